@@ -88,6 +88,9 @@ uint16_t pio_change_exclusive_program(PIO pio, const pio_program* prog) {
 };
 
 namespace pimoroni {
+    // Instances with a queue, so the shared DMA interrupt handler can find them
+    static APS6404* queue_instances[2] = {nullptr, nullptr};
+
     APS6404::APS6404(uint pin_csn, uint pin_d0, PIO pio)
                 : pin_csn(pin_csn)
                 , pin_d0(pin_d0)
@@ -104,6 +107,7 @@ namespace pimoroni {
         // Claim DMA channels
         dma_channel = dma_claim_unused_channel(true);
         read_cmd_dma_channel = dma_claim_unused_channel(true);
+        control_dma_channel = dma_claim_unused_channel(true);
         setup_dma_config();
     }
 
@@ -123,6 +127,24 @@ namespace pimoroni {
         sleep_us(500);
 
         adjust_clock();
+
+        for (int i = 0; i < 2; ++i) {
+            if (queue_instances[i] == this) break;
+            if (queue_instances[i] == nullptr) {
+                if (i == 0) {
+                    irq_add_shared_handler(DMA_IRQ_1, dma_irq_handler, PICO_SHARED_IRQ_HANDLER_DEFAULT_ORDER_PRIORITY);
+                    irq_set_enabled(DMA_IRQ_1, true);
+                }
+                queue_instances[i] = this;
+                break;
+            }
+        }
+    }
+
+    void APS6404::dma_irq_handler() {
+        for (int i = 0; i < 2; ++i) {
+            if (queue_instances[i]) queue_instances[i]->service_queue();
+        }
     }
 
     void APS6404::set_qpi() {
@@ -164,7 +186,6 @@ namespace pimoroni {
             aps6404_program_init(pio, pio_sm, pio_offset, pin_csn, pin_d0, false, false, false);
         }
 
-        last_cmd_was_write = false;
         page_smashing_ok = clock_hz <= 168000000;
     }
 
@@ -198,5 +219,31 @@ namespace pimoroni {
         channel_config_set_dreq(&read_config, pio_get_dreq(pio, pio_sm, false));
         channel_config_set_transfer_data_size(&read_config, DMA_SIZE_32);
         channel_config_set_bswap(&read_config, true);
+
+        // The control channel writes each 4 word control block to the data channel's alias 1
+        // registers, wrapping back to the first register every block.
+        control_config = dma_channel_get_default_config(control_dma_channel);
+        channel_config_set_read_increment(&control_config, true);
+        channel_config_set_write_increment(&control_config, true);
+        channel_config_set_ring(&control_config, true, 4);
+        channel_config_set_transfer_data_size(&control_config, DMA_SIZE_32);
+
+        // Every queued transfer chains back to the control channel to load the next block, and
+        // only raises an interrupt when the null block at the end of the list is reached.
+        dma_channel_config queue_config = write_config;
+        channel_config_set_irq_quiet(&queue_config, true);
+        end_ctrl = channel_config_get_ctrl_value(&queue_config);
+        channel_config_set_chain_to(&queue_config, control_dma_channel);
+        write_data_ctrl = channel_config_get_ctrl_value(&queue_config);
+        channel_config_set_read_increment(&queue_config, false);
+        repeat_data_ctrl = channel_config_get_ctrl_value(&queue_config);
+        channel_config_set_read_increment(&queue_config, true);
+        channel_config_set_bswap(&queue_config, false);
+        command_ctrl = channel_config_get_ctrl_value(&queue_config);
+
+        queue_config = read_config;
+        channel_config_set_irq_quiet(&queue_config, true);
+        channel_config_set_chain_to(&queue_config, control_dma_channel);
+        read_data_ctrl = channel_config_get_ctrl_value(&queue_config);
     }
 }
@@ -4,6 +4,11 @@
 #include "hardware/pio.h"
 #include "hardware/dma.h"
 
+// Performance counters cost a few cycles on every transfer, build with PICOVISION_STATS=0 to remove them
+#ifndef PICOVISION_STATS
+#define PICOVISION_STATS 1
+#endif
+
 namespace pimoroni {
     class APS6404 {
         public:
@@ -26,6 +31,36 @@ namespace pimoroni {
             void write(uint32_t addr, uint32_t* data, uint32_t len_in_bytes);
             void write_repeat(uint32_t addr, uint32_t data, uint32_t len_in_bytes);
 
+            // Queue a transfer.  Queued transfers run back to back, driven by a control DMA channel
+            // that loads each page's command and data transfer in turn, so these only block if the
+            // queue is full.  Data to write must be in place when it is queued, and no buffer may
+            // be touched again until a fence taken after queueing it has completed.
+            // Transfers started with the functions above wait for the queue to empty first.
+            void queue_write(uint32_t addr, uint32_t* data, uint32_t len_in_bytes);
+            void queue_write_repeat(uint32_t addr, uint32_t data, uint32_t len_in_bytes);
+            void queue_read(uint32_t addr, uint32_t* read_buf, uint32_t len_in_words);
+
+            // A fence covers everything queued before it was taken
+            uint32_t fence() const { return queued_seq; }
+            bool is_complete(uint32_t fence) const { return (int32_t)(completed_seq - fence) >= 0; }
+            void wait(uint32_t fence);
+
+            // Transfers queued, the most that were waiting at once, and the time the CPU spent
+            // waiting for transfers to complete or for room in the queue.
+            uint32_t get_queued_transfers() const { return queued_transfers; }
+            uint32_t get_max_queue_depth() const { return max_queue_depth; }
+            uint32_t get_stall_us() const { return stall_us; }
+            // Reads started directly rather than queued, bytes moved each way, and the extra
+            // commands needed where a transfer was split at a page boundary.
+            uint32_t get_direct_transfers() const { return direct_transfers; }
+            uint32_t get_bytes_written() const { return bytes_written; }
+            uint32_t get_bytes_read() const { return bytes_read; }
+            uint32_t get_page_splits() const { return page_splits; }
+            void reset_stats() {
+                queued_transfers = 0; max_queue_depth = 0; stall_us = 0;
+                direct_transfers = 0; bytes_written = 0; bytes_read = 0; page_splits = 0;
+            }
+
             // Start a read, this completes asynchronously, this function only blocks if another 
             // transfer is already in progress
             void read(uint32_t addr, uint32_t* read_buf, uint32_t len_in_words);
@@ -42,15 +77,65 @@ namespace pimoroni {
 
             // Block until any outstanding read or write completes
             void wait_for_finish_blocking() {
+                if (queued_seq != completed_seq) wait(queued_seq);
                 dma_channel_wait_for_finish_blocking(dma_channel);
             }
 
         private:
-            void write_no_page_crossing(uint32_t addr, uint32_t* data, uint32_t len_in_bytes);
             void start_read(uint32_t* read_buf, uint32_t total_len_in_words, int chain_channel = -1);
             void setup_dma_config();
             uint32_t* add_read_to_cmd_buffer(uint32_t* cmd_buf, uint32_t addr, uint32_t len_in_words);
 
+            // Each block is written to the data channel's alias 1 registers, the last write triggers it
+            struct ControlBlock {
+                uint32_t ctrl;
+                const volatile void* read_addr;
+                volatile void* write_addr;
+                uint32_t transfer_count;
+            };
+
+            // One list runs while the other is filled.  A list ends with a null block, which stops
+            // the chain and raises an interrupt that starts the next list.
+            static constexpr int QUEUE_LIST_LEN = 32;
+            struct QueueList {
+                ControlBlock blocks[QUEUE_LIST_LEN + 1];
+                uint32_t commands[QUEUE_LIST_LEN][4];  // Command words sent to the PIO by each block
+                int len;
+                uint32_t last_seq;  // Completing this list completes everything up to here
+            };
+            QueueList queue_lists[2];
+            volatile int queue_running = -1;
+            volatile int queue_fill = 0;
+            volatile uint32_t queued_seq = 0;
+            volatile uint32_t completed_seq = 0;
+
+            uint32_t queued_transfers = 0;
+            uint32_t max_queue_depth = 0;
+            uint32_t stall_us = 0;
+            uint32_t direct_transfers = 0;
+            uint32_t bytes_written = 0;
+            uint32_t bytes_read = 0;
+            uint32_t page_splits = 0;
+            uint32_t command_pages = 0;  // Pages queued for the transfer being queued
+
+            uint control_dma_channel;
+            dma_channel_config control_config;
+            uint32_t command_ctrl;
+            uint32_t write_data_ctrl;
+            uint32_t repeat_data_ctrl;
+            uint32_t read_data_ctrl;
+            uint32_t end_ctrl;
+
+            void reserve(int num_blocks);
+            void queue_write_page(uint32_t addr, const uint32_t* data, uint32_t len_in_bytes, bool repeat);
+            void queue_partial_word(uint32_t addr, uint32_t data, uint32_t len_in_bytes);
+            void queue_read_page(uint32_t addr, uint32_t* read_buf, uint32_t len_in_bytes);
+            void end_command();
+            void kick();
+            void start_fill_list();
+            void service_queue();
+            static void dma_irq_handler();
+
             uint pin_csn;  // CSn, SCK must be next pin after CSn
             uint pin_d0;   // D0, D1, D2, D3 must be consecutive
 
@@ -61,7 +146,6 @@ namespace pimoroni {
 
             uint dma_channel;
             uint read_cmd_dma_channel;
-            bool last_cmd_was_write = false;
             bool page_smashing_ok = true;
 
             dma_channel_config write_config;
@@ -69,6 +153,5 @@ namespace pimoroni {
 
             static constexpr int MULTI_READ_MAX_PAGES = 128;
             uint32_t multi_read_cmd_buffer[3 * MULTI_READ_MAX_PAGES];
-            uint32_t repeat_data;
     };
 }
@@ -1,108 +1,74 @@
 #include <algorithm>
 #include "aps6404.hpp"
 #include "hardware/dma.h"
+#include "hardware/sync.h"
+#include "hardware/timer.h"
 
 #ifndef NO_QSTR
 #include "aps6404.pio.h"
 #endif
 
 namespace pimoroni {
-    void APS6404::write_no_page_crossing(uint32_t addr, uint32_t* data, uint32_t len_in_bytes) {
-        int len = len_in_bytes;
-        int page_len = PAGE_SIZE - (addr & (PAGE_SIZE - 1));
-
-        if ((page_len & 3) != 0) {
-            while (len > page_len) {
-                wait_for_finish_blocking();
-                hw_set_bits(&dma_hw->ch[dma_channel].al1_ctrl, DMA_CH0_CTRL_TRIG_INCR_READ_BITS);
-
-                pio_sm_put_blocking(pio, pio_sm, (page_len << 1) - 1);
-                pio_sm_put_blocking(pio, pio_sm, 0x38000000u | addr);
-                pio_sm_put_blocking(pio, pio_sm, pio_offset + sram_offset_do_write);
-
-                dma_channel_transfer_from_buffer_now(dma_channel, data, (page_len >> 2) + 1);
-
-                len -= page_len;
-                addr += page_len;
-                data += page_len >> 2;
-                int bytes_sent_last_word = page_len & 3;
-                page_len = std::min(4 - bytes_sent_last_word, len);
-                
-                dma_channel_wait_for_finish_blocking(dma_channel);
-                pio_sm_put_blocking(pio, pio_sm, (page_len << 1) - 1);
-                pio_sm_put_blocking(pio, pio_sm, 0x38000000u | addr);
-                pio_sm_put_blocking(pio, pio_sm, pio_offset + sram_offset_do_write);
-                pio_sm_put_blocking(pio, pio_sm, __builtin_bswap32(*data >> (8 * bytes_sent_last_word)));
-                
-                addr += page_len;
-                len -= page_len;
-                ++data;
-                page_len = PAGE_SIZE - page_len;
-            }
-        }
-
-        for (page_len = std::min(page_len, len);
-            len > 0; 
-            addr += page_len, data += page_len >> 2, len -= page_len, page_len = std::min(PAGE_SIZE, len))
-        {
-            wait_for_finish_blocking();
-            hw_set_bits(&dma_hw->ch[dma_channel].al1_ctrl, DMA_CH0_CTRL_TRIG_INCR_READ_BITS);
-
-            pio_sm_put_blocking(pio, pio_sm, (page_len << 1) - 1);
-            pio_sm_put_blocking(pio, pio_sm, 0x38000000u | addr);
-            pio_sm_put_blocking(pio, pio_sm, pio_offset + sram_offset_do_write);
+    void APS6404::write(uint32_t addr, uint32_t* data, uint32_t len_in_bytes) {
+        wait_for_finish_blocking();
+        queue_write(addr, data, len_in_bytes);
+    }
 
-            dma_channel_transfer_from_buffer_now(dma_channel, data, (page_len >> 2) + 1);
-        }
+    void APS6404::write_repeat(uint32_t addr, uint32_t data, uint32_t len_in_bytes) {
+        wait_for_finish_blocking();
+        queue_write_repeat(addr, data, len_in_bytes);
     }
 
-    void APS6404::write(uint32_t addr, uint32_t* data, uint32_t len_in_bytes) {
-        if (!last_cmd_was_write) {
-            last_cmd_was_write = true;
-            wait_for_finish_blocking();
-            dma_channel_set_write_addr(dma_channel, &pio->txf[pio_sm], false);
-            dma_hw->ch[dma_channel].al1_ctrl = write_config.ctrl;
-        }
+    void APS6404::queue_write(uint32_t addr, uint32_t* data, uint32_t len_in_bytes) {
+#if PICOVISION_STATS
+        bytes_written += len_in_bytes;
+#endif
+        int len = len_in_bytes;
+        int page_len = PAGE_SIZE;
 
         if (!page_smashing_ok) {
-            write_no_page_crossing(addr, data, len_in_bytes);
-            return;
+            page_len -= (addr & (PAGE_SIZE - 1));
+
+            if ((page_len & 3) != 0) {
+                // The page ends part way through a word, so send the rest of that word on its own
+                while (len > page_len) {
+                    queue_write_page(addr, data, page_len, false);
+
+                    len -= page_len;
+                    addr += page_len;
+                    data += page_len >> 2;
+                    int bytes_sent_last_word = page_len & 3;
+                    page_len = std::min(4 - bytes_sent_last_word, len);
+
+                    queue_partial_word(addr, __builtin_bswap32(*data >> (8 * bytes_sent_last_word)), page_len);
+
+                    addr += page_len;
+                    len -= page_len;
+                    ++data;
+                    page_len = PAGE_SIZE - page_len;
+                }
+            }
         }
 
-        for (int len = len_in_bytes, page_len = std::min(PAGE_SIZE, len); 
+        for (page_len = std::min(page_len, len);
             len > 0; 
             addr += page_len, data += page_len >> 2, len -= page_len, page_len = std::min(PAGE_SIZE, len))
         {
-            wait_for_finish_blocking();
-            hw_set_bits(&dma_hw->ch[dma_channel].al1_ctrl, DMA_CH0_CTRL_TRIG_INCR_READ_BITS);
-
-            pio_sm_put_blocking(pio, pio_sm, (page_len << 1) - 1);
-            pio_sm_put_blocking(pio, pio_sm, 0x38000000u | addr);
-            pio_sm_put_blocking(pio, pio_sm, pio_offset + sram_offset_do_write);
-
-            dma_channel_transfer_from_buffer_now(dma_channel, data, (page_len >> 2) + 1);
+            queue_write_page(addr, data, page_len, false);
         }
-    }
 
-    void APS6404::write_repeat(uint32_t addr, uint32_t data, uint32_t len_in_bytes) {
-        if (!last_cmd_was_write) {
-            last_cmd_was_write = true;
-            dma_channel_set_write_addr(dma_channel, &pio->txf[pio_sm], false);
-            dma_hw->ch[dma_channel].al1_ctrl = write_config.ctrl;
-        }
+        end_command();
+    }
 
+    void APS6404::queue_write_repeat(uint32_t addr, uint32_t data, uint32_t len_in_bytes) {
+#if PICOVISION_STATS
+        bytes_written += len_in_bytes;
+#endif
         int first_page_len = PAGE_SIZE;
         if (!page_smashing_ok) {
             first_page_len -= (addr & (PAGE_SIZE - 1));
             if ((first_page_len & 3) != 0 && (int)len_in_bytes > first_page_len) {
-                wait_for_finish_blocking();
-                hw_clear_bits(&dma_hw->ch[dma_channel].al1_ctrl, DMA_CH0_CTRL_TRIG_INCR_READ_BITS);
-
-                pio_sm_put_blocking(pio, pio_sm, (first_page_len << 1) - 1);
-                pio_sm_put_blocking(pio, pio_sm, 0x38000000u | addr);
-                pio_sm_put_blocking(pio, pio_sm, pio_offset + sram_offset_do_write);
-
-                dma_channel_transfer_from_buffer_now(dma_channel, &data, (first_page_len >> 2) + 1);
+                queue_write_page(addr, &data, first_page_len, true);
 
                 len_in_bytes -= first_page_len;
                 addr += first_page_len;
@@ -116,20 +82,200 @@ namespace pimoroni {
              len > 0; 
              addr += page_len, len -= page_len, page_len = std::min(PAGE_SIZE, len))
         {
-            wait_for_finish_blocking();
-            hw_clear_bits(&dma_hw->ch[dma_channel].al1_ctrl, DMA_CH0_CTRL_TRIG_INCR_READ_BITS);
-            repeat_data = data;
+            queue_write_page(addr, &data, page_len, true);
+        }
+
+        end_command();
+    }
+
+    void APS6404::queue_read(uint32_t addr, uint32_t* read_buf, uint32_t len_in_words) {
+        int len = len_in_words << 2;
+        int page_len = PAGE_SIZE;
+        if (!page_smashing_ok) {
+            page_len -= (addr & (PAGE_SIZE - 1));
+
+            if ((page_len & 3) != 0 && len > page_len) {
+                // Reads split part way through a word need the command and data channels running
+                // at the same time, so can't be queued.
+                wait(fence());
+                read_blocking(addr, read_buf, len_in_words);
+                return;
+            }
+        }
+
+#if PICOVISION_STATS
+        bytes_read += len;
+#endif
+
+        for (page_len = std::min(page_len, len);
+            len > 0;
+            addr += page_len, read_buf += page_len >> 2, len -= page_len, page_len = std::min(PAGE_SIZE, len))
+        {
+            queue_read_page(addr, read_buf, page_len);
+        }
+
+        end_command();
+    }
+
+    void APS6404::reserve(int num_blocks) {
+        if (queue_lists[queue_fill].len + num_blocks <= QUEUE_LIST_LEN) return;
 
-            pio_sm_put_blocking(pio, pio_sm, (page_len << 1) - 1);
-            pio_sm_put_blocking(pio, pio_sm, 0x38000000u | addr);
-            pio_sm_put_blocking(pio, pio_sm, pio_offset + sram_offset_do_write);
+        // Wait for the running list to finish, at which point the full list is started
+        // and the other one can be filled.
+#if PICOVISION_STATS
+        uint32_t start = time_us_32();
+#endif
+        while (queue_lists[queue_fill].len + num_blocks > QUEUE_LIST_LEN) {
+            kick();
+            service_queue();
+        }
+#if PICOVISION_STATS
+        stall_us += time_us_32() - start;
+#endif
+    }
+
+    void APS6404::queue_write_page(uint32_t addr, const uint32_t* data, uint32_t len_in_bytes, bool repeat) {
+        reserve(2);
+#if PICOVISION_STATS
+        ++command_pages;
+#endif
+
+        uint32_t save = save_and_disable_interrupts();
+        QueueList &list = queue_lists[queue_fill];
+        uint32_t* command = list.commands[list.len];
+        command[0] = (len_in_bytes << 1) - 1;
+        command[1] = 0x38000000u | addr;
+        command[2] = pio_offset + sram_offset_do_write;
+        list.blocks[list.len++] = {command_ctrl, command, &pio->txf[pio_sm], 3};
+
+        if (repeat) {
+            command[3] = *data;
+            list.blocks[list.len++] = {repeat_data_ctrl, &command[3], &pio->txf[pio_sm], (len_in_bytes >> 2) + 1};
+        }
+        else {
+            list.blocks[list.len++] = {write_data_ctrl, data, &pio->txf[pio_sm], (len_in_bytes >> 2) + 1};
+        }
+        restore_interrupts(save);
+    }
+
+    void APS6404::queue_partial_word(uint32_t addr, uint32_t data, uint32_t len_in_bytes) {
+        reserve(1);
+#if PICOVISION_STATS
+        ++command_pages;
+#endif
+
+        uint32_t save = save_and_disable_interrupts();
+        QueueList &list = queue_lists[queue_fill];
+        uint32_t* command = list.commands[list.len];
+        command[0] = (len_in_bytes << 1) - 1;
+        command[1] = 0x38000000u | addr;
+        command[2] = pio_offset + sram_offset_do_write;
+        command[3] = data;
+        list.blocks[list.len++] = {command_ctrl, command, &pio->txf[pio_sm], 4};
+        restore_interrupts(save);
+    }
+
+    void APS6404::queue_read_page(uint32_t addr, uint32_t* read_buf, uint32_t len_in_bytes) {
+        reserve(2);
+#if PICOVISION_STATS
+        ++command_pages;
+#endif
+
+        uint32_t save = save_and_disable_interrupts();
+        QueueList &list = queue_lists[queue_fill];
+        uint32_t* command = list.commands[list.len];
+        command[0] = (len_in_bytes << 1) - 4;
+        command[1] = 0xeb000000u | addr;
+        command[2] = pio_offset + sram_offset_do_read;
+        list.blocks[list.len++] = {command_ctrl, command, &pio->txf[pio_sm], 3};
+        list.blocks[list.len++] = {read_data_ctrl, &pio->rxf[pio_sm], read_buf, len_in_bytes >> 2};
+        restore_interrupts(save);
+    }
+
+    void APS6404::end_command() {
+        uint32_t save = save_and_disable_interrupts();
+        queue_lists[queue_fill].last_seq = ++queued_seq;
+        restore_interrupts(save);
+
+#if PICOVISION_STATS
+        ++queued_transfers;
+        max_queue_depth = std::max(max_queue_depth, queued_seq - completed_seq);
+        if (command_pages > 1) page_splits += command_pages - 1;
+        command_pages = 0;
+#endif
+
+        kick();
+    }
+
+    void APS6404::wait(uint32_t fence) {
+        if (is_complete(fence)) return;
 
-            dma_channel_transfer_from_buffer_now(dma_channel, &repeat_data, (page_len >> 2) + 1);
+#if PICOVISION_STATS
+        uint32_t start = time_us_32();
+#endif
+        while (!is_complete(fence)) {
+            kick();
+            service_queue();
         }
+#if PICOVISION_STATS
+        stall_us += time_us_32() - start;
+#endif
+    }
+
+    void APS6404::kick() {
+        if (queue_running >= 0 || queue_lists[queue_fill].len == 0) return;
+
+        // Transfers started directly must finish before the queue can use the channel
+        dma_channel_wait_for_finish_blocking(dma_channel);
+
+        uint32_t save = save_and_disable_interrupts();
+        if (queue_running < 0) start_fill_list();
+        restore_interrupts(save);
+    }
+
+    // Called with interrupts disabled
+    void APS6404::start_fill_list() {
+        QueueList &list = queue_lists[queue_fill];
+        if (list.len == 0) return;
+
+        // The null block leaves the data channel set up for direct writes, without chaining
+        list.blocks[list.len] = {end_ctrl, nullptr, &pio->txf[pio_sm], 0};
+
+        queue_running = queue_fill;
+        queue_fill ^= 1;
+        queue_lists[queue_fill].len = 0;
+        queue_lists[queue_fill].last_seq = list.last_seq;
+
+        dma_hw->intr = 1u << dma_channel;
+        dma_channel_set_irq1_enabled(dma_channel, true);
+        dma_channel_configure(
+            control_dma_channel, &control_config,
+            &dma_hw->ch[dma_channel].al1_ctrl,
+            list.blocks,
+            4,
+            true
+        );
+    }
+
+    void APS6404::service_queue() {
+        uint32_t save = save_and_disable_interrupts();
+        if (queue_running >= 0 && (dma_hw->intr & (1u << dma_channel))) {
+            dma_hw->ints1 = 1u << dma_channel;
+            dma_channel_set_irq1_enabled(dma_channel, false);
+
+            completed_seq = queue_lists[queue_running].last_seq;
+            queue_running = -1;
+            start_fill_list();
+        }
+        restore_interrupts(save);
     }
 
     void APS6404::read(uint32_t addr, uint32_t* read_buf, uint32_t len_in_words) {
         start_read(read_buf, len_in_words);
+#if PICOVISION_STATS
+        ++direct_transfers;
+        bytes_read += len_in_words << 2;
+#endif
 
         uint32_t first_page_len = PAGE_SIZE;
         if (!page_smashing_ok) {
@@ -156,6 +302,10 @@ namespace pimoroni {
         }
 
         start_read(read_buf, total_len, chain_channel);
+#if PICOVISION_STATS
+        direct_transfers += num_reads;
+        bytes_read += total_len << 2;
+#endif
 
         dma_channel_transfer_from_buffer_now(read_cmd_dma_channel, multi_read_cmd_buffer, cmd_buf - multi_read_cmd_buffer);
     }
@@ -166,7 +316,6 @@ namespace pimoroni {
             channel_config_set_chain_to(&c, chain_channel);
         }
         
-        last_cmd_was_write = false;
         wait_for_finish_blocking();
 
         dma_channel_configure(
@@ -198,6 +347,9 @@ namespace pimoroni {
             addr += len;
 
             if (len_remaining <= 0) break;
+#if PICOVISION_STATS
+            ++page_splits;
+#endif
 
             len = len_remaining;
             if (len > PAGE_SIZE) len = PAGE_SIZE;
@@ -1,5 +1,6 @@
 #include "dv_display.hpp"
 #include "swd_load.hpp"
+#include "hardware/sync.h"
 #if SUPPORT_WIDE_MODES
 #include "pico-stick-wide.h"
 #else
@@ -24,6 +25,9 @@ static void my_thread_yield() {
 #endif
 
 namespace {
+  // Cleared sprite slots are stored normalised so that repeated clears compare equal
+  constexpr uint8_t cleared_sprite[7] = {1, 0xFF, 0xFF, 0, 0, 0, 0};
+
   template <typename T>
   bool is_transparent(T val);
   
@@ -57,16 +61,50 @@ namespace {
 
 namespace pimoroni {
   volatile bool enable_switch_on_vsync = false;
+  DVDisplay::vsync_func vsync_handler = nullptr;
+  void* vsync_handler_context = nullptr;
+
+#if PICOVISION_STATS
+  // Updated by the vsync handler, so kept here rather than in DVDisplay
+  volatile uint32_t flip_requested_at = 0;
+  volatile uint32_t flips_shown = 0;
+  volatile uint32_t flip_latency_us = 0;
+  volatile uint32_t flip_latency_max_us = 0;
+  volatile uint32_t vsyncs_since_flip = 0;
+  volatile bool frame_started = false;  // Set once a flip has been shown since the stats were reset
+  volatile uint32_t missed_vsyncs = 0;
+  volatile uint32_t frame_vsyncs[DVDisplay::FRAME_VSYNCS_LEN];
+#endif
 
   void vsync_callback() {
     if (gpio_get_irq_event_mask(DVDisplay::VSYNC) & GPIO_IRQ_EDGE_RISE) {
       gpio_acknowledge_irq(DVDisplay::VSYNC, GPIO_IRQ_EDGE_RISE);
+#if PICOVISION_STATS
+      ++vsyncs_since_flip;
+#endif
 
       if (enable_switch_on_vsync) {
         // Toggle RAM_SEL pin
         gpio_xor_mask(1 << DVDisplay::RAM_SEL);
+#if PICOVISION_STATS
+        uint32_t latency = time_us_32() - flip_requested_at;
+        flip_latency_us += latency;
+        if (latency > flip_latency_max_us) flip_latency_max_us = latency;
+        ++flips_shown;
+
+        // How many vsyncs the frame was on screen for
+        if (frame_started) {
+          uint32_t vsyncs = vsyncs_since_flip;
+          missed_vsyncs += vsyncs - 1;
+          ++frame_vsyncs[std::min(vsyncs, (uint32_t)DVDisplay::FRAME_VSYNCS_LEN) - 1];
+        }
+        frame_started = true;
+        vsyncs_since_flip = 0;
+#endif
         enable_switch_on_vsync = false;
       }
+
+      if (vsync_handler) vsync_handler(vsync_handler_context);
     }
   }
 
@@ -104,6 +142,8 @@ namespace pimoroni {
     if (frame_height_ == 0) frame_height = display_height_;
     else frame_height = frame_height_;
 
+    free_all_surfaces();
+
     bank = 0;
     h_repeat = 1;
     v_repeat = 1;
@@ -174,12 +214,17 @@ namespace pimoroni {
     mp_printf(&mp_plat_print, "Start I2C\n");
 
     if (res_mode != 0xFF) {
-      i2c->reg_write_uint8(I2C_ADDR, I2C_REG_SET_RES, res_mode);
+      i2c_reg_write_uint8(I2C_REG_SET_RES, res_mode);
     }
 
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_START, 1);
+    i2c_reg_write_uint8(I2C_REG_START, 1);
     mp_printf(&mp_plat_print, "Started\n");
 
+    sprite_commit_mode = SPRITE_COMMIT_IMMEDIATE;
+    sprite_bytes_requested = 0;
+    sprite_bytes_written = 0;
+    sprite_bytes_saved = 0;
+
     set_mode(mode_);
 
 #ifdef MICROPY_BUILD_TYPE
@@ -196,20 +241,16 @@ namespace pimoroni {
   }
   
   void DVDisplay::flip_async() {
+#if PICOVISION_STATS
+    uint32_t start = time_us_32();
+#endif
     if (mode == MODE_PALETTE) {
       if (rewrite_palette > 0) {
         write_palette();
         --rewrite_palette;
       }
-      if (pixel_buffer_location.y != -1) {
-        ram.write(point_to_address_palette(pixel_buffer_location), pixel_buffer, pixel_buffer_x);
-        pixel_buffer_location.y = -1;
-      }
-    }
-    else if (pixel_buffer_location.y != -1) {
-      ram.write(point_to_address16(pixel_buffer_location), pixel_buffer, pixel_buffer_x << 1);
-      pixel_buffer_location.y = -1;
     }
+    flush();
 
     if (rewrite_header) {
       set_scroll_idx_for_lines(-1, 0, display_height);
@@ -217,9 +258,22 @@ namespace pimoroni {
       --rewrite_header;
     }
 
+    if (sprite_commit_mode == SPRITE_COMMIT_AUTO) {
+      commit_sprites();
+    }
+    // Bytes committed this frame may have been requested in an earlier one
+    sprite_bytes_saved = sprite_bytes_requested > sprite_bytes_written ? sprite_bytes_requested - sprite_bytes_written : 0;
+    sprite_bytes_requested = 0;
+    sprite_bytes_written = 0;
+
     bank ^= 1;
     ram.wait_for_finish_blocking();
 
+#if PICOVISION_STATS
+    flip_requested_at = time_us_32();
+    flip_us += flip_requested_at - start;
+    ++flips;
+#endif
     enable_switch_on_vsync = true;
 
     if (change_mode) {
@@ -232,11 +286,29 @@ namespace pimoroni {
     wait_for_flip();
   }
 
+  bool DVDisplay::is_flip_pending() const {
+    return enable_switch_on_vsync;
+  }
+
+  void DVDisplay::set_vsync_handler(vsync_func handler, void* context) {
+    // Don't let the vsync handler see a half changed handler
+    uint32_t status = save_and_disable_interrupts();
+    vsync_handler = handler;
+    vsync_handler_context = context;
+    restore_interrupts(status);
+  }
+
   void DVDisplay::wait_for_flip() {
+#if PICOVISION_STATS
+    uint32_t start = time_us_32();
+#endif
     while (enable_switch_on_vsync) {
       // Waiting for IRQ handler to do flip.
       my_thread_yield();
     }
+#if PICOVISION_STATS
+    flip_wait_us += time_us_32() - start;
+#endif
 
     if (change_mode) {
       --change_mode;
@@ -245,12 +317,73 @@ namespace pimoroni {
     }
   }
 
+  uint32_t DVDisplay::get_flips_shown() const {
+#if PICOVISION_STATS
+    return flips_shown;
+#else
+    return 0;
+#endif
+  }
+
+  uint32_t DVDisplay::get_flip_latency_us() const {
+#if PICOVISION_STATS
+    return flip_latency_us;
+#else
+    return 0;
+#endif
+  }
+
+  uint32_t DVDisplay::get_flip_latency_max_us() const {
+#if PICOVISION_STATS
+    return flip_latency_max_us;
+#else
+    return 0;
+#endif
+  }
+
+  uint32_t DVDisplay::get_missed_vsyncs() const {
+#if PICOVISION_STATS
+    return missed_vsyncs;
+#else
+    return 0;
+#endif
+  }
+
+  uint32_t DVDisplay::get_frame_vsyncs(int vsyncs) const {
+#if PICOVISION_STATS
+    if (vsyncs < 1 || vsyncs > FRAME_VSYNCS_LEN) return 0;
+    return frame_vsyncs[vsyncs - 1];
+#else
+    return 0;
+#endif
+  }
+
+  void DVDisplay::reset_stats() {
+    reset_pixel_buffer_stats();
+    reset_ram_stats();
+    i2c_transfers = 0;
+    i2c_bytes = 0;
+    flips = 0;
+    flip_us = 0;
+    flip_wait_us = 0;
+#if PICOVISION_STATS
+    // Don't race the vsync handler
+    uint32_t status = save_and_disable_interrupts();
+    flips_shown = 0;
+    flip_latency_us = 0;
+    flip_latency_max_us = 0;
+    missed_vsyncs = 0;
+    frame_started = false;
+    for (auto &count : frame_vsyncs) count = 0;
+    restore_interrupts(status);
+#endif
+  }
+
   void DVDisplay::reset() {
-    for(auto i = 0u; i < MAX_DISPLAYED_SPRITES; i++) {
-      clear_sprite(i);
-    }
+    set_vsync_handler(nullptr, nullptr);
+    clear_all_sprites();
     //swd_reset();
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_STOP, 1);
+    i2c_reg_write_uint8(I2C_REG_STOP, 1);
 #ifdef MICROPY_BUILD_TYPE
     irq_remove_handler(IO_IRQ_BANK0, vsync_callback);
 #endif
@@ -290,7 +423,7 @@ namespace pimoroni {
     scroll_config[11] = wrap_offset & 0xFF;
     scroll_config[12] = (wrap_offset >> 8) & 0xFF;
 
-    i2c->write_bytes(I2C_ADDR, I2C_REG_SCROLL_BASE + idx, scroll_config, 13);
+    i2c_write_bytes(I2C_REG_SCROLL_BASE + idx, scroll_config, 13);
   }
 
   void DVDisplay::set_scroll_idx_for_lines(int idx, int miny, int maxy) {
@@ -319,12 +452,31 @@ namespace pimoroni {
     }
   }
 
+  void DVDisplay::set_line_offsets(const uint32_t* offsets, int miny, int len, int idx) {
+    // Alternate between two buffers so the next batch of lines can be
+    // prepared while the previous one is still being written.
+    constexpr int buf_size = 128;
+    uint32_t buf[2][buf_size];
+    uint addr = 4 * (7 + miny);
+    uint line_type = ((uint)mode << 27) | ((uint)(idx & 7) << 29) | ((uint32_t)h_repeat << 24);
+    for (int i = 0; i < len; i += buf_size) {
+      uint32_t* line_buf = buf[(i / buf_size) & 1];
+      int maxj = std::min(buf_size, len - i);
+      for (int j = 0; j < maxj; ++j) {
+        line_buf[j] = line_type + ((offsets[i + j] + base_address) & 0xFFFFFF);
+      }
+      ram.write(addr, line_buf, maxj * 4);
+      addr += 4 * maxj;
+    }
+    ram.wait_for_finish_blocking();
+  }
+
   uint8_t DVDisplay::get_gpio() {
-    return i2c->reg_read_uint8(I2C_ADDR, I2C_REG_GPIO);
+    return i2c_reg_read_uint8(I2C_REG_GPIO);
   }
 
   void DVDisplay::set_gpio_29_dir(bool output) {
-    uint8_t pin29_mode = i2c->reg_read_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE);
+    uint8_t pin29_mode = i2c_reg_read_uint8(I2C_REG_GPIO29_MODE);
     if (output) {
       pin29_mode = 5;
     }
@@ -336,51 +488,51 @@ namespace pimoroni {
       // Pin is already an input, don't change the pulls
       return;
     }
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE, pin29_mode);
+    i2c_reg_write_uint8(I2C_REG_GPIO29_MODE, pin29_mode);
   }
 
   void DVDisplay::set_gpio_29_value(uint8_t pwm_value) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO29_OUT, pwm_value);
+    i2c_reg_write_uint8(I2C_REG_GPIO29_OUT, pwm_value);
   }
 
   void DVDisplay::set_gpio_29_pull_up(bool on) {
-    uint8_t pin29_mode = i2c->reg_read_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE);
+    uint8_t pin29_mode = i2c_reg_read_uint8(I2C_REG_GPIO29_MODE);
     if (pin29_mode > 3) {
       return;
     }
     if (on) pin29_mode |= 1;
     else pin29_mode &= ~1;
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE, pin29_mode);
+    i2c_reg_write_uint8(I2C_REG_GPIO29_MODE, pin29_mode);
   }
 
   void DVDisplay::set_gpio_29_pull_down(bool on) {
-    uint8_t pin29_mode = i2c->reg_read_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE);
+    uint8_t pin29_mode = i2c_reg_read_uint8(I2C_REG_GPIO29_MODE);
     if (pin29_mode > 3) {
       return;
     }
     if (on) pin29_mode |= 2;
     else pin29_mode &= ~2;
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE, pin29_mode);
+    i2c_reg_write_uint8(I2C_REG_GPIO29_MODE, pin29_mode);
   }
 
   void DVDisplay::enable_gpio_29_adc() {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO29_MODE, 6);
+    i2c_reg_write_uint8(I2C_REG_GPIO29_MODE, 6);
   }
 
   float DVDisplay::get_gpio_29_adc() {
     constexpr float conversion = 3.3f / (1 << 12);
-    return i2c->reg_read_uint16(I2C_ADDR, I2C_REG_GPIO29_ADC) * conversion;
+    return i2c_reg_read_uint16(I2C_REG_GPIO29_ADC) * conversion;
   }
 
   uint8_t DVDisplay::get_gpio_hi() {
-    return i2c->reg_read_uint8(I2C_ADDR, I2C_REG_GPIO_HI);
+    return i2c_reg_read_uint8(I2C_REG_GPIO_HI);
   }
 
   void DVDisplay::i2c_modify_bit(uint8_t reg, uint bit, bool enable) {
-    uint8_t val = i2c->reg_read_uint8(I2C_ADDR, reg);
+    uint8_t val = i2c_reg_read_uint8(reg);
     if (enable) val |= 1u << bit;
     else val &= ~(1u << bit);
-    i2c->reg_write_uint8(I2C_ADDR, reg, val);
+    i2c_reg_write_uint8(reg, val);
   }
 
   void DVDisplay::set_gpio_hi_dir(uint pin, bool output) {
@@ -388,7 +540,7 @@ namespace pimoroni {
   }
 
   void DVDisplay::set_gpio_hi_dir_all(uint8_t val) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO_HI_OE, val);
+    i2c_reg_write_uint8(I2C_REG_GPIO_HI_OE, val);
   }
 
   void DVDisplay::set_gpio_hi(uint pin, bool on) {
@@ -396,7 +548,7 @@ namespace pimoroni {
   }
 
   void DVDisplay::set_gpio_hi_all(uint8_t val) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO_HI_OUT, val);
+    i2c_reg_write_uint8(I2C_REG_GPIO_HI_OUT, val);
   }
 
   void DVDisplay::set_gpio_hi_pull_up(uint pin, bool on) {
@@ -404,7 +556,7 @@ namespace pimoroni {
   }
 
   void DVDisplay::set_gpio_hi_pull_up_all(uint8_t val) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO_HI_PULL_UP, val);
+    i2c_reg_write_uint8(I2C_REG_GPIO_HI_PULL_UP, val);
   }
 
   void DVDisplay::set_gpio_hi_pull_down(uint pin, bool on) {
@@ -412,11 +564,11 @@ namespace pimoroni {
   }
 
   void DVDisplay::set_gpio_hi_pull_down_all(uint8_t val) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_GPIO_HI_PULL_DOWN, val);
+    i2c_reg_write_uint8(I2C_REG_GPIO_HI_PULL_DOWN, val);
   }
 
   float DVDisplay::get_gpu_temp() {
-    uint16_t raw_value = i2c->reg_read_uint16(I2C_ADDR, I2C_REG_GPU_TEMP);
+    uint16_t raw_value = i2c_reg_read_uint16(I2C_REG_GPU_TEMP);
 
     constexpr float conversionFactor = 3.3f / (1 << 12);
 
@@ -425,19 +577,19 @@ namespace pimoroni {
   }
 
   void DVDisplay::set_led_level(uint8_t level) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_LED, level | 0x80);
+    i2c_reg_write_uint8(I2C_REG_LED, level | 0x80);
   }
 
   void DVDisplay::set_led_heartbeat() {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_LED, 2);
+    i2c_reg_write_uint8(I2C_REG_LED, 2);
   }
 
   void DVDisplay::get_edid(uint8_t* edid) {
-    i2c->read_bytes(I2C_ADDR, I2C_REG_EDID, edid, 128);
+    i2c_read_bytes(I2C_REG_EDID, edid, 128);
   }
 
   void DVDisplay::set_display_palette_index(uint8_t idx) {
-    i2c->reg_write_uint8(I2C_ADDR, I2C_REG_PALETTE_INDEX, idx);
+    i2c_reg_write_uint8(I2C_REG_PALETTE_INDEX, idx);
   }
 
   void DVDisplay::set_local_palette_index(uint8_t idx) {
@@ -467,14 +619,65 @@ namespace pimoroni {
       vals[j++] = (colour >> 16) | (colour << 8);
     }
 
+    // Every write is from the same buffer, so they can all be queued
     for (int len_bytes = len * 3; len_bytes > 0; len_bytes -= VAL_BUFFER_LEN_IN_PIXELS * 3) {
       uint len_to_write = std::min(len_bytes, VAL_BUFFER_LEN_IN_PIXELS * 3);
-      ram.write(address, vals, len_to_write);
+      ram.queue_write(address, vals, len_to_write);
       address += len_to_write;
     }
     ram.wait_for_finish_blocking();
   }
 
+  void DVDisplay::fill_rect(const Rect &r, uint32_t colour)
+  {
+    if (r.empty()) return;
+    flush();
+
+    const uint32_t stride = frame_row_stride();
+    uint32_t address = point_to_address({r.x, r.y});
+
+    if (mode == MODE_RGB888) {
+      colour &= 0xFFFFFF;
+      if (colour != fill_buffer_colour) {
+        ram.wait(fill_buffer_fence);
+        for (int i = 0; i < FILL_BUFFER_LEN_IN_WORDS; i += 3) {
+          fill_buffer[i] = colour | (colour << 24);
+          fill_buffer[i + 1] = (colour >> 8) | (colour << 16);
+          fill_buffer[i + 2] = (colour >> 16) | (colour << 8);
+        }
+        fill_buffer_colour = colour;
+      }
+
+      for (int32_t y = 0; y < r.h; ++y, address += stride) {
+        uint32_t row_address = address;
+        for (int32_t len_bytes = r.w * 3; len_bytes > 0; len_bytes -= FILL_BUFFER_LEN_IN_WORDS * 4) {
+          const uint32_t len_to_write = std::min(len_bytes, FILL_BUFFER_LEN_IN_WORDS * 4);
+          ram.queue_write(row_address, fill_buffer, len_to_write);
+          row_address += len_to_write;
+        }
+      }
+      fill_buffer_fence = ram.fence();
+    }
+    else {
+      uint32_t val;
+      uint32_t len_bytes;
+      if (mode == MODE_PALETTE) {
+        val = colour & 0xFF;
+        val |= val << 8;
+        val |= val << 16;
+        len_bytes = r.w;
+      }
+      else {
+        val = (colour & 0xFFFF) | (colour << 16);
+        len_bytes = r.w << 1;
+      }
+
+      for (int32_t y = 0; y < r.h; ++y, address += stride) {
+        ram.queue_write_repeat(address, val, len_bytes);
+      }
+    }
+  }
+
   void DVDisplay::read(uint32_t address, size_t len, uint16_t *data)
   {
     if ((uintptr_t)data & 1) {
@@ -527,42 +730,97 @@ namespace pimoroni {
     }
   }
 
-  void DVDisplay::write_pixel(const Point &p, uint16_t colour)
+  void DVDisplay::flush()
   {
-    if (pixel_buffer_location.y == p.y && pixel_buffer_location.x + pixel_buffer_x == p.x) {
-      if (pixel_buffer_x & 1) pixel_buffer[pixel_buffer_x >> 1] |= (uint32_t)colour << 16;
-      else pixel_buffer[pixel_buffer_x >> 1] = colour;
-      if (++pixel_buffer_x == PIXEL_BUFFER_LEN_IN_WORDS * 2) {
-        ram.write(point_to_address16(pixel_buffer_location), pixel_buffer, PIXEL_BUFFER_LEN_IN_WORDS * 4);
-        pixel_buffer_location.y = -1;
+    if (pixel_buffer_len == 0) return;
+
+    if (alpha_blend) {
+      if (alpha_read_target) {
+        ram.read_blocking(pixel_buffer_address, pixel_buffer, (pixel_buffer_len + 3) >> 2);
       }
-      return;
+      alpha_blend(alpha_context, alpha_colour, alpha_buffer, (uint8_t*)pixel_buffer, alpha_len);
+      alpha_blend = nullptr;
+      alpha_len = 0;
     }
-    else if (pixel_buffer_location.y != -1) {
-      ram.write(point_to_address16(pixel_buffer_location), pixel_buffer, pixel_buffer_x << 1);
+
+    // The write completes asynchronously, so switch buffers rather than waiting for it.
+    // The next flush waits for this write before starting, so this buffer is free
+    // again by the time it is switched back to.
+    ram.write(pixel_buffer_address, pixel_buffer, pixel_buffer_len);
+    ++pixel_buffer_writes;
+    pixel_buffer = (pixel_buffer == pixel_buffers[0]) ? pixel_buffers[1] : pixel_buffers[0];
+    pixel_buffer_len = 0;
+    pixel_buffer_location.y = -1;
+  }
+
+  void DVDisplay::set_pixel_buffer_size(uint32_t len_in_bytes)
+  {
+    flush();
+    pixel_buffer_max_len = std::max<uint32_t>(1, std::min<uint32_t>(len_in_bytes, PIXEL_BUFFER_LEN_IN_WORDS * 4));
+  }
+
+  void DVDisplay::buffer_pixel(const Point &p, uint32_t address, uint32_t colour, uint32_t bytes_per_pixel)
+  {
+    ++pixels_buffered;
+    if (alpha_blend || p.y != pixel_buffer_location.y || p.x != pixel_buffer_location.x || pixel_buffer_len + bytes_per_pixel > pixel_buffer_max_len) {
+      flush();
+      pixel_buffer_address = address;
+    }
+
+    uint8_t* buf = (uint8_t*)pixel_buffer + pixel_buffer_len;
+    for (uint32_t i = 0; i < bytes_per_pixel; ++i) {
+      buf[i] = colour & 0xFF;
+      colour >>= 8;
+    }
+    pixel_buffer_len += bytes_per_pixel;
+    pixel_buffer_location = {p.x + 1, p.y};
+  }
+
+  void DVDisplay::write_pixel_alpha(const Point &p, uint8_t alpha, uint32_t colour, bool read_target, blend_func blend, void* context)
+  {
+    ++pixels_buffered;
+    uint32_t bytes_per_pixel = pixel_size();
+    if (blend != alpha_blend || context != alpha_context || colour != alpha_colour || read_target != alpha_read_target ||
+        p.y != pixel_buffer_location.y || p.x != pixel_buffer_location.x ||
+        pixel_buffer_len + bytes_per_pixel > pixel_buffer_max_len || alpha_len == ALPHA_BUFFER_LEN) {
+      flush();
+      pixel_buffer_address = point_to_address(p);
+      alpha_blend = blend;
+      alpha_context = context;
+      alpha_colour = colour;
+      alpha_read_target = read_target;
     }
-    pixel_buffer_location = p;
-    pixel_buffer_x = 1;
-    pixel_buffer[0] = colour;
+
+    alpha_buffer[alpha_len++] = alpha;
+    pixel_buffer_len += bytes_per_pixel;
+    pixel_buffer_location = {p.x + 1, p.y};
+  }
+
+  void DVDisplay::write_pixel(const Point &p, uint16_t colour)
+  {
+    buffer_pixel(p, point_to_address16(p), colour, 2);
   }
 
   void DVDisplay::write_pixel_span(const Point &p, uint l, uint16_t colour)
   {
+    flush();
     write(point_to_address16(p), l, colour);
   }
 
   void DVDisplay::write_pixel(const Point &p, RGB888 colour)
   {
-    ram.write(point_to_address24(p), &colour, 3);
+    buffer_pixel(p, point_to_address24(p), colour, 3);
   }
 
   void DVDisplay::write_pixel_span(const Point &p, uint l, RGB888 colour)
   {
+    flush();
     write(point_to_address24(p), l, colour);
   }
 
   void DVDisplay::write_pixel_span(const Point &p, uint l, uint16_t *data)
   {
+    flush();
     uint32_t offset = 0;
     if (((uintptr_t)data & 0x2) != 0) {
       uint32_t val = *data++;
@@ -577,6 +835,7 @@ namespace pimoroni {
 
   void DVDisplay::read_pixel_span(const Point &p, uint l, uint16_t *data)
   {
+    flush();
     read(point_to_address16(p), l, data);
   }
 
@@ -587,12 +846,11 @@ namespace pimoroni {
       return;
     }
 
+    flush();
     mode = new_mode;
     set_scroll_idx_for_lines(0, 0, display_height);
     write_sprite_table();
-    for (int i = 0; i < MAX_DISPLAYED_SPRITES; ++i) {
-      clear_sprite(i);
-    }
+    clear_all_sprites();
     change_mode = 1;
     if (mode == MODE_PALETTE) {
       rewrite_palette = 2;
@@ -601,6 +859,7 @@ namespace pimoroni {
   
   void DVDisplay::write_24bpp_pixel_span(const Point &p, uint len_in_pixels, uint8_t *data)
   {
+    flush();
     uint32_t offset = 0;
     uint32_t address = point_to_address24(p);
     uint l = len_in_pixels * 3;
@@ -619,6 +878,7 @@ namespace pimoroni {
 
   void DVDisplay::read_24bpp_pixel_span(const Point &p, uint len_in_pixels, uint8_t *data)
   {
+    flush();
     read(point_to_address24(p), len_in_pixels * 3, data);
   }
 
@@ -638,6 +898,12 @@ namespace pimoroni {
     rewrite_palette = 2;
   }
 
+  void DVDisplay::set_palette_rgb(const uint8_t* rgb, int palette_idx, int num_palettes)
+  {
+    memcpy(palette + palette_idx * PALETTE_SIZE * 3, rgb, num_palettes * PALETTE_SIZE * 3);
+    rewrite_palette = 2;
+  }
+
   void DVDisplay::set_palette(RGB888 new_palette[PALETTE_SIZE])
   {
     set_palette(new_palette, current_palette);
@@ -654,36 +920,24 @@ namespace pimoroni {
     ram.write(addr, (uint32_t*)palette, NUM_PALETTES * PALETTE_SIZE * 3);
   }
 
-  RGB888* DVDisplay::get_palette(uint8_t idx) {
-    return (uint32_t*)palette;
+  const uint8_t* DVDisplay::get_palette(uint8_t idx) const {
+    return palette + (idx % NUM_PALETTES) * PALETTE_SIZE * 3;
   }
 
   void DVDisplay::write_palette_pixel(const Point &p, uint8_t colour)
   {
-    if (pixel_buffer_location.y == p.y && pixel_buffer_location.x + pixel_buffer_x == p.x) {
-      if (pixel_buffer_x & 3) pixel_buffer[pixel_buffer_x >> 2] |= (uint32_t)colour << ((pixel_buffer_x & 3) << 3);
-      else pixel_buffer[pixel_buffer_x >> 2] = colour;
-      if (++pixel_buffer_x == PIXEL_BUFFER_LEN_IN_WORDS * 4) {
-        ram.write(point_to_address_palette(pixel_buffer_location), pixel_buffer, PIXEL_BUFFER_LEN_IN_WORDS * 4);
-        pixel_buffer_location.y = -1;
-      }
-      return;
-    }
-    else if (pixel_buffer_location.y != -1) {
-      ram.write(point_to_address_palette(pixel_buffer_location), pixel_buffer, pixel_buffer_x);
-    }
-    pixel_buffer_location = p;
-    pixel_buffer_x = 1;
-    pixel_buffer[0] = colour;
+    buffer_pixel(p, point_to_address_palette(p), colour, 1);
   }
   
   void DVDisplay::write_palette_pixel_span(const Point &p, uint l, uint8_t colour)
   {
+    flush();
     write(point_to_address_palette(p), l, colour);
   }
   
   void DVDisplay::write_palette_pixel_span(const Point &p, uint l, uint8_t* data)
   {
+    flush();
     uint offset = 0;
     uint32_t address = point_to_address_palette(p);
     if (((uintptr_t)data & 0x3) != 0 && l > 0) {
@@ -701,6 +955,7 @@ namespace pimoroni {
   
   void DVDisplay::read_palette_pixel_span(const Point &p, uint l, uint8_t *data)
   {
+    flush();
     read(point_to_address_palette(p), l, data);
   }
 
@@ -821,10 +1076,17 @@ namespace pimoroni {
     ram.wait_for_finish_blocking();
   }
 
+  uint32_t DVDisplay::queue_sprite_data(uint16_t sprite_data_idx, uint32_t offset, uint32_t* data, uint32_t len_in_bytes)
+  {
+    flush();
+    ram.queue_write(sprite_base_address + sprite_data_idx * sprite_size + offset, data, len_in_bytes);
+    return ram.fence();
+  }
+
   void DVDisplay::set_sprite(int sprite_num, uint16_t sprite_data_idx, const Point &p, SpriteBlendMode blend_mode, int v_scale)
   {
-    if (sprite_num < MAX_DISPLAYED_SPRITES) {
-      uint8_t buf[7];
+    if (sprite_num >= 0 && sprite_num < MAX_DISPLAYED_SPRITES) {
+      uint8_t* buf = sprite_pending[sprite_num];
       buf[0] = (uint8_t)blend_mode | ((v_scale - 1) << 3);
       buf[1] = sprite_data_idx & 0xff;
       buf[2] = sprite_data_idx >> 8;
@@ -833,18 +1095,251 @@ namespace pimoroni {
       buf[5] = p.y & 0xff;
       buf[6] = p.y >> 8;
 
-      i2c->write_bytes(I2C_ADDR, sprite_num, buf, 7);
+      sprite_bytes_requested += SPRITE_ENTRY_LEN;
+      if (sprite_commit_mode == SPRITE_COMMIT_IMMEDIATE) commit_sprite(sprite_num);
+      else sprites_dirty = true;
     }
   }
 
   void DVDisplay::clear_sprite(int sprite_num)
   {
-    if (sprite_num < MAX_DISPLAYED_SPRITES) {
-      uint8_t buf[3] = {1, 0xFF, 0xFF};
-      i2c->write_bytes(I2C_ADDR, sprite_num, buf, 3);
+    if (sprite_num >= 0 && sprite_num < MAX_DISPLAYED_SPRITES) {
+      memcpy(sprite_pending[sprite_num], cleared_sprite, SPRITE_ENTRY_LEN);
+
+      sprite_bytes_requested += 3;
+      if (sprite_commit_mode == SPRITE_COMMIT_IMMEDIATE) commit_sprite(sprite_num);
+      else sprites_dirty = true;
     }
   }
 
+  void DVDisplay::set_sprite_commit_mode(SpriteCommitMode commit_mode)
+  {
+    // Don't leave anything queued when switching back to immediate mode
+    if (commit_mode == SPRITE_COMMIT_IMMEDIATE) commit_sprites();
+    sprite_commit_mode = commit_mode;
+  }
+
+  void DVDisplay::commit_sprites()
+  {
+    if (!sprites_dirty) return;
+
+    for (int i = 0; i < MAX_DISPLAYED_SPRITES; ++i) {
+      commit_sprite(i);
+    }
+    sprites_dirty = false;
+  }
+
+  void DVDisplay::commit_sprite(int sprite_num, bool force)
+  {
+    uint8_t* buf = sprite_pending[sprite_num];
+    if (!force && memcmp(buf, sprite_committed[sprite_num], SPRITE_ENTRY_LEN) == 0) return;
+
+    // The GPU only reads the first 3 bytes of a cleared sprite
+    uint len = (buf[1] == 0xFF && buf[2] == 0xFF) ? 3 : SPRITE_ENTRY_LEN;
+    i2c_write_bytes(sprite_num, buf, len);
+    memcpy(sprite_committed[sprite_num], buf, SPRITE_ENTRY_LEN);
+    sprite_bytes_written += len;
+  }
+
+  void DVDisplay::clear_all_sprites()
+  {
+    // The GPU's sprite table can't be read back, so write every slot to get back in sync
+    for (int i = 0; i < MAX_DISPLAYED_SPRITES; ++i) {
+      memcpy(sprite_pending[i], cleared_sprite, SPRITE_ENTRY_LEN);
+      sprite_bytes_requested += 3;
+      commit_sprite(i, true);
+    }
+    sprites_dirty = false;
+  }
+
+  uint32_t DVDisplay::surface_start_address() const {
+    return (point_to_address24({0, frame_height}) + 3) & ~3;
+  }
+
+  uint32_t DVDisplay::surface_size(int idx) const {
+    const Surface &surface = surfaces[idx];
+    const uint32_t bytes_per_pixel = surface.mode == MODE_PALETTE ? 1 : surface.mode == MODE_RGB555 ? 2 : 3;
+    return ((uint32_t)surface.width * surface.height * bytes_per_pixel + 3) & ~3;
+  }
+
+  uint32_t DVDisplay::surface_address(int idx, const Point &p) const {
+    if (idx == FRAME_SURFACE) return point_to_address(p);
+    return surfaces[idx].address + ((uint32_t)p.y * surfaces[idx].width + p.x) * pixel_size();
+  }
+
+  int DVDisplay::create_surface(uint16_t width, uint16_t height) {
+    if (width == 0 || height == 0) return -1;
+
+    int idx = 0;
+    while (idx < MAX_SURFACES && surfaces[idx].width > 0) ++idx;
+    if (idx == MAX_SURFACES) return -1;
+
+    surfaces[idx] = {0, width, height, mode};
+    const uint32_t size = surface_size(idx);
+
+    // First fit: move past each surface in the way until there's a gap
+    uint32_t address = surface_start_address();
+    for (int i = 0; i < MAX_SURFACES; ++i) {
+      if (i == idx || surfaces[i].width == 0) continue;
+      if (address < surfaces[i].address + surface_size(i) && surfaces[i].address < address + size) {
+        address = surfaces[i].address + surface_size(i);
+        i = -1;
+      }
+    }
+
+    if (address + size > sprite_base_address) {
+      surfaces[idx].width = 0;
+      return -1;
+    }
+
+    surfaces[idx].address = address;
+    return idx;
+  }
+
+  void DVDisplay::free_surface(int idx) {
+    if (is_surface(idx)) surfaces[idx].width = 0;
+  }
+
+  void DVDisplay::free_all_surfaces() {
+    for (int i = 0; i < MAX_SURFACES; ++i) {
+      surfaces[i].width = 0;
+    }
+  }
+
+  Rect DVDisplay::get_surface_bounds(int idx) const {
+    if (idx == FRAME_SURFACE) return Rect(0, 0, frame_width, frame_height);
+    if (!is_surface(idx)) return Rect();
+    return Rect(0, 0, surfaces[idx].width, surfaces[idx].height);
+  }
+
+  uint32_t DVDisplay::get_free_surface_bytes() const {
+    const uint32_t start = surface_start_address();
+    uint32_t used = 0;
+    for (int i = 0; i < MAX_SURFACES; ++i) {
+      if (surfaces[i].width > 0) used += surface_size(i);
+    }
+    return start + used < sprite_base_address ? sprite_base_address - start - used : 0;
+  }
+
+  void DVDisplay::write_unaligned(uint32_t address, const uint8_t* data, uint32_t len) {
+    const uint32_t head = std::min<uint32_t>((4 - ((uintptr_t)data & 3)) & 3, len);
+    if (head > 0) {
+      // Queued as a repeat so the value is copied into the queue
+      uint32_t val = 0;
+      memcpy(&val, data, head);
+      ram.queue_write_repeat(address, val, head);
+      address += head;
+      data += head;
+      len -= head;
+    }
+    if (len > 0) {
+      ram.queue_write(address, (uint32_t*)data, len);
+    }
+  }
+
+  void DVDisplay::write_opaque_runs(uint32_t address, const uint8_t* data, uint32_t len_in_pixels, uint32_t transparent) {
+    const uint32_t bytes_per_pixel = pixel_size();
+    uint32_t run_start = 0;
+    bool in_run = false;
+
+    for (uint32_t i = 0; i <= len_in_pixels; ++i) {
+      bool opaque = false;
+      if (i < len_in_pixels) {
+        const uint8_t* pixel = data + i * bytes_per_pixel;
+        switch (mode) {
+          case MODE_PALETTE: opaque = (uint32_t)((pixel[0] >> 2) & 0x1F) != transparent; break;
+          case MODE_RGB555: opaque = (uint32_t)((pixel[0] | (pixel[1] << 8)) & 0x7FFF) != transparent; break;
+          case MODE_RGB888: opaque = (uint32_t)(pixel[0] | (pixel[1] << 8) | (pixel[2] << 16)) != transparent; break;
+        }
+      }
+
+      if (opaque && !in_run) {
+        run_start = i;
+        in_run = true;
+      }
+      else if (!opaque && in_run) {
+        write_unaligned(address + run_start * bytes_per_pixel, data + run_start * bytes_per_pixel, (i - run_start) * bytes_per_pixel);
+        in_run = false;
+      }
+    }
+  }
+
+  bool DVDisplay::blit(int src, const Rect &src_rect, int dst, const Point &dst_point, int32_t transparent, const Rect *clip) {
+    if (src != FRAME_SURFACE && (!is_surface(src) || surfaces[src].mode != mode)) return false;
+    if (dst != FRAME_SURFACE && (!is_surface(dst) || surfaces[dst].mode != mode)) return false;
+
+    // Clip to the source, then to the destination, keeping the two rects the same size
+    const int32_t dx = dst_point.x - src_rect.x;
+    const int32_t dy = dst_point.y - src_rect.y;
+    Rect from = src_rect.intersection(get_surface_bounds(src));
+    Rect dst_bounds = get_surface_bounds(dst);
+    if (clip) dst_bounds = dst_bounds.intersection(*clip);
+    const Rect to = Rect(from.x + dx, from.y + dy, from.w, from.h).intersection(dst_bounds);
+    if (to.empty()) return true;
+    from = Rect(to.x - dx, to.y - dy, to.w, to.h);
+
+    const int32_t bytes_per_pixel = pixel_size();
+    const int32_t chunk_len = (PIXEL_BUFFER_LEN_IN_WORDS * 4) / bytes_per_pixel;
+    const int32_t chunks_per_row = (from.w + chunk_len - 1) / chunk_len;
+    const int32_t num_chunks = chunks_per_row * from.h;
+
+    // When copying within a surface go in the direction that reads each pixel before it is overwritten
+    const bool bottom_up = src == dst && to.y > from.y;
+    const bool right_to_left = src == dst && to.y == from.y && to.x > from.x;
+
+    auto get_chunk = [&](int32_t i, uint32_t &src_address, uint32_t &dst_address) {
+      int32_t row = i / chunks_per_row;
+      int32_t chunk = i % chunks_per_row;
+      if (bottom_up) row = from.h - 1 - row;
+      if (right_to_left) chunk = chunks_per_row - 1 - chunk;
+      const int32_t x = chunk * chunk_len;
+      src_address = surface_address(src, Point(from.x + x, from.y + row));
+      dst_address = surface_address(dst, Point(to.x + x, to.y + row));
+      return std::min(chunk_len, from.w - x);
+    };
+
+    // The pixel buffers are used for the copy, so make sure they are no longer being written from
+    flush();
+    ram.wait_for_finish_blocking();
+
+    // Reads and writes are queued, so the next chunk is read while the current one is
+    // processed and the PSRAM is kept busy.  The queue runs in order, so a buffer is never
+    // read into before the write from it has finished.
+    uint32_t src_address, dst_address;
+    int32_t len = get_chunk(0, src_address, dst_address);
+    int buf = 0;
+    ram.queue_read(src_address, pixel_buffers[buf], (len * bytes_per_pixel + 3) >> 2);
+    uint32_t read_fence = ram.fence();
+
+    for (int32_t i = 0; i < num_chunks; ++i) {
+      uint32_t next_src_address = 0, next_dst_address = 0;
+      int32_t next_len = 0;
+      uint32_t next_read_fence = 0;
+      if (i + 1 < num_chunks) {
+        next_len = get_chunk(i + 1, next_src_address, next_dst_address);
+        ram.queue_read(next_src_address, pixel_buffers[buf ^ 1], (next_len * bytes_per_pixel + 3) >> 2);
+        next_read_fence = ram.fence();
+      }
+
+      ram.wait(read_fence);
+      if (transparent < 0) {
+        ram.queue_write(dst_address, pixel_buffers[buf], len * bytes_per_pixel);
+      }
+      else {
+        write_opaque_runs(dst_address, (const uint8_t*)pixel_buffers[buf], len, transparent);
+      }
+
+      src_address = next_src_address;
+      dst_address = next_dst_address;
+      len = next_len;
+      read_fence = next_read_fence;
+      buf ^= 1;
+    }
+    ram.wait_for_finish_blocking();
+
+    return true;
+  }
+
   uint32_t DVDisplay::point_to_address(const Point& p) const {
     switch(mode) {
       default:
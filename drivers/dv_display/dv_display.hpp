@@ -59,6 +59,12 @@ namespace pimoroni {
         BLEND_BLEND2 = 4,   // Use frame if Sprite A0, additive blend if Sprite A1
     };
 
+    enum SpriteCommitMode : uint8_t {
+        SPRITE_COMMIT_IMMEDIATE = 0,  // set_sprite/clear_sprite are sent to the GPU straight away
+        SPRITE_COMMIT_MANUAL = 1,     // Changes are held until commit_sprites is called
+        SPRITE_COMMIT_AUTO = 2,       // Changes are held until commit_sprites or the next flip
+    };
+
     // I2C pins
     static constexpr uint I2C_SDA = 6;
     static constexpr uint I2C_SCL = 7;
@@ -173,13 +179,73 @@ namespace pimoroni {
       void write_pixel_span(const Point &p, uint l, uint16_t *data);
       void read_pixel_span(const Point &p, uint l, uint16_t *data);
 
+      // Fill a rectangle of the frame with a pixel value in the current mode (including depth).
+      // A write is queued for each row and this returns while they are still running, anything
+      // else that accesses the PSRAM waits for them to finish.  The rect must be within the frame.
+      void fill_rect(const Rect &r, uint32_t colour);
+
       // 24bpp interface
       void write_pixel(const Point &p, RGB888 colour);
       void write_pixel_span(const Point &p, uint l, RGB888 colour);
       void write_24bpp_pixel_span(const Point &p, uint len_in_pixels, uint8_t *data);
       void read_24bpp_pixel_span(const Point &p, uint len_in_pixels, uint8_t *data);
 
+      // Single pixel writes in all modes are collected into runs of horizontally
+      // adjacent pixels, which are written out when the run is broken, before any
+      // read or span write, on flip, or when flush is called.
+      void flush();
+      // Maximum length of a run in bytes, from 1 to 1024. Anything less than two pixels,
+      // such as 1, writes every pixel on its own.
+      void set_pixel_buffer_size(uint32_t len_in_bytes);
+      uint32_t get_pixel_buffer_size() const { return pixel_buffer_max_len; }
+      // Pixels passed to write_pixel, and the PSRAM writes used to store them.
+      uint32_t get_pixels_buffered() const { return pixels_buffered; }
+      uint32_t get_pixel_buffer_writes() const { return pixel_buffer_writes; }
+      void reset_pixel_buffer_stats() { pixels_buffered = 0; pixel_buffer_writes = 0; }
+
+      // PSRAM transfers queued, the most waiting at once, and the time spent waiting for them.
+      uint32_t get_ram_queued_transfers() const { return ram.get_queued_transfers(); }
+      uint32_t get_ram_max_queue_depth() const { return ram.get_max_queue_depth(); }
+      uint32_t get_ram_stall_us() const { return ram.get_stall_us(); }
+      void reset_ram_stats() { ram.reset_stats(); }
+
+      // Bytes moved each way and page splits in PSRAM, and the I2C traffic to the GPU.
+      uint32_t get_ram_direct_transfers() const { return ram.get_direct_transfers(); }
+      uint32_t get_ram_bytes_written() const { return ram.get_bytes_written(); }
+      uint32_t get_ram_bytes_read() const { return ram.get_bytes_read(); }
+      uint32_t get_ram_page_splits() const { return ram.get_page_splits(); }
+      uint32_t get_i2c_transfers() const { return i2c_transfers; }
+      uint32_t get_i2c_bytes() const { return i2c_bytes; }
+
+      // Flips requested, the time spent in flip_async and waiting in wait_for_flip, and of
+      // the flips shown, the time from each being requested to the vsync that showed it.
+      // A frame shown for more than one vsync missed the others, frame_vsyncs counts the
+      // frames shown for 1 to FRAME_VSYNCS_LEN vsyncs, the last including any longer.
+      static constexpr int FRAME_VSYNCS_LEN = 5;
+      uint32_t get_flips() const { return flips; }
+      uint32_t get_flip_us() const { return flip_us; }
+      uint32_t get_flip_wait_us() const { return flip_wait_us; }
+      uint32_t get_flips_shown() const;
+      uint32_t get_flip_latency_us() const;
+      uint32_t get_flip_latency_max_us() const;
+      uint32_t get_missed_vsyncs() const;
+      uint32_t get_frame_vsyncs(int vsyncs) const;
+      // Resets all the counters above, the PSRAM and the pixel buffer stats.
+      void reset_stats();
+
+      // Alpha blended pixels are collected into runs in the same way. When the run is
+      // written out it is read back in one go (if read_target is set), blended in place
+      // by the supplied function, and written back in one go.
+      typedef void (*blend_func)(void* context, uint32_t colour, const uint8_t* alpha, uint8_t* pixels, uint32_t len);
+      void write_pixel_alpha(const Point &p, uint8_t alpha, uint32_t colour, bool read_target, blend_func blend, void* context);
+
       bool init(uint16_t width, uint16_t height, Mode mode = MODE_RGB555, uint16_t frame_width = 0, uint16_t frame_height = 0);
+      uint16_t get_display_width() const { return display_width; }
+      uint16_t get_display_height() const { return display_height; }
+      uint16_t get_frame_width() const { return frame_width; }
+      uint16_t get_frame_height() const { return frame_height; }
+      // The bank being drawn to, this changes on every flip
+      uint8_t get_bank() const { return bank; }
       void flip();
       void reset();
 
@@ -187,6 +253,13 @@ namespace pimoroni {
       // You must call wait_for_flip before doing any more reads or writes, defining sprites, etc.
       void flip_async();
       void wait_for_flip();
+      // True until the flip queued by flip_async has happened, so that wait_for_flip won't block.
+      bool is_flip_pending() const;
+
+      // The handler is called from the vsync interrupt on every vsync, after any flip,
+      // so it must be quick. Pass nullptr to remove it.
+      typedef void (*vsync_func)(void* context);
+      void set_vsync_handler(vsync_func handler, void* context);
 
       // Define the data for a sprite, the specified data index can then be supplied
       // to set_sprite to use the sprite.  Up to 1024 sprites can be defined.
@@ -202,11 +275,29 @@ namespace pimoroni {
       // Load a sprite stored in PicoVision sprite format
       void load_pvs_sprite(uint16_t sprite_data_idx, uint32_t* data, uint32_t len_in_bytes);
 
+      // Queue a write of sprite data, starting offset bytes into sprite_data_idx and running on into the
+      // following indexes, so a bundle of sprites can be loaded without waiting for each one to be written.
+      // The data must not be changed until the returned fence has completed, see wait_for_fence.
+      uint32_t queue_sprite_data(uint16_t sprite_data_idx, uint32_t offset, uint32_t* data, uint32_t len_in_bytes);
+      void wait_for_fence(uint32_t fence) { ram.wait(fence); }
+      static constexpr uint32_t get_max_num_sprites() { return max_num_sprites; }
+      static constexpr uint32_t get_sprite_size() { return sprite_size; }
+
       // Display/move a sprite to a given position.
       // Note sprite positions are always display relative (not scrolled)
       void set_sprite(int sprite_num, uint16_t sprite_data_idx, const Point &p, SpriteBlendMode blend_mode = BLEND_DEPTH, int v_scale = 1);
       void clear_sprite(int sprite_num);
 
+      // Sprite changes are tracked against a copy of the GPU's sprite table, and only slots
+      // that actually changed are sent over I2C.  In the manual and auto commit modes the changes
+      // are held back until commit_sprites is called (or, in auto mode, the next flip).
+      void set_sprite_commit_mode(SpriteCommitMode commit_mode);
+      SpriteCommitMode get_sprite_commit_mode() const { return sprite_commit_mode; }
+      void commit_sprites();
+
+      // The number of sprite I2C bytes that didn't need to be sent during the last frame.
+      uint32_t get_sprite_bytes_saved() const { return sprite_bytes_saved; }
+
       // 32 colour palette mode.  Note that palette entries range from 0-31,
       // but when writing colour values the palette entry is in bits 6-2, so the
       // entry value is effectively multiplied by 4.
@@ -215,11 +306,14 @@ namespace pimoroni {
       void set_palette(RGB888 palette[PALETTE_SIZE], int palette_idx = 0);
       void set_palette(RGB888 palette[PALETTE_SIZE]);
       void set_palette_colour(uint8_t entry, RGB888 colour, int palette_idx);
+      // Replace num_palettes whole palettes, from palette_idx on, with 3 bytes of R, G, B per entry
+      void set_palette_rgb(const uint8_t* rgb, int palette_idx, int num_palettes = 1);
       void set_palette_colour(uint8_t entry, RGB888 colour);
       void set_display_palette_index(uint8_t idx);
       void set_local_palette_index(uint8_t idx);
       uint8_t get_local_palette_index();
-      RGB888* get_palette(uint8_t idx = 0);
+      // The R, G, B bytes of each entry in a palette
+      const uint8_t* get_palette(uint8_t idx = 0) const;
 
       void write_palette_pixel(const Point &p, uint8_t colour);
       void write_palette_pixel_span(const Point &p, uint l, uint8_t colour);
@@ -236,6 +330,36 @@ namespace pimoroni {
       // this applies to the current bank only - you need to set again after flipping to apply the same setting to the other bank.
       virtual void set_scroll_idx_for_lines(int idx, int miny, int maxy);
 
+      // Point each scanline from miny to miny + len - 1 at an arbitrary position in the frame, using the given scroll idx.
+      // Offsets are in bytes from the start of the frame, as returned by line_offset.  Like set_scroll_idx_for_lines
+      // this applies to the current bank only, and the lines can be returned to normal by setting their scroll idx again.
+      void set_line_offsets(const uint32_t* offsets, int miny, int len, int idx = 0);
+      uint32_t line_offset(const Point& p) const { return point_to_address(p) - base_address; }
+      uint32_t max_line_offset() const { return sprite_base_address - base_address; }
+
+      // Off-screen surfaces are stored in the PSRAM between the end of the frame and the sprite data.
+      // A surface has the same address in both banks but, like sprites, its contents must be written
+      // to each bank.  Pixels are stored in the format of the mode the surface was created in.
+      // Surfaces are freed by init.
+      static constexpr int MAX_SURFACES = 32;
+      static constexpr int FRAME_SURFACE = -1;
+
+      // Returns the new surface index, or -1 if there isn't enough free PSRAM
+      int create_surface(uint16_t width, uint16_t height);
+      void free_surface(int idx);
+      void free_all_surfaces();
+      bool is_surface(int idx) const { return idx >= 0 && idx < MAX_SURFACES && surfaces[idx].width > 0; }
+      Rect get_surface_bounds(int idx) const;
+      uint32_t get_free_surface_bytes() const;
+
+      // Copy src_rect from a surface, or FRAME_SURFACE, to dst_point in another (or the same) surface.
+      // Rows are read into SRAM and written back out a chunk at a time, with the read of the next
+      // chunk running while the current one is processed.  Pixels whose colour (ignoring depth)
+      // equals transparent aren't copied, pass -1 to copy every pixel.  The copy is clipped to both
+      // surfaces and to clip, if supplied.
+      // Returns false if either surface doesn't exist or was created in a different mode.
+      bool blit(int src, const Rect &src_rect, int dst, const Point &dst_point, int32_t transparent = -1, const Rect *clip = nullptr);
+
       // Returns the state of GPU GPIOs 23-29 as a bitfield.
       uint8_t get_gpio();
 
@@ -285,9 +409,9 @@ namespace pimoroni {
       uint32_t point_to_address(const Point& p) const;
       int pixel_size() const;
       int frame_row_stride() const { return (int)frame_width * 3; }
-      void raw_read_async(uint32_t address, uint32_t* data, uint32_t len_in_words) { ram.read(address, data, len_in_words); }
-      void raw_write_async(uint32_t address, uint32_t* data, uint32_t len_in_words) { ram.write(address, data, len_in_words << 2); }
-      void raw_write_async_bytes(uint32_t address, uint32_t* data, uint32_t len_in_bytes) { ram.write(address, data, len_in_bytes); }
+      void raw_read_async(uint32_t address, uint32_t* data, uint32_t len_in_words) { flush(); ram.read(address, data, len_in_words); }
+      void raw_write_async(uint32_t address, uint32_t* data, uint32_t len_in_words) { flush(); ram.write(address, data, len_in_words << 2); }
+      void raw_write_async_bytes(uint32_t address, uint32_t* data, uint32_t len_in_bytes) { flush(); ram.write(address, data, len_in_bytes); }
       void raw_wait_for_finish_blocking() { ram.wait_for_finish_blocking(); }
 
     protected:
@@ -304,11 +428,96 @@ namespace pimoroni {
 
       void i2c_modify_bit(uint8_t reg, uint bit, bool enable);
 
+      // All I2C to the GPU goes through these, so it can be counted
+      void i2c_reg_write_uint8(uint8_t reg, uint8_t value) {
+        count_i2c(2);
+        i2c->reg_write_uint8(I2C_ADDR, reg, value);
+      }
+      uint8_t i2c_reg_read_uint8(uint8_t reg) {
+        count_i2c(2);
+        return i2c->reg_read_uint8(I2C_ADDR, reg);
+      }
+      uint16_t i2c_reg_read_uint16(uint8_t reg) {
+        count_i2c(3);
+        return i2c->reg_read_uint16(I2C_ADDR, reg);
+      }
+      int i2c_write_bytes(uint8_t reg, const uint8_t* buf, int len) {
+        count_i2c(len + 1);
+        return i2c->write_bytes(I2C_ADDR, reg, buf, len);
+      }
+      int i2c_read_bytes(uint8_t reg, uint8_t* buf, int len) {
+        count_i2c(len + 1);
+        return i2c->read_bytes(I2C_ADDR, reg, buf, len);
+      }
+
     private:
-      static constexpr int PIXEL_BUFFER_LEN_IN_WORDS = 32;
-      uint32_t pixel_buffer[PIXEL_BUFFER_LEN_IN_WORDS];
-      Point pixel_buffer_location;
-      int32_t pixel_buffer_x;
+      uint32_t i2c_transfers = 0;
+      uint32_t i2c_bytes = 0;
+      uint32_t flips = 0;
+      uint32_t flip_us = 0;
+      uint32_t flip_wait_us = 0;
+
+      void count_i2c(uint32_t len) {
+#if PICOVISION_STATS
+        ++i2c_transfers;
+        i2c_bytes += len;
+#endif
+      }
+
+      // Two buffers, so one can be filled while the other is being written out
+      static constexpr int PIXEL_BUFFER_LEN_IN_WORDS = APS6404::PAGE_SIZE / 4;
+      uint32_t pixel_buffers[2][PIXEL_BUFFER_LEN_IN_WORDS];
+      uint32_t* pixel_buffer = pixel_buffers[0];
+      uint32_t pixel_buffer_address = 0;
+      uint32_t pixel_buffer_len = 0;
+      uint32_t pixel_buffer_max_len = PIXEL_BUFFER_LEN_IN_WORDS * 4;
+      Point pixel_buffer_location;  // Where the next pixel must be to extend the run
+      uint32_t pixels_buffered = 0;
+      uint32_t pixel_buffer_writes = 0;
+
+      // Set while the pixel buffer holds an alpha run
+      static constexpr int ALPHA_BUFFER_LEN = 512;
+      uint8_t alpha_buffer[ALPHA_BUFFER_LEN];
+      uint32_t alpha_len = 0;
+      uint32_t alpha_colour = 0;
+      bool alpha_read_target = false;
+      blend_func alpha_blend = nullptr;
+      void* alpha_context = nullptr;
+
+      void buffer_pixel(const Point &p, uint32_t address, uint32_t colour, uint32_t bytes_per_pixel);
+
+      // RGB888 fills can't use a repeated word, so each row is written from this buffer.
+      // It holds a whole number of pixels and must not change until the fills using it are done.
+      static constexpr int FILL_BUFFER_LEN_IN_WORDS = 255;
+      uint32_t fill_buffer[FILL_BUFFER_LEN_IN_WORDS];
+      uint32_t fill_buffer_colour = 0xFFFFFFFF;
+      uint32_t fill_buffer_fence = 0;
+
+      struct Surface {
+        uint32_t address;
+        uint16_t width;  // 0 if the surface is free
+        uint16_t height;
+        Mode mode;
+      };
+      Surface surfaces[MAX_SURFACES] = {};
+
+      uint32_t surface_start_address() const;
+      uint32_t surface_size(int idx) const;
+      uint32_t surface_address(int idx, const Point &p) const;
+      void write_unaligned(uint32_t address, const uint8_t* data, uint32_t len);
+      void write_opaque_runs(uint32_t address, const uint8_t* data, uint32_t len_in_pixels, uint32_t transparent);
+
+      static constexpr int SPRITE_ENTRY_LEN = 7;
+      uint8_t sprite_pending[MAX_DISPLAYED_SPRITES][SPRITE_ENTRY_LEN];
+      uint8_t sprite_committed[MAX_DISPLAYED_SPRITES][SPRITE_ENTRY_LEN];
+      bool sprites_dirty = false;
+      SpriteCommitMode sprite_commit_mode = SPRITE_COMMIT_IMMEDIATE;
+      uint32_t sprite_bytes_requested = 0;
+      uint32_t sprite_bytes_written = 0;
+      uint32_t sprite_bytes_saved = 0;
+
+      void commit_sprite(int sprite_num, bool force = false);
+      void clear_all_sprites();
 
       void write(uint32_t address, size_t len, const uint16_t colour);
       void read(uint32_t address, size_t len, uint16_t *data);
@@ -0,0 +1,31 @@
+# This example plays a song with PicoSynth's sequencer, leaving Python free for drawing.
+# song.pvsq was made from a MIDI file with tools/song_converter, copy it to the basic directory on your Pico too.
+# The screen changes colour on each beat, following the song's position rather than timing it in Python.
+from picovision import PicoVision, PEN_RGB555
+from picosynth import PicoSynth
+
+display = PicoVision(PEN_RGB555, 640, 480)
+
+WHITE = display.create_pen(255, 255, 255)
+COLOURS = [display.create_pen(128, 0, 32), display.create_pen(0, 64, 128),
+           display.create_pen(128, 96, 0), display.create_pen(0, 128, 64)]
+
+# the song was converted with 4 rows to a beat
+ROWS_PER_BEAT = 4
+
+synth = PicoSynth()
+synth.set_volume(0.5)
+
+with open("basic/song.pvsq", "rb") as f:
+    song = f.read()
+
+# the song loops, so it plays until it's stopped
+synth.play_song(song)
+
+while True:
+    position, row = synth.get_song_position()
+    display.set_pen(COLOURS[(row // ROWS_PER_BEAT) % len(COLOURS)])
+    display.clear()
+    display.set_pen(WHITE)
+    display.text("Position {} row {}".format(position, row), 10, 10, scale=4)
+    display.update()
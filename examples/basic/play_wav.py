@@ -0,0 +1,34 @@
+# This example streams a WAV file from the SD card with PicoSynth, while a tone plays over it.
+# It doesn't do anything with the display.
+# You will need sdcard.py saved to your Pico, see sdtest.py, and a WAV file on the card.
+# 16-bit PCM and IMA-ADPCM files are supported, and take the same little RAM however long they are.
+from machine import Pin, SPI
+from picosynth import PicoSynth, Channel
+import sdcard
+import os
+import time
+
+FILENAME = "/sd/music.wav"
+
+# set up the SD card
+sd_spi = SPI(1, sck=Pin(10, Pin.OUT), mosi=Pin(11, Pin.OUT), miso=Pin(12, Pin.OUT))
+sd = sdcard.SDCard(sd_spi, Pin(15))
+os.mount(sd, "/sd")
+
+synth = PicoSynth()
+synth.set_volume(0.5)
+
+# stream the file on sample voice 0, it's read a little at a time as it plays
+synth.play_wav(FILENAME, volume=0.8)
+
+# and play a beep over it every second, on the synth
+beep = synth.channel(0)
+beep.configure(waveforms=Channel.SQUARE, attack=0.01, decay=0.1, sustain=0, release=0.1, volume=0.3)
+
+while synth.is_sample_playing(0):
+    beep.frequency(880)
+    beep.trigger_attack()
+    time.sleep(1)
+
+synth.stop()
+os.umount("/sd")
@@ -0,0 +1,56 @@
+# Time antialiased drawing that falls back to per-pixel alpha blending.
+# A pixel buffer size of 1 byte blends every pixel with its own PSRAM
+# read and write, the default reads, blends and writes whole runs.
+
+import math
+import time
+from picovision import PicoVision, PEN_RGB555
+from picovector import PicoVector, Polygon, ANTIALIAS_X16
+
+WIDTH = 640
+HEIGHT = 480
+LINES = 24
+
+display = PicoVision(PEN_RGB555, WIDTH, HEIGHT)
+vector = PicoVector(display)
+vector.set_antialiasing(ANTIALIAS_X16)
+
+BLACK = display.create_pen(0, 0, 0)
+WHITE = display.create_pen(255, 255, 255)
+
+
+def spoke(angle, length, width):
+    # A thin polygon from the centre out, too big for the vector tile fast path
+    cx, cy = WIDTH // 2, HEIGHT // 2
+    dx, dy = math.cos(angle), math.sin(angle)
+    nx, ny = -dy * width / 2, dx * width / 2
+    return Polygon(
+        (int(cx + nx), int(cy + ny)),
+        (int(cx + dx * length + nx), int(cy + dy * length + ny)),
+        (int(cx + dx * length - nx), int(cy + dy * length - ny)),
+        (int(cx - nx), int(cy - ny)))
+
+
+spokes = [spoke(2 * math.pi * i / LINES, HEIGHT // 2 - 4, 3) for i in range(LINES)]
+
+
+def run(size):
+    display.set_pen(BLACK)
+    display.clear()
+    display.set_pen(WHITE)
+    display.set_pixel_buffer_size(size)
+    display.reset_pixel_buffer_stats()
+    t_start = time.ticks_us()
+    for s in spokes:
+        vector.draw(s)
+    display.flush()
+    t = time.ticks_diff(time.ticks_us(), t_start)
+    pixels, writes = display.get_pixel_buffer_stats()
+    print("{:5d} bytes: {} lines in {}us, {:.1f}us per line, {} pixels in {} writes".format(
+        size, LINES, t, t / LINES, pixels, writes))
+
+
+run(1)
+run(1024)
+
+display.update()
@@ -0,0 +1,43 @@
+# Measure how much CPU time mixing sample voices over the synth takes, by counting
+# how far a busy loop gets while 0 to 4 looping samples are playing.
+
+import array
+import time
+from picosynth import PicoSynth
+
+SECONDS = 2
+SAMPLE_RATE = 22050
+SAMPLE_VOICES = 4
+
+
+def busy_loop(ms):
+    count = 0
+    t_end = time.ticks_add(time.ticks_ms(), ms)
+    while time.ticks_diff(t_end, time.ticks_ms()) > 0:
+        count += 1
+    return count
+
+
+# Half a second of quiet noise, played on a loop
+sample = array.array("h", ((i * 2654435761 >> 16) % 4096 - 2048 for i in range(SAMPLE_RATE // 2)))
+
+synth = PicoSynth()
+synth.set_volume(0.1)
+
+for voices in range(SAMPLE_VOICES + 1):
+    synth.stop()
+    if voices:
+        for voice in range(voices):
+            synth.play_sample(sample, voice, loop=True, volume=0.25, speed=1.0 + voice / 4)
+    else:
+        synth.play()
+    synth.reset_audio_stats()
+
+    idle = busy_loop(SECONDS * 1000)
+    if voices == 0:
+        baseline = idle
+    underruns, _ = synth.get_audio_stats()
+    print("{} voices: {:.1f}% of the CPU spent refilling beyond the synth, {} underruns".format(
+        voices, 100 * (baseline - idle) / baseline, underruns))
+
+synth.stop()
@@ -0,0 +1,48 @@
+# Measure the fill rate of clear and rectangle for each pen type and resolution.
+# Rows are queued as PSRAM writes and run in the background, so the time is
+# taken after flush, which waits for them to finish.
+
+import time
+from picovision import PicoVision, PEN_P5, PEN_RGB555, PEN_RGB888
+
+FRAMES = 10
+
+MODES = (
+    ("P5", PEN_P5, 720, 480),
+    ("P5", PEN_P5, 320, 240),
+    ("RGB555", PEN_RGB555, 720, 480),
+    ("RGB555", PEN_RGB555, 640, 480),
+    ("RGB555", PEN_RGB555, 320, 240),
+    ("RGB888", PEN_RGB888, 320, 240),
+)
+
+
+def run(name, pen_type, width, height):
+    display = PicoVision(pen_type, width, height)
+    pens = [display.create_pen(255, 0, 0), display.create_pen(0, 0, 255)]
+
+    t_start = time.ticks_us()
+    for i in range(FRAMES):
+        display.set_pen(pens[i & 1])
+        display.clear()
+    display.flush()
+    t_clear = time.ticks_diff(time.ticks_us(), t_start) / FRAMES
+
+    t_start = time.ticks_us()
+    for i in range(FRAMES):
+        display.set_pen(pens[i & 1])
+        for y in range(0, height, 16):
+            display.rectangle(0, y, width, 8)
+    display.flush()
+    t_rect = time.ticks_diff(time.ticks_us(), t_start) / FRAMES
+
+    pixels = width * height
+    print("{} {}x{}: clear {:.0f}us ({:.1f} Mpixel/s), rectangles {:.0f}us ({:.1f} Mpixel/s)".format(
+        name, width, height, t_clear, pixels / t_clear, t_rect, pixels / 2 / t_rect))
+
+    display.update()
+    del display
+
+
+for mode in MODES:
+    run(*mode)
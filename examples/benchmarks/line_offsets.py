@@ -0,0 +1,50 @@
+# Compare the cost of a per-line raster effect done with scroll groups
+# against uploading a whole line offset table with set_line_offsets.
+
+import time
+import rasterfx
+from picovision import PicoVision, PEN_RGB555
+
+WIDTH = 320
+HEIGHT = 240
+FRAMES = 100
+
+display = PicoVision(PEN_RGB555, WIDTH, HEIGHT, WIDTH * 2, HEIGHT)
+
+display.set_pen(display.create_pen(0, 0, 0))
+display.clear()
+display.set_pen(display.create_pen(255, 255, 255))
+for y in range(0, HEIGHT, 8):
+    display.line(0, y, WIDTH * 2, y)
+for x in range(0, WIDTH * 2, 8):
+    display.line(x, 0, x, HEIGHT)
+
+# Scroll groups: only seven bands can move independently, and each band
+# costs an I2C transaction every frame.
+bands = [(g, g * HEIGHT // 7, (g + 1) * HEIGHT // 7) for g in range(7)]
+for g, y0, y1 in bands:
+    display.set_scroll_group_for_lines(g + 1, y0, y1)
+
+t_start = time.ticks_us()
+for f in range(FRAMES):
+    for g, y0, y1 in bands:
+        display.set_scroll_group_offset(g + 1, 16 + (f + g) % 16, 0)
+t_groups = time.ticks_diff(time.ticks_us(), t_start)
+
+# Line offsets: every line moves independently for a single PSRAM write.
+tables = rasterfx.sine_wobble_frames(display, HEIGHT, 16, 60, 30)
+
+t_start = time.ticks_us()
+for f in range(FRAMES):
+    display.set_line_offsets(tables[f % len(tables)])
+t_lines = time.ticks_diff(time.ticks_us(), t_start)
+
+print("Scroll groups (7 bands):     {:.1f}us per frame".format(t_groups / FRAMES))
+print("Line offsets ({} lines):    {:.1f}us per frame".format(HEIGHT, t_lines / FRAMES))
+
+# Show the result, alternating banks so both get the table
+f = 0
+while True:
+    display.set_line_offsets(tables[f % len(tables)])
+    display.update()
+    f += 1
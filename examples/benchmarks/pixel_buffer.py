@@ -0,0 +1,50 @@
+# Count the PSRAM writes used by per-pixel primitives with and without
+# write combining. A pixel buffer size of 1 byte writes every pixel on
+# its own, the default combines runs of adjacent pixels on a line.
+
+import time
+from picovision import PicoVision, PEN_RGB555
+
+WIDTH = 320
+HEIGHT = 240
+
+display = PicoVision(PEN_RGB555, WIDTH, HEIGHT)
+
+BLACK = display.create_pen(0, 0, 0)
+WHITE = display.create_pen(255, 255, 255)
+
+
+def lines():
+    for y in range(0, HEIGHT, 4):
+        display.line(0, y, WIDTH - 1, HEIGHT - 1 - y)
+
+
+def circles():
+    for r in range(10, 110, 10):
+        display.circle(WIDTH // 2, HEIGHT // 2, r)
+
+
+def text():
+    for y in range(0, HEIGHT, 16):
+        display.text("The quick brown fox jumps over the lazy dog", 0, y, WIDTH, 2)
+
+
+def run(name, draw, size):
+    display.set_pen(BLACK)
+    display.clear()
+    display.set_pen(WHITE)
+    display.set_pixel_buffer_size(size)
+    display.reset_pixel_buffer_stats()
+    t_start = time.ticks_us()
+    draw()
+    display.flush()
+    t = time.ticks_diff(time.ticks_us(), t_start)
+    pixels, writes = display.get_pixel_buffer_stats()
+    print("{:8s} {:5d} bytes: {:6d} pixels in {:6d} writes, {:7d}us".format(name, size, pixels, writes, t))
+
+
+for name, draw in (("lines", lines), ("circles", circles), ("text", text)):
+    run(name, draw, 1)
+    run(name, draw, 1024)
+
+display.update()
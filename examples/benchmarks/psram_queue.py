@@ -0,0 +1,31 @@
+# Time large fills, which are written to PSRAM a 1KB page at a time, and
+# show how many transfers were queued and how long the CPU waited for them.
+
+import time
+from picovision import PicoVision, PEN_RGB555, PEN_RGB888
+
+FRAMES = 20
+
+
+def run(name, pen_type, width, height):
+    display = PicoVision(pen_type, width, height)
+    pens = [display.create_pen(255, 0, 0), display.create_pen(0, 255, 0), display.create_pen(0, 0, 255)]
+    display.reset_psram_stats()
+
+    t_start = time.ticks_us()
+    for i in range(FRAMES):
+        display.set_pen(pens[i % 3])
+        display.clear()
+        display.rectangle(10, 10, width - 20, height - 20)
+    display.flush()
+    t = time.ticks_diff(time.ticks_us(), t_start)
+
+    transfers, max_depth, stall_us = display.get_psram_stats()
+    print("{}: {:.1f}us per frame, {} transfers, up to {} queued, {}us waiting".format(
+        name, t / FRAMES, transfers, max_depth, stall_us))
+    display.update()
+    del display
+
+
+run("RGB555 640x480", PEN_RGB555, 640, 480)
+run("RGB888 320x240", PEN_RGB888, 320, 240)
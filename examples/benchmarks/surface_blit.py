@@ -0,0 +1,55 @@
+# Compare drawing a status panel every frame with drawing it once into an
+# off-screen surface and copying it into the frame with blit.
+
+import time
+from picovision import PicoVision, PEN_RGB555
+
+WIDTH = 320
+HEIGHT = 240
+PANEL_W = 200
+PANEL_H = 60
+FRAMES = 50
+
+display = PicoVision(PEN_RGB555, WIDTH, HEIGHT)
+
+BLACK = display.create_pen(0, 0, 0)
+BLUE = display.create_pen(0, 0, 128)
+WHITE = display.create_pen(255, 255, 255)
+YELLOW = display.create_pen(255, 255, 0)
+
+
+def draw_panel(x, y):
+    display.set_pen(BLUE)
+    display.rectangle(x, y, PANEL_W, PANEL_H)
+    display.set_pen(WHITE)
+    display.line(x, y, x + PANEL_W - 1, y)
+    display.line(x, y + PANEL_H - 1, x + PANEL_W - 1, y + PANEL_H - 1)
+    for i in range(5):
+        display.set_pen(YELLOW)
+        display.circle(x + 20 + i * 24, y + 40, 8)
+    display.set_pen(WHITE)
+    display.text("SCORE 0012345", x + 8, y + 6, PANEL_W, 2)
+
+
+def run(name, draw):
+    display.set_pen(BLACK)
+    display.clear()
+    t_start = time.ticks_us()
+    for _ in range(FRAMES):
+        draw()
+    display.flush()
+    t = time.ticks_diff(time.ticks_us(), t_start)
+    print("{}: {:.1f}us per panel".format(name, t / FRAMES))
+
+
+panel = display.create_surface(PANEL_W, PANEL_H)
+draw_panel(0, 0)
+display.blit(None, (0, 0, PANEL_W, PANEL_H), (0, 0), dst_surface=panel)
+
+run("Draw", lambda: draw_panel(60, 180))
+run("Blit", lambda: display.blit(panel, (0, 0, PANEL_W, PANEL_H), (60, 180)))
+run("Blit transparent", lambda: display.blit(panel, (0, 0, PANEL_W, PANEL_H), (60, 180), transparent=BLUE))
+
+print("{} bytes of surface memory free".format(display.get_free_surface_memory()))
+
+display.update()
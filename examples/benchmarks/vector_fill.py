@@ -0,0 +1,36 @@
+# Time full screen PicoVector fills at 720x480. Shapes this size used to
+# be too big for the vector tile fast path and were drawn a pixel at a time.
+
+import time
+from picovision import PicoVision, PEN_RGB555
+from picovector import PicoVector, Polygon, RegularPolygon, ANTIALIAS_X4
+
+WIDTH = 720
+HEIGHT = 480
+FRAMES = 10
+
+display = PicoVision(PEN_RGB555, WIDTH, HEIGHT)
+vector = PicoVector(display)
+vector.set_antialiasing(ANTIALIAS_X4)
+
+BLACK = display.create_pen(0, 0, 0)
+BLUE = display.create_pen(0, 64, 200)
+
+shapes = (
+    ("rectangle", Polygon((0, 0), (WIDTH, 0), (WIDTH, HEIGHT), (0, HEIGHT))),
+    ("circle", RegularPolygon(WIDTH // 2, HEIGHT // 2, 64, HEIGHT // 2)),
+    ("triangle", Polygon((0, HEIGHT), (WIDTH // 2, 0), (WIDTH, HEIGHT))),
+)
+
+for name, shape in shapes:
+    t_total = 0
+    for f in range(FRAMES):
+        display.set_pen(BLACK)
+        display.clear()
+        display.set_pen(BLUE)
+        t_start = time.ticks_us()
+        vector.draw(shape)
+        t_total += time.ticks_diff(time.ticks_us(), t_start)
+    print("{:10s} {:.1f}ms per fill".format(name, t_total / FRAMES / 1000))
+
+display.update()
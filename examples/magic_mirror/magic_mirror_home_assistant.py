@@ -85,6 +85,8 @@ second = 0
 last_second = 0
 temperature = None
 wifi_problem = False
+sunrise_date = sunrise_time = None
+sunset_date = sunset_time = None
 
 buildings = []
 BUILDING_COUNT = 20
@@ -0,0 +1,71 @@
+import asyncio
+
+# Awaitable flips and vsyncs for asyncio apps
+#
+#     display = AsyncDisplay(PicoGraphics(PEN_RGB555, 640, 480))
+#
+#     async def render():
+#         while True:
+#             display.clear()
+#             ...
+#             await display.flip()
+#
+# Everything else is passed through to the wrapped display. While a flip is
+# being awaited other tasks - fetching over the network, reading sensors - run
+# until the vsync that shows the frame. Drawing from them with the display's
+# own methods waits for the flip to finish first, which blocks every task until
+# the vsync. PicoVector and JPEG decoding don't wait, so call wait_for_flip()
+# before using them anywhere but straight after the flip.
+
+try:
+    from asyncio import ThreadSafeFlag
+except ImportError:
+    # CPython, running under the emulator, where there's no vsync to wait for
+    class ThreadSafeFlag:
+        def set(self):
+            pass
+
+        async def wait(self):
+            await asyncio.sleep(0)
+
+
+class AsyncDisplay:
+    def __init__(self, display):
+        self._display = display
+        # Set from the scheduled vsync callback, which only one task can wait on,
+        # so it's passed on to any number of waiters by an Event
+        self._flag = ThreadSafeFlag()
+        self._vsync = asyncio.Event()
+        self._task = None
+        display.set_vsync_callback(self._on_vsync)
+
+    def __getattr__(self, name):
+        return getattr(self._display, name)
+
+    def _on_vsync(self, display):
+        self._flag.set()
+
+    async def _forward_vsyncs(self):
+        while True:
+            await self._flag.wait()
+            self._vsync.set()
+            self._vsync.clear()
+
+    async def vsync(self):
+        # Returns at the start of the next vsync
+        if self._task is None:
+            self._task = asyncio.create_task(self._forward_vsyncs())
+        await self._vsync.wait()
+
+    async def flip(self):
+        # Like update(), but lets other tasks run while waiting for the flip
+        self._display.flip_async()
+        while self._display.is_flipping():
+            await self.vsync()
+        self._display.wait_for_flip()
+
+    def close(self):
+        self._display.set_vsync_callback(None)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,57 @@
+import math
+from array import array
+
+# Line offset tables for display.set_line_offsets()
+#
+# Each table holds one entry per display line, giving the position in the
+# frame that line should be read from. Tables are plain array("I") so they
+# can be built once, kept around, and uploaded each frame for the cost of
+# a single PSRAM write.
+#
+# Remember that, like scroll groups, line offsets apply to the current bank
+# only, so upload the same table before each of two consecutive updates if
+# you want it to stick.
+
+
+def rows(display, source_rows, x=0):
+    # Show frame row source_rows[n] on display line n
+    pixel = display.get_line_offset(1, 0) - display.get_line_offset(0, 0)
+    offsets = array("I", bytearray(4 * len(source_rows)))
+    for line, y in enumerate(source_rows):
+        offsets[line] = display.get_line_offset(0, y) + x * pixel
+    return offsets
+
+
+def identity(display, lines):
+    return rows(display, range(lines))
+
+
+def flip(display, lines):
+    return rows(display, range(lines - 1, -1, -1))
+
+
+def mirror(display, lines, axis):
+    # Lines above the axis are shown as normal, lines below it reflect them
+    return rows(display, [y if y < axis else max(0, 2 * axis - y - 1) for y in range(lines)])
+
+
+def zoom(display, lines, scale, centre=None):
+    # Vertical zoom about a centre line by repeating or skipping frame rows
+    if centre is None:
+        centre = lines // 2
+    return rows(display, [max(0, min(lines - 1, centre + int((y - centre) / scale))) for y in range(lines)])
+
+
+def sine_wobble(display, lines, amplitude, wavelength, phase=0):
+    # Shift each line horizontally by up to +/- amplitude pixels
+    pixel = display.get_line_offset(1, 0) - display.get_line_offset(0, 0)
+    offsets = array("I", bytearray(4 * lines))
+    for y in range(lines):
+        dx = int(amplitude * math.sin(2 * math.pi * (y + phase) / wavelength))
+        offsets[y] = max(0, display.get_line_offset(0, y) + dx * pixel)
+    return offsets
+
+
+def sine_wobble_frames(display, lines, amplitude, wavelength, frames):
+    # Precompute one full cycle of sine_wobble
+    return [sine_wobble(display, lines, amplitude, wavelength, wavelength * f / frames) for f in range(frames)]
@@ -0,0 +1,393 @@
+#include "display_list.hpp"
+
+#include <cstring>
+
+namespace pimoroni {
+
+  namespace {
+    struct PointArgs { Point p; int32_t v; };
+    struct CharacterArgs { Point p; float s; int32_t a; char c; };
+    struct TextArgs { Point p; int32_t wrap; float s; int32_t a; uint8_t letter_spacing; bool fixed_width; uint32_t len; };
+    struct FontArgs { const bitmap::font_t *bitmap_font; const hershey::font_t *hershey_font; };
+    struct LineArgs { Point p1; Point p2; uint thickness; };
+    struct SpriteArgs { uint16_t sprite_data_idx; uint16_t width; uint16_t height; uint16_t bytes_per_pixel; };
+    struct ScrollArgs { int32_t idx; int32_t miny; int32_t maxy; };
+    struct LinesArgs { int32_t idx; int32_t miny; int32_t len; };
+    struct CallbackArgs { DisplayList::replay_func func; };
+
+    constexpr size_t padded(size_t len) { return (len + 3) & ~3; }
+  }
+
+  uint8_t* DisplayList::add(Op op, size_t len) {
+    if (!recording) return nullptr;
+
+    // The first command in a list records the state it was drawn with
+    if (used == 0 && op != OP_STATE) {
+      State state = get_state();
+      add(OP_STATE, &state, sizeof(state));
+    }
+
+    size_t needed = used + sizeof(Header) + padded(len);
+    if (needed > capacity) {
+      size_t new_capacity = std::max(needed, capacity ? capacity * 2 : (size_t)1024);
+      buffer = (uint8_t*)resize(buffer, capacity, new_capacity);
+      capacity = new_capacity;
+    }
+
+    Header header = {op, {0, 0, 0}, (uint32_t)len};
+    memcpy(buffer + used, &header, sizeof(Header));
+    uint8_t* args = buffer + used + sizeof(Header);
+    used = needed;
+    return args;
+  }
+
+  void DisplayList::add(Op op, const void* args, size_t len) {
+    uint8_t* dest = add(op, len);
+    if (dest && len) memcpy(dest, args, len);
+  }
+
+  void DisplayList::free_buffer() {
+    if (buffer) resize(buffer, capacity, 0);
+    buffer = nullptr;
+    capacity = 0;
+    used = 0;
+  }
+
+  DisplayList::State DisplayList::get_state() const {
+    return {
+      pen, bg, has_bg, depth,
+      graphics.thickness,
+      graphics.blend_mode,
+      graphics.clip,
+      graphics.bitmap_font,
+      graphics.hershey_font
+    };
+  }
+
+  void DisplayList::apply_state(const State &state) {
+    graphics.set_pen(state.pen);
+    if (state.has_bg) graphics.set_bg(state.bg);
+    graphics.set_depth(state.depth);
+    graphics.set_thickness(state.thickness);
+    graphics.set_blend_mode(state.blend_mode);
+    graphics.set_clip(state.clip);
+    graphics.bitmap_font = state.bitmap_font;
+    graphics.hershey_font = state.hershey_font;
+  }
+
+  void DisplayList::set_pen(uint c) {
+    pen = c;
+    add(OP_SET_PEN, c);
+  }
+
+  void DisplayList::set_bg(uint c) {
+    bg = c;
+    has_bg = true;
+    add(OP_SET_BG, c);
+  }
+
+  void DisplayList::set_depth(uint8_t new_depth) {
+    depth = new_depth;
+    add(OP_SET_DEPTH, new_depth);
+  }
+
+  void DisplayList::set_thickness(uint t) {
+    add(OP_SET_THICKNESS, t);
+  }
+
+  void DisplayList::set_blend_mode(BlendMode mode) {
+    add(OP_SET_BLEND_MODE, mode);
+  }
+
+  void DisplayList::set_clip(const Rect &r) {
+    add(OP_SET_CLIP, r);
+  }
+
+  void DisplayList::remove_clip() {
+    add(OP_REMOVE_CLIP, nullptr, 0);
+  }
+
+  void DisplayList::set_font() {
+    FontArgs args = {graphics.bitmap_font, graphics.hershey_font};
+    add(OP_SET_FONT, args);
+  }
+
+  void DisplayList::clear() {
+    add(OP_CLEAR, nullptr, 0);
+  }
+
+  void DisplayList::pixel(const Point &p) {
+    add(OP_PIXEL, p);
+  }
+
+  void DisplayList::pixel_span(const Point &p, int32_t l) {
+    PointArgs args = {p, l};
+    add(OP_PIXEL_SPAN, args);
+  }
+
+  void DisplayList::rectangle(const Rect &r) {
+    add(OP_RECTANGLE, r);
+  }
+
+  void DisplayList::circle(const Point &p, int32_t r) {
+    PointArgs args = {p, r};
+    add(OP_CIRCLE, args);
+  }
+
+  void DisplayList::character(const char c, const Point &p, float s, int32_t a) {
+    CharacterArgs args = {p, s, a, c};
+    add(OP_CHARACTER, args);
+  }
+
+  void DisplayList::text(const std::string_view &t, const Point &p, int32_t wrap, float s, int32_t a, uint8_t letter_spacing, bool fixed_width) {
+    TextArgs args = {p, wrap, s, a, letter_spacing, fixed_width, (uint32_t)t.size()};
+    uint8_t* dest = add(OP_TEXT, sizeof(args) + t.size());
+    if (dest) {
+      memcpy(dest, &args, sizeof(args));
+      memcpy(dest + sizeof(args), t.data(), t.size());
+    }
+  }
+
+  void DisplayList::polygon(const std::vector<Point> &points) {
+    add(OP_POLYGON, points.data(), points.size() * sizeof(Point));
+  }
+
+  void DisplayList::triangle(const Point &p1, const Point &p2, const Point &p3) {
+    Point args[3] = {p1, p2, p3};
+    add(OP_TRIANGLE, args);
+  }
+
+  void DisplayList::line(const Point &p1, const Point &p2) {
+    LineArgs args = {p1, p2, 1};
+    add(OP_LINE, args);
+  }
+
+  void DisplayList::thick_line(const Point &p1, const Point &p2, uint thickness) {
+    LineArgs args = {p1, p2, thickness};
+    add(OP_THICK_LINE, args);
+  }
+
+  void DisplayList::define_sprite(uint16_t sprite_data_idx, uint16_t width, uint16_t height, const uint16_t* data) {
+    SpriteArgs args = {sprite_data_idx, width, height, 2};
+    size_t len = width * height * 2;
+    uint8_t* dest = add(OP_DEFINE_SPRITE, sizeof(args) + len);
+    if (dest) {
+      memcpy(dest, &args, sizeof(args));
+      memcpy(dest + sizeof(args), data, len);
+    }
+  }
+
+  void DisplayList::define_palette_sprite(uint16_t sprite_data_idx, uint16_t width, uint16_t height, const uint8_t* data) {
+    SpriteArgs args = {sprite_data_idx, width, height, 1};
+    size_t len = width * height;
+    uint8_t* dest = add(OP_DEFINE_SPRITE, sizeof(args) + len);
+    if (dest) {
+      memcpy(dest, &args, sizeof(args));
+      memcpy(dest + sizeof(args), data, len);
+    }
+  }
+
+  void DisplayList::load_pvs_sprite(uint16_t sprite_data_idx, const uint32_t* data, uint32_t len_in_bytes) {
+    SpriteArgs args = {sprite_data_idx, 0, 0, 0};
+    uint8_t* dest = add(OP_LOAD_PVS_SPRITE, sizeof(args) + len_in_bytes);
+    if (dest) {
+      memcpy(dest, &args, sizeof(args));
+      memcpy(dest + sizeof(args), data, len_in_bytes);
+    }
+  }
+
+  void DisplayList::set_scroll_idx_for_lines(int idx, int miny, int maxy) {
+    ScrollArgs args = {idx, miny, maxy};
+    add(OP_SCROLL_LINES, args);
+  }
+
+  void DisplayList::set_line_offsets(const uint32_t* offsets, int miny, int len, int idx) {
+    LinesArgs args = {idx, miny, len};
+    uint8_t* dest = add(OP_LINE_OFFSETS, sizeof(args) + len * sizeof(uint32_t));
+    if (dest) {
+      memcpy(dest, &args, sizeof(args));
+      memcpy(dest + sizeof(args), offsets, len * sizeof(uint32_t));
+    }
+  }
+
+  void DisplayList::callback(replay_func func, const void* args, size_t len) {
+    CallbackArgs header = {func};
+    uint8_t* dest = add(OP_CALLBACK, sizeof(header) + len);
+    if (dest) {
+      memcpy(dest, &header, sizeof(header));
+      memcpy(dest + sizeof(header), args, len);
+    }
+  }
+
+  void DisplayList::replay() {
+    if (used == 0) return;
+
+    State live_state = get_state();
+
+    // Anything drawn while replaying shouldn't be recorded again
+    bool was_recording = recording;
+    recording = false;
+
+    DVDisplay &driver = graphics.driver;
+
+    size_t offset = 0;
+    while (offset < used) {
+      Header header;
+      memcpy(&header, buffer + offset, sizeof(Header));
+      uint8_t* args = buffer + offset + sizeof(Header);
+      offset += sizeof(Header) + padded(header.len);
+
+      switch (header.op) {
+        case OP_STATE: {
+          State state;
+          memcpy(&state, args, sizeof(state));
+          apply_state(state);
+          break;
+        }
+        case OP_SET_PEN: {
+          uint c;
+          memcpy(&c, args, sizeof(c));
+          graphics.set_pen(c);
+          break;
+        }
+        case OP_SET_BG: {
+          uint c;
+          memcpy(&c, args, sizeof(c));
+          graphics.set_bg(c);
+          break;
+        }
+        case OP_SET_DEPTH:
+          graphics.set_depth(args[0]);
+          break;
+        case OP_SET_THICKNESS: {
+          uint t;
+          memcpy(&t, args, sizeof(t));
+          graphics.set_thickness(t);
+          break;
+        }
+        case OP_SET_BLEND_MODE: {
+          BlendMode mode;
+          memcpy(&mode, args, sizeof(mode));
+          graphics.set_blend_mode(mode);
+          break;
+        }
+        case OP_SET_CLIP: {
+          Rect r;
+          memcpy(&r, args, sizeof(r));
+          graphics.set_clip(r);
+          break;
+        }
+        case OP_REMOVE_CLIP:
+          graphics.remove_clip();
+          break;
+        case OP_SET_FONT: {
+          FontArgs font;
+          memcpy(&font, args, sizeof(font));
+          graphics.bitmap_font = font.bitmap_font;
+          graphics.hershey_font = font.hershey_font;
+          break;
+        }
+        case OP_CLEAR:
+          graphics.clear();
+          break;
+        case OP_PIXEL: {
+          Point p;
+          memcpy(&p, args, sizeof(p));
+          graphics.pixel(p);
+          break;
+        }
+        case OP_PIXEL_SPAN: {
+          PointArgs a;
+          memcpy(&a, args, sizeof(a));
+          graphics.pixel_span(a.p, a.v);
+          break;
+        }
+        case OP_RECTANGLE: {
+          Rect r;
+          memcpy(&r, args, sizeof(r));
+          graphics.rectangle(r);
+          break;
+        }
+        case OP_CIRCLE: {
+          PointArgs a;
+          memcpy(&a, args, sizeof(a));
+          graphics.circle(a.p, a.v);
+          break;
+        }
+        case OP_CHARACTER: {
+          CharacterArgs a;
+          memcpy(&a, args, sizeof(a));
+          graphics.character(a.c, a.p, a.s, a.a);
+          break;
+        }
+        case OP_TEXT: {
+          TextArgs a;
+          memcpy(&a, args, sizeof(a));
+          std::string_view t((const char*)args + sizeof(a), a.len);
+          graphics.text(t, a.p, a.wrap, a.s, a.a, a.letter_spacing, a.fixed_width);
+          break;
+        }
+        case OP_POLYGON: {
+          std::vector<Point> points(header.len / sizeof(Point));
+          memcpy(points.data(), args, points.size() * sizeof(Point));
+          graphics.polygon(points);
+          break;
+        }
+        case OP_TRIANGLE: {
+          Point p[3];
+          memcpy(p, args, sizeof(p));
+          graphics.triangle(p[0], p[1], p[2]);
+          break;
+        }
+        case OP_LINE: {
+          LineArgs a;
+          memcpy(&a, args, sizeof(a));
+          graphics.line(a.p1, a.p2);
+          break;
+        }
+        case OP_THICK_LINE: {
+          LineArgs a;
+          memcpy(&a, args, sizeof(a));
+          graphics.thick_line(a.p1, a.p2, a.thickness);
+          break;
+        }
+        case OP_DEFINE_SPRITE: {
+          SpriteArgs a;
+          memcpy(&a, args, sizeof(a));
+          if (a.bytes_per_pixel == 1) driver.define_palette_sprite(a.sprite_data_idx, a.width, a.height, args + sizeof(a));
+          else driver.define_sprite(a.sprite_data_idx, a.width, a.height, (uint16_t*)(args + sizeof(a)));
+          break;
+        }
+        case OP_LOAD_PVS_SPRITE: {
+          SpriteArgs a;
+          memcpy(&a, args, sizeof(a));
+          driver.load_pvs_sprite(a.sprite_data_idx, (uint32_t*)(args + sizeof(a)), header.len - sizeof(a));
+          break;
+        }
+        case OP_SCROLL_LINES: {
+          ScrollArgs a;
+          memcpy(&a, args, sizeof(a));
+          driver.set_scroll_idx_for_lines(a.idx, a.miny, a.maxy);
+          break;
+        }
+        case OP_LINE_OFFSETS: {
+          LinesArgs a;
+          memcpy(&a, args, sizeof(a));
+          driver.set_line_offsets((const uint32_t*)(args + sizeof(a)), a.miny, a.len, a.idx);
+          break;
+        }
+        case OP_CALLBACK: {
+          CallbackArgs a;
+          memcpy(&a, args, sizeof(a));
+          a.func(graphics, args + sizeof(a), header.len - sizeof(a));
+          break;
+        }
+      }
+    }
+
+    apply_state(live_state);
+    used = 0;
+    recording = was_recording;
+  }
+
+}
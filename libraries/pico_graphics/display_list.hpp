@@ -0,0 +1,142 @@
+#pragma once
+
+#include <cstdint>
+#include <cstddef>
+#include <string_view>
+#include <vector>
+
+#include "pico_graphics_dv.hpp"
+
+namespace pimoroni {
+
+  // Records drawing commands issued against one PSRAM bank into a compact
+  // binary list, so they can be replayed against the other bank after a flip.
+  // This keeps both banks in sync without drawing everything twice.
+  class DisplayList {
+    public:
+      // Used to grow the command buffer, so that it can live on the MicroPython heap
+      typedef void* (*resize_func)(void* buffer, size_t old_size, size_t new_size);
+
+      // Replays a command that the display list can't draw by itself
+      typedef void (*replay_func)(PicoGraphicsDV &graphics, const void* args, size_t len);
+
+      enum Op : uint8_t {
+        OP_STATE = 0,
+        OP_SET_PEN,
+        OP_SET_BG,
+        OP_SET_DEPTH,
+        OP_SET_THICKNESS,
+        OP_SET_BLEND_MODE,
+        OP_SET_CLIP,
+        OP_REMOVE_CLIP,
+        OP_SET_FONT,
+        OP_CLEAR,
+        OP_PIXEL,
+        OP_PIXEL_SPAN,
+        OP_RECTANGLE,
+        OP_CIRCLE,
+        OP_CHARACTER,
+        OP_TEXT,
+        OP_POLYGON,
+        OP_TRIANGLE,
+        OP_LINE,
+        OP_THICK_LINE,
+        OP_DEFINE_SPRITE,
+        OP_LOAD_PVS_SPRITE,
+        OP_SCROLL_LINES,
+        OP_LINE_OFFSETS,
+        OP_CALLBACK,
+      };
+
+      DisplayList(PicoGraphicsDV &graphics, resize_func resize)
+      : graphics(graphics), resize(resize) {}
+
+      void start() { recording = true; }
+      void stop() { recording = false; }
+      bool is_recording() const { return recording; }
+
+      // Bytes of commands waiting to be replayed
+      size_t size() const { return used; }
+      bool empty() const { return used == 0; }
+
+      // Draw the recorded commands into the current bank, then empty the list.
+      // Drawing state (pen, clip, font etc) is left as it was before the replay.
+      void replay();
+      void discard() { used = 0; }
+      void free_buffer();
+
+      // Drawing state is tracked even when not recording, because
+      // the first command in a list needs to know what it was.
+      void set_pen(uint c);
+      void set_bg(uint c);
+      void set_depth(uint8_t depth);
+      void set_thickness(uint t);
+      void set_blend_mode(BlendMode mode);
+      void set_clip(const Rect &r);
+      void remove_clip();
+      void set_font();
+
+      void clear();
+      void pixel(const Point &p);
+      void pixel_span(const Point &p, int32_t l);
+      void rectangle(const Rect &r);
+      void circle(const Point &p, int32_t r);
+      void character(const char c, const Point &p, float s, int32_t a);
+      void text(const std::string_view &t, const Point &p, int32_t wrap, float s, int32_t a, uint8_t letter_spacing, bool fixed_width);
+      void polygon(const std::vector<Point> &points);
+      void triangle(const Point &p1, const Point &p2, const Point &p3);
+      void line(const Point &p1, const Point &p2);
+      void thick_line(const Point &p1, const Point &p2, uint thickness);
+
+      void define_sprite(uint16_t sprite_data_idx, uint16_t width, uint16_t height, const uint16_t* data);
+      void define_palette_sprite(uint16_t sprite_data_idx, uint16_t width, uint16_t height, const uint8_t* data);
+      void load_pvs_sprite(uint16_t sprite_data_idx, const uint32_t* data, uint32_t len_in_bytes);
+      void set_scroll_idx_for_lines(int idx, int miny, int maxy);
+      void set_line_offsets(const uint32_t* offsets, int miny, int len, int idx);
+
+      // args are copied into the list, any pointers they contain must stay valid until the replay
+      void callback(replay_func func, const void* args, size_t len);
+
+    private:
+      struct State {
+        uint pen;
+        uint bg;
+        bool has_bg;
+        uint8_t depth;
+        uint thickness;
+        BlendMode blend_mode;
+        Rect clip;
+        const bitmap::font_t *bitmap_font;
+        const hershey::font_t *hershey_font;
+      };
+
+      // Every command starts with a header, and its arguments are padded to a multiple of 4 bytes.
+      // The length is 32 bits so no command is too long to record, such as a long text() or polygon()
+      struct Header {
+        Op op;
+        uint8_t reserved[3];
+        uint32_t len;
+      };
+
+      PicoGraphicsDV &graphics;
+      resize_func resize;
+      bool recording = false;
+
+      uint pen = 0;
+      uint bg = 0;
+      bool has_bg = false;
+      uint8_t depth = 0;
+
+      uint8_t* buffer = nullptr;
+      size_t capacity = 0;
+      size_t used = 0;
+
+      State get_state() const;
+      void apply_state(const State &state);
+
+      uint8_t* add(Op op, size_t len);
+      void add(Op op, const void* args, size_t len);
+      template<typename T> void add(Op op, const T &args) { add(op, &args, sizeof(T)); }
+  };
+
+}
@@ -0,0 +1,178 @@
+#include <algorithm>
+#include <cstring>
+
+#include "glyph_cache.hpp"
+
+namespace pimoroni {
+
+  namespace {
+    // Draws nothing, but keeps every span it's asked to draw
+    class GlyphRecorder : public PicoGraphics {
+      public:
+        std::vector<Rect> spans;
+
+        GlyphRecorder(const PicoGraphics &graphics) : PicoGraphics(0, 0, nullptr) {
+          bitmap_font = graphics.bitmap_font;
+          hershey_font = graphics.hershey_font;
+          thickness = graphics.thickness;
+          // Glyphs are drawn at the origin, and Hershey glyphs reach above and left of it
+          bounds = clip = Rect(-INT16_MAX, -INT16_MAX, INT16_MAX * 2, INT16_MAX * 2);
+        }
+
+        void set_pen(uint c) override {}
+        void set_pen(uint8_t r, uint8_t g, uint8_t b) override {}
+        void set_pixel(const Point &p) override { spans.push_back(Rect(p.x, p.y, 1, 1)); }
+        void set_pixel_span(const Point &p, uint l) override { spans.push_back(Rect(p.x, p.y, l, 1)); }
+    };
+  }
+
+  void PicoGraphicsDV::text(const std::string_view &t, const Point &p, int32_t wrap, float s, int32_t a, uint8_t letter_spacing, bool fixed_width) {
+    if (!glyph_cache || !glyph_cache->text(*this, t, p, wrap, s, a, letter_spacing, fixed_width)) {
+      PicoGraphics::text(t, p, wrap, s, a, letter_spacing, fixed_width);
+    }
+  }
+
+  bool GlyphCache::text(PicoGraphicsDV &graphics, const std::string_view &t, const Point &p, int32_t wrap, float s, int32_t a, uint8_t letter_spacing, bool fixed_width) {
+    if (max_size == 0 || a != 0) return false;
+    if (!graphics.bitmap_font && !graphics.hershey_font) return false;
+    for (auto c : t) {
+      if (c < ' ' || c > '~') return false;
+    }
+
+    Key key = {nullptr, s, 0, 0, false, 0};
+    if (graphics.bitmap_font) {
+      // Bitmap text wraps between words, but never if the whole line fits
+      if (graphics.measure_text(t, s, letter_spacing, fixed_width) > wrap) return false;
+      key.font = graphics.bitmap_font;
+      key.scale = std::max(1, (int)s);
+      key.letter_spacing = letter_spacing;
+      key.fixed_width = fixed_width;
+    } else {
+      key.font = graphics.hershey_font;
+      key.thickness = graphics.thickness;
+    }
+
+    std::vector<Run> glyph_runs;
+    Point origin = p;
+    for (auto c : t) {
+      key.c = c;
+      const Glyph* glyph = find(key);
+      if (glyph) {
+        hits++;
+        draw(graphics, origin, runs + glyph->first, glyph->count);
+        origin.x += glyph->advance;
+      }
+      else {
+        misses++;
+        rasterise(graphics, key, glyph_runs);
+        draw(graphics, origin, glyph_runs.data(), glyph_runs.size());
+        const int32_t advance = graphics.measure_text(std::string_view(&key.c, 1), s, letter_spacing, fixed_width);
+        add(key, advance, glyph_runs.data(), glyph_runs.size());
+        origin.x += advance;
+      }
+    }
+    return true;
+  }
+
+  void GlyphCache::set_size(size_t len_in_bytes) {
+    max_size = std::min(len_in_bytes, (size_t)UINT16_MAX * sizeof(Run));
+    free_buffer();
+  }
+
+  void GlyphCache::clear() {
+    num_runs = 0;
+    num_glyphs = 0;
+  }
+
+  void GlyphCache::free_buffer() {
+    if (runs) resize(runs, capacity, 0);
+    runs = nullptr;
+    capacity = 0;
+    clear();
+  }
+
+  const GlyphCache::Glyph* GlyphCache::find(const Key &key) {
+    for (auto i = 0; i < num_glyphs; i++) {
+      if (glyphs[i].key == key) {
+        glyphs[i].last_used = ++clock;
+        return &glyphs[i];
+      }
+    }
+    return nullptr;
+  }
+
+  const GlyphCache::Glyph* GlyphCache::add(const Key &key, int32_t advance, const Run* glyph_runs, size_t count) {
+    const size_t max_runs = max_size / sizeof(Run);
+    if (count > max_runs) return nullptr;
+
+    if (!runs) {
+      capacity = max_runs * sizeof(Run);
+      runs = (Run*)resize(nullptr, 0, capacity);
+    }
+    while (num_glyphs == MAX_GLYPHS || num_runs + count > max_runs) {
+      evict_oldest();
+    }
+
+    Glyph &glyph = glyphs[num_glyphs++];
+    glyph = {key, advance, num_runs, (uint16_t)count, ++clock};
+    memcpy(runs + num_runs, glyph_runs, count * sizeof(Run));
+    num_runs += count;
+    return &glyph;
+  }
+
+  void GlyphCache::evict_oldest() {
+    int oldest = 0;
+    for (auto i = 1; i < num_glyphs; i++) {
+      if (glyphs[i].last_used < glyphs[oldest].last_used) oldest = i;
+    }
+    const Glyph evicted = glyphs[oldest];
+    glyphs[oldest] = glyphs[--num_glyphs];
+
+    // Close up the runs, so the free space is always at the end
+    memmove(runs + evicted.first, runs + evicted.first + evicted.count, (num_runs - evicted.first - evicted.count) * sizeof(Run));
+    num_runs -= evicted.count;
+    for (auto i = 0; i < num_glyphs; i++) {
+      if (glyphs[i].first > evicted.first) glyphs[i].first -= evicted.count;
+    }
+    evictions++;
+  }
+
+  void GlyphCache::rasterise(PicoGraphicsDV &graphics, const Key &key, std::vector<Run> &glyph_runs) {
+    GlyphRecorder recorder(graphics);
+    recorder.text(std::string_view(&key.c, 1), Point(0, 0), INT32_MAX, key.scale, 0, key.letter_spacing, key.fixed_width);
+
+    // Join spans that touch or overlap on each row
+    std::vector<Rect> &spans = recorder.spans;
+    std::sort(spans.begin(), spans.end(), [](const Rect &a, const Rect &b) {
+      return a.y != b.y ? a.y < b.y : a.x < b.x;
+    });
+    std::vector<Rect> rows;
+    for (auto &span : spans) {
+      if (span.w <= 0) continue;
+      if (!rows.empty() && rows.back().y == span.y && span.x <= rows.back().x + rows.back().w) {
+        rows.back().w = std::max(rows.back().w, span.x + span.w - rows.back().x);
+      }
+      else {
+        rows.push_back(span);
+      }
+    }
+
+    // Then stack the same run on consecutive rows into one rectangle
+    glyph_runs.clear();
+    for (auto &row : rows) {
+      auto below = std::find_if(glyph_runs.begin(), glyph_runs.end(), [&row](const Run &run) {
+        return run.y + run.h == row.y && run.x == row.x && run.w == row.w;
+      });
+      if (below != glyph_runs.end()) below->h++;
+      else glyph_runs.push_back({(int16_t)row.x, (int16_t)row.y, (uint16_t)row.w, 1});
+    }
+  }
+
+  void GlyphCache::draw(PicoGraphicsDV &graphics, const Point &p, const Run* glyph_runs, size_t count) {
+    for (auto i = 0u; i < count; i++) {
+      const Run &run = glyph_runs[i];
+      graphics.rectangle(Rect(p.x + run.x, p.y + run.y, run.w, run.h));
+    }
+  }
+
+}
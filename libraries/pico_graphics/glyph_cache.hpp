@@ -0,0 +1,93 @@
+#pragma once
+
+#include <cstdint>
+#include <cstddef>
+#include <string_view>
+#include <vector>
+
+#include "pico_graphics_dv.hpp"
+
+namespace pimoroni {
+
+  // Keeps the shape of each glyph drawn by text(), as the rectangles of pixels it
+  // covers, so text drawn again is a few queued fills per glyph rather than being
+  // rasterised again. Shapes are kept without a colour, so one glyph serves every pen,
+  // and the least recently used are dropped when the cache is full.
+  class GlyphCache {
+    public:
+      // Used to grow the glyph buffer, so that it can live on the MicroPython heap
+      typedef void* (*resize_func)(void* buffer, size_t old_size, size_t new_size);
+
+      static constexpr size_t DEFAULT_SIZE = 4096;
+      static constexpr int MAX_GLYPHS = 128;
+
+      GlyphCache(resize_func resize) : resize(resize) {}
+
+      // Draws the text a glyph at a time, caching glyphs that haven't been drawn before.
+      // Returns false without drawing anything if the text is rotated, would wrap, or has
+      // characters outside printable ASCII, so must be drawn by PicoGraphics instead.
+      bool text(PicoGraphicsDV &graphics, const std::string_view &t, const Point &p, int32_t wrap, float s, int32_t a, uint8_t letter_spacing, bool fixed_width);
+
+      // Bytes of glyph shapes to keep, 0 turns the cache off
+      void set_size(size_t len_in_bytes);
+      size_t get_size() const { return max_size; }
+      size_t get_used() const { return num_runs * sizeof(Run); }
+      void clear();
+      void free_buffer();
+
+      uint32_t get_hits() const { return hits; }
+      uint32_t get_misses() const { return misses; }
+      uint32_t get_evictions() const { return evictions; }
+      void reset_stats() { hits = 0; misses = 0; evictions = 0; }
+
+    private:
+      struct Run {
+        int16_t x, y;
+        uint16_t w, h;
+      };
+
+      struct Key {
+        const void *font;
+        float scale;
+        uint16_t thickness;
+        uint8_t letter_spacing;
+        bool fixed_width;
+        char c;
+
+        bool operator==(const Key &k) const {
+          return font == k.font && scale == k.scale && thickness == k.thickness
+            && letter_spacing == k.letter_spacing && fixed_width == k.fixed_width && c == k.c;
+        }
+      };
+
+      struct Glyph {
+        Key key;
+        int32_t advance;
+        uint16_t first;  // Index of its first run
+        uint16_t count;
+        uint32_t last_used;
+      };
+
+      resize_func resize;
+      size_t max_size = DEFAULT_SIZE;
+
+      Run* runs = nullptr;
+      size_t capacity = 0;  // In bytes
+      uint16_t num_runs = 0;
+      Glyph glyphs[MAX_GLYPHS];
+      int num_glyphs = 0;
+      uint32_t clock = 0;
+
+      uint32_t hits = 0;
+      uint32_t misses = 0;
+      uint32_t evictions = 0;
+
+      const Glyph* find(const Key &key);
+      const Glyph* add(const Key &key, int32_t advance, const Run* glyph_runs, size_t count);
+      void evict_oldest();
+
+      static void rasterise(PicoGraphicsDV &graphics, const Key &key, std::vector<Run> &glyph_runs);
+      static void draw(PicoGraphicsDV &graphics, const Point &p, const Run* glyph_runs, size_t count);
+  };
+
+}
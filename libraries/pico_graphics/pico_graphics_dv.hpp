@@ -1,3 +1,5 @@
+#pragma once
+
 #include "pico_graphics.hpp"
 #include "dv_display.hpp"
 
@@ -7,18 +9,39 @@ namespace pimoroni {
     FIXED = 1,
   };
 
+  class GlyphCache;
+
   class PicoGraphicsDV : public PicoGraphics {
     public:
       DVDisplay &driver;
       BlendMode blend_mode = BlendMode::TARGET;
+      GlyphCache *glyph_cache = nullptr;
 
       void set_blend_mode(BlendMode mode) {
+        driver.flush();
         blend_mode = mode;
       }
 
       virtual void set_depth(uint8_t new_depth) {}
       virtual void set_bg(uint c) {};
 
+      // Filled by the driver, which queues a PSRAM write for each row and returns while they run.
+      // These hide the PicoGraphics versions, which draw a span at a time.
+      void rectangle(const Rect &r) {
+        uint32_t pixel;
+        const Rect clipped = r.intersection(clip);
+        if (clipped.empty()) return;
+        if (get_fill_pixel(pixel)) driver.fill_rect(clipped, pixel);
+        else PicoGraphics::rectangle(clipped);
+      }
+      void clear() { rectangle(clip); }
+
+      // Drawn from glyph_cache where it can be, see glyph_cache.cpp. Hides the PicoGraphics version.
+      void text(const std::string_view &t, const Point &p, int32_t wrap, float s = 2.0f, int32_t a = 0, uint8_t letter_spacing = 1, bool fixed_width = false);
+
+      // The pen as it is stored in the frame, returns false if rectangles can't be filled by the driver
+      virtual bool get_fill_pixel(uint32_t &pixel) { return false; }
+
       PicoGraphicsDV(uint16_t width, uint16_t height, DVDisplay &dv_display)
       : PicoGraphics(width, height, nullptr),
         driver(dv_display)
@@ -42,7 +65,9 @@ namespace pimoroni {
       int create_pen_hsv(float h, float s, float v) override;
       void set_pixel(const Point &p) override;
       void set_pixel_span(const Point &p, uint l) override;
+      bool get_fill_pixel(uint32_t &pixel) override { pixel = color | depth; return true; }
       void set_pixel_alpha(const Point &p, const uint8_t a) override;
+      static void blend_span(void* pen, uint32_t colour, const uint8_t* alpha, uint8_t* pixels, uint32_t len);
 
       bool supports_alpha_blend() override {return true;}
 
@@ -66,7 +91,9 @@ namespace pimoroni {
       int create_pen_hsv(float h, float s, float v) override;
       void set_pixel(const Point &p) override;
       void set_pixel_span(const Point &p, uint l) override;
+      bool get_fill_pixel(uint32_t &pixel) override { pixel = color; return true; }
       void set_pixel_alpha(const Point &p, const uint8_t a) override;
+      static void blend_span(void* pen, uint32_t colour, const uint8_t* alpha, uint8_t* pixels, uint32_t len);
 
       bool supports_alpha_blend() override {return true;}
 
@@ -84,10 +111,11 @@ namespace pimoroni {
       uint8_t depth = 0;
       bool used[2][palette_size];
 
-      std::array<std::array<uint8_t, 16>, 512> candidate_cache;
-      std::array<uint8_t, 16> candidates;
-      bool cache_built = false;
-      uint8_t cached_palette = 0;
+      // For each RGB444 colour: the nearest entry in bits 4-0, a second entry to dither
+      // with in bits 9-5 and how many sixteenths of the second to use in bits 13-10
+      static const uint16_t palette_lut_size = 4096;
+      std::array<std::array<uint16_t, palette_lut_size>, 2> palette_lut;
+      bool lut_built[2] = {false, false};
 
       PicoGraphics_PenDV_P5(uint16_t width, uint16_t height, DVDisplay &dv_display);
       void set_pen(uint c) override;
@@ -97,15 +125,24 @@ namespace pimoroni {
       int create_pen(uint8_t r, uint8_t g, uint8_t b) override;
       int create_pen_hsv(float h, float s, float v) override;
       int reset_pen(uint8_t i) override;
+      // Replace whole palettes at once, as 3 bytes of R, G, B per entry, marking every entry used
+      void set_palette(const uint8_t *rgb, uint8_t palette_idx, uint8_t num_palettes);
 
       int get_palette_size() override {return 0;};
       RGB* get_palette() override {return nullptr;};
 
       void set_pixel(const Point &p) override;
       void set_pixel_span(const Point &p, uint l) override;
-      void get_dither_candidates(const RGB &col, const RGB *palette, size_t len, std::array<uint8_t, 16> &candidates);
+      bool get_fill_pixel(uint32_t &pixel) override { pixel = (color << 2) | depth; return true; }
+      void build_palette_lut(uint8_t palette_idx);
       void set_pixel_dither(const Point &p, const RGB &c) override;
 
+      // Palette colours can't be blended, so coverage of half or more draws the pen colour
+      void set_pixel_alpha(const Point &p, const uint8_t a) override;
+      bool supports_alpha_blend() override {return true;}
+
+      bool render_pico_vector_tile(const Rect &bounds, uint8_t* alpha_data, uint32_t stride, uint8_t alpha_type) override;
+
       static size_t buffer_size(uint w, uint h) {
           return w * h;
       }
@@ -6,6 +6,13 @@ namespace pimoroni {
         return ((uint32_t)r << 16) | ((uint32_t)g << 8) | b;
     }
 
+    static void read_palette(const DVDisplay &driver, uint8_t palette_idx, RGB *palette) {
+        const uint8_t *rgb = driver.get_palette(palette_idx);
+        for(auto i = 0; i < DVDisplay::PALETTE_SIZE; i++) {
+            palette[i] = RGB(rgb[i * 3], rgb[i * 3 + 1], rgb[i * 3 + 2]);
+        }
+    }
+
     PicoGraphics_PenDV_P5::PicoGraphics_PenDV_P5(uint16_t width, uint16_t height, DVDisplay &dv_display)
       : PicoGraphicsDV(width, height, dv_display)
       {
@@ -17,7 +24,6 @@ namespace pimoroni {
             driver.set_palette_colour(i, RGB_to_RGB888(n, n, n) << 3, 1);
             used[1][i] = false;
         }
-        cache_built = false;
     }
     void PicoGraphics_PenDV_P5::set_pen(uint c) {
         color = c & 0x1f;
@@ -27,20 +33,23 @@ namespace pimoroni {
     }
     void PicoGraphics_PenDV_P5::set_pen(uint8_t r, uint8_t g, uint8_t b) {
         uint8_t current_palette = driver.get_local_palette_index();
-        RGB888 *driver_palette = driver.get_palette(current_palette);
-        RGB palette[palette_size];
-        for(auto i = 0u; i < palette_size; i++) {
-            palette[i] = RGB((uint)driver_palette[i]);
-        }
+        if(!lut_built[current_palette]) build_palette_lut(current_palette);
 
-        int pen = RGB(r, g, b).closest(palette, palette_size);
-        if(pen != -1) color = pen;
+        // The table is keyed by RGB444, so only trust it when it finds the colour itself
+        color = palette_lut[current_palette][((r & 0xF0) << 4) | (g & 0xF0) | (b >> 4)] & 0x1f;
+        const uint8_t *entry = driver.get_palette(current_palette) + color * 3;
+        if(entry[0] != r || entry[1] != g || entry[2] != b) {
+            RGB palette[palette_size];
+            read_palette(driver, current_palette, palette);
+            int pen = RGB(r, g, b).closest(palette, palette_size);
+            if(pen != -1) color = pen;
+        }
     }
     int PicoGraphics_PenDV_P5::update_pen(uint8_t i, uint8_t r, uint8_t g, uint8_t b) {
         uint8_t current_palette = driver.get_local_palette_index();
         i &= 0x1f;
         used[current_palette][i] = true;
-        cache_built = false;
+        lut_built[current_palette] = false;
         driver.set_palette_colour(i, RGB_to_RGB888(r, g, b));
         return i;
     }
@@ -50,7 +59,7 @@ namespace pimoroni {
         for(auto i = 0u; i < palette_size; i++) {
             if(!used[current_palette][i]) {
                 used[current_palette][i] = true;
-                cache_built = false;
+                lut_built[current_palette] = false;
                 driver.set_palette_colour(i, RGB_to_RGB888(r, g, b));
                 return i;
             }
@@ -61,11 +70,20 @@ namespace pimoroni {
         RGB p = RGB::from_hsv(h, s, v);
         return create_pen(p.r, p.g, p.b);
     }
+    void PicoGraphics_PenDV_P5::set_palette(const uint8_t *rgb, uint8_t palette_idx, uint8_t num_palettes) {
+        driver.set_palette_rgb(rgb, palette_idx, num_palettes);
+        for(auto p = palette_idx; p < palette_idx + num_palettes; p++) {
+            for(auto i = 0u; i < palette_size; i++) {
+                used[p][i] = true;
+            }
+            lut_built[p] = false;
+        }
+    }
     int PicoGraphics_PenDV_P5::reset_pen(uint8_t i) {
         uint8_t current_palette = driver.get_local_palette_index();
         driver.set_palette_colour(i, 0);
         used[current_palette][i] = false;
-        cache_built = false;
+        lut_built[current_palette] = false;
         return i;
     }
     void PicoGraphics_PenDV_P5::set_pixel(const Point &p) {
@@ -76,48 +94,133 @@ namespace pimoroni {
         driver.write_palette_pixel_span(p, l, (color << 2) | depth);
     }
 
-    void PicoGraphics_PenDV_P5::get_dither_candidates(const RGB &col, const RGB *palette, size_t len, std::array<uint8_t, 16> &candidates) {
-        RGB error;
-        for(size_t i = 0; i < candidates.size(); i++) {
-            candidates[i] = (col + error).closest(palette, len);
-            error += (col - palette[candidates[i]]);
+    void PicoGraphics_PenDV_P5::set_pixel_alpha(const Point &p, const uint8_t a) {
+        if (a >= 128) set_pixel(p);
+    }
+
+    bool PicoGraphics_PenDV_P5::render_pico_vector_tile(const Rect &src_bounds, uint8_t* alpha_data, uint32_t stride, uint8_t alpha_type) {
+        // Coverage is 0-1 without antialiasing, 0-4 with X4 and 0-16 with X16
+        const uint8_t alpha_threshold = (alpha_type == 2) ? 8 : (alpha_type == 1) ? 2 : 1;
+
+        const Rect bounds = src_bounds.intersection(clip);
+        if (bounds.w <= 0 || bounds.h <= 0) return true;
+        alpha_data += bounds.x - src_bounds.x + stride * (bounds.y - src_bounds.y);
+
+        // Double buffering - in the main loop one buffer is being written to the PSRAM or read into 
+        // in the background while the other is processed.  Rows wider than the buffers are split
+        // into segments, which are pipelined in the same way as whole rows.
+        constexpr int32_t max_segment_len = 256;
+        uint8_t buf0[max_segment_len] alignas(4);
+        uint8_t buf1[max_segment_len] alignas(4);
+        uint8_t* rbuf = buf0;
+        uint8_t* wbuf = buf1;
+
+        const int32_t segments_per_row = (bounds.w + max_segment_len - 1) / max_segment_len;
+        const int32_t num_segments = segments_per_row * bounds.h;
+        const uint8_t pen = (color << 2) | depth;
+
+        // Start reading the first segment
+        int32_t seg_x = 0;
+        int32_t seg_y = 0;
+        int32_t seg_len = std::min(max_segment_len, bounds.w);
+        uint32_t address = driver.point_to_address({bounds.x, bounds.y});
+        driver.raw_read_async(address, (uint32_t*)rbuf, (seg_len + 3) >> 2);
+        driver.raw_wait_for_finish_blocking();
+
+        for (int32_t s = 0; s < num_segments; ++s) {
+            std::swap(wbuf, rbuf);
+
+            const uint32_t prev_address = address;
+            const int32_t len = seg_len;
+            uint8_t* alpha_ptr = &alpha_data[stride * seg_y + seg_x];
+
+            // Find the next segment
+            seg_x += max_segment_len;
+            if (seg_x >= bounds.w) {
+                seg_x = 0;
+                ++seg_y;
+            }
+            seg_len = std::min(max_segment_len, bounds.w - seg_x);
+            address = driver.point_to_address({bounds.x + seg_x, bounds.y + seg_y});
+
+            // Process this segment
+            for (int32_t x = 0; x < len; ++x) {
+                if (*alpha_ptr++ >= alpha_threshold) {
+                    wbuf[x] = pen;
+                }
+
+                // Halfway through processing this segment switch from writing the previous one to reading the next
+                if (x == len >> 1 && s+1 < num_segments) {
+                    driver.raw_read_async(address, (uint32_t*)rbuf, (seg_len + 3) >> 2);
+                }
+            }
+
+            // Write the segment out while we loop on to the next
+            driver.raw_write_async_bytes(prev_address, (uint32_t*)wbuf, len);
         }
 
-        // sort by a rough approximation of luminance, this ensures that neighbouring
-        // pixels in the dither matrix are at extreme opposites of luminence
-        // giving a more balanced output
-        std::sort(candidates.begin(), candidates.end(), [palette](int a, int b) {
-            return palette[a].luminance() > palette[b].luminance();
-        });
+        // Wait for the last write to finish as we are writing from stack
+        driver.raw_wait_for_finish_blocking();
+
+        return true;
     }
 
-    void PicoGraphics_PenDV_P5::set_pixel_dither(const Point &p, const RGB &c) {
-        if(!bounds.contains(p)) return;
+    void PicoGraphics_PenDV_P5::build_palette_lut(uint8_t palette_idx) {
+        palette_idx &= 1;
+        RGB palette[palette_size];
+        read_palette(driver, palette_idx, palette);
 
-        uint8_t current_palette = driver.get_local_palette_index();
+        for(auto key = 0u; key < palette_lut_size; key++) {
+            RGB col(((key >> 8) & 0xf) * 17, ((key >> 4) & 0xf) * 17, (key & 0xf) * 17);
+            const int nearest = col.closest(palette, palette_size);
+            const RGB &a = palette[nearest];
+            const int32_t er = col.r - a.r;
+            const int32_t eg = col.g - a.g;
+            const int32_t eb = col.b - a.b;
 
-        if(!cache_built || current_palette != cached_palette) {
-            RGB888 *driver_palette = driver.get_palette(current_palette);
-            RGB palette[palette_size];
+            // Find the entry that comes closest to the colour when dithered with the nearest,
+            // with errors in sixteenths so the mix can be compared with the nearest alone
+            uint16_t entry = nearest;
+            int32_t best_error = (er * er + eg * eg + eb * eb) << 8;
             for(auto i = 0u; i < palette_size; i++) {
-                palette[i] = RGB((uint)driver_palette[i]);
-            }
+                const int32_t dr = palette[i].r - a.r;
+                const int32_t dg = palette[i].g - a.g;
+                const int32_t db = palette[i].b - a.b;
+                const int32_t dd = dr * dr + dg * dg + db * db;
+                const int32_t de = er * dr + eg * dg + eb * db;
+                if(dd == 0 || de <= 0) continue;
 
-            for(uint i = 0; i < 512; i++) {
-                RGB cache_col((i & 0x1C0) >> 1, (i & 0x38) << 2, (i & 0x7) << 5);
-                get_dither_candidates(cache_col, palette, palette_size, candidate_cache[i]);
+                const int32_t mix = std::min((de * 16 + (dd >> 1)) / dd, (int32_t)15);
+                if(mix == 0) continue;
+
+                const int32_t xr = er * 16 - dr * mix;
+                const int32_t xg = eg * 16 - dg * mix;
+                const int32_t xb = eb * 16 - db * mix;
+                // Dithering between distant colours looks noisy, so count some of the spread as error
+                const int32_t error = xr * xr + xg * xg + xb * xb + ((dd * mix * (16 - mix)) >> 2);
+                if(error < best_error) {
+                    best_error = error;
+                    entry = nearest | (i << 5) | (mix << 10);
+                }
             }
-            cache_built = true;
-            cached_palette = current_palette;
+            palette_lut[palette_idx][key] = entry;
         }
+        lut_built[palette_idx] = true;
+    }
+
+    void PicoGraphics_PenDV_P5::set_pixel_dither(const Point &p, const RGB &c) {
+        if(!bounds.contains(p)) return;
+
+        uint8_t current_palette = driver.get_local_palette_index();
+        if(!lut_built[current_palette]) build_palette_lut(current_palette);
 
-        uint cache_key = ((c.r & 0xE0) << 1) | ((c.g & 0xE0) >> 2) | ((c.b & 0xE0) >> 5);
+        const uint16_t entry = palette_lut[current_palette][((c.r & 0xF0) << 4) | (c.g & 0xF0) | ((c.b & 0xF0) >> 4)];
 
         // find the pattern coordinate offset
         uint pattern_index = (p.x & 0b11) | ((p.y & 0b11) << 2);
 
-        // set the pixel
-        color = candidate_cache[cache_key][dither16_pattern[pattern_index]];
+        // set the pixel, using the second entry for the first few sixteenths of the pattern
+        color = (dither16_pattern[pattern_index] < (entry >> 10)) ? (entry >> 5) & 0x1f : entry & 0x1f;
         set_pixel(p);
     }
 }
@@ -18,6 +18,7 @@ namespace pimoroni {
         color = c;
     }
     void PicoGraphics_PenDV_RGB555::set_bg(uint c) {
+        driver.flush();
         background = c;
     }
     void PicoGraphics_PenDV_RGB555::set_depth(uint8_t new_depth) {
@@ -40,23 +41,28 @@ namespace pimoroni {
         driver.write_pixel_span(p, l, (uint16_t)(color | depth));
     }
     void PicoGraphics_PenDV_RGB555::set_pixel_alpha(const Point &p, const uint8_t a) {
-        uint16_t src = background;
-        if (blend_mode == BlendMode::TARGET) {
-            driver.read_pixel_span(p, 1, &src);
-        }
+        // Runs of pixels are read, blended by blend_span and written back together by the driver
+        driver.write_pixel_alpha(p, a, color, blend_mode == BlendMode::TARGET, blend_span, this);
+    };
+    void PicoGraphics_PenDV_RGB555::blend_span(void* pen, uint32_t colour, const uint8_t* alpha, uint8_t* pixels, uint32_t len) {
+        PicoGraphics_PenDV_RGB555* self = (PicoGraphics_PenDV_RGB555*)pen;
+        uint16_t* pixels16 = (uint16_t*)pixels;
 
-        uint8_t src_r = (src >> 7) & 0b11111000;
-        uint8_t src_g = (src >> 2) & 0b11111000;
-        uint8_t src_b = (src << 3) & 0b11111000;
+        uint8_t dst_r = (colour >> 7) & 0b11111000;
+        uint8_t dst_g = (colour >> 2) & 0b11111000;
+        uint8_t dst_b = (colour << 3) & 0b11111000;
+        const RGB dst(dst_r, dst_g, dst_b);
 
-        uint8_t dst_r = (color >> 7) & 0b11111000;
-        uint8_t dst_g = (color >> 2) & 0b11111000;
-        uint8_t dst_b = (color << 3) & 0b11111000;
+        for (uint32_t i = 0; i < len; ++i) {
+            uint16_t src = (self->blend_mode == BlendMode::TARGET) ? pixels16[i] : self->background;
 
-        RGB555 blended = RGB(src_r, src_g, src_b).blend(RGB(dst_r, dst_g, dst_b), a).to_rgb555();
+            uint8_t src_r = (src >> 7) & 0b11111000;
+            uint8_t src_g = (src >> 2) & 0b11111000;
+            uint8_t src_b = (src << 3) & 0b11111000;
 
-        driver.write_pixel(p, blended);
-    };
+            pixels16[i] = RGB(src_r, src_g, src_b).blend(dst, alpha[i]).to_rgb555();
+        }
+    }
 
     bool PicoGraphics_PenDV_RGB555::render_pico_vector_tile(const Rect &src_bounds, uint8_t* alpha_data, uint32_t stride, uint8_t alpha_type) {
         
@@ -71,41 +77,52 @@ namespace pimoroni {
         alpha_data += bounds.x - src_bounds.x + stride * (bounds.y - src_bounds.y);
         
         // Double buffering - in the main loop one buffer is being written to the PSRAM or read into 
-        // in the background while the other is processed
-        uint16_t buf0[128] alignas(4);
-        uint16_t buf1[128] alignas(4);
-        if (bounds.w > 128 || bounds.h > 128) {
-            return false;
-        }
+        // in the background while the other is processed.  Rows wider than the buffers are split
+        // into segments, which are pipelined in the same way as whole rows.
+        constexpr int32_t max_segment_len = 128;
+        uint16_t buf0[max_segment_len] alignas(4);
+        uint16_t buf1[max_segment_len] alignas(4);
         uint16_t* rbuf = buf0;
         uint16_t* wbuf = buf1;
 
-        // Start reading the first row
+        const int32_t segments_per_row = (bounds.w + max_segment_len - 1) / max_segment_len;
+        const int32_t num_segments = segments_per_row * bounds.h;
+
+        // Start reading the first segment
+        int32_t seg_x = 0;
+        int32_t seg_y = 0;
+        int32_t seg_len = std::min(max_segment_len, bounds.w);
         uint32_t address = driver.point_to_address({bounds.x, bounds.y});
-        uint32_t row_len_in_words = (bounds.w + 1) >> 1;
         if (blend_mode == BlendMode::TARGET) {
-            driver.raw_read_async(address, (uint32_t*)rbuf, row_len_in_words);
+            driver.raw_read_async(address, (uint32_t*)rbuf, (seg_len + 1) >> 1);
         }
 
         const uint32_t colour_expanded = (uint32_t(color & 0x7C00) << 10) | (uint32_t(color & 0x3E0) << 5) | (color & 0x1F);
         const uint32_t background_expanded = (uint32_t(background & 0x7C00) << 10) | (uint32_t(background & 0x3E0) << 5) | (background & 0x1F);
-        uint32_t address_stride = driver.frame_row_stride();
 
         if (blend_mode == BlendMode::TARGET) {
             driver.raw_wait_for_finish_blocking();
         }
 
-        for (int32_t y = 0; y < bounds.h; ++y) {
+        for (int32_t s = 0; s < num_segments; ++s) {
             std::swap(wbuf, rbuf);
 
-            uint32_t prev_address = address;
+            const uint32_t prev_address = address;
+            const int32_t len = seg_len;
+            uint8_t* alpha_ptr = &alpha_data[stride * seg_y + seg_x];
 
-            address += address_stride;
+            // Find the next segment
+            seg_x += max_segment_len;
+            if (seg_x >= bounds.w) {
+                seg_x = 0;
+                ++seg_y;
+            }
+            seg_len = std::min(max_segment_len, bounds.w - seg_x);
+            address = driver.point_to_address({bounds.x + seg_x, bounds.y + seg_y});
 
-            // Process this row
-            uint8_t* alpha_ptr = &alpha_data[stride * y];
+            // Process this segment
             if (blend_mode == BlendMode::TARGET) {
-                for (int32_t x = 0; x < bounds.w; ++x) {
+                for (int32_t x = 0; x < len; ++x) {
                     uint8_t alpha = *alpha_ptr++;
                     if (alpha >= alpha_max) {
                         wbuf[x] = (uint16_t)(color | depth);
@@ -120,13 +137,13 @@ namespace pimoroni {
                         wbuf[x] = ((blended >> 14) & 0x7C00) | ((blended >> 9) & 0x3E0) | ((blended >> 4) & 0x1F) | (alpha > 7 ? depth : (src & 0x8000));
                     }
 
-                    // Halfway through processing this row switch from writing previous row to reading the next
-                    if (x+1 == (int32_t)row_len_in_words && y+1 < bounds.h) {
-                        driver.raw_read_async(address, (uint32_t*)rbuf, row_len_in_words);
+                    // Halfway through processing this segment switch from writing the previous one to reading the next
+                    if (x == len >> 1 && s+1 < num_segments) {
+                        driver.raw_read_async(address, (uint32_t*)rbuf, (seg_len + 1) >> 1);
                     }
                 }
             } else {
-                for (int32_t x = 0; x < bounds.w; ++x) {
+                for (int32_t x = 0; x < len; ++x) {
                     uint8_t alpha = *alpha_ptr++;
                     if (alpha >= alpha_max) {
                         wbuf[x] = (uint16_t)(color | depth);
@@ -141,8 +158,8 @@ namespace pimoroni {
                 }          
             }
 
-            // Write the row out while we loop on to the next
-            driver.raw_write_async_bytes(prev_address, (uint32_t*)wbuf, bounds.w << 1);
+            // Write the segment out while we loop on to the next
+            driver.raw_write_async_bytes(prev_address, (uint32_t*)wbuf, len << 1);
         }
 
         // Wait for the last write to finish as we are writing from stack
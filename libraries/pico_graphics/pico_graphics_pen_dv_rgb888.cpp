@@ -10,6 +10,7 @@ namespace pimoroni {
         color = c;
     }
     void PicoGraphics_PenDV_RGB888::set_bg(uint c) {
+        driver.flush();
         background = c;
     }
     void PicoGraphics_PenDV_RGB888::set_pen(uint8_t r, uint8_t g, uint8_t b) {
@@ -29,16 +30,27 @@ namespace pimoroni {
         driver.write_pixel_span(p, l, color);
     }
     void PicoGraphics_PenDV_RGB888::set_pixel_alpha(const Point &p, const uint8_t a) {
-        uint32_t src = background;
-        if (blend_mode == BlendMode::TARGET) {
-            driver.read_24bpp_pixel_span(p, 1, (uint8_t*)&src);
-        }
+        // Runs of pixels are read, blended by blend_span and written back together by the driver
+        driver.write_pixel_alpha(p, a, color, blend_mode == BlendMode::TARGET, blend_span, this);
+    };
+    void PicoGraphics_PenDV_RGB888::blend_span(void* pen, uint32_t colour, const uint8_t* alpha, uint8_t* pixels, uint32_t len) {
+        PicoGraphics_PenDV_RGB888* self = (PicoGraphics_PenDV_RGB888*)pen;
 
         // TODO: "uint" should be RGB888 but there's curently a mismatch between "uint32_t" and "unsigned int"
-        RGB888 blended = RGB((uint)src).blend(RGB((uint)color), a).to_rgb888();
+        const RGB dst((uint)colour);
 
-        driver.write_pixel(p, blended);
-    };
+        for (uint32_t i = 0; i < len; ++i, pixels += 3) {
+            uint32_t src = self->background;
+            if (self->blend_mode == BlendMode::TARGET) {
+                src = pixels[0] | (pixels[1] << 8) | (pixels[2] << 16);
+            }
+
+            RGB888 blended = RGB((uint)src).blend(dst, alpha[i]).to_rgb888();
+            pixels[0] = blended & 0xFF;
+            pixels[1] = (blended >> 8) & 0xFF;
+            pixels[2] = (blended >> 16) & 0xFF;
+        }
+    }
 
     bool PicoGraphics_PenDV_RGB888::render_pico_vector_tile(const Rect &src_bounds, uint8_t* alpha_data, uint32_t stride, uint8_t alpha_type) {
         
@@ -53,41 +65,52 @@ namespace pimoroni {
         alpha_data += bounds.x - src_bounds.x + stride * (bounds.y - src_bounds.y);
         
         // Double buffering - in the main loop one buffer is being written to the PSRAM or read into 
-        // in the background while the other is processed
-        uint8_t buf0[128*3] alignas(4);
-        uint8_t buf1[128*3] alignas(4);
-        if (bounds.w > 128 || bounds.h > 128) {
-            return false;
-        }
+        // in the background while the other is processed.  Rows wider than the buffers are split
+        // into segments, which are pipelined in the same way as whole rows.
+        constexpr int32_t max_segment_len = 128;
+        uint8_t buf0[max_segment_len*3] alignas(4);
+        uint8_t buf1[max_segment_len*3] alignas(4);
         uint8_t* rbuf = buf0;
         uint8_t* wbuf = buf1;
 
-        // Start reading the first row
+        const int32_t segments_per_row = (bounds.w + max_segment_len - 1) / max_segment_len;
+        const int32_t num_segments = segments_per_row * bounds.h;
+
+        // Start reading the first segment
+        int32_t seg_x = 0;
+        int32_t seg_y = 0;
+        int32_t seg_len = std::min(max_segment_len, bounds.w);
         uint32_t address = driver.point_to_address({bounds.x, bounds.y});
-        uint32_t row_len_in_words = (bounds.w * 3 + 3) >> 2;
         if (blend_mode == BlendMode::TARGET) {
-            driver.raw_read_async(address, (uint32_t*)rbuf, row_len_in_words);
+            driver.raw_read_async(address, (uint32_t*)rbuf, (seg_len * 3 + 3) >> 2);
         }
 
         const uint8_t colour_expanded[3] = { (uint8_t)color, (uint8_t)(color >> 8), (uint8_t)(color >> 16) };
         const uint8_t background_expanded[3] = { (uint8_t)background, (uint8_t)(background >> 8), (uint8_t)(background >> 16) };
-        uint32_t address_stride = driver.frame_row_stride();
 
         if (blend_mode == BlendMode::TARGET) {
             driver.raw_wait_for_finish_blocking();
         }
 
-        for (int32_t y = 0; y < bounds.h; ++y) {
+        for (int32_t s = 0; s < num_segments; ++s) {
             std::swap(wbuf, rbuf);
 
-            uint32_t prev_address = address;
+            const uint32_t prev_address = address;
+            const int32_t len = seg_len;
+            uint8_t* alpha_ptr = &alpha_data[stride * seg_y + seg_x];
 
-            address += address_stride;
+            // Find the next segment
+            seg_x += max_segment_len;
+            if (seg_x >= bounds.w) {
+                seg_x = 0;
+                ++seg_y;
+            }
+            seg_len = std::min(max_segment_len, bounds.w - seg_x);
+            address = driver.point_to_address({bounds.x + seg_x, bounds.y + seg_y});
 
-            // Process this row
-            uint8_t* alpha_ptr = &alpha_data[stride * y];
+            // Process this segment
             if (blend_mode == BlendMode::TARGET) {
-                for (int32_t x = 0; x < bounds.w; ++x) {
+                for (int32_t x = 0; x < len; ++x) {
                     uint8_t alpha = *alpha_ptr++;
                     if (alpha >= alpha_max) {
                         wbuf[x*3] = colour_expanded[0];
@@ -101,13 +124,13 @@ namespace pimoroni {
                         }
                     }
 
-                    // Halfway through processing this row switch from writing previous row to reading the next
-                    if (x == bounds.w >> 1 && y+1 < bounds.h) {
-                        driver.raw_read_async(address, (uint32_t*)rbuf, row_len_in_words);
+                    // Halfway through processing this segment switch from writing the previous one to reading the next
+                    if (x == len >> 1 && s+1 < num_segments) {
+                        driver.raw_read_async(address, (uint32_t*)rbuf, (seg_len * 3 + 3) >> 2);
                     }
                 }
             } else {
-                for (int32_t x = 0; x < bounds.w; ++x) {
+                for (int32_t x = 0; x < len; ++x) {
                     uint8_t alpha = *alpha_ptr++;
                     if (alpha >= alpha_max) {
                         wbuf[x*3] = colour_expanded[0];
@@ -126,8 +149,8 @@ namespace pimoroni {
                 }
             }
 
-            // Write the row out while we loop on to the next
-            driver.raw_write_async_bytes(prev_address, (uint32_t*)wbuf, bounds.w * 3);
+            // Write the segment out while we loop on to the next
+            driver.raw_write_async_bytes(prev_address, (uint32_t*)wbuf, len * 3);
         }
 
         // Wait for the last write to finish as we are writing from stack
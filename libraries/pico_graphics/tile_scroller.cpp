@@ -0,0 +1,138 @@
+#include "tile_scroller.hpp"
+
+#include <algorithm>
+
+namespace pimoroni {
+
+  namespace {
+    // Division and modulo that round towards negative infinity, for positions left of or above the map
+    int32_t floor_div(int32_t a, int32_t b) {
+      return (a >= 0) ? a / b : -((-a + b - 1) / b);
+    }
+
+    int32_t floor_mod(int32_t a, int32_t b) {
+      int32_t m = a % b;
+      return (m < 0) ? m + b : m;
+    }
+  }
+
+  TileScroller::TileScroller(PicoGraphicsDV &graphics, const Tilemap &tilemap, uint background, int scroll_group)
+    : graphics(graphics), tilemap(tilemap), background(background), scroll_group(scroll_group)
+  {
+    DVDisplay &driver = graphics.driver;
+    axis_x = make_axis(tilemap.tile_width, driver.get_display_width(), driver.get_frame_width());
+    axis_y = make_axis(tilemap.tile_height, driver.get_display_height(), driver.get_frame_height());
+  }
+
+  TileScroller::Axis TileScroller::make_axis(int32_t tile_size, int32_t display_size, int32_t frame_size) {
+    Axis axis = {tile_size, display_size, frame_size / tile_size, true};
+    if (axis.ring_tiles < tiles_needed(axis)) {
+      // Not enough room to scroll, so just cover the display
+      axis.ring_tiles = (display_size + tile_size - 1) / tile_size;
+      axis.scrolls = false;
+    }
+    return axis;
+  }
+
+  int32_t TileScroller::tiles_needed(const Axis &axis) {
+    // A partly scrolled display can show one more tile than fits in it, plus the margins
+    return (axis.display_size + axis.tile_size - 1) / axis.tile_size + 1 + 2 * MARGIN;
+  }
+
+  void TileScroller::get_window(const Axis &axis, int32_t camera, int32_t &first, int32_t &count) {
+    if (!axis.scrolls) {
+      first = 0;
+      count = axis.ring_tiles;
+      return;
+    }
+    first = floor_div(camera, axis.tile_size) - MARGIN;
+    int32_t last = floor_div(camera + axis.display_size - 1, axis.tile_size) + MARGIN;
+    count = last - first + 1;
+  }
+
+  void TileScroller::scroll_to(const Point &new_camera) {
+    camera = Point(axis_x.scrolls ? new_camera.x : 0, axis_y.scrolls ? new_camera.y : 0);
+    tiles_drawn = 0;
+
+    Rect window;
+    get_window(axis_x, camera.x, window.x, window.w);
+    get_window(axis_y, camera.y, window.y, window.h);
+
+    DVDisplay &driver = graphics.driver;
+    const int bank = driver.get_bank();
+    if (!lines_set[bank]) {
+      driver.set_scroll_idx_for_lines(scroll_group, 0, driver.get_display_height());
+      lines_set[bank] = true;
+    }
+
+    // Draw whatever this bank doesn't already have
+    Rect &bank_valid = valid[bank];
+    const Rect kept = bank_valid.intersection(window);
+    if (kept.empty()) {
+      draw_tiles(window);
+    }
+    else {
+      draw_tiles(Rect(window.x, window.y, kept.x - window.x, window.h));
+      draw_tiles(Rect(kept.x + kept.w, window.y, window.x + window.w - (kept.x + kept.w), window.h));
+      draw_tiles(Rect(kept.x, window.y, kept.w, kept.y - window.y));
+      draw_tiles(Rect(kept.x, kept.y + kept.h, kept.w, window.y + window.h - (kept.y + kept.h)));
+    }
+    bank_valid = window;
+
+    const int32_t ring_w = axis_x.ring_tiles * axis_x.tile_size;
+    const int32_t ring_h = axis_y.ring_tiles * axis_y.tile_size;
+    driver.setup_scroll_group(
+      Point(floor_mod(camera.x, ring_w), floor_mod(camera.y, ring_h)),
+      scroll_group,
+      axis_x.scrolls ? ring_w : 0,
+      axis_y.scrolls ? ring_h : 0,
+      0, 0);
+  }
+
+  void TileScroller::draw_tiles(const Rect &tiles) {
+    if (tiles.empty()) return;
+
+    // Split the area wherever it wraps around the ring
+    for (int32_t y = tiles.y; y < tiles.y + tiles.h;) {
+      const int32_t ring_y = floor_mod(y, axis_y.ring_tiles);
+      const int32_t h = std::min(tiles.y + tiles.h - y, axis_y.ring_tiles - ring_y);
+
+      for (int32_t x = tiles.x; x < tiles.x + tiles.w;) {
+        const int32_t ring_x = floor_mod(x, axis_x.ring_tiles);
+        const int32_t w = std::min(tiles.x + tiles.w - x, axis_x.ring_tiles - ring_x);
+
+        const Point dest(ring_x * tilemap.tile_width, ring_y * tilemap.tile_height);
+        fill(Rect(dest.x, dest.y, w * tilemap.tile_width, h * tilemap.tile_height));
+        tilemap.draw(graphics, Point(dest.x - x * tilemap.tile_width, dest.y - y * tilemap.tile_height), Rect(x, y, w, h));
+        tiles_drawn += w * h;
+
+        x += w;
+      }
+      y += h;
+    }
+  }
+
+  void TileScroller::fill(const Rect &r) {
+    const Rect dest = r.intersection(graphics.clip);
+    if (dest.empty()) return;
+
+    DVDisplay &driver = graphics.driver;
+    for (int32_t y = dest.y; y < dest.y + dest.h; ++y) {
+      const Point p(dest.x, y);
+      switch (graphics.pen_type) {
+        case PicoGraphics::PEN_DV_P5:
+          driver.write_palette_pixel_span(p, dest.w, (uint8_t)((background << 2) | ((PicoGraphics_PenDV_P5&)graphics).depth));
+          break;
+        case PicoGraphics::PEN_DV_RGB555:
+          driver.write_pixel_span(p, dest.w, (uint16_t)(background | ((PicoGraphics_PenDV_RGB555&)graphics).depth));
+          break;
+        case PicoGraphics::PEN_DV_RGB888:
+          driver.write_pixel_span(p, dest.w, (RGB888)background);
+          break;
+        default:  // Non-dv pen types
+          break;
+      }
+    }
+  }
+
+}
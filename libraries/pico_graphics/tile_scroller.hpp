@@ -0,0 +1,79 @@
+#pragma once
+
+#include <cstdint>
+
+#include "pico_graphics_dv.hpp"
+#include "tilemap.hpp"
+
+namespace pimoroni {
+
+  // Scrolls a tilemap of any size across the display by treating the frame as a
+  // ring of tiles. Each bank keeps track of which tiles it holds, and moving the
+  // camera only draws the tiles that have come into view since that bank was
+  // last drawn, then points a scroll group at the camera, wrapping at the edge
+  // of the ring. The cost of a frame depends on how far the camera moved, not
+  // on the size of the map.
+  //
+  // One extra tile is kept around the visible area, so the bank still on screen
+  // has everything needed to show the new camera position until the flip, as
+  // long as the camera moves less than a tile per frame.
+  //
+  // Every line of the display is put in the scroll group the first time each
+  // bank is drawn to.
+  class TileScroller {
+    public:
+      static constexpr int32_t MARGIN = 1;
+
+      TileScroller(PicoGraphicsDV &graphics, const Tilemap &tilemap, uint background, int scroll_group);
+
+      // Each axis scrolls if the frame is big enough, otherwise it stays at 0
+      bool can_scroll_x() const { return axis_x.scrolls; }
+      bool can_scroll_y() const { return axis_y.scrolls; }
+
+      // Tiles needed along each axis for that axis to scroll
+      int32_t get_ring_tiles_needed_x() const { return tiles_needed(axis_x); }
+      int32_t get_ring_tiles_needed_y() const { return tiles_needed(axis_y); }
+
+      // Move the camera to a position in the map, in pixels.
+      // This draws into the current bank, so should be called once before each flip.
+      void scroll_to(const Point &camera);
+      const Point& get_camera() const { return camera; }
+
+      // Forget what's been drawn so every visible tile is drawn again, eg: after changing the map
+      void invalidate() {
+        valid[0] = valid[1] = Rect();
+        lines_set[0] = lines_set[1] = false;
+      }
+
+      // Tiles drawn by the last scroll_to
+      uint32_t get_tiles_drawn() const { return tiles_drawn; }
+
+    private:
+      struct Axis {
+        int32_t tile_size;
+        int32_t display_size;
+        int32_t ring_tiles;
+        bool scrolls;
+      };
+
+      PicoGraphicsDV &graphics;
+      Tilemap tilemap;
+      uint background;
+      int scroll_group;
+
+      Axis axis_x;
+      Axis axis_y;
+      Point camera;
+      Rect valid[2];
+      bool lines_set[2] = {false, false};
+      uint32_t tiles_drawn = 0;
+
+      static Axis make_axis(int32_t tile_size, int32_t display_size, int32_t frame_size);
+      static int32_t tiles_needed(const Axis &axis);
+      static void get_window(const Axis &axis, int32_t camera, int32_t &first, int32_t &count);
+
+      void draw_tiles(const Rect &tiles);
+      void fill(const Rect &r);
+  };
+
+}
@@ -0,0 +1,145 @@
+#include "tilemap.hpp"
+
+#include <algorithm>
+#include <type_traits>
+
+namespace pimoroni {
+
+  namespace {
+    constexpr int32_t LINE_BUFFER_LEN = 256;
+
+    // Collects runs of opaque pixels and writes each one with a single span write.
+    // Span writes complete asynchronously, so runs alternate between two buffers.
+    template<DVDisplay::Mode MODE>
+    class SpanWriter {
+      public:
+        SpanWriter(DVDisplay &driver) : driver(driver) {}
+
+        ~SpanWriter() {
+          flush();
+          // Wait for the last write to finish as we are writing from stack
+          driver.raw_wait_for_finish_blocking();
+        }
+
+        void add(const Point &p, uint32_t pixel) {
+          if (len == 0) start = p;
+          if constexpr (MODE == DVDisplay::MODE_PALETTE) {
+            buf[len] = pixel;
+          } else if constexpr (MODE == DVDisplay::MODE_RGB555) {
+            ((uint16_t*)buf)[len] = pixel;
+          } else {
+            buf[len * 3] = pixel & 0xFF;
+            buf[len * 3 + 1] = (pixel >> 8) & 0xFF;
+            buf[len * 3 + 2] = (pixel >> 16) & 0xFF;
+          }
+          if (++len == LINE_BUFFER_LEN) flush();
+        }
+
+        void flush() {
+          if (len == 0) return;
+          if constexpr (MODE == DVDisplay::MODE_PALETTE) {
+            driver.write_palette_pixel_span(start, len, buf);
+          } else if constexpr (MODE == DVDisplay::MODE_RGB555) {
+            driver.write_pixel_span(start, len, (uint16_t*)buf);
+          } else {
+            driver.write_24bpp_pixel_span(start, len, buf);
+          }
+          buf = (buf == buffers[0]) ? buffers[1] : buffers[0];
+          len = 0;
+        }
+
+      private:
+        DVDisplay &driver;
+        alignas(4) uint8_t buffers[2][LINE_BUFFER_LEN * (MODE == DVDisplay::MODE_PALETTE ? 1 : MODE == DVDisplay::MODE_RGB555 ? 2 : 3)];
+        uint8_t* buf = buffers[0];
+        Point start;
+        int32_t len = 0;
+    };
+
+    template<DVDisplay::Mode MODE>
+    void draw_rows(const Tilemap &tilemap, DVDisplay &driver, const Point &origin, const Rect &dest, uint32_t depth) {
+      typedef typename std::conditional<MODE == DVDisplay::MODE_PALETTE, uint8_t, uint16_t>::type sheet_pixel_t;
+
+      const int32_t tw = tilemap.tile_width;
+      const int32_t th = tilemap.tile_height;
+      const int32_t sheet_cols = tilemap.sheet_width / tw;
+      const int32_t num_tiles = sheet_cols * (tilemap.sheet_height / th);
+      const sheet_pixel_t* sheet = (const sheet_pixel_t*)tilemap.sheet;
+
+      SpanWriter<MODE> writer(driver);
+
+      for (int32_t y = dest.y; y < dest.y + dest.h; ++y) {
+        const int32_t map_y = (y - origin.y) / th;
+        const int32_t tile_y = (y - origin.y) % th;
+
+        int32_t x = dest.x;
+        while (x < dest.x + dest.w) {
+          const int32_t map_x = (x - origin.x) / tw;
+          const int32_t tile_x = (x - origin.x) % tw;
+          const int32_t end_x = std::min(dest.x + dest.w, x + tw - tile_x);
+
+          const uint16_t entry = tilemap.get_entry(map_x, map_y);
+          int32_t index = entry & Tilemap::INDEX_MASK;
+          if (index == 0 || index > num_tiles) {
+            writer.flush();
+            x = end_x;
+            continue;
+          }
+          --index;
+
+          const int32_t sheet_y = (index / sheet_cols) * th + ((entry & Tilemap::FLIP_Y) ? th - 1 - tile_y : tile_y);
+          const int32_t sheet_x = (index % sheet_cols) * tw;
+          const sheet_pixel_t* src = sheet + sheet_y * tilemap.sheet_width + sheet_x;
+          int32_t step = 1;
+          if (entry & Tilemap::FLIP_X) {
+            src += tw - 1 - tile_x;
+            step = -1;
+          } else {
+            src += tile_x;
+          }
+
+          for (; x < end_x; ++x, src += step) {
+            const sheet_pixel_t pixel = *src;
+            if constexpr (MODE == DVDisplay::MODE_PALETTE) {
+              if ((pixel & 0x01) == 0) { writer.flush(); continue; }
+              writer.add({x, y}, (pixel & 0x7C) | depth);
+            } else if constexpr (MODE == DVDisplay::MODE_RGB555) {
+              if ((pixel & 0x8000) == 0) { writer.flush(); continue; }
+              writer.add({x, y}, pixel | depth);
+            } else {
+              if ((pixel & 0x8000) == 0) { writer.flush(); continue; }
+              writer.add({x, y}, ((pixel & 0x7c00) << 9) | ((pixel & 0x03e0) << 6) | ((pixel & 0x001f) << 3));
+            }
+          }
+        }
+        writer.flush();
+      }
+    }
+  }
+
+  void Tilemap::draw(PicoGraphicsDV &graphics, const Point &origin, const Rect &area) const {
+    if (tile_width <= 0 || tile_height <= 0) return;
+
+    const Rect tiles = area.intersection(Rect(0, 0, width, height));
+    if (tiles.empty()) return;
+
+    const Rect dest = Rect(origin.x + tiles.x * tile_width, origin.y + tiles.y * tile_height,
+                           tiles.w * tile_width, tiles.h * tile_height).intersection(graphics.clip);
+    if (dest.empty()) return;
+
+    switch (graphics.pen_type) {
+      case PicoGraphics::PEN_DV_P5:
+        draw_rows<DVDisplay::MODE_PALETTE>(*this, graphics.driver, origin, dest, ((PicoGraphics_PenDV_P5&)graphics).depth);
+        break;
+      case PicoGraphics::PEN_DV_RGB555:
+        draw_rows<DVDisplay::MODE_RGB555>(*this, graphics.driver, origin, dest, ((PicoGraphics_PenDV_RGB555&)graphics).depth);
+        break;
+      case PicoGraphics::PEN_DV_RGB888:
+        draw_rows<DVDisplay::MODE_RGB888>(*this, graphics.driver, origin, dest, 0);
+        break;
+      default:  // Non-dv pen types
+        break;
+    }
+  }
+
+}
@@ -0,0 +1,48 @@
+#pragma once
+
+#include <cstdint>
+
+#include "pico_graphics_dv.hpp"
+
+namespace pimoroni {
+
+  // A map of tiles taken from a sheet of equally sized tiles.
+  //
+  // Map entries are 8 or 16 bits. 0 is an empty tile, otherwise an entry is one
+  // more than the number of the tile, counting left to right then top to bottom
+  // across the sheet. 16 bit entries can also flip their tile.
+  //
+  // Sheet pixels are RGB555 with bit 15 set if opaque or, in palette mode, the
+  // colour index in bits 2-6 with bit 0 set if opaque.
+  class Tilemap {
+    public:
+      static constexpr uint16_t FLIP_X = 0x4000;
+      static constexpr uint16_t FLIP_Y = 0x8000;
+      static constexpr uint16_t INDEX_MASK = 0x3FFF;
+
+      const void* map = nullptr;
+      bool wide_entries = false;
+      int32_t width = 0;
+      int32_t height = 0;
+
+      const void* sheet = nullptr;
+      int32_t sheet_width = 0;
+      int32_t sheet_height = 0;
+
+      int32_t tile_width = 16;
+      int32_t tile_height = 16;
+
+      uint16_t get_entry(int32_t x, int32_t y) const {
+        int32_t i = y * width + x;
+        return wide_entries ? ((const uint16_t*)map)[i] : ((const uint8_t*)map)[i];
+      }
+
+      // Draw the tiles in area, which is measured in tiles, with the top left of the map at origin.
+      // Each row is composed in SRAM and opaque runs are written with one span write each.
+      void draw(PicoGraphicsDV &graphics, const Point &origin, const Rect &area) const;
+      void draw(PicoGraphicsDV &graphics, const Point &origin) const {
+        draw(graphics, origin, Rect(0, 0, width, height));
+      }
+  };
+
+}
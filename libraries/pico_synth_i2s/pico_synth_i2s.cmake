@@ -5,6 +5,10 @@ pico_generate_pio_header(pico_synth_i2s ${CMAKE_CURRENT_LIST_DIR}/pico_synth_i2s
 
 target_sources(pico_synth_i2s INTERFACE
   ${CMAKE_CURRENT_LIST_DIR}/pico_synth_i2s.cpp
+  ${CMAKE_CURRENT_LIST_DIR}/synth_block.cpp
+  ${CMAKE_CURRENT_LIST_DIR}/sample_voice.cpp
+  ${CMAKE_CURRENT_LIST_DIR}/wav_stream.cpp
+  ${CMAKE_CURRENT_LIST_DIR}/sequencer.cpp
   ${CMAKE_CURRENT_LIST_DIR}/../pico_synth/pico_synth.cpp
 )
 
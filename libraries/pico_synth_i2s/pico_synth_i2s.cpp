@@ -3,6 +3,7 @@
 #include "hardware/dma.h"
 #include "hardware/irq.h"
 #include "hardware/clocks.h"
+#include "hardware/sync.h"
 
 
 #ifndef NO_QSTR
@@ -10,11 +11,13 @@
 #endif
 
 #include "pico_synth_i2s.hpp"
+#include "synth_block.hpp"
 
 
 namespace pimoroni {
 
   PicoSynth_I2S* PicoSynth_I2S::picosynth = nullptr;
+  const int16_t PicoSynth_I2S::silence[PicoSynth_I2S::SILENCE_SIZE] = {0};
 
   // once the dma transfer of the scanline is complete we move to the
   // next scanline (or quit if we're finished)
@@ -107,24 +110,84 @@ namespace pimoroni {
   }
 
   void PicoSynth_I2S::play_sample(uint8_t *data, uint32_t length) {
-    stop_playing();
+    play_sample(0, (const int16_t *)data, length / 2);
+  }
 
-    if(picosynth == this) {
-      // Restart the audio SM and start a new DMA transfer
-      pio_sm_set_enabled(audio_pio, audio_sm, true);
-      dma_channel_transfer_from_buffer_now(audio_dma_channel, data, length / 2);
-      play_mode = PLAYING_BUFFER;
-    }
+  void PicoSynth_I2S::play_sample(uint voice, const int16_t *data, uint32_t length, bool loop, uint32_t loop_start, uint32_t loop_end) {
+    assert(voice < NUM_SAMPLE_VOICES);
+    if(loop_end == 0 || loop_end > length) loop_end = length;
+    loop = loop && loop_start < loop_end;
+
+    // The voice may be being mixed in the interrupt
+    uint32_t status = save_and_disable_interrupts();
+    sample_voices[voice].start(data, length, loop, loop_start, loop_end);
+    restore_interrupts(status);
+
+    play_synth();
   }
 
-  void PicoSynth_I2S::play_synth() {
-    if(play_mode != PLAYING_SYNTH) {
-      stop_playing();
+  void PicoSynth_I2S::play_stream(uint voice, SampleSource *source) {
+    assert(voice < NUM_SAMPLE_VOICES);
+
+    uint32_t status = save_and_disable_interrupts();
+    sample_voices[voice].start(source);
+    restore_interrupts(status);
+
+    play_synth();
+  }
+
+  void PicoSynth_I2S::stop_sample(uint voice) {
+    assert(voice < NUM_SAMPLE_VOICES);
+    sample_voices[voice].stop();
+  }
+
+  bool PicoSynth_I2S::is_sample_playing(uint voice) {
+    assert(voice < NUM_SAMPLE_VOICES);
+    return sample_voices[voice].playing;
+  }
+
+  void PicoSynth_I2S::set_sample_volume(uint voice, float value) {
+    assert(voice < NUM_SAMPLE_VOICES);
+    value = value < 0.0f ? 0.0f : value;
+    value = value > 1.0f ? 1.0f : value;
+    sample_voices[voice].volume = floor(value * 65535.0f);
+  }
+
+  void PicoSynth_I2S::set_sample_speed(uint voice, float speed) {
+    assert(voice < NUM_SAMPLE_VOICES);
+    // Never stand still, or the voice would never finish
+    uint32_t step = (uint32_t)(speed * 65536.0f);
+    sample_voices[voice].step = step < 1 ? 1 : step;
+  }
+
+  bool PicoSynth_I2S::play_song(const uint8_t *data, uint32_t length) {
+    // The sequencer may be being stepped in the interrupt
+    uint32_t status = save_and_disable_interrupts();
+    sequencer.stop(synth);
+    bool loaded = sequencer.load(data, length);
+    if(loaded) {
+      sequencer.play(synth);
+    }
+    restore_interrupts(status);
+
+    if(loaded) {
+      play_synth();
     }
+    return loaded;
+  }
+
+  void PicoSynth_I2S::stop_song() {
+    uint32_t status = save_and_disable_interrupts();
+    sequencer.stop(synth);
+    restore_interrupts(status);
+  }
 
+  void PicoSynth_I2S::play_synth() {
     if(picosynth == this && play_mode == NOT_PLAYING) {
-      // Nothing is playing, so we can set up the first buffer straight away
-      current_buffer = 0;
+      // Nothing is playing, so we can fill the whole ring straight away
+      buffers_filled = 0;
+      buffers_played = 0;
+      playing_silence = true;
 
       populate_next_synth();
 
@@ -145,11 +208,29 @@ namespace pimoroni {
     dma_hw->ints0 = 1u << audio_dma_channel;
 
     if(play_mode == PLAYING_SYNTH) {
-
-      dma_channel_transfer_from_buffer_now(audio_dma_channel, tone_buffers[current_buffer], TONE_BUFFER_SIZE);
-      current_buffer = (current_buffer + 1) % NUM_TONE_BUFFERS;
-
-      populate_next_synth();
+      if(!playing_silence) {
+        // The block that just finished is free to fill again
+        buffers_played = buffers_played + 1;
+      }
+
+      if(buffers_filled != buffers_played) {
+        uint buffer = buffers_played % NUM_TONE_BUFFERS;
+        dma_channel_transfer_from_buffer_now(audio_dma_channel, &tone_buffers[buffer * tone_buffer_size], tone_buffer_size);
+        playing_silence = false;
+      }
+      else {
+        dma_channel_transfer_from_buffer_now(audio_dma_channel, silence, SILENCE_SIZE);
+        if(!playing_silence) underruns++;
+        underrun_samples += SILENCE_SIZE;
+        playing_silence = true;
+      }
+
+      if(refill) {
+        refill(refill_context);
+      }
+      else {
+        populate_next_synth();
+      }
     }
     else {
       play_mode = NOT_PLAYING;
@@ -157,13 +238,55 @@ namespace pimoroni {
   }
 
   void PicoSynth_I2S::populate_next_synth() {
-    int16_t *samples = tone_buffers[current_buffer];
-    for(uint i = 0; i < TONE_BUFFER_SIZE; i++) {
-      samples[i] = synth.get_audio_frame();
+    while(buffers_filled - buffers_played < NUM_TONE_BUFFERS) {
+      int16_t *samples = &tone_buffers[(buffers_filled % NUM_TONE_BUFFERS) * tone_buffer_size];
+      render_block(samples, tone_buffer_size);
+      // Only hand the block over once it's full
+      buffers_filled = buffers_filled + 1;
+    }
+  }
+
+  void PicoSynth_I2S::update() {
+    // Without a refill handler the interrupt does the filling
+    if(refill && play_mode == PLAYING_SYNTH) {
+      populate_next_synth();
+    }
+
+    // Sources may read files, which can't be done in the interrupt
+    for(auto &voice : sample_voices) {
+      if(voice.playing && voice.source) {
+        voice.source->fill();
+      }
     }
   }
 
+  void PicoSynth_I2S::set_refill_handler(refill_func handler, void* context) {
+    uint32_t status = save_and_disable_interrupts();
+    refill = handler;
+    refill_context = context;
+    restore_interrupts(status);
+  }
+
+  void PicoSynth_I2S::set_buffer_size(uint samples) {
+    samples = samples < MIN_BUFFER_SIZE ? MIN_BUFFER_SIZE : samples;
+    samples = samples > MAX_BUFFER_SIZE ? MAX_BUFFER_SIZE : samples;
+
+    // The ring can't change size under the DMA, so restart the synth around it
+    bool restart = play_mode == PLAYING_SYNTH;
+    if(restart) stop_ring();
+    tone_buffer_size = samples / NUM_TONE_BUFFERS;
+    if(restart) play_synth();
+  }
+
   void PicoSynth_I2S::stop_playing() {
+    stop_ring();
+    sequencer.stop(synth);
+    for(auto &voice : sample_voices) {
+      voice.stop();
+    }
+  }
+
+  void PicoSynth_I2S::stop_ring() {
     if(picosynth == this) {
       // Stop the audio SM
       pio_sm_set_enabled(audio_pio, audio_sm, false);
@@ -199,4 +322,27 @@ namespace pimoroni {
     this->set_volume(this->get_volume() + delta);
   }
 
+  void PicoSynth_I2S::render_block(int16_t *out, uint len) {
+    while(len > 0) {
+      // Rendered up to each of the sequencer's ticks, so its notes start on the right sample
+      uint n = len;
+      if(sequencer.is_playing() && sequencer.samples_until_tick() < n) {
+        n = sequencer.samples_until_tick();
+      }
+
+      pimoroni::render_block(synth, out, n, SYSTEM_FREQ);
+      for(auto &voice : sample_voices) {
+        if(voice.playing) {
+          voice.mix(out, n, synth.volume);
+        }
+      }
+
+      if(sequencer.is_playing()) {
+        sequencer.advance(synth, n);
+      }
+      out += n;
+      len -= n;
+    }
+  }
+
 }
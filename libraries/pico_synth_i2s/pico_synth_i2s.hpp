@@ -3,11 +3,21 @@
 #include "hardware/pio.h"
 #include "common/pimoroni_common.hpp"
 #include "../pico_synth/pico_synth.hpp"
+#include "sample_voice.hpp"
+#include "sequencer.hpp"
 
 namespace pimoroni {
 
   class PicoSynth_I2S {
   public:
+    static const uint SYSTEM_FREQ = 22050;
+    static const uint MIN_BUFFER_SIZE = 256;
+    static const uint MAX_BUFFER_SIZE = 2048;
+    static const uint DEFAULT_BUFFER_SIZE = 1024;
+    static const uint NUM_SAMPLE_VOICES = 4;
+
+    typedef void (*refill_func)(void* context);
+
     uint i2s_data               =  9;
     uint i2s_bclk               = 10;
     uint i2s_lrclk              = 11;
@@ -18,23 +28,34 @@ namespace pimoroni {
     uint audio_dma_channel;
 
   private:
-    static const uint SYSTEM_FREQ = 22050;
-
     uint16_t volume = 127;
 
     static void dma_complete();
 
-    static const uint NUM_TONE_BUFFERS = 2;
-    static const uint TONE_BUFFER_SIZE = 4;
-    int16_t tone_buffers[NUM_TONE_BUFFERS][TONE_BUFFER_SIZE] = {0};
-    uint current_buffer = 0;
+    // A ring of blocks, played by DMA from the interrupt and filled by update()
+    static const uint NUM_TONE_BUFFERS = 4;
+    int16_t tone_buffers[MAX_BUFFER_SIZE] = {0};
+    uint tone_buffer_size = DEFAULT_BUFFER_SIZE / NUM_TONE_BUFFERS;
+    volatile uint32_t buffers_filled = 0;
+    volatile uint32_t buffers_played = 0;
+    bool playing_silence = true;
+
+    // Played when the ring runs dry, so it can be refilled without a long gap
+    static const uint SILENCE_SIZE = 32;
+    static const int16_t silence[SILENCE_SIZE];
+    uint32_t underruns = 0;
+    uint32_t underrun_samples = 0;
+
+    refill_func refill = nullptr;
+    void* refill_context = nullptr;
 
     PicoSynth synth;
+    SampleVoice sample_voices[NUM_SAMPLE_VOICES];
+    Sequencer sequencer{SYSTEM_FREQ};
 
     enum PlayMode {
-      PLAYING_BUFFER,
       //PLAYING_TONE,
-      PLAYING_SYNTH,
+      PLAYING_SYNTH,  // The ring is playing, with the synth and any sample voices mixed into it
       NOT_PLAYING
     };
 
@@ -56,15 +77,60 @@ namespace pimoroni {
     float get_volume();
     void adjust_volume(float delta);
 
+    // Plays 16 bit samples over the synth on voice 0, length is in bytes
     void play_sample(uint8_t *data, uint32_t length);
+    // Plays 16 bit samples over the synth on one of NUM_SAMPLE_VOICES voices, replacing whatever
+    // that voice was playing. A loop_end of 0 loops to the end of the sample.
+    void play_sample(uint voice, const int16_t *data, uint32_t length, bool loop = false, uint32_t loop_start = 0, uint32_t loop_end = 0);
+    // Plays a voice from a source that hands over its samples as they're needed, such as a
+    // WavStream. Call update() regularly for the source to read ahead.
+    void play_stream(uint voice, SampleSource *source);
+    void stop_sample(uint voice);
+    bool is_sample_playing(uint voice);
+    // Take effect straight away, and carry on to the voice's next sample
+    void set_sample_volume(uint voice, float value);
+    void set_sample_speed(uint voice, float speed);
+    // Plays a song in the Sequencer's format on the synth channels, stepped as the ring is filled.
+    // The song isn't copied. Returns false if it isn't a valid song.
+    bool play_song(const uint8_t *data, uint32_t length);
+    void stop_song();
+    bool is_song_playing() const { return sequencer.is_playing(); }
+    uint8_t get_song_position() const { return sequencer.get_order_position(); }
+    uint16_t get_song_row() const { return sequencer.get_row(); }
     void play_synth();
+    // Stops the synth, the song and every sample voice
     void stop_playing();
     AudioChannel& synth_channel(uint channel);
 
+    // Samples buffered ahead of the output, MIN_BUFFER_SIZE to MAX_BUFFER_SIZE, which
+    // is rounded down to a whole number of blocks. Larger buffers survive longer without
+    // update() being called, but changes to the synth take longer to be heard.
+    void set_buffer_size(uint samples);
+    uint get_buffer_size() const { return tone_buffer_size * NUM_TONE_BUFFERS; }
+
+    // Called from the DMA interrupt each time a block has been played, so must be quick,
+    // and should arrange for update() to be called soon. Without one, blocks are refilled
+    // in the interrupt.
+    void set_refill_handler(refill_func handler, void* context);
+    // Fills every free block of the ring with synth output, when there's a refill handler,
+    // then lets any streaming voices read ahead.
+    void update();
+
+    // Times the ring ran dry, and the samples of silence played while it was
+    uint32_t get_underruns() const { return underruns; }
+    uint32_t get_underrun_samples() const { return underrun_samples; }
+    void reset_stats() { underruns = 0; underrun_samples = 0; }
+
+    // Renders len samples of the synth and sample voices into out, for playing or saving elsewhere. Must
+    // not be used while the synth is playing, as it moves the channels on too.
+    void render_block(int16_t *out, uint len);
+    bool is_playing() const { return play_mode != NOT_PLAYING; }
+
     static PicoSynth_I2S* picosynth;
 
   private:
     void partial_teardown();
+    void stop_ring();
     void dma_safe_abort(uint channel);
     void next_audio_sequence();
     void populate_next_synth();
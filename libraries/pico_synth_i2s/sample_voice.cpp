@@ -0,0 +1,87 @@
+#include <algorithm>
+
+#include "sample_voice.hpp"
+
+namespace pimoroni {
+
+  namespace {
+    inline int16_t add_clipped(int16_t out, int32_t sample) {
+      int32_t mixed = out + sample;
+      return mixed <= -0x8000 ? -0x8000 : (mixed > 0x7fff ? 0x7fff : mixed);
+    }
+  }
+
+  void SampleVoice::start(const int16_t *data, uint32_t length, bool loop, uint32_t loop_start, uint32_t loop_end) {
+    this->data = data;
+    this->length = length;
+    this->loop = loop;
+    this->loop_start = loop_start;
+    this->loop_end = loop_end;
+    source = nullptr;
+    position = 0;
+    fraction = 0;
+    playing = length > 0;
+  }
+
+  void SampleVoice::start(SampleSource *source) {
+    // The first mix asks the source for its first block
+    data = nullptr;
+    length = 0;
+    loop = false;
+    this->source = source;
+    position = 0;
+    fraction = 0;
+    playing = true;
+  }
+
+  void SampleVoice::mix(int16_t *out, uint len, uint16_t gain) {
+    const int32_t scale = ((uint32_t)volume * gain) >> 16;
+    uint32_t end = loop ? loop_end : length;
+
+    uint i = 0;
+    while(playing && i < len) {
+      if(position >= end && source) {
+        if(source->next_block(data, length)) {
+          position -= end;
+          end = length;
+          continue;
+        }
+        if(source->finished()) {
+          playing = false;
+        }
+        break;
+      }
+      if(position >= end) {
+        if(!loop) {
+          playing = false;
+          break;
+        }
+        position = loop_start + (position - end) % (end - loop_start);
+      }
+
+      // Mix up to the end of the sample or loop in one go, so the loop below needn't check
+      uint n = len - i;
+      if(step == 0x10000) {
+        n = std::min(n, (uint)(end - position));
+        const int16_t *in = data + position;
+        for(auto j = 0u; j < n; j++) {
+          out[i + j] = add_clipped(out[i + j], (in[j] * scale) >> 16);
+        }
+        position += n;
+      }
+      else {
+        // Output samples until the position passes the end
+        uint64_t until_end = ((((uint64_t)(end - position)) << 16) - fraction + step - 1) / step;
+        n = (uint)std::min((uint64_t)n, until_end);
+        for(auto j = 0u; j < n; j++) {
+          out[i + j] = add_clipped(out[i + j], (data[position] * scale) >> 16);
+          fraction += step;
+          position += fraction >> 16;
+          fraction &= 0xffff;
+        }
+      }
+      i += n;
+    }
+  }
+
+}
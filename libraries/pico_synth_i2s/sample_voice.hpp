@@ -0,0 +1,49 @@
+#pragma once
+
+#include <cstdint>
+
+#include "pico/stdlib.h"
+
+namespace pimoroni {
+
+  // Hands a SampleVoice its samples a block at a time as it plays, for sounds too long to hold in RAM
+  struct SampleSource {
+    // Called when the voice reaches the end of its block, which is then free to reuse.
+    // Returns false if the next block isn't ready yet.
+    virtual bool next_block(const int16_t *&data, uint32_t &length) = 0;
+    // True once every block has been handed over
+    virtual bool finished() const = 0;
+    // Reads ahead into any free blocks. Called outside the interrupt, by PicoSynth_I2S::update()
+    virtual void fill() = 0;
+  };
+
+  // A 16 bit PCM sample playing alongside the synth, mixed into the audio ring by PicoSynth_I2S
+  struct SampleVoice {
+    const int16_t *data = nullptr;
+    uint32_t length = 0;
+    SampleSource *source = nullptr;
+
+    // When looping, playback jumps back to loop_start on reaching loop_end
+    bool loop = false;
+    uint32_t loop_start = 0;
+    uint32_t loop_end = 0;
+
+    // Q16 fraction of a sample to move on each output sample, 0x10000 plays at the recorded pitch
+    uint32_t step = 0x10000;
+    uint16_t volume = 0xffff;
+
+    uint32_t position = 0;
+    uint32_t fraction = 0;
+    volatile bool playing = false;
+
+    void start(const int16_t *data, uint32_t length, bool loop, uint32_t loop_start, uint32_t loop_end);
+    void start(SampleSource *source);
+    void stop() { playing = false; }
+
+    // Adds len samples of the voice to out, scaled by its volume and gain (0 to 0xffff),
+    // clipping the result. Stops the voice when it reaches the end of a sample that doesn't loop,
+    // or of its source. A source that falls behind leaves the voice silent until it catches up.
+    void mix(int16_t *out, uint len, uint16_t gain);
+  };
+
+}
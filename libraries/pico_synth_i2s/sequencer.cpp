@@ -0,0 +1,325 @@
+#include <math.h>
+#include <string.h>
+
+#include "sequencer.hpp"
+
+namespace pimoroni {
+
+  namespace {
+    const uint8_t HAS_NOTE = 0b00001000;
+    const uint8_t HAS_INSTRUMENT = 0b00010000;
+    const uint8_t HAS_EFFECT = 0b00100000;
+    const uint8_t CHANNEL_MASK = 0b00000111;
+
+    inline uint16_t read_uint16(const uint8_t *p) {
+      return p[0] | (p[1] << 8);
+    }
+
+    // As Channel.configure, the envelope can't take no time at all
+    inline uint16_t read_ms(const uint8_t *p) {
+      uint16_t ms = read_uint16(p);
+      return ms > 0 ? ms : 1;
+    }
+
+    uint16_t note_frequency(uint note) {
+      note = note > 127 ? 127 : note;
+      return (uint16_t)(440.0f * powf(2.0f, ((float)note - 69.0f) / 12.0f) + 0.5f);
+    }
+
+    // Checks the rows of a pattern stay inside it and only refer to what the song has
+    bool check_rows(const uint8_t *p, const uint8_t *end, uint rows, uint channels, uint instruments) {
+      for(auto r = 0u; r < rows; r++) {
+        if(p >= end) return false;
+        uint events = *p++;
+        for(auto e = 0u; e < events; e++) {
+          if(p >= end) return false;
+          uint8_t flags = *p++;
+          if((flags & CHANNEL_MASK) >= channels) return false;
+          if(flags & HAS_NOTE) {
+            if(p >= end || (*p > 127 && *p != Sequencer::NOTE_OFF)) return false;
+            p++;
+          }
+          if(flags & HAS_INSTRUMENT) {
+            if(p >= end || *p == 0 || *p > instruments) return false;
+            p++;
+          }
+          if(flags & HAS_EFFECT) {
+            if(end - p < 2 || p[0] > Sequencer::NOTE_CUT) return false;
+            p += 2;
+          }
+        }
+      }
+      return true;
+    }
+  }
+
+  bool Sequencer::load(const uint8_t *data, uint32_t length) {
+    unload();
+
+    if(length < HEADER_SIZE || memcmp(data, "PVSQ", 4) != 0 || data[4] != VERSION) {
+      return false;
+    }
+    uint8_t channels = data[5];
+    uint8_t instrument_total = data[6];
+    uint8_t pattern_total = data[7];
+    uint8_t order_total = data[8];
+    uint8_t restart_position = data[9];
+    if(channels < 1 || channels > PicoSynth::CHANNEL_COUNT || order_total == 0 || data[10] == 0 || read_uint16(data + 12) == 0) {
+      return false;
+    }
+    if(restart_position != NO_RESTART && restart_position >= order_total) {
+      return false;
+    }
+
+    const uint8_t *end = data + length;
+    const uint8_t *p = data + HEADER_SIZE;
+    if((uint32_t)(end - p) < instrument_total * INSTRUMENT_SIZE + order_total) {
+      return false;
+    }
+    const uint8_t *instrument_data = p;
+    p += instrument_total * INSTRUMENT_SIZE;
+    const uint8_t *order_data = p;
+    for(auto i = 0u; i < order_total; i++) {
+      if(order_data[i] >= pattern_total) return false;
+    }
+    p += order_total;
+
+    const uint8_t *pattern_data = p;
+    for(auto i = 0u; i < pattern_total; i++) {
+      if(end - p < 3) return false;
+      uint pattern_rows = p[0] == 0 ? 256 : p[0];
+      uint pattern_length = read_uint16(p + 1);
+      p += 3;
+      if((uint32_t)(end - p) < pattern_length || !check_rows(p, p + pattern_length, pattern_rows, channels, instrument_total)) {
+        return false;
+      }
+      p += pattern_length;
+    }
+
+    song = data;
+    channel_count = channels;
+    instrument_count = instrument_total;
+    pattern_count = pattern_total;
+    order_length = order_total;
+    restart = restart_position;
+    instruments = instrument_data;
+    order = order_data;
+    patterns = pattern_data;
+    return true;
+  }
+
+  void Sequencer::unload() {
+    playing = false;
+    song = nullptr;
+  }
+
+  void Sequencer::play(PicoSynth &synth) {
+    if(!song) {
+      return;
+    }
+
+    ticks_per_row = song[10];
+    samples_per_tick = read_uint16(song + 12);
+    memset(tracks, 0, sizeof(tracks));
+    tick_in_row = 0;
+    jump_order = -1;
+    jump_row = -1;
+    start_order(0, 0);
+    playing = true;
+
+    // The first row starts straight away
+    tick(synth);
+    samples_to_tick = samples_per_tick;
+  }
+
+  void Sequencer::stop(PicoSynth &synth) {
+    if(playing) {
+      playing = false;
+      for(auto c = 0u; c < channel_count; c++) {
+        synth.channels[c].trigger_release();
+      }
+    }
+  }
+
+  void Sequencer::advance(PicoSynth &synth, uint32_t samples) {
+    samples_to_tick -= samples < samples_to_tick ? samples : samples_to_tick;
+    while(playing && samples_to_tick == 0) {
+      tick(synth);
+      samples_to_tick = samples_per_tick;
+    }
+  }
+
+  void Sequencer::tick(PicoSynth &synth) {
+    if(tick_in_row == 0) {
+      start_row(synth);
+    }
+    else {
+      for(auto c = 0u; c < channel_count; c++) {
+        Track &track = tracks[c];
+        AudioChannel &channel = synth.channels[c];
+        switch(track.effect) {
+          case ARPEGGIO: {
+            const uint8_t offsets[3] = {0, (uint8_t)(track.param >> 4), (uint8_t)(track.param & 0xf)};
+            channel.frequency = note_frequency(track.note + offsets[tick_in_row % 3]);
+            break;
+          }
+          case SLIDE_UP:
+            track.frequency = track.frequency + track.param > 20000 ? 20000 : track.frequency + track.param;
+            channel.frequency = track.frequency;
+            break;
+          case SLIDE_DOWN:
+            track.frequency = track.frequency <= track.param + 1 ? 1 : track.frequency - track.param;
+            channel.frequency = track.frequency;
+            break;
+          case VOLUME_SLIDE: {
+            int32_t volume = channel.volume + ((track.param >> 4) - (track.param & 0xf)) * 1024;
+            channel.volume = volume < 0 ? 0 : (volume > 0xffff ? 0xffff : volume);
+            break;
+          }
+          case NOTE_CUT:
+            if(tick_in_row == track.param) {
+              channel.off();
+            }
+            break;
+          default:
+            break;
+        }
+      }
+    }
+
+    if(++tick_in_row < ticks_per_row) {
+      return;
+    }
+    tick_in_row = 0;
+
+    // On to the next row, or wherever the row's effects said to go
+    uint next_order = order_position;
+    uint next_row = row + 1;
+    if(jump_order >= 0 || jump_row >= 0) {
+      next_order = jump_order >= 0 ? jump_order : order_position + 1;
+      next_row = jump_row >= 0 ? jump_row : 0;
+      jump_order = -1;
+      jump_row = -1;
+    }
+    else if(next_row < rows) {
+      row = next_row;
+      return;
+    }
+    else {
+      next_order++;
+      next_row = 0;
+    }
+
+    if(next_order >= order_length) {
+      if(restart == NO_RESTART) {
+        stop(synth);
+        return;
+      }
+      next_order = restart;
+    }
+    start_order(next_order, next_row);
+  }
+
+  void Sequencer::start_row(PicoSynth &synth) {
+    for(auto c = 0u; c < channel_count; c++) {
+      // Effects only last for their row, and an arpeggio ends back on its note
+      if(tracks[c].effect == ARPEGGIO) {
+        synth.channels[c].frequency = tracks[c].frequency;
+      }
+      tracks[c].effect = NONE;
+    }
+
+    uint events = *next_event++;
+    for(auto e = 0u; e < events; e++) {
+      uint8_t flags = *next_event++;
+      uint c = flags & CHANNEL_MASK;
+      Track &track = tracks[c];
+      AudioChannel &channel = synth.channels[c];
+
+      uint8_t note = flags & HAS_NOTE ? *next_event++ : 0;
+      if(flags & HAS_INSTRUMENT) {
+        const uint8_t *instrument = instruments + (*next_event++ - 1) * INSTRUMENT_SIZE;
+        channel.waveforms = instrument[0];
+        channel.volume = read_uint16(instrument + 2);
+        channel.attack_ms = read_ms(instrument + 4);
+        channel.decay_ms = read_ms(instrument + 6);
+        channel.sustain = read_uint16(instrument + 8);
+        channel.release_ms = read_ms(instrument + 10);
+        channel.pulse_width = read_uint16(instrument + 12);
+      }
+      if(flags & HAS_EFFECT) {
+        track.effect = next_event[0];
+        track.param = next_event[1];
+        next_event += 2;
+      }
+
+      if(flags & HAS_NOTE) {
+        if(note == NOTE_OFF) {
+          channel.trigger_release();
+        }
+        else {
+          track.note = note;
+          track.frequency = note_frequency(note);
+          channel.frequency = track.frequency;
+          channel.trigger_attack();
+        }
+      }
+
+      switch(track.effect) {
+        case SET_VOLUME:
+          channel.volume = track.param * 257;
+          break;
+        case SET_SPEED:
+          if(track.param > 0) ticks_per_row = track.param;
+          break;
+        case SET_TEMPO:
+          set_tempo(track.param);
+          break;
+        case PATTERN_BREAK:
+          jump_row = track.param;
+          break;
+        case POSITION_JUMP:
+          jump_order = track.param;
+          break;
+        case NOTE_CUT:
+          if(track.param == 0) channel.off();
+          break;
+        default:
+          break;
+      }
+    }
+  }
+
+  void Sequencer::start_order(uint8_t position, uint16_t start_row) {
+    order_position = position;
+    next_event = find_pattern(order[position], rows);
+
+    // Skip to the row a pattern break asked for
+    row = start_row < rows ? start_row : 0;
+    for(auto r = 0u; r < row; r++) {
+      uint events = *next_event++;
+      for(auto e = 0u; e < events; e++) {
+        uint8_t flags = *next_event++;
+        next_event += (flags & HAS_NOTE ? 1 : 0) + (flags & HAS_INSTRUMENT ? 1 : 0) + (flags & HAS_EFFECT ? 2 : 0);
+      }
+    }
+  }
+
+  const uint8_t* Sequencer::find_pattern(uint8_t pattern, uint16_t &rows) const {
+    // Patterns vary in length, so are found by hopping over the ones before
+    const uint8_t *p = patterns;
+    for(auto i = 0u; i < pattern; i++) {
+      p += 3 + read_uint16(p + 1);
+    }
+    rows = p[0] == 0 ? 256 : p[0];
+    return p + 3;
+  }
+
+  void Sequencer::set_tempo(uint8_t bpm) {
+    if(bpm > 0) {
+      uint32_t samples = sample_rate * 5 / (2 * bpm);
+      samples_per_tick = samples > 0xffff ? 0xffff : samples;
+    }
+  }
+
+}
@@ -0,0 +1,117 @@
+#pragma once
+
+#include <cstdint>
+
+#include "../pico_synth/pico_synth.hpp"
+
+namespace pimoroni {
+
+  // Plays a song in PicoVision's sequencer format on the synth's channels, stepped from the
+  // audio fill so notes land on the exact sample they're due however busy the CPU is.
+  //
+  // A song is a header, instruments, an order list and patterns, all little endian:
+  //
+  //   "PVSQ", u8 version, u8 channels (1 to 8), u8 instruments, u8 patterns,
+  //   u8 order length, u8 restart order (0xff to stop at the end), u8 ticks per row,
+  //   u8 reserved, u16 samples per tick, u16 reserved
+  //
+  //   Each instrument: u8 waveforms, u8 reserved, u16 volume, u16 attack ms, u16 decay ms,
+  //   u16 sustain, u16 release ms, u16 pulse width - as Channel.configure, scaled to 65535
+  //
+  //   Order: the pattern to play at each position of the song
+  //
+  //   Each pattern: u8 rows (0 for 256), u16 length in bytes of the rows that follow. Each
+  //   row is a u8 count of events, then the events. An event is a u8 of the song channel
+  //   (bits 0-2) and which of a note (bit 3), instrument (bit 4) and effect (bit 5) follow
+  //   it, each a u8: a MIDI note or NOTE_OFF, a 1 based instrument, an effect and its parameter.
+  //
+  // Song channel n plays on synth channel n, leaving the rest free.
+  class Sequencer {
+  public:
+    static const uint8_t VERSION = 1;
+    static const uint8_t NOTE_OFF = 0xff;
+    static const uint8_t NO_RESTART = 0xff;
+
+    // Last for the row they're on, apart from the tempo and position ones
+    enum Effect : uint8_t {
+      NONE = 0,
+      ARPEGGIO = 1,       // Cycles the note, +x and +y semitones each tick, param xy
+      SLIDE_UP = 2,       // Hz per tick
+      SLIDE_DOWN = 3,     // Hz per tick
+      VOLUME_SLIDE = 4,   // Up x or down y 1/64ths of full volume per tick, param xy
+      SET_VOLUME = 5,     // 0 to 255
+      SET_SPEED = 6,      // Ticks per row
+      SET_TEMPO = 7,      // In BPM, as a tracker module's, where a tick is 2.5 / BPM seconds
+      PATTERN_BREAK = 8,  // Moves on to the next order, starting at row param
+      POSITION_JUMP = 9,  // Moves on to order param
+      NOTE_CUT = 10       // Silences the note on tick param
+    };
+
+  private:
+    static const uint HEADER_SIZE = 16;
+    static const uint INSTRUMENT_SIZE = 14;
+
+    struct Track {
+      uint8_t note;
+      uint8_t effect;
+      uint8_t param;
+      uint16_t frequency;
+    };
+
+    const uint8_t *song = nullptr;
+    uint32_t sample_rate = 22050;
+    uint8_t channel_count = 0;
+    uint8_t instrument_count = 0;
+    uint8_t pattern_count = 0;
+    uint8_t order_length = 0;
+    uint8_t restart = NO_RESTART;
+    const uint8_t *instruments = nullptr;
+    const uint8_t *order = nullptr;
+    const uint8_t *patterns = nullptr;
+
+    Track tracks[PicoSynth::CHANNEL_COUNT];
+
+    volatile bool playing = false;
+    uint8_t ticks_per_row = 6;
+    uint16_t samples_per_tick = 441;
+    uint32_t samples_to_tick = 0;
+    uint8_t tick_in_row = 0;
+
+    uint8_t order_position = 0;
+    uint16_t row = 0;
+    uint16_t rows = 0;
+    const uint8_t *next_event = nullptr;
+
+    // Set by PATTERN_BREAK and POSITION_JUMP, to act on at the end of the row
+    int16_t jump_order = -1;
+    int16_t jump_row = -1;
+
+  public:
+    Sequencer(uint32_t sample_rate = 22050) : sample_rate(sample_rate) {}
+
+    // Checks a song and gets ready to play it from the start. The song isn't copied, so
+    // must stay put until another is loaded. Returns false if it isn't a valid song.
+    bool load(const uint8_t *data, uint32_t length);
+    void unload();
+
+    void play(PicoSynth &synth);
+    // Releases the song's channels
+    void stop(PicoSynth &synth);
+    bool is_playing() const { return playing; }
+    uint8_t get_order_position() const { return order_position; }
+    uint16_t get_row() const { return row; }
+
+    // How many samples can be rendered before the sequencer next needs to step the synth
+    uint32_t samples_until_tick() const { return samples_to_tick; }
+    // Moves on by samples rendered, stepping the synth's channels at each tick reached
+    void advance(PicoSynth &synth, uint32_t samples);
+
+  private:
+    void tick(PicoSynth &synth);
+    void start_row(PicoSynth &synth);
+    void start_order(uint8_t position, uint16_t start_row);
+    const uint8_t* find_pattern(uint8_t pattern, uint16_t &rows) const;
+    void set_tempo(uint8_t bpm);
+  };
+
+}
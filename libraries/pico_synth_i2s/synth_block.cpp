@@ -0,0 +1,202 @@
+#include <algorithm>
+#include <math.h>
+
+#include "synth_block.hpp"
+
+namespace pimoroni {
+
+  namespace {
+    // Channels are mixed this many samples at a time, to keep the mix on the stack
+    const uint MIX_LEN = 64;
+
+    const uint SINE_LEN = 256;
+    int16_t sine_table[SINE_LEN];
+    bool sine_table_built = false;
+
+    // 16384 / n, to average n waveforms without dividing
+    const int32_t AVERAGE[7] = {0, 16384, 8192, 5461, 4096, 3277, 2731};
+
+    uint32_t noise_state = 0x32B71700;
+
+    void build_sine_table() {
+      for(auto i = 0u; i < SINE_LEN; i++) {
+        // Starting from the bottom of the wave, as PicoSynth's does
+        sine_table[i] = (int16_t)(-cosf((float)i * 2.0f * (float)M_PI / SINE_LEN) * 32767.0f);
+      }
+      sine_table_built = true;
+    }
+
+    uint32_t next_random() {
+      noise_state ^= noise_state << 13;
+      noise_state ^= noise_state >> 17;
+      noise_state ^= noise_state << 5;
+      return noise_state;
+    }
+
+    int32_t next_noise() {
+      // Four 16 bit randoms summed are roughly normally distributed
+      uint32_t r0 = next_random();
+      uint32_t r1 = next_random();
+      int32_t noise = (int32_t)(((r0 & 0xffff) + (r1 & 0xffff) + (r0 >> 16) + (r1 >> 16)) / 2) - 0xffff;
+      // Clamped to 16 bits, as it's stored, so the envelope and volume multiplies fit in 32 bits
+      return noise < -0x8000 ? -0x8000 : (noise > 0x7fff ? 0x7fff : noise);
+    }
+
+    // W is the channel's waveforms, or 0 to read them from the channel each sample
+    template<uint8_t W>
+    void render_segment(AudioChannel &channel, int32_t *mix, uint len, uint32_t step) {
+      const uint8_t waveforms = W ? W : channel.waveforms;
+      const bool single = W != 0;
+      const int32_t average = AVERAGE[__builtin_popcount(waveforms)];
+      const int32_t volume = channel.volume;
+      const uint32_t pulse_width = channel.pulse_width;
+
+      uint32_t offset = channel.waveform_offset;
+      uint32_t adsr = channel.adsr;
+      const int32_t adsr_step = channel.adsr_step;
+
+      for(auto i = 0u; i < len; i++) {
+        offset += step;
+        if(offset & 0x10000) {
+          channel.noise = next_noise();
+        }
+        offset &= 0xffff;
+        adsr += adsr_step;
+
+        int32_t sample = 0;
+        if(waveforms & Waveform::NOISE) {
+          sample += channel.noise;
+        }
+        if(waveforms & Waveform::SAW) {
+          sample += (int32_t)offset - 0x7fff;
+        }
+        if(waveforms & Waveform::TRIANGLE) {
+          // The last step down would be -0x8001, one past 16 bits
+          sample += offset < 0x7fff ? (int32_t)(offset * 2) - 0x7fff : std::max(0x7fff - ((int32_t)offset - 0x7fff) * 2, -0x8000);
+        }
+        if(waveforms & Waveform::SQUARE) {
+          sample += offset < pulse_width ? 0x7fff : -0x7fff;
+        }
+        if(waveforms & Waveform::SINE) {
+          sample += sine_table[offset >> 8];
+        }
+        if(waveforms & Waveform::WAVE) {
+          sample += channel.wave_buffer[channel.wave_buf_pos];
+          if(++channel.wave_buf_pos == 64) {
+            channel.wave_buf_pos = 0;
+            if(channel.wave_buffer_callback) {
+              channel.wave_buffer_callback(channel);
+            }
+          }
+        }
+
+        if(!single) {
+          sample = (sample * average) >> 14;
+        }
+        // The sample fits in 16 bits and the envelope and volume are 16 bit, so these
+        // are 32 bit multiplies, with no 64 bit helper calls on the M0+
+        sample = (sample * (int32_t)(adsr >> 8)) >> 16;
+        mix[i] += (sample * volume) >> 16;
+      }
+
+      channel.waveform_offset = offset;
+      channel.adsr = adsr;
+    }
+
+    void render_channel(AudioChannel &channel, int32_t *mix, uint len, uint32_t step) {
+      uint i = 0;
+      while(i < len) {
+        if(channel.adsr_phase == ADSRPhase::OFF) {
+          // Only the waveform moves on while a channel is off
+          channel.waveform_offset = (channel.waveform_offset + step * (len - i)) & 0xffff;
+          return;
+        }
+
+        if(channel.adsr_frame >= channel.adsr_end_frame && channel.adsr_phase != ADSRPhase::SUSTAIN) {
+          switch(channel.adsr_phase) {
+            case ADSRPhase::ATTACK:
+              channel.trigger_decay();
+              break;
+            case ADSRPhase::DECAY:
+              channel.trigger_sustain();
+              break;
+            case ADSRPhase::RELEASE:
+              channel.off();
+              break;
+            default:
+              break;
+          }
+        }
+
+        // The envelope steps evenly until its next phase change, so render up to there in one go
+        uint segment = len - i;
+        if(channel.adsr_phase == ADSRPhase::OFF) {
+          // A release still sounds for the sample it ends on
+          segment = 1;
+        }
+        else if(channel.adsr_phase != ADSRPhase::SUSTAIN && channel.adsr_end_frame > channel.adsr_frame) {
+          segment = std::min(segment, (uint)(channel.adsr_end_frame - channel.adsr_frame));
+        }
+
+        switch(channel.waveforms) {
+          case 0:
+            channel.waveform_offset = (channel.waveform_offset + step * segment) & 0xffff;
+            channel.adsr += channel.adsr_step * segment;
+            break;
+          case Waveform::SINE:
+            render_segment<Waveform::SINE>(channel, mix + i, segment, step);
+            break;
+          case Waveform::SQUARE:
+            render_segment<Waveform::SQUARE>(channel, mix + i, segment, step);
+            break;
+          case Waveform::SAW:
+            render_segment<Waveform::SAW>(channel, mix + i, segment, step);
+            break;
+          case Waveform::TRIANGLE:
+            render_segment<Waveform::TRIANGLE>(channel, mix + i, segment, step);
+            break;
+          default:
+            render_segment<0>(channel, mix + i, segment, step);
+            break;
+        }
+
+        channel.adsr_frame += segment;
+        i += segment;
+      }
+    }
+  }
+
+  void render_block(PicoSynth &synth, int16_t *out, uint len, uint32_t sample_rate) {
+    if(!sine_table_built) {
+      build_sine_table();
+    }
+
+    int32_t mix[MIX_LEN];
+    while(len > 0) {
+      uint block = std::min(len, MIX_LEN);
+      for(auto i = 0u; i < block; i++) {
+        mix[i] = 0;
+      }
+
+      for(auto c = 0u; c < PicoSynth::CHANNEL_COUNT; c++) {
+        AudioChannel &channel = synth.channels[c];
+        // Q16 fraction of the waveform to move on each sample
+        uint32_t step = ((channel.frequency * 256) << 8) / sample_rate;
+        render_channel(channel, mix, block, step);
+      }
+
+      // The mix can be more than 16 bits, so it's multiplied by the volume a byte at a
+      // time, which gives the same result as one 64 bit multiply
+      const int32_t volume_hi = synth.volume >> 8;
+      const int32_t volume_lo = synth.volume & 0xff;
+      for(auto i = 0u; i < block; i++) {
+        int32_t sample = (mix[i] * volume_hi + ((mix[i] * volume_lo) >> 8)) >> 8;
+        out[i] = sample <= -0x8000 ? -0x8000 : (sample > 0x7fff ? 0x7fff : sample);
+      }
+
+      out += block;
+      len -= block;
+    }
+  }
+
+}
@@ -0,0 +1,20 @@
+#pragma once
+
+#include <cstdint>
+
+#include "../pico_synth/pico_synth.hpp"
+
+namespace pimoroni {
+
+  // Renders len samples of the synth into out, the same as calling
+  // synth.get_audio_frame() len times, but a channel at a time: each channel's
+  // envelope is stepped over whole segments of the block between its phase changes,
+  // and its waveform is read with a fixed point phase accumulator and wavetables,
+  // so there's far less per sample work when several channels are playing.
+  //
+  // Noise comes from a generator of its own, clamped to 16 bits, so won't match
+  // get_audio_frame sample for sample, and averaging mixed waveforms rounds slightly
+  // differently. Every multiply is 32 bit, where get_audio_frame's are 64 bit.
+  void render_block(PicoSynth &synth, int16_t *out, uint len, uint32_t sample_rate);
+
+}
@@ -0,0 +1,234 @@
+#include <string.h>
+
+#include "wav_stream.hpp"
+
+namespace pimoroni {
+
+  namespace {
+    const int8_t IMA_INDEX[8] = {-1, -1, -1, -1, 2, 4, 6, 8};
+
+    const int16_t IMA_STEP[89] = {
+      7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+      50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+      253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+      1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+      3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487,
+      12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767
+    };
+
+    inline uint16_t read_uint16(const uint8_t *p) {
+      return p[0] | (p[1] << 8);
+    }
+
+    inline uint32_t read_uint32(const uint8_t *p) {
+      return p[0] | (p[1] << 8) | (p[2] << 16) | ((uint32_t)p[3] << 24);
+    }
+
+    struct ImaChannel {
+      int32_t predictor;
+      int32_t index;
+
+      // As the IMA reference decoder, adding up the step's fractions rather than multiplying
+      int16_t next(uint8_t nibble) {
+        int32_t step = IMA_STEP[index];
+        int32_t diff = step >> 3;
+        if(nibble & 4) diff += step;
+        if(nibble & 2) diff += step >> 1;
+        if(nibble & 1) diff += step >> 2;
+        predictor += (nibble & 8) ? -diff : diff;
+        predictor = predictor < -0x8000 ? -0x8000 : (predictor > 0x7fff ? 0x7fff : predictor);
+
+        index += IMA_INDEX[nibble & 7];
+        index = index < 0 ? 0 : (index > 88 ? 88 : index);
+        return predictor;
+      }
+    };
+  }
+
+  uint decode_ima_adpcm(const uint8_t *block, uint len, uint channels, int16_t *out) {
+    if(channels == 0 || len < 4 * channels) {
+      return 0;
+    }
+
+    // Each channel's header holds its first sample, then the channels take turns with 4
+    // bytes - 8 samples, low nibble first - at a time
+    const uint groups = (len - 4 * channels) / (4 * channels);
+    const uint samples = 1 + groups * 8;
+
+    for(auto c = 0u; c < channels; c++) {
+      const uint8_t *header = block + c * 4;
+      ImaChannel channel = {(int16_t)read_uint16(header), header[2] > 88 ? 88 : header[2]};
+
+      int16_t *sample = out;
+      *sample++ = c == 0 ? channel.predictor : (out[0] + channel.predictor) >> 1;
+      for(auto g = 0u; g < groups; g++) {
+        const uint8_t *data = block + 4 * channels + (g * channels + c) * 4;
+        for(auto i = 0u; i < 4; i++) {
+          int16_t low = channel.next(data[i] & 0xf);
+          int16_t high = channel.next(data[i] >> 4);
+          if(c == 0) {
+            sample[0] = low;
+            sample[1] = high;
+          }
+          else {
+            // Mixing stereo down to mono
+            sample[0] = (sample[0] + low) >> 1;
+            sample[1] = (sample[1] + high) >> 1;
+          }
+          sample += 2;
+        }
+      }
+    }
+    return samples;
+  }
+
+  bool WavStream::open(read_func read, void* context) {
+    close();
+    this->read = read;
+    read_context = context;
+
+    uint8_t header[20];
+    if(read_fully(header, 12) != 12 || memcmp(header, "RIFF", 4) != 0 || memcmp(header + 8, "WAVE", 4) != 0) {
+      return false;
+    }
+
+    bool have_format = false;
+    while(true) {
+      if(read_fully(header, 8) != 8) {
+        return false;
+      }
+      uint32_t chunk_size = read_uint32(header + 4);
+
+      if(memcmp(header, "fmt ", 4) == 0) {
+        if(chunk_size < 16) {
+          return false;
+        }
+        uint32_t size = chunk_size < sizeof(header) ? chunk_size : sizeof(header);
+        if(read_fully(header, size) != size || !skip(chunk_size - size + (chunk_size & 1))) {
+          return false;
+        }
+        format = (Format)read_uint16(header);
+        channels = read_uint16(header + 2);
+        sample_rate = read_uint32(header + 4);
+        block_align = read_uint16(header + 12);
+        uint16_t bits = read_uint16(header + 14);
+
+        if(channels < 1 || channels > 2 || sample_rate == 0) {
+          return false;
+        }
+        if(format == PCM) {
+          have_format = bits == 16;
+        }
+        else if(format == IMA_ADPCM) {
+          // Blocks are read whole, and the largest decodes to 2041 samples, inside one buffer
+          have_format = bits == 4 && block_align >= 4 * channels && block_align <= MAX_BLOCK_ALIGN;
+        }
+        if(!have_format) {
+          return false;
+        }
+      }
+      else if(memcmp(header, "data", 4) == 0) {
+        data_remaining = chunk_size;
+        break;
+      }
+      else if(!skip(chunk_size + (chunk_size & 1))) {
+        return false;
+      }
+    }
+
+    if(!have_format) {
+      return false;
+    }
+    at_end = false;
+    return true;
+  }
+
+  void WavStream::close() {
+    at_end = true;
+    data_remaining = 0;
+    buffers_filled = 0;
+    buffers_taken = 0;
+    playing_buffer = false;
+  }
+
+  uint WavStream::decode(int16_t *out) {
+    if(format == IMA_ADPCM) {
+      uint len = read_fully(block, block_align < data_remaining ? block_align : data_remaining);
+      data_remaining -= len;
+      return decode_ima_adpcm(block, len, channels, out);
+    }
+
+    // Read straight into the buffer, then mix any stereo down in place
+    uint len = BUFFER_SAMPLES * sizeof(int16_t);
+    len = len < data_remaining ? len : data_remaining;
+    len = read_fully((uint8_t *)out, len);
+    data_remaining -= len;
+
+    uint samples = len / (sizeof(int16_t) * channels);
+    if(channels == 2) {
+      for(auto i = 0u; i < samples; i++) {
+        out[i] = (out[i * 2] + out[i * 2 + 1]) >> 1;
+      }
+    }
+    return samples;
+  }
+
+  bool WavStream::next_block(const int16_t *&data, uint32_t &length) {
+    if(playing_buffer) {
+      // The voice has finished with it
+      buffers_taken = buffers_taken + 1;
+      playing_buffer = false;
+    }
+    if(buffers_taken == buffers_filled) {
+      return false;
+    }
+
+    uint buffer = buffers_taken % 2;
+    data = buffers[buffer];
+    length = lengths[buffer];
+    playing_buffer = true;
+    return true;
+  }
+
+  bool WavStream::finished() const {
+    return at_end && buffers_taken == buffers_filled;
+  }
+
+  void WavStream::fill() {
+    // One buffer may be playing, so there's one to fill ahead of it
+    while(!at_end && buffers_filled - buffers_taken < 2) {
+      uint buffer = buffers_filled % 2;
+      uint samples = decode(buffers[buffer]);
+      if(samples == 0) {
+        at_end = true;
+        break;
+      }
+      lengths[buffer] = samples;
+      buffers_filled = buffers_filled + 1;
+    }
+  }
+
+  uint WavStream::read_fully(uint8_t *buf, uint len) {
+    uint total = 0;
+    while(total < len) {
+      int result = read(read_context, buf + total, len - total);
+      if(result <= 0) {
+        break;
+      }
+      total += result;
+    }
+    return total;
+  }
+
+  bool WavStream::skip(uint32_t len) {
+    while(len > 0) {
+      uint chunk = len < MAX_BLOCK_ALIGN ? len : MAX_BLOCK_ALIGN;
+      if(read_fully(block, chunk) != chunk) {
+        return false;
+      }
+      len -= chunk;
+    }
+    return true;
+  }
+
+}
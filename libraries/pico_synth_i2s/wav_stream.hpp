@@ -0,0 +1,71 @@
+#pragma once
+
+#include <cstdint>
+
+#include "sample_voice.hpp"
+
+namespace pimoroni {
+
+  // Streams a 16 bit PCM or IMA-ADPCM WAV file into a SampleVoice, decoding it a block at a
+  // time into one of two buffers while the other plays, so the RAM it needs doesn't depend
+  // on the length of the file. Stereo files are mixed down to mono.
+  class WavStream : public SampleSource {
+  public:
+    // Reads up to len bytes of the file into buf, returning how many were read, 0 at the
+    // end of the file or less than 0 on an error
+    typedef int (*read_func)(void* context, uint8_t *buf, uint len);
+
+    static const uint BUFFER_SAMPLES = 2048;
+    static const uint MAX_BLOCK_ALIGN = 1024;
+
+    enum Format : uint16_t {
+      PCM = 0x0001,
+      IMA_ADPCM = 0x0011
+    };
+
+  private:
+    read_func read = nullptr;
+    void* read_context = nullptr;
+
+    Format format = PCM;
+    uint16_t channels = 1;
+    uint32_t sample_rate = 0;
+    uint16_t block_align = 0;
+    uint32_t data_remaining = 0;
+
+    int16_t buffers[2][BUFFER_SAMPLES];
+    uint32_t lengths[2] = {0, 0};
+    volatile uint32_t buffers_filled = 0;
+    volatile uint32_t buffers_taken = 0;
+    volatile bool playing_buffer = false;
+    volatile bool at_end = true;
+
+    uint8_t block[MAX_BLOCK_ALIGN];
+
+  public:
+    // Reads the file's header up to the start of its samples. Returns false if it isn't a
+    // WAV file, or is in a format that can't be streamed.
+    bool open(read_func read, void* context);
+    void close();
+
+    Format get_format() const { return format; }
+    uint16_t get_channels() const { return channels; }
+    uint32_t get_sample_rate() const { return sample_rate; }
+
+    // Decodes the next block of the file into out, returning the number of samples
+    uint decode(int16_t *out);
+
+    bool next_block(const int16_t *&data, uint32_t &length) override;
+    bool finished() const override;
+    void fill() override;
+
+  private:
+    uint read_fully(uint8_t *buf, uint len);
+    bool skip(uint32_t len);
+  };
+
+  // Decodes a block of WAV IMA-ADPCM, len bytes of channels interleaved, into mono samples,
+  // returning how many
+  uint decode_ima_adpcm(const uint8_t *block, uint len, uint channels, int16_t *out);
+
+}
@@ -3,6 +3,7 @@ string(TOUPPER ${MOD_NAME} MOD_NAME_UPPER)
 add_library(usermod_${MOD_NAME} INTERFACE)
 
 option(SUPPORT_WIDE_MODES "Build with widescreen support." OFF)
+option(PICOVISION_STATS "Build with performance counters." ON)
 
 get_filename_component(PICOVISION_PATH ${CMAKE_CURRENT_LIST_DIR}/../.. ABSOLUTE)
 
@@ -17,6 +18,10 @@ target_sources(usermod_${MOD_NAME} INTERFACE
     ${PICOVISION_PATH}/libraries/pico_graphics/pico_graphics_pen_dv_rgb888.cpp
     ${PICOVISION_PATH}/libraries/pico_graphics/pico_graphics_pen_dv_rgb555.cpp
     ${PICOVISION_PATH}/libraries/pico_graphics/pico_graphics_pen_dv_p5.cpp
+    ${PICOVISION_PATH}/libraries/pico_graphics/display_list.cpp
+    ${PICOVISION_PATH}/libraries/pico_graphics/glyph_cache.cpp
+    ${PICOVISION_PATH}/libraries/pico_graphics/tilemap.cpp
+    ${PICOVISION_PATH}/libraries/pico_graphics/tile_scroller.cpp
     ${PIMORONI_PICO_PATH}/libraries/pico_graphics/types.cpp
 )
 
@@ -47,6 +52,12 @@ target_compile_definitions(usermod_${MOD_NAME} INTERFACE
 )
 endif()
 
+if (NOT PICOVISION_STATS)
+target_compile_definitions(usermod_${MOD_NAME} INTERFACE
+    -DPICOVISION_STATS=0
+)
+endif()
+
 target_link_libraries(usermod INTERFACE usermod_${MOD_NAME})
 
 set_source_files_properties(
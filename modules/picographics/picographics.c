@@ -3,8 +3,15 @@
 // DV Display specific functions
 MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_set_scroll_group_offset_obj, 1, ModPicoGraphics_set_scroll_group_offset);
 MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ModPicoGraphics_set_scroll_group_for_lines_obj, 4, 4, ModPicoGraphics_set_scroll_group_for_lines);
+MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_set_line_offsets_obj, 2, ModPicoGraphics_set_line_offsets);
+MP_DEFINE_CONST_FUN_OBJ_3(ModPicoGraphics_get_line_offset_obj, ModPicoGraphics_get_line_offset);
 MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_tilemap_obj, 4, ModPicoGraphics_tilemap);
+MP_DEFINE_CONST_FUN_OBJ_3(ModPicoGraphics_create_surface_obj, ModPicoGraphics_create_surface);
+MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_free_surface_obj, ModPicoGraphics_free_surface);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_free_surface_memory_obj, ModPicoGraphics_get_free_surface_memory);
+MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_blit_obj, 4, ModPicoGraphics_blit);
 MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_load_animation_obj, 4, ModPicoGraphics_load_animation);
+MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_load_sprite_bundle_obj, 2, ModPicoGraphics_load_sprite_bundle);
 
 // Class Methods
 MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_update_obj, ModPicoGraphics_update);
@@ -16,6 +23,7 @@ MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_set_palette_obj, 2, ModPicoGraphics_s
 
 MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_remote_palette_obj, ModPicoGraphics_set_remote_palette);
 MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_local_palette_obj, ModPicoGraphics_set_local_palette);
+MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ModPicoGraphics_build_palette_lut_obj, 1, 2, ModPicoGraphics_build_palette_lut);
 
 // Pen
 MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_pen_obj, ModPicoGraphics_set_pen);
@@ -49,6 +57,27 @@ MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ModPicoGraphics_line_obj, 5, 6, ModPicoGraph
 MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_load_sprite_obj, 2, ModPicoGraphics_load_sprite);
 MP_DEFINE_CONST_FUN_OBJ_KW(ModPicoGraphics_display_sprite_obj, 5, ModPicoGraphics_display_sprite);
 MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_clear_sprite_obj, ModPicoGraphics_clear_sprite);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_commit_sprites_obj, ModPicoGraphics_commit_sprites);
+MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_sprite_commit_mode_obj, ModPicoGraphics_set_sprite_commit_mode);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_sprite_bytes_saved_obj, ModPicoGraphics_get_sprite_bytes_saved);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_flush_obj, ModPicoGraphics_flush);
+MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_pixel_buffer_size_obj, ModPicoGraphics_set_pixel_buffer_size);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_pixel_buffer_stats_obj, ModPicoGraphics_get_pixel_buffer_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_reset_pixel_buffer_stats_obj, ModPicoGraphics_reset_pixel_buffer_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_psram_stats_obj, ModPicoGraphics_get_psram_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_reset_psram_stats_obj, ModPicoGraphics_reset_psram_stats);
+MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_glyph_cache_size_obj, ModPicoGraphics_set_glyph_cache_size);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_glyph_cache_stats_obj, ModPicoGraphics_get_glyph_cache_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_reset_glyph_cache_stats_obj, ModPicoGraphics_reset_glyph_cache_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_stats_obj, ModPicoGraphics_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_reset_stats_obj, ModPicoGraphics_reset_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_flip_async_obj, ModPicoGraphics_flip_async);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_is_flipping_obj, ModPicoGraphics_is_flipping);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_wait_for_flip_obj, ModPicoGraphics_wait_for_flip);
+MP_DEFINE_CONST_FUN_OBJ_2(ModPicoGraphics_set_vsync_callback_obj, ModPicoGraphics_set_vsync_callback);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_start_recording_obj, ModPicoGraphics_start_recording);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_stop_recording_obj, ModPicoGraphics_stop_recording);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_recording_size_obj, ModPicoGraphics_get_recording_size);
 
 // Utility
 MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_get_bounds_obj, ModPicoGraphics_get_bounds);
@@ -90,6 +119,8 @@ STATIC const mp_rom_map_elem_t ModPicoGraphics_locals_dict_table[] = {
 
     { MP_ROM_QSTR(MP_QSTR_set_scroll_group_offset), MP_ROM_PTR(&ModPicoGraphics_set_scroll_group_offset_obj) },
     { MP_ROM_QSTR(MP_QSTR_set_scroll_group_for_lines), MP_ROM_PTR(&ModPicoGraphics_set_scroll_group_for_lines_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_line_offsets), MP_ROM_PTR(&ModPicoGraphics_set_line_offsets_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_line_offset), MP_ROM_PTR(&ModPicoGraphics_get_line_offset_obj) },
 
     { MP_ROM_QSTR(MP_QSTR_update), MP_ROM_PTR(&ModPicoGraphics_update_obj) },
     { MP_ROM_QSTR(MP_QSTR_set_clip), MP_ROM_PTR(&ModPicoGraphics_set_clip_obj) },
@@ -109,8 +140,34 @@ STATIC const mp_rom_map_elem_t ModPicoGraphics_locals_dict_table[] = {
     { MP_ROM_QSTR(MP_QSTR_load_sprite), MP_ROM_PTR(&ModPicoGraphics_load_sprite_obj) },
     { MP_ROM_QSTR(MP_QSTR_display_sprite), MP_ROM_PTR(&ModPicoGraphics_display_sprite_obj) },
     { MP_ROM_QSTR(MP_QSTR_clear_sprite), MP_ROM_PTR(&ModPicoGraphics_clear_sprite_obj) },
+    { MP_ROM_QSTR(MP_QSTR_commit_sprites), MP_ROM_PTR(&ModPicoGraphics_commit_sprites_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_sprite_commit_mode), MP_ROM_PTR(&ModPicoGraphics_set_sprite_commit_mode_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_sprite_bytes_saved), MP_ROM_PTR(&ModPicoGraphics_get_sprite_bytes_saved_obj) },
+    { MP_ROM_QSTR(MP_QSTR_flush), MP_ROM_PTR(&ModPicoGraphics_flush_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_pixel_buffer_size), MP_ROM_PTR(&ModPicoGraphics_set_pixel_buffer_size_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_pixel_buffer_stats), MP_ROM_PTR(&ModPicoGraphics_get_pixel_buffer_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_reset_pixel_buffer_stats), MP_ROM_PTR(&ModPicoGraphics_reset_pixel_buffer_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_psram_stats), MP_ROM_PTR(&ModPicoGraphics_get_psram_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_reset_psram_stats), MP_ROM_PTR(&ModPicoGraphics_reset_psram_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_glyph_cache_size), MP_ROM_PTR(&ModPicoGraphics_set_glyph_cache_size_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_glyph_cache_stats), MP_ROM_PTR(&ModPicoGraphics_get_glyph_cache_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_reset_glyph_cache_stats), MP_ROM_PTR(&ModPicoGraphics_reset_glyph_cache_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_stats), MP_ROM_PTR(&ModPicoGraphics_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_reset_stats), MP_ROM_PTR(&ModPicoGraphics_reset_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_flip_async), MP_ROM_PTR(&ModPicoGraphics_flip_async_obj) },
+    { MP_ROM_QSTR(MP_QSTR_is_flipping), MP_ROM_PTR(&ModPicoGraphics_is_flipping_obj) },
+    { MP_ROM_QSTR(MP_QSTR_wait_for_flip), MP_ROM_PTR(&ModPicoGraphics_wait_for_flip_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_vsync_callback), MP_ROM_PTR(&ModPicoGraphics_set_vsync_callback_obj) },
+    { MP_ROM_QSTR(MP_QSTR_start_recording), MP_ROM_PTR(&ModPicoGraphics_start_recording_obj) },
+    { MP_ROM_QSTR(MP_QSTR_stop_recording), MP_ROM_PTR(&ModPicoGraphics_stop_recording_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_recording_size), MP_ROM_PTR(&ModPicoGraphics_get_recording_size_obj) },
     { MP_ROM_QSTR(MP_QSTR_tilemap), MP_ROM_PTR(&ModPicoGraphics_tilemap_obj) },
+    { MP_ROM_QSTR(MP_QSTR_create_surface), MP_ROM_PTR(&ModPicoGraphics_create_surface_obj) },
+    { MP_ROM_QSTR(MP_QSTR_free_surface), MP_ROM_PTR(&ModPicoGraphics_free_surface_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_free_surface_memory), MP_ROM_PTR(&ModPicoGraphics_get_free_surface_memory_obj) },
+    { MP_ROM_QSTR(MP_QSTR_blit), MP_ROM_PTR(&ModPicoGraphics_blit_obj) },
     { MP_ROM_QSTR(MP_QSTR_load_animation), MP_ROM_PTR(&ModPicoGraphics_load_animation_obj) },
+    { MP_ROM_QSTR(MP_QSTR_load_sprite_bundle), MP_ROM_PTR(&ModPicoGraphics_load_sprite_bundle_obj) },
 
     { MP_ROM_QSTR(MP_QSTR_create_pen), MP_ROM_PTR(&ModPicoGraphics_create_pen_obj) },
     { MP_ROM_QSTR(MP_QSTR_create_pen_hsv), MP_ROM_PTR(&ModPicoGraphics_create_pen_hsv_obj) },
@@ -119,6 +176,7 @@ STATIC const mp_rom_map_elem_t ModPicoGraphics_locals_dict_table[] = {
     { MP_ROM_QSTR(MP_QSTR_set_palette), MP_ROM_PTR(&ModPicoGraphics_set_palette_obj) },
     { MP_ROM_QSTR(MP_QSTR_set_remote_palette), MP_ROM_PTR(&ModPicoGraphics_set_remote_palette_obj) },
     { MP_ROM_QSTR(MP_QSTR_set_local_palette), MP_ROM_PTR(&ModPicoGraphics_set_local_palette_obj) },
+    { MP_ROM_QSTR(MP_QSTR_build_palette_lut), MP_ROM_PTR(&ModPicoGraphics_build_palette_lut_obj) },
 
     { MP_ROM_QSTR(MP_QSTR_get_bounds), MP_ROM_PTR(&ModPicoGraphics_get_bounds_obj) },
     { MP_ROM_QSTR(MP_QSTR_set_font), MP_ROM_PTR(&ModPicoGraphics_set_font_obj) },
@@ -163,10 +221,42 @@ const mp_obj_type_t ModPicoGraphics_type = {
 };
 #endif
 
+/***** TileScroller *****/
+MP_DEFINE_CONST_FUN_OBJ_3(ModPicoGraphics_TileScroller_scroll_to_obj, ModPicoGraphics_TileScroller_scroll_to);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_TileScroller_invalidate_obj, ModPicoGraphics_TileScroller_invalidate);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_TileScroller_get_camera_obj, ModPicoGraphics_TileScroller_get_camera);
+MP_DEFINE_CONST_FUN_OBJ_1(ModPicoGraphics_TileScroller_get_tiles_drawn_obj, ModPicoGraphics_TileScroller_get_tiles_drawn);
+
+STATIC const mp_rom_map_elem_t ModPicoGraphics_TileScroller_locals_dict_table[] = {
+    { MP_ROM_QSTR(MP_QSTR_scroll_to), MP_ROM_PTR(&ModPicoGraphics_TileScroller_scroll_to_obj) },
+    { MP_ROM_QSTR(MP_QSTR_invalidate), MP_ROM_PTR(&ModPicoGraphics_TileScroller_invalidate_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_camera), MP_ROM_PTR(&ModPicoGraphics_TileScroller_get_camera_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_tiles_drawn), MP_ROM_PTR(&ModPicoGraphics_TileScroller_get_tiles_drawn_obj) },
+};
+STATIC MP_DEFINE_CONST_DICT(ModPicoGraphics_TileScroller_locals_dict, ModPicoGraphics_TileScroller_locals_dict_table);
+
+#ifdef MP_DEFINE_CONST_OBJ_TYPE
+MP_DEFINE_CONST_OBJ_TYPE(
+    ModPicoGraphics_TileScroller_type,
+    MP_QSTR_TileScroller,
+    MP_TYPE_FLAG_NONE,
+    make_new, ModPicoGraphics_TileScroller_make_new,
+    locals_dict, (mp_obj_dict_t*)&ModPicoGraphics_TileScroller_locals_dict
+);
+#else
+const mp_obj_type_t ModPicoGraphics_TileScroller_type = {
+    { &mp_type_type },
+    .name = MP_QSTR_TileScroller,
+    .make_new = ModPicoGraphics_TileScroller_make_new,
+    .locals_dict = (mp_obj_dict_t*)&ModPicoGraphics_TileScroller_locals_dict,
+};
+#endif
+
 /***** Module Globals *****/
 STATIC const mp_map_elem_t picographics_globals_table[] = {
     { MP_ROM_QSTR(MP_QSTR___name__), MP_OBJ_NEW_QSTR(MP_QSTR_picovision) },
     { MP_ROM_QSTR(MP_QSTR_PicoVision), (mp_obj_t)&ModPicoGraphics_type },
+    { MP_ROM_QSTR(MP_QSTR_TileScroller), (mp_obj_t)&ModPicoGraphics_TileScroller_type },
 
     { MP_ROM_QSTR(MP_QSTR_PEN_RGB888), MP_ROM_INT(PEN_DV_RGB888) },
     { MP_ROM_QSTR(MP_QSTR_PEN_RGB555), MP_ROM_INT(PEN_DV_RGB555) },
@@ -181,6 +271,13 @@ STATIC const mp_map_elem_t picographics_globals_table[] = {
     { MP_ROM_QSTR(MP_QSTR_SPRITE_BLEND_UNDER), MP_ROM_INT(3) },
     { MP_ROM_QSTR(MP_QSTR_SPRITE_BLEND_OVER), MP_ROM_INT(4) },
 
+    { MP_ROM_QSTR(MP_QSTR_SPRITE_COMMIT_IMMEDIATE), MP_ROM_INT(0) },
+    { MP_ROM_QSTR(MP_QSTR_SPRITE_COMMIT_MANUAL), MP_ROM_INT(1) },
+    { MP_ROM_QSTR(MP_QSTR_SPRITE_COMMIT_AUTO), MP_ROM_INT(2) },
+
+    { MP_ROM_QSTR(MP_QSTR_TILE_FLIP_X), MP_ROM_INT(0x4000) },
+    { MP_ROM_QSTR(MP_QSTR_TILE_FLIP_Y), MP_ROM_INT(0x8000) },
+
 #if SUPPORT_WIDE_MODES
     { MP_ROM_QSTR(MP_QSTR_WIDESCREEN), MP_ROM_TRUE },
 #else
@@ -1,5 +1,9 @@
 #include "drivers/dv_display/dv_display.hpp"
 #include "libraries/pico_graphics/pico_graphics_dv.hpp"
+#include "libraries/pico_graphics/display_list.hpp"
+#include "libraries/pico_graphics/glyph_cache.hpp"
+#include "libraries/pico_graphics/tilemap.hpp"
+#include "libraries/pico_graphics/tile_scroller.hpp"
 #include "common/pimoroni_common.hpp"
 
 #include "micropython/modules/util.hpp"
@@ -38,12 +42,35 @@ const std::string_view mp_obj_to_string_r(const mp_obj_t &obj) {
 static I2C dv_i2c(DVDisplay::I2C_SDA, DVDisplay::I2C_SCL);
 static DVDisplay dv_display(&dv_i2c);
 
+static void *display_list_resize(void *buffer, size_t old_size, size_t new_size) {
+    if(new_size == 0) {
+        m_del(uint8_t, buffer, old_size);
+        return nullptr;
+    }
+    return m_renew(uint8_t, buffer, old_size, new_size);
+}
+
 typedef struct _ModPicoGraphics_obj_t {
     mp_obj_base_t base;
     PicoGraphicsDV *graphics;
     DVDisplay *display;
+    DisplayList *display_list;
+    GlyphCache *glyph_cache;
+    mp_obj_t vsync_callback;
 } ModPicoGraphics_obj_t;
 
+// After flip_async the bank being drawn to is still on screen until the next vsync,
+// so anything that draws to or reads the frame finishes the flip, and replays the
+// display list into the new bank, first. Modules that draw through the graphics
+// pointer, like PicoVector and jpegdec, don't come through here, so Python has to
+// call wait_for_flip before using them
+static void finish_flip(ModPicoGraphics_obj_t *self) {
+    if(dv_display.is_flip_pending()) {
+        dv_display.wait_for_flip();
+        self->display_list->replay();
+    }
+}
+
 typedef struct _PNG_decode_target {
     void *target;
     Rect source = {0, 0, 0, 0};
@@ -222,6 +249,10 @@ mp_obj_t ModPicoGraphics_make_new(const mp_obj_type_t *type, size_t n_args, size
     }
 
     self->display = &dv_display;
+    self->display_list = m_new_class(DisplayList, *self->graphics, display_list_resize);
+    self->glyph_cache = m_new_class(GlyphCache, display_list_resize);
+    self->vsync_callback = mp_const_none;
+    self->graphics->glyph_cache = self->glyph_cache;
 
     // Clear each buffer
     for(auto x = 0u; x < 2u; x++){
@@ -257,6 +288,7 @@ mp_obj_t ModPicoGraphics_set_scroll_group_offset(size_t n_args, const mp_obj_t *
     mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
+    finish_flip(MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t));
     dv_display.setup_scroll_group(
         Point(
             args[ARG_x].u_int,
@@ -275,14 +307,63 @@ mp_obj_t ModPicoGraphics_set_scroll_group_offset(size_t n_args, const mp_obj_t *
 mp_obj_t ModPicoGraphics_set_scroll_group_for_lines(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_scroll_index, ARG_min_y, ARG_max_y };
 
-    dv_display.set_scroll_idx_for_lines(
-        mp_obj_get_int(args[ARG_scroll_index]),
-        mp_obj_get_int(args[ARG_min_y]),
-        mp_obj_get_int(args[ARG_max_y]));
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    int scroll_index = mp_obj_get_int(args[ARG_scroll_index]);
+    int min_y = mp_obj_get_int(args[ARG_min_y]);
+    int max_y = mp_obj_get_int(args[ARG_max_y]);
+
+    self->display->set_scroll_idx_for_lines(scroll_index, min_y, max_y);
+    self->display_list->set_scroll_idx_for_lines(scroll_index, min_y, max_y);
 
     return mp_const_none;
 }
 
+mp_obj_t ModPicoGraphics_set_line_offsets(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_self, ARG_offsets, ARG_start, ARG_scroll_group };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_offsets, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_start, MP_ARG_INT, { .u_int = 0 } },
+        { MP_QSTR_scroll_group, MP_ARG_INT, { .u_int = 0 } },
+    };
+
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(args[ARG_offsets].u_obj, &bufinfo, MP_BUFFER_READ);
+
+    if(bufinfo.len % 4 != 0) mp_raise_ValueError("set_line_offsets: offsets must be a 32-bit array, eg: array('I')");
+
+    int start = args[ARG_start].u_int;
+    int lines = bufinfo.len / 4;
+    int scroll_group = args[ARG_scroll_group].u_int;
+
+    if(scroll_group < 0 || scroll_group > 7) mp_raise_ValueError("set_line_offsets: scroll_group must be in the range 0 to 7");
+    if(start < 0 || start + lines > self->display->get_display_height()) mp_raise_ValueError("set_line_offsets: lines out of range");
+
+    uint32_t *offsets = (uint32_t *)bufinfo.buf;
+    for(int i = 0; i < lines; i++) {
+        if(offsets[i] >= self->display->max_line_offset()) mp_raise_ValueError("set_line_offsets: offset out of range");
+    }
+
+    self->display->set_line_offsets(offsets, start, lines, scroll_group);
+    self->display_list->set_line_offsets(offsets, start, lines, scroll_group);
+
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_get_line_offset(mp_obj_t self_in, mp_obj_t x, mp_obj_t y) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
+    return mp_obj_new_int(self->display->line_offset({mp_obj_get_int(x), mp_obj_get_int(y)}));
+}
+
 mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
     enum { ARG_self, ARG_filename, ARG_index, ARG_source };
     static const mp_arg_t allowed_args[] = {
@@ -296,6 +377,7 @@ mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     int index = args[ARG_index].u_int;
 
@@ -321,6 +403,7 @@ mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp
             mp_printf(&mp_plat_print, "load_sprite: Not a PNG, loading as a PVS sprite.\n");
             mp_stream_read_exactly(fhandle, (uint8_t *)buf + sizeof(PNG_HEADER), fsize - sizeof(PNG_HEADER), &error);
             self->display->load_pvs_sprite(args[ARG_index].u_int, (uint32_t *)buf, fsize);
+            self->display_list->load_pvs_sprite(args[ARG_index].u_int, (uint32_t *)buf, fsize);
             m_free(buf);
             return mp_const_none;
         }
@@ -333,6 +416,7 @@ mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp
         if (strncmp((const char *)bufinfo.buf, PNG_HEADER, sizeof(PNG_HEADER)) != 0) {
             mp_printf(&mp_plat_print, "load_sprite: Not a PNG, loading as a PVS sprite.\n");
             self->display->load_pvs_sprite(args[ARG_index].u_int , (uint32_t*)bufinfo.buf, bufinfo.len);
+            self->display_list->load_pvs_sprite(args[ARG_index].u_int , (uint32_t*)bufinfo.buf, bufinfo.len);
             m_del(uint8_t, bufinfo.buf, bufinfo.len);
 
             return mp_const_none;
@@ -418,8 +502,10 @@ mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp
         if (status == 0) {
             if(bytes_per_pixel == 1) {
                 self->display->define_palette_sprite(args[ARG_index].u_int, width, height, (uint8_t *)(decode_target->target));
+                self->display_list->define_palette_sprite(args[ARG_index].u_int, width, height, (uint8_t *)(decode_target->target));
             } else {
                 self->display->define_sprite(args[ARG_index].u_int, width, height, (uint16_t *)(decode_target->target));
+                self->display_list->define_sprite(args[ARG_index].u_int, width, height, (uint16_t *)(decode_target->target));
             }
         }
         result = status == 0 ? mp_const_true : mp_const_false;
@@ -432,6 +518,125 @@ mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp
     return result;
 }
 
+// Sprite bundles are written by tools/assets/pack_sprites.py, see there for the format
+static const char SPRITE_BUNDLE_MAGIC[] = {'P', 'V', 'S', 'B'};
+static constexpr uint32_t SPRITE_BUNDLE_HEADER_LEN = 12;
+
+typedef struct _SpriteBundleReader {
+    mp_obj_t file;
+    const uint8_t *buf;
+    size_t len;
+
+    bool read(void *dest, size_t n) {
+        if(file != MP_OBJ_NULL) {
+            int error;
+            return mp_stream_read_exactly(file, dest, n, &error) == n;
+        }
+        if(n > len) return false;
+        memcpy(dest, buf, n);
+        buf += n;
+        len -= n;
+        return true;
+    }
+} _SpriteBundleReader;
+
+// Writes a sprite bundle into the current PSRAM bank, reading a chunk while the previous one is written
+static void load_sprite_bundle_into_bank(DVDisplay *display, mp_obj_t bundle, uint32_t *chunks[2]) {
+    _SpriteBundleReader reader = {MP_OBJ_NULL, nullptr, 0};
+    if(mp_obj_is_str(bundle)) {
+        GET_STR_DATA_LEN(bundle, str, str_len);
+        int32_t fsize;
+        reader.file = (mp_obj_t)pngdec_open_callback((const char*)str, &fsize);
+    } else {
+        mp_buffer_info_t bufinfo;
+        mp_get_buffer_raise(bundle, &bufinfo, MP_BUFFER_READ);
+        reader.buf = (const uint8_t *)bufinfo.buf;
+        reader.len = bufinfo.len;
+    }
+
+    const char *error = nullptr;
+    uint16_t *table = nullptr;
+    uint16_t num_sprites = 0;
+
+    uint8_t header[SPRITE_BUNDLE_HEADER_LEN];
+    if(!reader.read(header, sizeof(header)) || memcmp(header, SPRITE_BUNDLE_MAGIC, sizeof(SPRITE_BUNDLE_MAGIC)) != 0) {
+        error = "load_sprite_bundle: not a sprite bundle";
+    } else {
+        uint16_t first_index = header[4] | (header[5] << 8);
+        uint16_t num_indexes = header[6] | (header[7] << 8);
+        num_sprites = header[8] | (header[9] << 8);
+
+        if(first_index + num_indexes > DVDisplay::get_max_num_sprites()) {
+            error = "load_sprite_bundle: bundle doesn't fit in the sprite indexes";
+        } else {
+            table = m_new(uint16_t, num_sprites * 2);
+            if(!reader.read(table, num_sprites * 4)) error = "load_sprite_bundle: bundle is corrupt";
+        }
+
+        const uint32_t sprite_size = DVDisplay::get_sprite_size();
+        uint32_t fences[2] = {0, 0};
+        bool pending[2] = {false, false};
+        int buf = 0;
+        for(uint16_t i = 0; i < num_sprites && !error; ++i) {
+            uint16_t index = table[i * 2];
+            uint32_t len = (table[i * 2 + 1] + 3) & ~3;
+            if(index + (len + sprite_size - 1) / sprite_size > num_indexes) {
+                error = "load_sprite_bundle: bundle is corrupt";
+                break;
+            }
+
+            // Sprites larger than a chunk run on into the following index, so are written a chunk at a time
+            for(uint32_t offset = 0; offset < len; offset += sprite_size) {
+                uint32_t chunk_len = std::min(sprite_size, len - offset);
+                if(pending[buf]) display->wait_for_fence(fences[buf]);
+                if(!reader.read(chunks[buf], chunk_len)) {
+                    error = "load_sprite_bundle: bundle is corrupt";
+                    break;
+                }
+                fences[buf] = display->queue_sprite_data(first_index + index, offset, chunks[buf], chunk_len);
+                pending[buf] = true;
+                buf ^= 1;
+            }
+        }
+        display->raw_wait_for_finish_blocking();
+    }
+
+    if(table) m_del(uint16_t, table, num_sprites * 2);
+    if(reader.file != MP_OBJ_NULL) pngdec_close_callback(reader.file);
+    if(error) mp_raise_ValueError(error);
+}
+
+mp_obj_t ModPicoGraphics_load_sprite_bundle(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_self, ARG_bundle, ARG_both_buffers };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_bundle, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_both_buffers, MP_ARG_BOOL, {.u_bool = true} }
+    };
+
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    const uint32_t chunk_words = DVDisplay::get_sprite_size() / 4;
+    uint32_t *chunks[2] = {m_new(uint32_t, chunk_words), m_new(uint32_t, chunk_words)};
+
+    load_sprite_bundle_into_bank(self->display, args[ARG_bundle].u_obj, chunks);
+    if(args[ARG_both_buffers].u_bool) {
+        // The other bank can only be written once it's been flipped to, so flip there and back
+        self->display->flip();
+        load_sprite_bundle_into_bank(self->display, args[ARG_bundle].u_obj, chunks);
+        self->display->flip();
+    }
+
+    m_del(uint32_t, chunks[0], chunk_words);
+    m_del(uint32_t, chunks[1], chunk_words);
+
+    return mp_const_none;
+}
+
 mp_obj_t ModPicoGraphics_load_animation(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
     enum { ARG_self, ARG_slot, ARG_data, ARG_frame_size, ARG_source };
 
@@ -449,6 +654,7 @@ mp_obj_t ModPicoGraphics_load_animation(size_t n_args, const mp_obj_t *pos_args,
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     int start_slot = args[ARG_slot].u_int;
     int slot = start_slot;
@@ -524,6 +730,7 @@ mp_obj_t ModPicoGraphics_load_animation(size_t n_args, const mp_obj_t *pos_args,
                     // Advance to the next row
                     data += tilesheet_w - frame_w;
                 }
+                self->display_list->define_palette_sprite(slot, frame_w, frame_h, buf);
                 self->display->define_palette_sprite(slot++, frame_w, frame_h, buf);
             }
         }
@@ -545,6 +752,7 @@ mp_obj_t ModPicoGraphics_load_animation(size_t n_args, const mp_obj_t *pos_args,
                     }
                     data += tilesheet_w - frame_w;
                 }
+                self->display_list->define_sprite(slot, frame_w, frame_h, buf);
                 self->display->define_sprite(slot++, frame_w, frame_h, buf);
             }
         }
@@ -557,131 +765,175 @@ mp_obj_t ModPicoGraphics_load_animation(size_t n_args, const mp_obj_t *pos_args,
     return mp_obj_new_list(frames_x * frames_y, tuple);
 }
 
+struct TilemapArgs {
+    Tilemap tilemap;
+    Point origin;
+};
+
+// Point a tilemap at its map and tile sheet buffers, once its size and tile size are set
+static void get_tilemap_buffers(Tilemap &tilemap, PicoGraphicsDV *graphics, mp_obj_t map_in, mp_obj_t tile_data_in) {
+    mp_buffer_info_t tilesheet_data;
+    mp_buffer_info_t tilemap_data;
+
+    if(tilemap.width < 0 || tilemap.height < 0) mp_raise_ValueError("tilemap: bounds must not be negative");
+    if(tilemap.tile_width <= 0 || tilemap.tile_height <= 0) mp_raise_ValueError("tilemap: tile size must be positive");
+
+    // sprite data
+    mp_obj_tuple_t *tuple_tile_data = MP_OBJ_TO_PTR2(tile_data_in, mp_obj_tuple_t);
+
+    if(tuple_tile_data->len != 3) mp_raise_ValueError("tilemap: tile_data tuple must contain (w, h, data)");
+
+    tilemap.sheet_width = mp_obj_get_int(tuple_tile_data->items[0]);
+    tilemap.sheet_height = mp_obj_get_int(tuple_tile_data->items[1]);
+    mp_get_buffer_raise(tuple_tile_data->items[2], &tilesheet_data, MP_BUFFER_READ);
+    tilemap.sheet = tilesheet_data.buf;
+
+    size_t bytes_per_pixel = graphics->pen_type == PicoGraphics::PEN_DV_P5 ? 1 : 2;
+    if(tilemap.sheet_width < 0 || tilemap.sheet_height < 0 || tilesheet_data.len < (size_t)(tilemap.sheet_width * tilemap.sheet_height) * bytes_per_pixel) {
+        mp_raise_ValueError("tilemap: tile_data is too small for its size");
+    }
+
+    // 16-bit maps, eg: array("H"), can also flip tiles
+    mp_get_buffer_raise(map_in, &tilemap_data, MP_BUFFER_READ);
+    tilemap.map = tilemap_data.buf;
+    tilemap.wide_entries = tilemap_data.typecode == 'H' || tilemap_data.typecode == 'h';
+
+    size_t map_len = tilemap_data.len / (tilemap.wide_entries ? 2 : 1);
+    if(map_len < (size_t)(tilemap.width * tilemap.height)) mp_raise_ValueError("tilemap: tilemap is too small for bounds");
+}
+
+static void replay_tilemap(PicoGraphicsDV &graphics, const void *args, size_t len) {
+    (void)len;
+    const TilemapArgs *t = (const TilemapArgs *)args;
+    t->tilemap.draw(graphics, t->origin);
+}
+
 mp_obj_t ModPicoGraphics_tilemap(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
-    enum { ARG_self, ARG_tilemap, ARG_bounds, ARG_tile_data };
+    enum { ARG_self, ARG_tilemap, ARG_bounds, ARG_tile_data, ARG_tile_width, ARG_tile_height };
 
     static const mp_arg_t allowed_args[] = {
         { MP_QSTR_, MP_ARG_REQUIRED | MP_ARG_OBJ },
         { MP_QSTR_tilemap, MP_ARG_REQUIRED | MP_ARG_OBJ },
         { MP_QSTR_bounds, MP_ARG_REQUIRED | MP_ARG_OBJ },
         { MP_QSTR_tile_data, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_tile_width, MP_ARG_INT, {.u_int = 16} },
+        { MP_QSTR_tile_height, MP_ARG_INT, {.u_int = 16} },
     };
 
-    mp_buffer_info_t tilesheet_data;
-    mp_buffer_info_t tilemap_data;
-
     mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    TilemapArgs t;
+    Tilemap &tilemap = t.tilemap;
 
     // drawing region
     mp_obj_tuple_t *tuple_bounds = MP_OBJ_TO_PTR2(args[ARG_bounds].u_obj, mp_obj_tuple_t);
 
     if(tuple_bounds->len != 4) mp_raise_ValueError("tilemap: bounds tuple must contain (x, y, w, h)");
 
-    int origin_x = mp_obj_get_int(tuple_bounds->items[0]);
-    int origin_y = mp_obj_get_int(tuple_bounds->items[1]);
-    int tiles_x = mp_obj_get_int(tuple_bounds->items[2]);
-    int tiles_y = mp_obj_get_int(tuple_bounds->items[3]);
+    t.origin.x = mp_obj_get_int(tuple_bounds->items[0]);
+    t.origin.y = mp_obj_get_int(tuple_bounds->items[1]);
+    tilemap.width = mp_obj_get_int(tuple_bounds->items[2]);
+    tilemap.height = mp_obj_get_int(tuple_bounds->items[3]);
 
-    // sprite data
-    mp_obj_tuple_t *tuple_tile_data = MP_OBJ_TO_PTR2(args[ARG_tile_data].u_obj, mp_obj_tuple_t);
+    tilemap.tile_width = args[ARG_tile_width].u_int;
+    tilemap.tile_height = args[ARG_tile_height].u_int;
 
-    if(tuple_tile_data->len != 3) mp_raise_ValueError("tilemap: tile_data tuple must contain (w, h, data)");
+    get_tilemap_buffers(tilemap, self->graphics, args[ARG_tilemap].u_obj, args[ARG_tile_data].u_obj);
 
-    int tilesheet_stride = mp_obj_get_int(tuple_tile_data->items[0]);
-    mp_get_buffer_raise(tuple_tile_data->items[2], &tilesheet_data, MP_BUFFER_READ);
+    tilemap.draw(*self->graphics, t.origin);
 
-    mp_get_buffer_raise(args[ARG_tilemap].u_obj, &tilemap_data, MP_BUFFER_READ);
+    // The tilemap and tilesheet buffers are referenced, not copied, so must not change before the replay
+    self->display_list->callback(replay_tilemap, &t, sizeof(t));
 
-    uint8_t *tilemap = (uint8_t *)tilemap_data.buf;
+    return mp_const_none;
+}
 
-    if(self->graphics->pen_type == PicoGraphics::PEN_DV_P5) {
+mp_obj_t ModPicoGraphics_create_surface(mp_obj_t self_in, mp_obj_t width_in, mp_obj_t height_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-        uint8_t *pixel_data = (uint8_t *)tilesheet_data.buf;
+    int width = mp_obj_get_int(width_in);
+    int height = mp_obj_get_int(height_in);
+    if(width <= 0 || height <= 0 || width > 0xFFFF || height > 0xFFFF) mp_raise_ValueError("create_surface: invalid size");
 
-        for(auto y = 0; y < tiles_y * 16; y++) {
-            int tile_y = y / 16 * tiles_x;
-            for(auto x = 0; x < tiles_x * 16; x++) {
-                int tile_x = x / 16;
-                int tile_index = tile_x + tile_y;
-                int tile = tilemap[tile_index];
-                if(tile == 0) continue;
-                tile--;
-                tile &= 0b1111;
+    int surface = self->display->create_surface(width, height);
+    if(surface < 0) mp_raise_msg(&mp_type_RuntimeError, "create_surface: not enough free PSRAM");
 
-                int tilesheet_x = (tile & 0b11) * 16;
-                int tilesheet_y = ((tile >> 2) & 0b11) * 16;
+    return mp_obj_new_int(surface);
+}
 
-                int tile_pixel_x = (x & 0b1111) + tilesheet_x;
-                int tile_pixel_y = (y & 0b1111) + tilesheet_y;
+mp_obj_t ModPicoGraphics_free_surface(mp_obj_t self_in, mp_obj_t surface) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
+    self->display->free_surface(mp_obj_get_int(surface));
+    return mp_const_none;
+}
 
-                int tilesheet_index = tile_pixel_y * tilesheet_stride + tile_pixel_x;
+mp_obj_t ModPicoGraphics_get_free_surface_memory(mp_obj_t self_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    return mp_obj_new_int(self->display->get_free_surface_bytes());
+}
 
-                uint8_t tile_pixel = pixel_data[tilesheet_index];
+struct BlitArgs {
+    int src;
+    Rect src_rect;
+    int dst;
+    Point dst_point;
+    int32_t transparent;
+};
+
+static void replay_blit(PicoGraphicsDV &graphics, const void *args, size_t len) {
+    (void)len;
+    const BlitArgs *b = (const BlitArgs *)args;
+    graphics.driver.blit(b->src, b->src_rect, b->dst, b->dst_point, b->transparent, b->dst == DVDisplay::FRAME_SURFACE ? &graphics.clip : nullptr);
+}
 
-                if((tile_pixel & 0x01) == 0) continue;
+mp_obj_t ModPicoGraphics_blit(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_self, ARG_src_surface, ARG_src_rect, ARG_dst_point, ARG_transparent, ARG_dst_surface };
 
-                self->graphics->set_pen((tile_pixel >> 2) & 0x1f);
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_src_surface, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_src_rect, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_dst_point, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_transparent, MP_ARG_INT, {.u_int = -1} },
+        { MP_QSTR_dst_surface, MP_ARG_OBJ, {.u_obj = mp_const_none} },
+    };
 
-                self->graphics->pixel({
-                    origin_x + x,
-                    origin_y + y
-                });
-            }
-        }
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
-    } else {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-        uint16_t *pixel_data = (uint16_t *)tilesheet_data.buf;
-
-        for(auto y = 0; y < tiles_y * 16; y++) {
-            int tile_y = y / 16 * tiles_x;
-            for(auto x = 0; x < tiles_x * 16; x++) {
-                int tile_x = x / 16;
-                int tile_index = tile_x + tile_y;
-                int tile = tilemap[tile_index];
-                if(tile == 0) continue;
-                tile--;
-                tile &= 0b1111;
-
-                int tilesheet_x = (tile & 0b11) * 16;
-                int tilesheet_y = ((tile >> 2) & 0b11) * 16;
-
-                int tile_pixel_x = (x & 0b1111) + tilesheet_x;
-                int tile_pixel_y = (y & 0b1111) + tilesheet_y;
-
-                int tilesheet_index = tile_pixel_y * tilesheet_stride + tile_pixel_x;
-
-                RGB555 tile_pixel = pixel_data[tilesheet_index];
-
-                if((tile_pixel & 0x8000) == 0) continue;
-
-                uint8_t r, g, b;
-
-                switch(self->graphics->pen_type) {
-                    case PicoGraphics::PEN_DV_RGB888:
-                        r = (tile_pixel & 0x7c00) >> 7;
-                        g = (tile_pixel & 0x03e0) >> 2;
-                        b = (tile_pixel & 0x001f) << 3;
-                        self->graphics->set_pen(RGB(r, g, b).to_rgb888());
-                        break;
-                    case PicoGraphics::PEN_DV_RGB555:
-                        self->graphics->set_pen((RGB555)tile_pixel);
-                        break;
-                    default:  // Non-dv pen types
-                        break;
-                };
-                self->graphics->pixel({
-                    origin_x + x,
-                    origin_y + y
-                });
-            }
+    BlitArgs b;
 
-        }
+    // None is the frame
+    b.src = args[ARG_src_surface].u_obj == mp_const_none ? DVDisplay::FRAME_SURFACE : mp_obj_get_int(args[ARG_src_surface].u_obj);
+    b.dst = args[ARG_dst_surface].u_obj == mp_const_none ? DVDisplay::FRAME_SURFACE : mp_obj_get_int(args[ARG_dst_surface].u_obj);
+
+    mp_obj_tuple_t *tuple_rect = MP_OBJ_TO_PTR2(args[ARG_src_rect].u_obj, mp_obj_tuple_t);
+    if(tuple_rect->len != 4) mp_raise_ValueError("blit: src_rect tuple must contain (x, y, w, h)");
+    b.src_rect = Rect(mp_obj_get_int(tuple_rect->items[0]), mp_obj_get_int(tuple_rect->items[1]),
+                      mp_obj_get_int(tuple_rect->items[2]), mp_obj_get_int(tuple_rect->items[3]));
+
+    mp_obj_tuple_t *tuple_point = MP_OBJ_TO_PTR2(args[ARG_dst_point].u_obj, mp_obj_tuple_t);
+    if(tuple_point->len != 2) mp_raise_ValueError("blit: dst_point tuple must contain (x, y)");
+    b.dst_point = Point(mp_obj_get_int(tuple_point->items[0]), mp_obj_get_int(tuple_point->items[1]));
+
+    b.transparent = args[ARG_transparent].u_int;
+
+    // Blits to the frame are clipped like any other drawing
+    if(!self->display->blit(b.src, b.src_rect, b.dst, b.dst_point, b.transparent, b.dst == DVDisplay::FRAME_SURFACE ? &self->graphics->clip : nullptr)) {
+        mp_raise_ValueError("blit: invalid surface, or surface created in a different mode");
     }
 
+    self->display_list->callback(replay_blit, &b, sizeof(b));
+
     return mp_const_none;
 }
 
@@ -701,6 +953,7 @@ mp_obj_t ModPicoGraphics_display_sprite(size_t n_args, const mp_obj_t *pos_args,
     mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
+    finish_flip(MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t));
     dv_display.set_sprite(args[ARG_slot].u_int, 
                           args[ARG_sprite_index].u_int,
                           {args[ARG_x].u_int, args[ARG_y].u_int},
@@ -711,13 +964,166 @@ mp_obj_t ModPicoGraphics_display_sprite(size_t n_args, const mp_obj_t *pos_args,
 }
 
 mp_obj_t ModPicoGraphics_clear_sprite(mp_obj_t self_in, mp_obj_t slot) {
+    finish_flip(MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t));
     dv_display.clear_sprite(mp_obj_get_int(slot));
     return mp_const_none;
 }
 
+mp_obj_t ModPicoGraphics_commit_sprites(mp_obj_t self_in) {
+    finish_flip(MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t));
+    dv_display.commit_sprites();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_set_sprite_commit_mode(mp_obj_t self_in, mp_obj_t mode) {
+    int commit_mode = mp_obj_get_int(mode);
+    if(commit_mode < DVDisplay::SPRITE_COMMIT_IMMEDIATE || commit_mode > DVDisplay::SPRITE_COMMIT_AUTO) {
+        mp_raise_ValueError("set_sprite_commit_mode: invalid mode");
+    }
+    dv_display.set_sprite_commit_mode((DVDisplay::SpriteCommitMode)commit_mode);
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_get_sprite_bytes_saved(mp_obj_t self_in) {
+    (void)self_in;
+    return mp_obj_new_int(dv_display.get_sprite_bytes_saved());
+}
+
+mp_obj_t ModPicoGraphics_flush(mp_obj_t self_in) {
+    finish_flip(MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t));
+    dv_display.flush();
+    // Also wait for queued fills to finish
+    dv_display.raw_wait_for_finish_blocking();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_set_pixel_buffer_size(mp_obj_t self_in, mp_obj_t size) {
+    (void)self_in;
+    int len_in_bytes = mp_obj_get_int(size);
+    if(len_in_bytes < 0) mp_raise_ValueError("set_pixel_buffer_size: size must be positive");
+    dv_display.set_pixel_buffer_size(len_in_bytes);
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_get_pixel_buffer_stats(mp_obj_t self_in) {
+    (void)self_in;
+    mp_obj_t tuple[2] = {
+        mp_obj_new_int(dv_display.get_pixels_buffered()),
+        mp_obj_new_int(dv_display.get_pixel_buffer_writes())
+    };
+    return mp_obj_new_tuple(2, tuple);
+}
+
+mp_obj_t ModPicoGraphics_reset_pixel_buffer_stats(mp_obj_t self_in) {
+    (void)self_in;
+    dv_display.reset_pixel_buffer_stats();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_get_psram_stats(mp_obj_t self_in) {
+    (void)self_in;
+    mp_obj_t tuple[3] = {
+        mp_obj_new_int(dv_display.get_ram_queued_transfers()),
+        mp_obj_new_int(dv_display.get_ram_max_queue_depth()),
+        mp_obj_new_int(dv_display.get_ram_stall_us())
+    };
+    return mp_obj_new_tuple(3, tuple);
+}
+
+mp_obj_t ModPicoGraphics_reset_psram_stats(mp_obj_t self_in) {
+    (void)self_in;
+    dv_display.reset_ram_stats();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_set_glyph_cache_size(mp_obj_t self_in, mp_obj_t size) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    int len_in_bytes = mp_obj_get_int(size);
+    if(len_in_bytes < 0) mp_raise_ValueError("set_glyph_cache_size: size must be positive");
+    self->glyph_cache->set_size(len_in_bytes);
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_get_glyph_cache_stats(mp_obj_t self_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    mp_obj_t tuple[4] = {
+        mp_obj_new_int(self->glyph_cache->get_hits()),
+        mp_obj_new_int(self->glyph_cache->get_misses()),
+        mp_obj_new_int(self->glyph_cache->get_evictions()),
+        mp_obj_new_int(self->glyph_cache->get_used())
+    };
+    return mp_obj_new_tuple(4, tuple);
+}
+
+mp_obj_t ModPicoGraphics_reset_glyph_cache_stats(mp_obj_t self_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    self->glyph_cache->reset_stats();
+    return mp_const_none;
+}
+
+static void stats_store(mp_obj_t dict, qstr key, uint32_t value) {
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(key), mp_obj_new_int_from_uint(value));
+}
+
+mp_obj_t ModPicoGraphics_stats(mp_obj_t self_in) {
+    (void)self_in;
+    mp_obj_t stats = mp_obj_new_dict(0);
+#if PICOVISION_STATS
+    stats_store(stats, MP_QSTR_psram_transfers, dv_display.get_ram_queued_transfers() + dv_display.get_ram_direct_transfers());
+    stats_store(stats, MP_QSTR_psram_bytes_written, dv_display.get_ram_bytes_written());
+    stats_store(stats, MP_QSTR_psram_bytes_read, dv_display.get_ram_bytes_read());
+    stats_store(stats, MP_QSTR_psram_page_splits, dv_display.get_ram_page_splits());
+    stats_store(stats, MP_QSTR_psram_max_queue_depth, dv_display.get_ram_max_queue_depth());
+    stats_store(stats, MP_QSTR_psram_wait_us, dv_display.get_ram_stall_us());
+    stats_store(stats, MP_QSTR_i2c_transfers, dv_display.get_i2c_transfers());
+    stats_store(stats, MP_QSTR_i2c_bytes, dv_display.get_i2c_bytes());
+    stats_store(stats, MP_QSTR_pixels_buffered, dv_display.get_pixels_buffered());
+    stats_store(stats, MP_QSTR_pixel_buffer_writes, dv_display.get_pixel_buffer_writes());
+    stats_store(stats, MP_QSTR_flips, dv_display.get_flips());
+    stats_store(stats, MP_QSTR_flips_shown, dv_display.get_flips_shown());
+    stats_store(stats, MP_QSTR_flip_us, dv_display.get_flip_us());
+    stats_store(stats, MP_QSTR_flip_wait_us, dv_display.get_flip_wait_us());
+    stats_store(stats, MP_QSTR_flip_latency_us, dv_display.get_flip_latency_us());
+    stats_store(stats, MP_QSTR_flip_latency_max_us, dv_display.get_flip_latency_max_us());
+    stats_store(stats, MP_QSTR_missed_vsyncs, dv_display.get_missed_vsyncs());
+
+    mp_obj_t frame_vsyncs[DVDisplay::FRAME_VSYNCS_LEN];
+    for(auto i = 0; i < DVDisplay::FRAME_VSYNCS_LEN; i++) {
+        frame_vsyncs[i] = mp_obj_new_int_from_uint(dv_display.get_frame_vsyncs(i + 1));
+    }
+    mp_obj_dict_store(stats, MP_OBJ_NEW_QSTR(MP_QSTR_frame_vsyncs), mp_obj_new_tuple(DVDisplay::FRAME_VSYNCS_LEN, frame_vsyncs));
+#endif
+    return stats;
+}
+
+mp_obj_t ModPicoGraphics_reset_stats(mp_obj_t self_in) {
+    (void)self_in;
+    dv_display.reset_stats();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_start_recording(mp_obj_t self_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    self->display_list->start();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_stop_recording(mp_obj_t self_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    self->display_list->stop();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_get_recording_size(mp_obj_t self_in) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    return mp_obj_new_int(self->display_list->size());
+}
+
 mp_obj_t ModPicoGraphics_set_font(mp_obj_t self_in, mp_obj_t font) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
     self->graphics->set_font(mp_obj_to_string_r(font));
+    self->display_list->set_font();
     return mp_const_none;
 }
 
@@ -731,8 +1137,46 @@ mp_obj_t ModPicoGraphics_get_bounds(mp_obj_t self_in) {
 }
 
 mp_obj_t ModPicoGraphics_update(mp_obj_t self_in) {
-    (void)self_in;
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
     dv_display.flip();
+    self->display_list->replay();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_flip_async(mp_obj_t self_in) {
+    finish_flip(MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t));
+    dv_display.flip_async();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_is_flipping(mp_obj_t self_in) {
+    (void)self_in;
+    return dv_display.is_flip_pending() ? mp_const_true : mp_const_false;
+}
+
+mp_obj_t ModPicoGraphics_wait_for_flip(mp_obj_t self_in) {
+    finish_flip(MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t));
+    return mp_const_none;
+}
+
+// Runs in the vsync interrupt, so the callback is scheduled to run later as a soft IRQ
+static void ModPicoGraphics_on_vsync(void* context) {
+    ModPicoGraphics_obj_t *self = (ModPicoGraphics_obj_t *)context;
+    mp_sched_schedule(self->vsync_callback, MP_OBJ_FROM_PTR(self));
+}
+
+mp_obj_t ModPicoGraphics_set_vsync_callback(mp_obj_t self_in, mp_obj_t callback) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    if(callback == mp_const_none) {
+        dv_display.set_vsync_handler(nullptr, nullptr);
+        self->vsync_callback = mp_const_none;
+        return mp_const_none;
+    }
+    if(!mp_obj_is_callable(callback)) mp_raise_TypeError("set_vsync_callback: callback must be callable or None");
+    dv_display.set_vsync_handler(nullptr, nullptr);
+    self->vsync_callback = callback;
+    dv_display.set_vsync_handler(ModPicoGraphics_on_vsync, self);
     return mp_const_none;
 }
 
@@ -774,38 +1218,47 @@ mp_obj_t ModPicoGraphics_module_RGB_to_RGB565(mp_obj_t r, mp_obj_t g, mp_obj_t b
 
 mp_obj_t ModPicoGraphics_set_pen(mp_obj_t self_in, mp_obj_t pen) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->set_pen(mp_obj_get_int(pen));
+    self->display_list->set_pen(mp_obj_get_int(pen));
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_set_bg(mp_obj_t self_in, mp_obj_t pen) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->set_bg(mp_obj_get_int(pen));
+    self->display_list->set_bg(mp_obj_get_int(pen));
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_set_blend_mode(mp_obj_t self_in, mp_obj_t pen) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->set_blend_mode((BlendMode)mp_obj_get_int(pen));
+    self->display_list->set_blend_mode((BlendMode)mp_obj_get_int(pen));
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_set_depth(mp_obj_t self_in, mp_obj_t depth) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->set_depth(mp_obj_get_int(depth));
+    self->display_list->set_depth(mp_obj_get_int(depth));
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_reset_pen(mp_obj_t self_in, mp_obj_t pen) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->reset_pen(mp_obj_get_int(pen));
 
@@ -816,6 +1269,7 @@ mp_obj_t ModPicoGraphics_update_pen(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_i, ARG_r, ARG_g, ARG_b };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->update_pen(
         mp_obj_get_int(args[ARG_i]) & 0xff,
@@ -860,6 +1314,7 @@ mp_obj_t ModPicoGraphics_create_pen_hsv(size_t n_args, const mp_obj_t *args) {
 
 mp_obj_t ModPicoGraphics_set_remote_palette(mp_obj_t self_in, mp_obj_t index) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->display->set_display_palette_index(mp_obj_get_int(index));
 
@@ -868,16 +1323,39 @@ mp_obj_t ModPicoGraphics_set_remote_palette(mp_obj_t self_in, mp_obj_t index) {
 
 mp_obj_t ModPicoGraphics_set_local_palette(mp_obj_t self_in, mp_obj_t index) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->display->set_local_palette_index(mp_obj_get_int(index));
 
     return mp_const_none;
 }
 
+mp_obj_t ModPicoGraphics_build_palette_lut(size_t n_args, const mp_obj_t *args) {
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[0], ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    if(self->graphics->pen_type != PicoGraphics::PEN_DV_P5) mp_raise_ValueError("build_palette_lut(): needs PEN_P5");
+    PicoGraphics_PenDV_P5 *graphics = (PicoGraphics_PenDV_P5 *)self->graphics;
+
+    if(n_args == 2 && args[1] != mp_const_none) {
+        int palette_idx = mp_obj_get_int(args[1]);
+        if(palette_idx < 0 || palette_idx >= DVDisplay::NUM_PALETTES) mp_raise_ValueError("build_palette_lut(): palette index out of range");
+        graphics->build_palette_lut(palette_idx);
+    } else {
+        for(auto i = 0; i < DVDisplay::NUM_PALETTES; i++) {
+            graphics->build_palette_lut(i);
+        }
+    }
+
+    return mp_const_none;
+}
+
 mp_obj_t ModPicoGraphics_set_thickness(mp_obj_t self_in, mp_obj_t pen) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->set_thickness(mp_obj_get_int(pen));
+    self->display_list->set_thickness(mp_obj_get_int(pen));
 
     return mp_const_none;
 }
@@ -887,6 +1365,24 @@ mp_obj_t ModPicoGraphics_set_palette(size_t n_args, const mp_obj_t *pos_args, mp
     const mp_obj_t *tuples = pos_args + 1;
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(pos_args[0], ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    // A buffer of R, G, B bytes replaces the current palette, or both palettes, in one go
+    mp_buffer_info_t bufinfo;
+    if(n_args == 2 && !mp_obj_is_type(pos_args[1], &mp_type_list) && mp_get_buffer(pos_args[1], &bufinfo, MP_BUFFER_READ)) {
+        if(self->graphics->pen_type != PicoGraphics::PEN_DV_P5) mp_raise_ValueError("set_palette(): palette buffers need PEN_P5");
+
+        const size_t palette_bytes = DVDisplay::PALETTE_SIZE * 3;
+        PicoGraphics_PenDV_P5 *graphics = (PicoGraphics_PenDV_P5 *)self->graphics;
+        if(bufinfo.len == palette_bytes) {
+            graphics->set_palette((const uint8_t *)bufinfo.buf, self->display->get_local_palette_index(), 1);
+        } else if(bufinfo.len == palette_bytes * DVDisplay::NUM_PALETTES) {
+            graphics->set_palette((const uint8_t *)bufinfo.buf, 0, DVDisplay::NUM_PALETTES);
+        } else {
+            mp_raise_ValueError("set_palette(): buffer must hold 32 or 64 colours as R, G, B bytes");
+        }
+        return mp_const_none;
+    }
 
     // Check if there is only one argument, which might be a list
     if(n_args == 2) {
@@ -926,40 +1422,52 @@ mp_obj_t ModPicoGraphics_set_clip(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_x, ARG_y, ARG_w, ARG_h };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-    self->graphics->set_clip({
+    Rect r(
         mp_obj_get_int(args[ARG_x]),
         mp_obj_get_int(args[ARG_y]),
         mp_obj_get_int(args[ARG_w]),
         mp_obj_get_int(args[ARG_h])
-    });
+    );
+
+    self->graphics->set_clip(r);
+    self->display_list->set_clip(r);
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_remove_clip(mp_obj_t self_in) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->remove_clip();
+    self->display_list->remove_clip();
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_clear(mp_obj_t self_in) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     self->graphics->clear();
+    self->display_list->clear();
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_pixel(mp_obj_t self_in, mp_obj_t x, mp_obj_t y) {
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-    self->graphics->pixel({
+    Point p(
         mp_obj_get_int(x),
         mp_obj_get_int(y)
-    });
+    );
+
+    self->graphics->pixel(p);
+    self->display_list->pixel(p);
 
     return mp_const_none;
 }
@@ -968,11 +1476,16 @@ mp_obj_t ModPicoGraphics_pixel_span(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_x, ARG_y, ARG_l };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-    self->graphics->pixel_span({
+    Point p(
         mp_obj_get_int(args[ARG_x]),
         mp_obj_get_int(args[ARG_y])
-    },  mp_obj_get_int(args[ARG_l]));
+    );
+    int l = mp_obj_get_int(args[ARG_l]);
+
+    self->graphics->pixel_span(p, l);
+    self->display_list->pixel_span(p, l);
 
     return mp_const_none;
 }
@@ -981,13 +1494,17 @@ mp_obj_t ModPicoGraphics_rectangle(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_x, ARG_y, ARG_w, ARG_h };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-    self->graphics->rectangle({
+    Rect r(
         mp_obj_get_int(args[ARG_x]),
         mp_obj_get_int(args[ARG_y]),
         mp_obj_get_int(args[ARG_w]),
         mp_obj_get_int(args[ARG_h])
-    });
+    );
+
+    self->graphics->rectangle(r);
+    self->display_list->rectangle(r);
 
     return mp_const_none;
 }
@@ -996,11 +1513,16 @@ mp_obj_t ModPicoGraphics_circle(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_x, ARG_y, ARG_r };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-    self->graphics->circle({
+    Point p(
         mp_obj_get_int(args[ARG_x]),
         mp_obj_get_int(args[ARG_y])
-    },  mp_obj_get_int(args[ARG_r]));
+    );
+    int r = mp_obj_get_int(args[ARG_r]);
+
+    self->graphics->circle(p, r);
+    self->display_list->circle(p, r);
 
     return mp_const_none;
 }
@@ -1019,6 +1541,7 @@ mp_obj_t ModPicoGraphics_character(size_t n_args, const mp_obj_t *pos_args, mp_m
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     int c = mp_obj_get_int(args[ARG_char].u_obj);
     int x = args[ARG_x].u_int;
@@ -1026,6 +1549,7 @@ mp_obj_t ModPicoGraphics_character(size_t n_args, const mp_obj_t *pos_args, mp_m
     int scale = args[ARG_scale].u_int;
 
     self->graphics->character((char)c, Point(x, y), scale);
+    self->display_list->character((char)c, Point(x, y), scale, 0);
 
     return mp_const_none;
 }
@@ -1048,6 +1572,7 @@ mp_obj_t ModPicoGraphics_text(size_t n_args, const mp_obj_t *pos_args, mp_map_t
     mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     mp_obj_t text_obj = args[ARG_text].u_obj;
 
@@ -1066,6 +1591,7 @@ mp_obj_t ModPicoGraphics_text(size_t n_args, const mp_obj_t *pos_args, mp_map_t
     bool fixed_width = args[ARG_fixed_width].u_obj == mp_const_true;
 
     self->graphics->text(t, Point(x, y), wrap, scale, angle, letter_spacing, fixed_width);
+    self->display_list->text(t, Point(x, y), wrap, scale, angle, letter_spacing, fixed_width);
 
     return mp_const_none;
 }
@@ -1107,6 +1633,7 @@ mp_obj_t ModPicoGraphics_polygon(size_t n_args, const mp_obj_t *pos_args, mp_map
     const mp_obj_t *tuples = pos_args + 1;
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(pos_args[0], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
     // Check if there is only one argument, which might be a list
     if(n_args == 2) {
@@ -1139,6 +1666,7 @@ mp_obj_t ModPicoGraphics_polygon(size_t n_args, const mp_obj_t *pos_args, mp_map
             });
         }
         self->graphics->polygon(points);
+        self->display_list->polygon(points);
     }
 
     return mp_const_none;
@@ -1148,15 +1676,14 @@ mp_obj_t ModPicoGraphics_triangle(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_x1, ARG_y1, ARG_x2, ARG_y2, ARG_x3, ARG_y3 };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
 
-    self->graphics->triangle(
-        {mp_obj_get_int(args[ARG_x1]),
-         mp_obj_get_int(args[ARG_y1])},
-        {mp_obj_get_int(args[ARG_x2]),
-         mp_obj_get_int(args[ARG_y2])},
-        {mp_obj_get_int(args[ARG_x3]),
-         mp_obj_get_int(args[ARG_y3])}
-    );
+    Point p1(mp_obj_get_int(args[ARG_x1]), mp_obj_get_int(args[ARG_y1]));
+    Point p2(mp_obj_get_int(args[ARG_x2]), mp_obj_get_int(args[ARG_y2]));
+    Point p3(mp_obj_get_int(args[ARG_x3]), mp_obj_get_int(args[ARG_y3]));
+
+    self->graphics->triangle(p1, p2, p3);
+    self->display_list->triangle(p1, p2, p3);
 
     return mp_const_none;
 }
@@ -1165,30 +1692,26 @@ mp_obj_t ModPicoGraphics_line(size_t n_args, const mp_obj_t *args) {
     enum { ARG_self, ARG_x1, ARG_y1, ARG_x2, ARG_y2, ARG_thickness };
 
     ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self], ModPicoGraphics_obj_t);
+    finish_flip(self);
+
+    Point p1(mp_obj_get_int(args[ARG_x1]), mp_obj_get_int(args[ARG_y1]));
+    Point p2(mp_obj_get_int(args[ARG_x2]), mp_obj_get_int(args[ARG_y2]));
 
     if(n_args == 5) {
-        self->graphics->line(
-            {mp_obj_get_int(args[ARG_x1]),
-            mp_obj_get_int(args[ARG_y1])},
-            {mp_obj_get_int(args[ARG_x2]),
-            mp_obj_get_int(args[ARG_y2])}
-        );
+        self->graphics->line(p1, p2);
+        self->display_list->line(p1, p2);
     }
     else if(n_args == 6) {
-        self->graphics->thick_line(
-            {mp_obj_get_int(args[ARG_x1]),
-            mp_obj_get_int(args[ARG_y1])},
-            {mp_obj_get_int(args[ARG_x2]),
-            mp_obj_get_int(args[ARG_y2])},
-            mp_obj_get_int(args[ARG_thickness])
-        );
+        int thickness = mp_obj_get_int(args[ARG_thickness]);
+        self->graphics->thick_line(p1, p2, thickness);
+        self->display_list->thick_line(p1, p2, thickness);
     }
 
     return mp_const_none;
 }
 
 mp_obj_t ModPicoGraphics_loop(mp_obj_t self_in, mp_obj_t update, mp_obj_t render) {
-    (void)self_in;
+    ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
     /*
     TODO: Uh how do we typecheck a function?
     if(!mp_obj_is_type(update, &mp_type_function)) {
@@ -1197,14 +1720,13 @@ mp_obj_t ModPicoGraphics_loop(mp_obj_t self_in, mp_obj_t update, mp_obj_t render
     if(!mp_obj_is_type(render, &mp_type_function)) {
         mp_raise_TypeError("render(ticks_ms) must be a function.");
     }*/
-    //ModPicoGraphics_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_obj_t);
     absolute_time_t t_start = get_absolute_time();
     mp_obj_t result;
     while(true) {
         uint32_t tick = absolute_time_diff_us(t_start, get_absolute_time()) / 1000;
         result = mp_call_function_1(update, mp_obj_new_int(tick));
         if (result == mp_const_false) break;
-        dv_display.wait_for_flip();
+        finish_flip(self);
         result = mp_call_function_1(render, mp_obj_new_int(tick));
         if (result == mp_const_false) break;
         dv_display.flip_async();
@@ -1363,4 +1885,90 @@ mp_obj_t ModPicoGraphics_get_i2c(mp_obj_t self_in) {
 
     return i2c_obj;
 }
+
+/***** TileScroller *****/
+
+typedef struct _ModPicoGraphics_TileScroller_obj_t {
+    mp_obj_base_t base;
+    mp_obj_t display;
+    mp_obj_t tilemap;
+    mp_obj_t tile_data;
+    TileScroller *scroller;
+} ModPicoGraphics_TileScroller_obj_t;
+
+mp_obj_t ModPicoGraphics_TileScroller_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_kw, const mp_obj_t *all_args) {
+    enum { ARG_display, ARG_tilemap, ARG_size, ARG_tile_data, ARG_tile_width, ARG_tile_height, ARG_background, ARG_scroll_group };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_display, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_tilemap, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_size, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_tile_data, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_tile_width, MP_ARG_INT, { .u_int = 16 } },
+        { MP_QSTR_tile_height, MP_ARG_INT, { .u_int = 16 } },
+        { MP_QSTR_background, MP_ARG_INT, { .u_int = 0 } },
+        { MP_QSTR_scroll_group, MP_ARG_INT, { .u_int = 1 } },
+    };
+
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all_kw_array(n_args, n_kw, all_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+
+    if(!mp_obj_is_type(args[ARG_display].u_obj, &ModPicoGraphics_type)) mp_raise_ValueError("TileScroller: display must be a PicoVision");
+    ModPicoGraphics_obj_t *display = MP_OBJ_TO_PTR2(args[ARG_display].u_obj, ModPicoGraphics_obj_t);
+
+    int scroll_group = args[ARG_scroll_group].u_int;
+    if(scroll_group < 1 || scroll_group > 7) mp_raise_ValueError("TileScroller: scroll_group must be 1 to 7");
+
+    mp_obj_tuple_t *tuple_size = MP_OBJ_TO_PTR2(args[ARG_size].u_obj, mp_obj_tuple_t);
+    if(tuple_size->len != 2) mp_raise_ValueError("TileScroller: size tuple must contain (w, h)");
+
+    Tilemap tilemap;
+    tilemap.width = mp_obj_get_int(tuple_size->items[0]);
+    tilemap.height = mp_obj_get_int(tuple_size->items[1]);
+    tilemap.tile_width = args[ARG_tile_width].u_int;
+    tilemap.tile_height = args[ARG_tile_height].u_int;
+
+    get_tilemap_buffers(tilemap, display->graphics, args[ARG_tilemap].u_obj, args[ARG_tile_data].u_obj);
+
+    ModPicoGraphics_TileScroller_obj_t *self = m_new_obj(ModPicoGraphics_TileScroller_obj_t);
+    self->base.type = &ModPicoGraphics_TileScroller_type;
+    self->display = args[ARG_display].u_obj;
+    self->tilemap = args[ARG_tilemap].u_obj;
+    self->tile_data = args[ARG_tile_data].u_obj;
+    self->scroller = m_new_class(TileScroller, *display->graphics, tilemap, args[ARG_background].u_int, scroll_group);
+
+    if(!self->scroller->can_scroll_x() && !self->scroller->can_scroll_y()) {
+        mp_raise_msg_varg(&mp_type_ValueError, MP_ERROR_TEXT("TileScroller: frame must be at least %d tiles wide or %d tiles tall to scroll"),
+            self->scroller->get_ring_tiles_needed_x(), self->scroller->get_ring_tiles_needed_y());
+    }
+
+    return MP_OBJ_FROM_PTR(self);
+}
+
+mp_obj_t ModPicoGraphics_TileScroller_scroll_to(mp_obj_t self_in, mp_obj_t x, mp_obj_t y) {
+    ModPicoGraphics_TileScroller_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_TileScroller_obj_t);
+    finish_flip(MP_OBJ_TO_PTR2(self->display, ModPicoGraphics_obj_t));
+    self->scroller->scroll_to(Point(mp_obj_get_int(x), mp_obj_get_int(y)));
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_TileScroller_invalidate(mp_obj_t self_in) {
+    ModPicoGraphics_TileScroller_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_TileScroller_obj_t);
+    self->scroller->invalidate();
+    return mp_const_none;
+}
+
+mp_obj_t ModPicoGraphics_TileScroller_get_camera(mp_obj_t self_in) {
+    ModPicoGraphics_TileScroller_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_TileScroller_obj_t);
+    const Point &camera = self->scroller->get_camera();
+    mp_obj_t tuple[2] = {
+        mp_obj_new_int(camera.x),
+        mp_obj_new_int(camera.y)
+    };
+    return mp_obj_new_tuple(2, tuple);
+}
+
+mp_obj_t ModPicoGraphics_TileScroller_get_tiles_drawn(mp_obj_t self_in) {
+    ModPicoGraphics_TileScroller_obj_t *self = MP_OBJ_TO_PTR2(self_in, ModPicoGraphics_TileScroller_obj_t);
+    return mp_obj_new_int(self->scroller->get_tiles_drawn());
+}
 }
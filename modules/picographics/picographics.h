@@ -25,6 +25,7 @@ enum PicoGraphicsBusType {
 
 // Type
 extern const mp_obj_type_t ModPicoGraphics_type;
+extern const mp_obj_type_t ModPicoGraphics_TileScroller_type;
 
 // Module functions
 extern mp_obj_t ModPicoGraphics_get_required_buffer_size(mp_obj_t display_in, mp_obj_t pen_type_in);
@@ -32,8 +33,15 @@ extern mp_obj_t ModPicoGraphics_get_required_buffer_size(mp_obj_t display_in, mp
 // DV Display specific functions
 extern mp_obj_t ModPicoGraphics_set_scroll_group_offset(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
 extern mp_obj_t ModPicoGraphics_set_scroll_group_for_lines(size_t n_args, const mp_obj_t *args);
+extern mp_obj_t ModPicoGraphics_set_line_offsets(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
+extern mp_obj_t ModPicoGraphics_get_line_offset(mp_obj_t self_in, mp_obj_t x, mp_obj_t y);
 extern mp_obj_t ModPicoGraphics_tilemap(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
+extern mp_obj_t ModPicoGraphics_create_surface(mp_obj_t self_in, mp_obj_t width_in, mp_obj_t height_in);
+extern mp_obj_t ModPicoGraphics_free_surface(mp_obj_t self_in, mp_obj_t surface);
+extern mp_obj_t ModPicoGraphics_get_free_surface_memory(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_blit(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
 extern mp_obj_t ModPicoGraphics_load_animation(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
+extern mp_obj_t ModPicoGraphics_load_sprite_bundle(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
 
 // Class methods
 extern mp_obj_t ModPicoGraphics_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_kw, const mp_obj_t *all_args);
@@ -48,6 +56,7 @@ extern mp_obj_t ModPicoGraphics_hsv_to_rgb(size_t n_args, const mp_obj_t *args);
 
 extern mp_obj_t ModPicoGraphics_set_remote_palette(mp_obj_t self_in, mp_obj_t index);
 extern mp_obj_t ModPicoGraphics_set_local_palette(mp_obj_t self_in, mp_obj_t index);
+extern mp_obj_t ModPicoGraphics_build_palette_lut(size_t n_args, const mp_obj_t *args);
 
 // Pen
 extern mp_obj_t ModPicoGraphics_set_pen(mp_obj_t self_in, mp_obj_t pen);
@@ -81,6 +90,27 @@ extern mp_obj_t ModPicoGraphics_line(size_t n_args, const mp_obj_t *args);
 extern mp_obj_t ModPicoGraphics_load_sprite(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
 extern mp_obj_t ModPicoGraphics_display_sprite(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
 extern mp_obj_t ModPicoGraphics_clear_sprite(mp_obj_t self_in, mp_obj_t slot);
+extern mp_obj_t ModPicoGraphics_commit_sprites(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_set_sprite_commit_mode(mp_obj_t self_in, mp_obj_t mode);
+extern mp_obj_t ModPicoGraphics_get_sprite_bytes_saved(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_flush(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_set_pixel_buffer_size(mp_obj_t self_in, mp_obj_t size);
+extern mp_obj_t ModPicoGraphics_get_pixel_buffer_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_reset_pixel_buffer_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_get_psram_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_reset_psram_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_set_glyph_cache_size(mp_obj_t self_in, mp_obj_t size);
+extern mp_obj_t ModPicoGraphics_get_glyph_cache_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_reset_glyph_cache_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_flip_async(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_is_flipping(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_wait_for_flip(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_set_vsync_callback(mp_obj_t self_in, mp_obj_t callback);
+extern mp_obj_t ModPicoGraphics_reset_stats(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_start_recording(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_stop_recording(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_get_recording_size(mp_obj_t self_in);
 
 // Utility
 extern mp_obj_t ModPicoGraphics_set_font(mp_obj_t self_in, mp_obj_t font);
@@ -107,3 +137,10 @@ extern mp_obj_t ModPicoGraphics_get_gpu_temp(mp_obj_t self_in);
 
 // Loop
 extern mp_obj_t ModPicoGraphics_loop(mp_obj_t self_in, mp_obj_t update, mp_obj_t render);
+
+// TileScroller
+extern mp_obj_t ModPicoGraphics_TileScroller_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_kw, const mp_obj_t *all_args);
+extern mp_obj_t ModPicoGraphics_TileScroller_scroll_to(mp_obj_t self_in, mp_obj_t x, mp_obj_t y);
+extern mp_obj_t ModPicoGraphics_TileScroller_invalidate(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_TileScroller_get_camera(mp_obj_t self_in);
+extern mp_obj_t ModPicoGraphics_TileScroller_get_tiles_drawn(mp_obj_t self_in);
@@ -9,10 +9,21 @@ target_sources(usermod_${MOD_NAME} INTERFACE
     ${CMAKE_CURRENT_LIST_DIR}/${MOD_NAME}.cpp
     ${PIMORONI_PICO_PATH}/libraries/pico_synth/pico_synth.cpp
     ${PICOVISION_PATH}/libraries/pico_synth_i2s/pico_synth_i2s.cpp
+    ${PICOVISION_PATH}/libraries/pico_synth_i2s/synth_block.cpp
+    ${PICOVISION_PATH}/libraries/pico_synth_i2s/sample_voice.cpp
+    ${PICOVISION_PATH}/libraries/pico_synth_i2s/wav_stream.cpp
+    ${PICOVISION_PATH}/libraries/pico_synth_i2s/sequencer.cpp
 )
 
 pico_generate_pio_header(usermod_${MOD_NAME} ${PICOVISION_PATH}/libraries/pico_synth_i2s/pico_synth_i2s.pio)
 
+# Render every sample played, so like the PSRAM driver it's worth -O2 over MicroPython's -Os
+set_source_files_properties(
+    ${PICOVISION_PATH}/libraries/pico_synth_i2s/synth_block.cpp
+    ${PICOVISION_PATH}/libraries/pico_synth_i2s/sample_voice.cpp
+    PROPERTIES COMPILE_OPTIONS "-O2"
+)
+
 
 target_include_directories(usermod_${MOD_NAME} INTERFACE
     ${CMAKE_CURRENT_LIST_DIR}
@@ -21,9 +21,24 @@ MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth___del___obj, PicoSynth___del__);
 MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_set_volume_obj, PicoSynth_set_volume);
 MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_get_volume_obj, PicoSynth_get_volume);
 MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_adjust_volume_obj, PicoSynth_adjust_volume);
-MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_play_sample_obj, PicoSynth_play_sample);
+MP_DEFINE_CONST_FUN_OBJ_KW(PicoSynth_play_sample_obj, 2, PicoSynth_play_sample);
+MP_DEFINE_CONST_FUN_OBJ_KW(PicoSynth_play_wav_obj, 2, PicoSynth_play_wav);
+MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_stop_sample_obj, PicoSynth_stop_sample);
+MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_is_sample_playing_obj, PicoSynth_is_sample_playing);
+MP_DEFINE_CONST_FUN_OBJ_3(PicoSynth_set_sample_volume_obj, PicoSynth_set_sample_volume);
+MP_DEFINE_CONST_FUN_OBJ_3(PicoSynth_set_sample_speed_obj, PicoSynth_set_sample_speed);
+MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_play_song_obj, PicoSynth_play_song);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_stop_song_obj, PicoSynth_stop_song);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_is_song_playing_obj, PicoSynth_is_song_playing);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_get_song_position_obj, PicoSynth_get_song_position);
 MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_play_synth_obj, PicoSynth_play_synth);
 MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_stop_playing_obj, PicoSynth_stop_playing);
+MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_set_buffer_size_obj, PicoSynth_set_buffer_size);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_get_buffer_size_obj, PicoSynth_get_buffer_size);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_update_obj, PicoSynth_update);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_get_audio_stats_obj, PicoSynth_get_audio_stats);
+MP_DEFINE_CONST_FUN_OBJ_1(PicoSynth_reset_audio_stats_obj, PicoSynth_reset_audio_stats);
+MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_render_block_obj, PicoSynth_render_block);
 MP_DEFINE_CONST_FUN_OBJ_2(PicoSynth_synth_channel_obj, PicoSynth_synth_channel);
 
 /***** Binding of Methods *****/
@@ -57,9 +72,24 @@ STATIC const mp_rom_map_elem_t PicoSynth_locals_dict_table[] = {
     { MP_ROM_QSTR(MP_QSTR_get_volume), MP_ROM_PTR(&PicoSynth_get_volume_obj) },
     { MP_ROM_QSTR(MP_QSTR_adjust_volume), MP_ROM_PTR(&PicoSynth_adjust_volume_obj) },
     { MP_ROM_QSTR(MP_QSTR_play_sample), MP_ROM_PTR(&PicoSynth_play_sample_obj) },
+    { MP_ROM_QSTR(MP_QSTR_play_wav), MP_ROM_PTR(&PicoSynth_play_wav_obj) },
+    { MP_ROM_QSTR(MP_QSTR_stop_sample), MP_ROM_PTR(&PicoSynth_stop_sample_obj) },
+    { MP_ROM_QSTR(MP_QSTR_is_sample_playing), MP_ROM_PTR(&PicoSynth_is_sample_playing_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_sample_volume), MP_ROM_PTR(&PicoSynth_set_sample_volume_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_sample_speed), MP_ROM_PTR(&PicoSynth_set_sample_speed_obj) },
+    { MP_ROM_QSTR(MP_QSTR_play_song), MP_ROM_PTR(&PicoSynth_play_song_obj) },
+    { MP_ROM_QSTR(MP_QSTR_stop_song), MP_ROM_PTR(&PicoSynth_stop_song_obj) },
+    { MP_ROM_QSTR(MP_QSTR_is_song_playing), MP_ROM_PTR(&PicoSynth_is_song_playing_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_song_position), MP_ROM_PTR(&PicoSynth_get_song_position_obj) },
     { MP_ROM_QSTR(MP_QSTR_play), MP_ROM_PTR(&PicoSynth_play_synth_obj) },
     { MP_ROM_QSTR(MP_QSTR_stop), MP_ROM_PTR(&PicoSynth_stop_playing_obj) },
     { MP_ROM_QSTR(MP_QSTR_channel), MP_ROM_PTR(&PicoSynth_synth_channel_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_buffer_size), MP_ROM_PTR(&PicoSynth_set_buffer_size_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_buffer_size), MP_ROM_PTR(&PicoSynth_get_buffer_size_obj) },
+    { MP_ROM_QSTR(MP_QSTR_update), MP_ROM_PTR(&PicoSynth_update_obj) },
+    { MP_ROM_QSTR(MP_QSTR_get_audio_stats), MP_ROM_PTR(&PicoSynth_get_audio_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_reset_audio_stats), MP_ROM_PTR(&PicoSynth_reset_audio_stats_obj) },
+    { MP_ROM_QSTR(MP_QSTR_render_block), MP_ROM_PTR(&PicoSynth_render_block_obj) },
 
 };
 
@@ -1,4 +1,5 @@
 #include "libraries/pico_synth_i2s/pico_synth_i2s.hpp"
+#include "libraries/pico_synth_i2s/wav_stream.hpp"
 #include "micropython/modules/util.hpp"
 #include <cstdio>
 #include <cfloat>
@@ -9,6 +10,7 @@ using namespace pimoroni;
 extern "C" {
 #include "picosynth.h"
 #include "py/builtin.h"
+#include "py/stream.h"
 
 
 /********** Channel **********/
@@ -340,8 +342,54 @@ mp_obj_t Channel_play_tone(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw
 typedef struct _PicoSynth_obj_t {
     mp_obj_base_t base;
     PicoSynth_I2S* picosynth;
+    volatile bool update_scheduled;
+    // Keeps the buffers and files the voices are playing from being collected
+    mp_obj_t sample_data[PicoSynth_I2S::NUM_SAMPLE_VOICES];
+    // Made the first time a voice plays a WAV file, and kept for the next
+    WavStream* wav_streams[PicoSynth_I2S::NUM_SAMPLE_VOICES];
+    mp_obj_t song_data;
 } _PicoSynth_obj_t;
 
+
+/***** Helper Functions *****/
+// Runs in the DMA interrupt, so the ring is refilled later by a scheduled call to update()
+static void PicoSynth_schedule_update(void* context) {
+    _PicoSynth_obj_t *self = (_PicoSynth_obj_t *)context;
+    if(!self->update_scheduled) {
+        self->update_scheduled = mp_sched_schedule(MP_OBJ_FROM_PTR(&PicoSynth_update_obj), MP_OBJ_FROM_PTR(self));
+    }
+}
+
+uint get_sample_voice(mp_int_t voice) {
+    if(voice < 0 || voice >= (int)PicoSynth_I2S::NUM_SAMPLE_VOICES) {
+        mp_raise_msg_varg(&mp_type_ValueError, MP_ERROR_TEXT("voice out of range. Expected 0 to %d"), PicoSynth_I2S::NUM_SAMPLE_VOICES - 1);
+    }
+    return voice;
+}
+
+float get_sample_speed(mp_obj_t in) {
+    float speed = mp_obj_get_float(in);
+    if(speed <= 0.0f || speed > 16.0f) {
+        mp_raise_ValueError("speed out of range. Expected greater than 0 and up to 16");
+    }
+    return speed;
+}
+
+// Called by update() as streaming voices read ahead
+static int PicoSynth_read_file(void* context, uint8_t *buf, uint len) {
+    int error = 0;
+    mp_uint_t read = mp_stream_rw(MP_OBJ_FROM_PTR(context), buf, len, &error, MP_STREAM_RW_READ);
+    return read > 0 || error == 0 ? (int)read : -1;
+}
+
+void set_synth_buffer_size(PicoSynth_I2S& picosynth, mp_obj_t in) {
+    int samples = mp_obj_get_int(in);
+    if(samples < (int)PicoSynth_I2S::MIN_BUFFER_SIZE || samples > (int)PicoSynth_I2S::MAX_BUFFER_SIZE) {
+        mp_raise_msg_varg(&mp_type_ValueError, MP_ERROR_TEXT("buffer_size out of range. Expected %d to %d"), PicoSynth_I2S::MIN_BUFFER_SIZE, PicoSynth_I2S::MAX_BUFFER_SIZE);
+    }
+    picosynth.set_buffer_size(samples);
+}
+
 /***** Print *****/
 void PicoSynth_print(const mp_print_t *print, mp_obj_t self_in, mp_print_kind_t kind) {
     (void)kind; //Unused input parameter
@@ -354,13 +402,14 @@ void PicoSynth_print(const mp_print_t *print, mp_obj_t self_in, mp_print_kind_t
 mp_obj_t PicoSynth_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_kw, const mp_obj_t *all_args) {
     _PicoSynth_obj_t *self = nullptr;
 
-    enum { ARG_i2s_data, ARG_i2s_bclk, ARG_i2s_lrclk, ARG_pio, ARG_sm };
+    enum { ARG_i2s_data, ARG_i2s_bclk, ARG_i2s_lrclk, ARG_pio, ARG_sm, ARG_buffer_size };
     static const mp_arg_t allowed_args[] = {
         { MP_QSTR_i2s_data, MP_ARG_INT, {.u_int = 26} },
         { MP_QSTR_i2s_bclk, MP_ARG_INT, {.u_int = 27} },
         { MP_QSTR_i2s_lrclk, MP_ARG_INT, {.u_int = 28} },
         { MP_QSTR_pio, MP_ARG_INT, {.u_int = 0} },
-        { MP_QSTR_sm, MP_ARG_INT, {.u_int = 0} }
+        { MP_QSTR_sm, MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_buffer_size, MP_ARG_OBJ, {.u_obj = mp_const_none} }
     };
 
     // Parse args.
@@ -383,11 +432,21 @@ mp_obj_t PicoSynth_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_k
     uint pin_lrclk = args[ARG_i2s_lrclk].u_int;
 
     PicoSynth_I2S *picosynth = m_new_class(PicoSynth_I2S, pin_data, pin_bclk, pin_lrclk, pio_int, sm);
+    if(args[ARG_buffer_size].u_obj != mp_const_none) {
+        set_synth_buffer_size(*picosynth, args[ARG_buffer_size].u_obj);
+    }
     picosynth->init();
 
     self = m_new_obj_with_finaliser(_PicoSynth_obj_t);
     self->base.type = &PicoSynth_type;
     self->picosynth = picosynth;
+    self->update_scheduled = false;
+    for(auto i = 0u; i < PicoSynth_I2S::NUM_SAMPLE_VOICES; i++) {
+        self->sample_data[i] = mp_const_none;
+        self->wav_streams[i] = nullptr;
+    }
+    self->song_data = mp_const_none;
+    picosynth->set_refill_handler(PicoSynth_schedule_update, self);
 
     return MP_OBJ_FROM_PTR(self);
 }
@@ -396,7 +455,13 @@ mp_obj_t PicoSynth_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_k
 /***** Destructor ******/
 mp_obj_t PicoSynth___del__(mp_obj_t self_in) {
     _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->picosynth->set_refill_handler(nullptr, nullptr);
     m_del_class(PicoSynth_I2S, self->picosynth);
+    for(auto i = 0u; i < PicoSynth_I2S::NUM_SAMPLE_VOICES; i++) {
+        if(self->wav_streams[i]) {
+            m_del_class(WavStream, self->wav_streams[i]);
+        }
+    }
     return mp_const_none;
 }
 
@@ -419,20 +484,164 @@ extern mp_obj_t PicoSynth_adjust_volume(mp_obj_t self_in, mp_obj_t delta) {
     return mp_const_none;
 }
 
-extern mp_obj_t PicoSynth_play_sample(mp_obj_t self_in, mp_obj_t data) {
-    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+extern mp_obj_t PicoSynth_play_sample(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_self, ARG_data, ARG_voice, ARG_loop, ARG_loop_start, ARG_loop_end, ARG_volume, ARG_speed };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_data, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_voice, MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_loop, MP_ARG_KW_ONLY | MP_ARG_BOOL, {.u_bool = false} },
+        { MP_QSTR_loop_start, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_loop_end, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_obj = mp_const_none} },
+        { MP_QSTR_volume, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_obj = mp_const_none} },
+        { MP_QSTR_speed, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_obj = mp_const_none} },
+    };
+
+    // Parse args.
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, _PicoSynth_obj_t);
 
     mp_buffer_info_t bufinfo;
-    mp_get_buffer_raise(data, &bufinfo, MP_BUFFER_RW);
-    if(bufinfo.len < 1) {
+    mp_get_buffer_raise(args[ARG_data].u_obj, &bufinfo, MP_BUFFER_READ);
+    if(bufinfo.len < 2) {
         mp_raise_ValueError("Supplied buffer is too small!");
     }
+    if((uintptr_t)bufinfo.buf & 1) {
+        mp_raise_ValueError("Supplied buffer must be 16-bit aligned!");
+    }
+    uint32_t length = bufinfo.len / sizeof(int16_t);
+
+    uint voice = get_sample_voice(args[ARG_voice].u_int);
+
+    int loop_start = args[ARG_loop_start].u_int;
+    int loop_end = args[ARG_loop_end].u_obj == mp_const_none ? (int)length : mp_obj_get_int(args[ARG_loop_end].u_obj);
+    if(loop_start < 0 || loop_end > (int)length || loop_start >= loop_end) {
+        mp_raise_msg_varg(&mp_type_ValueError, MP_ERROR_TEXT("loop out of range. Expected 0 <= loop_start < loop_end <= %d"), length);
+    }
+
+    if(args[ARG_volume].u_obj != mp_const_none) {
+        self->picosynth->set_sample_volume(voice, mp_obj_get_float(args[ARG_volume].u_obj));
+    }
+    if(args[ARG_speed].u_obj != mp_const_none) {
+        self->picosynth->set_sample_speed(voice, get_sample_speed(args[ARG_speed].u_obj));
+    }
+
+    self->sample_data[voice] = args[ARG_data].u_obj;
+    self->picosynth->play_sample(voice, (const int16_t *)bufinfo.buf, length, args[ARG_loop].u_bool, loop_start, loop_end);
+
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_play_wav(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_self, ARG_file, ARG_voice, ARG_volume, ARG_speed };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_file, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_voice, MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_volume, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_obj = mp_const_none} },
+        { MP_QSTR_speed, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_obj = mp_const_none} },
+    };
+
+    // Parse args.
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(args[ARG_self].u_obj, _PicoSynth_obj_t);
+    uint voice = get_sample_voice(args[ARG_voice].u_int);
+
+    // Takes a filename, or a file already open for reading
+    mp_obj_t file = args[ARG_file].u_obj;
+    if(mp_obj_is_str(file)) {
+        mp_obj_t open_args[2] = {file, MP_OBJ_NEW_QSTR(MP_QSTR_rb)};
+        file = mp_builtin_open(2, open_args, (mp_map_t *)&mp_const_empty_map);
+    }
+    mp_get_stream_raise(file, MP_STREAM_OP_READ);
+
+    // The voice may still be playing from the stream that's about to be reused
+    self->picosynth->stop_sample(voice);
+    if(!self->wav_streams[voice]) {
+        self->wav_streams[voice] = m_new_class(WavStream);
+    }
+    WavStream *stream = self->wav_streams[voice];
+
+    if(!stream->open(PicoSynth_read_file, MP_OBJ_TO_PTR(file))) {
+        mp_raise_ValueError("play_wav: Not a 16-bit PCM or IMA-ADPCM WAV file, with 1 or 2 channels!");
+    }
+
+    if(args[ARG_volume].u_obj != mp_const_none) {
+        self->picosynth->set_sample_volume(voice, mp_obj_get_float(args[ARG_volume].u_obj));
+    }
+    // Played at the file's own rate, however fast that is compared to the synth
+    float speed = args[ARG_speed].u_obj == mp_const_none ? 1.0f : get_sample_speed(args[ARG_speed].u_obj);
+    self->picosynth->set_sample_speed(voice, speed * stream->get_sample_rate() / PicoSynth_I2S::SYSTEM_FREQ);
+
+    // Read ahead into both buffers before the voice starts
+    stream->fill();
+    self->sample_data[voice] = file;
+    self->picosynth->play_stream(voice, stream);
+
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_stop_sample(mp_obj_t self_in, mp_obj_t voice_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->picosynth->stop_sample(get_sample_voice(mp_obj_get_int(voice_in)));
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_is_sample_playing(mp_obj_t self_in, mp_obj_t voice_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    return self->picosynth->is_sample_playing(get_sample_voice(mp_obj_get_int(voice_in))) ? mp_const_true : mp_const_false;
+}
+
+extern mp_obj_t PicoSynth_set_sample_volume(mp_obj_t self_in, mp_obj_t voice_in, mp_obj_t value) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->picosynth->set_sample_volume(get_sample_voice(mp_obj_get_int(voice_in)), mp_obj_get_float(value));
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_set_sample_speed(mp_obj_t self_in, mp_obj_t voice_in, mp_obj_t speed) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->picosynth->set_sample_speed(get_sample_voice(mp_obj_get_int(voice_in)), get_sample_speed(speed));
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_play_song(mp_obj_t self_in, mp_obj_t data) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(data, &bufinfo, MP_BUFFER_READ);
+    if(!self->picosynth->play_song((const uint8_t *)bufinfo.buf, bufinfo.len)) {
+        self->song_data = mp_const_none;
+        mp_raise_ValueError("play_song: Not a valid PVSQ song!");
+    }
+    self->song_data = data;
 
-    self->picosynth->play_sample((uint8_t *)bufinfo.buf, bufinfo.len);
+    return mp_const_none;
+}
 
+extern mp_obj_t PicoSynth_stop_song(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->picosynth->stop_song();
     return mp_const_none;
 }
 
+extern mp_obj_t PicoSynth_is_song_playing(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    return self->picosynth->is_song_playing() ? mp_const_true : mp_const_false;
+}
+
+extern mp_obj_t PicoSynth_get_song_position(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    mp_obj_t tuple[] = {
+        mp_obj_new_int(self->picosynth->get_song_position()),
+        mp_obj_new_int(self->picosynth->get_song_row())
+    };
+    return mp_obj_new_tuple(2, tuple);
+}
+
 extern mp_obj_t PicoSynth_play_synth(mp_obj_t self_in) {
     _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
     self->picosynth->play_synth();
@@ -447,6 +656,53 @@ extern mp_obj_t PicoSynth_stop_playing(mp_obj_t self_in) {
     return mp_const_none;
 }
 
+extern mp_obj_t PicoSynth_set_buffer_size(mp_obj_t self_in, mp_obj_t samples) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    set_synth_buffer_size(*self->picosynth, samples);
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_get_buffer_size(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    return mp_obj_new_int(self->picosynth->get_buffer_size());
+}
+
+extern mp_obj_t PicoSynth_update(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->update_scheduled = false;
+    self->picosynth->update();
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_get_audio_stats(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    mp_obj_t tuple[2] = {
+        mp_obj_new_int(self->picosynth->get_underruns()),
+        mp_obj_new_int(self->picosynth->get_underrun_samples())
+    };
+    return mp_obj_new_tuple(2, tuple);
+}
+
+extern mp_obj_t PicoSynth_reset_audio_stats(mp_obj_t self_in) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+    self->picosynth->reset_stats();
+    return mp_const_none;
+}
+
+extern mp_obj_t PicoSynth_render_block(mp_obj_t self_in, mp_obj_t buffer) {
+    _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
+
+    if(self->picosynth->is_playing()) {
+        mp_raise_msg(&mp_type_RuntimeError, "Cannot render_block() while playing, call stop() first");
+    }
+
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(buffer, &bufinfo, MP_BUFFER_WRITE);
+    self->picosynth->render_block((int16_t *)bufinfo.buf, bufinfo.len / sizeof(int16_t));
+
+    return mp_const_none;
+}
+
 extern mp_obj_t PicoSynth_synth_channel(mp_obj_t self_in, mp_obj_t channel_in) {
     _PicoSynth_obj_t *self = MP_OBJ_TO_PTR2(self_in, _PicoSynth_obj_t);
 
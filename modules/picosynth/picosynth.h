@@ -32,8 +32,27 @@ extern mp_obj_t PicoSynth_set_volume(mp_obj_t self_in, mp_obj_t value);
 extern mp_obj_t PicoSynth_get_volume(mp_obj_t self_in);
 extern mp_obj_t PicoSynth_adjust_volume(mp_obj_t self_in, mp_obj_t delta);
 
-extern mp_obj_t PicoSynth_play_sample(mp_obj_t self_in, mp_obj_t data);
+extern mp_obj_t PicoSynth_play_sample(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
+extern mp_obj_t PicoSynth_play_wav(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args);
+extern mp_obj_t PicoSynth_stop_sample(mp_obj_t self_in, mp_obj_t voice_in);
+extern mp_obj_t PicoSynth_is_sample_playing(mp_obj_t self_in, mp_obj_t voice_in);
+extern mp_obj_t PicoSynth_set_sample_volume(mp_obj_t self_in, mp_obj_t voice_in, mp_obj_t value);
+extern mp_obj_t PicoSynth_set_sample_speed(mp_obj_t self_in, mp_obj_t voice_in, mp_obj_t speed);
+extern mp_obj_t PicoSynth_play_song(mp_obj_t self_in, mp_obj_t data);
+extern mp_obj_t PicoSynth_stop_song(mp_obj_t self_in);
+extern mp_obj_t PicoSynth_is_song_playing(mp_obj_t self_in);
+extern mp_obj_t PicoSynth_get_song_position(mp_obj_t self_in);
 extern mp_obj_t PicoSynth_play_synth(mp_obj_t self_in);
 extern mp_obj_t PicoSynth_stop_playing(mp_obj_t self_in);
 
-extern mp_obj_t PicoSynth_synth_channel(mp_obj_t self_in, mp_obj_t channel_in);
\ No newline at end of file
+extern mp_obj_t PicoSynth_set_buffer_size(mp_obj_t self_in, mp_obj_t samples);
+extern mp_obj_t PicoSynth_get_buffer_size(mp_obj_t self_in);
+extern mp_obj_t PicoSynth_update(mp_obj_t self_in);
+extern mp_obj_t PicoSynth_get_audio_stats(mp_obj_t self_in);
+extern mp_obj_t PicoSynth_reset_audio_stats(mp_obj_t self_in);
+extern mp_obj_t PicoSynth_render_block(mp_obj_t self_in, mp_obj_t buffer);
+
+extern mp_obj_t PicoSynth_synth_channel(mp_obj_t self_in, mp_obj_t channel_in);
+
+// Scheduled from the DMA interrupt to refill the audio ring
+extern const mp_obj_fun_builtin_fixed_t PicoSynth_update_obj;
\ No newline at end of file
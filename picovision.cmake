@@ -10,6 +10,10 @@ target_sources(${LIB_NAME} INTERFACE
     ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/pico_graphics_pen_dv_rgb888.cpp
     ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/pico_graphics_pen_dv_rgb555.cpp
     ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/pico_graphics_pen_dv_p5.cpp
+    ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/display_list.cpp
+    ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/glyph_cache.cpp
+    ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/tilemap.cpp
+    ${CMAKE_CURRENT_LIST_DIR}/libraries/pico_graphics/tile_scroller.cpp
     ${PIMORONI_PICO_PATH}/libraries/pico_graphics/types.cpp
 )
 
@@ -0,0 +1,302 @@
+"""Compile PNGs into PicoVision sprites and frame images, ready to load.
+
+    python tools/assets/compile_assets.py sprites birb-sprite.png --size 32 32 --out build/
+    python tools/assets/compile_assets.py frame sky.png --format rgb555 --out build/
+
+Sprites are written as .pvs files, trimmed line by line the way
+DVDisplay::define_sprite_internal trims them, so load_sprite() can copy them
+straight into PSRAM without decoding a PNG on the device. Frame images are
+the raw pixels of the mode, with the width padded to a multiple of 4 pixels
+as DVDisplay pads frame_width. Everything compiled into a directory is
+listed in its manifest.json.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+MAX_SPRITE_WIDTH = 64
+MAX_SPRITE_HEIGHT = 32
+SPRITE_SIZE = 0x900
+MAX_NUM_SPRITES = 1024
+PALETTE_SIZE = 32
+
+SPRITE_FORMATS = ("argb1555", "p5")
+FRAME_FORMATS = ("rgb555", "rgb888", "p5")
+MANIFEST = "manifest.json"
+
+
+class AssetError(Exception):
+    pass
+
+
+def load_palette(path):
+    """The colours of a palette image: the palette of an indexed PNG, or the pixels of any other, in order."""
+    image = Image.open(path)
+    if image.mode == "P":
+        colours = np.array(image.getpalette()[:PALETTE_SIZE * 3], dtype=np.uint8).reshape(-1, 3)
+    else:
+        colours = np.array(image.convert("RGB"), dtype=np.uint8).reshape(-1, 3)[:PALETTE_SIZE]
+    if len(colours) == 0:
+        raise AssetError("{}: no colours in palette".format(path))
+    return colours
+
+
+def nearest_colours(rgb, palette, chunk=65536):
+    """The index of the closest palette colour to each pixel."""
+    flat = rgb.reshape(-1, 3).astype(np.int32)
+    palette = palette.astype(np.int32)
+    index = np.empty(len(flat), dtype=np.uint8)
+    for start in range(0, len(flat), chunk):
+        distance = ((flat[start:start + chunk, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        index[start:start + chunk] = distance.argmin(axis=1)
+    return index.reshape(rgb.shape[:-1])
+
+
+def indexed_alpha(image):
+    """Whether each entry of an indexed image's palette is opaque, as pngdec sees its tRNS chunk."""
+    alpha = np.zeros(256, dtype=bool)
+    transparency = image.info.get("transparency")
+    if isinstance(transparency, bytes):
+        alpha[:len(transparency)] = np.frombuffer(transparency, dtype=np.uint8) > 0
+    elif isinstance(transparency, int):
+        alpha[:] = True
+        alpha[transparency] = False
+    return alpha
+
+
+def to_p5(image, palette=None, name="image"):
+    """Palette entries in bits 6-2 and the alpha in bit 0, as load_sprite() decodes a PNG in P5 mode.
+
+    Indexed PNGs keep their indexes, like on the device, unless a palette is given to map their colours to.
+    """
+    if image.mode == "P" and palette is None:
+        index = np.array(image, dtype=np.uint8)
+        return ((index & 0x1F) << 2) | indexed_alpha(image)[index].astype(np.uint8)
+    if palette is None:
+        raise AssetError("{}: P5 needs an indexed PNG or a --palette".format(name))
+    rgba = np.array(image.convert("RGBA"), dtype=np.uint8)
+    index = nearest_colours(rgba[..., :3], palette)
+    return (index << 2) | (rgba[..., 3] > 0).astype(np.uint8)
+
+
+def to_argb1555(image):
+    """RGB555 with the alpha in bit 15, as load_sprite() decodes a PNG."""
+    rgba = np.array(image.convert("RGBA"), dtype=np.uint16)
+    pixels = ((rgba[..., 0] & 0xF8) << 7) | ((rgba[..., 1] & 0xF8) << 2) | (rgba[..., 2] >> 3)
+    return (pixels | np.where(rgba[..., 3] > 0, 0x8000, 0)).astype("<u2")
+
+
+def to_rgb888(image):
+    """Bytes in the order the GPU reads them: blue, green, red."""
+    return np.array(image.convert("RGB"), dtype=np.uint8)[..., ::-1]
+
+
+def split_cells(pixels, width, height):
+    """Cut a sheet into an array of (cells, height, width), left to right then top to bottom."""
+    rows, columns = pixels.shape[0] // height, pixels.shape[1] // width
+    if rows == 0 or columns == 0:
+        raise AssetError("sheet is smaller than one {}x{} sprite".format(width, height))
+    pixels = pixels[:rows * height, :columns * width]
+    return pixels.reshape(rows, height, columns, width).swapaxes(1, 2).reshape(rows * columns, height, width)
+
+
+def encode_sprites(cells):
+    """Encodes an array of (cells, height, width) sprite pixels as .pvs files.
+
+    Each line keeps only the pixels from its first opaque pixel to its last, and
+    empty lines at the bottom are dropped, as in DVDisplay::define_sprite_internal.
+    """
+    count, height, width = cells.shape
+    if width > MAX_SPRITE_WIDTH or height > MAX_SPRITE_HEIGHT:
+        raise AssetError("sprites can be at most {}x{}, not {}x{}".format(MAX_SPRITE_WIDTH, MAX_SPRITE_HEIGHT, width, height))
+    opaque = (cells & (1 if cells.dtype == np.uint8 else 0x8000)) != 0
+
+    # Empty lines have an offset of the width and no length, as get_sprite_limits leaves them
+    has_pixels = opaque.any(axis=2)
+    offsets = np.where(has_pixels, opaque.argmax(axis=2), width)
+    lengths = np.where(has_pixels, width - opaque[:, :, ::-1].argmax(axis=2) - offsets, 0)
+    heights = np.maximum(height - has_pixels[:, ::-1].argmax(axis=1), 1)
+    heights[~has_pixels.any(axis=1)] = 1
+
+    rows = np.arange(height)
+    columns = np.arange(width)
+    keep = ((columns[None, None, :] >= offsets[:, :, None]) &
+            (columns[None, None, :] < (offsets + lengths)[:, :, None]) &
+            (rows[None, :, None] < heights[:, None, None]))
+    data = cells[keep].tobytes()
+    ends = np.cumsum(keep.reshape(count, -1).sum(axis=1)) * cells.itemsize
+
+    limits = ((lengths << 8) | offsets).astype("<u2")
+    sprites = []
+    start = 0
+    for i in range(count):
+        header = np.concatenate((np.array([(heights[i] << 8) + width], dtype="<u2"), limits[i, :heights[i]]))
+        padding = b"\x00\x00" if header.nbytes & 2 else b""
+        sprite = header.tobytes() + padding + data[start:ends[i]]
+        start = ends[i]
+        sprites.append(sprite)
+    return sprites
+
+
+def sprite_slots(sprite):
+    """The number of sprite indexes a sprite takes up, as sprites over 0x900 bytes run on into the next."""
+    return -(-len(sprite) // SPRITE_SIZE)
+
+
+def encode_frame(pixels):
+    """Pads each row of a frame image to a multiple of 4 pixels, like frame_width."""
+    width = pixels.shape[1]
+    padding = (4 - width % 4) % 4
+    if padding:
+        pad = [(0, 0), (0, padding)] + [(0, 0)] * (pixels.ndim - 2)
+        pixels = np.pad(pixels, pad)
+    return np.ascontiguousarray(pixels).tobytes(), width + padding
+
+
+def read_manifest(out):
+    path = os.path.join(out, MANIFEST)
+    if not os.path.exists(path):
+        return {"sprites": [], "frames": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(out, manifest):
+    with open(os.path.join(out, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+def add_entries(entries, new_entries):
+    """Replaces entries written to the same file, keeping their place so sprite indexes stay put."""
+    files = {entry["file"]: i for i, entry in enumerate(entries)}
+    for entry in new_entries:
+        if entry["file"] in files:
+            entries[files[entry["file"]]] = entry
+        else:
+            files[entry["file"]] = len(entries)
+            entries.append(entry)
+
+
+def compile_sprites(args, palette):
+    entries = []
+    for path in args.images:
+        image = Image.open(path)
+        left, top = 0, 0
+        if args.source:
+            left, top, w, h = args.source
+            image = image.crop((left, top, left + w, top + h))
+        if args.format == "p5":
+            if image.mode == "P" and palette is None and "transparency" not in image.info:
+                print("{}: no transparency, so every pixel is transparent, as on the device".format(path), file=sys.stderr)
+            pixels = to_p5(image, palette, path)
+        else:
+            pixels = to_argb1555(image)
+        width, height = args.size or (pixels.shape[1], pixels.shape[0])
+        try:
+            sprites = encode_sprites(split_cells(pixels, width, height))
+        except AssetError as e:
+            raise AssetError("{}: {}".format(path, e))
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        columns = pixels.shape[1] // width
+        for i, sprite in enumerate(sprites):
+            filename = "{}.pvs".format(name) if len(sprites) == 1 else "{}_{:03d}.pvs".format(name, i)
+            with open(os.path.join(args.out, filename), "wb") as f:
+                f.write(sprite)
+            entries.append({
+                "file": filename,
+                "format": args.format,
+                "width": width,
+                "height": height,
+                "bytes": len(sprite),
+                "slots": sprite_slots(sprite),
+                "source": [path, left + (i % columns) * width, top + (i // columns) * height, width, height],
+            })
+        print("{}: {} sprites, {} bytes".format(path, len(sprites), sum(len(sprite) for sprite in sprites)))
+    return entries
+
+
+def compile_frames(args, palette):
+    entries = []
+    for path in args.images:
+        image = Image.open(path)
+        if args.format == "p5":
+            pixels = to_p5(image, palette, path)
+            if not args.depth:
+                pixels &= 0x7C
+        elif args.format == "rgb555":
+            pixels = to_argb1555(image)
+            if not args.depth:
+                pixels &= 0x7FFF
+        else:
+            pixels = to_rgb888(image)
+        data, stride = encode_frame(pixels)
+
+        filename = "{}.{}".format(os.path.splitext(os.path.basename(path))[0], args.format)
+        with open(os.path.join(args.out, filename), "wb") as f:
+            f.write(data)
+        entries.append({
+            "file": filename,
+            "format": args.format,
+            "width": image.width,
+            "height": image.height,
+            "stride": stride,
+            "bytes": len(data),
+            "source": [path, 0, 0, image.width, image.height],
+        })
+        print("{}: {}x{} {}, {} bytes".format(path, image.width, image.height, args.format, len(data)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sprites = commands.add_parser("sprites", help="compile PNG sprite sheets into .pvs sprites")
+    sprites.add_argument("images", nargs="+", help="PNG sprite sheets")
+    sprites.add_argument("--size", type=int, nargs=2, metavar=("W", "H"), help="size of each sprite in the sheets (default: the whole image)")
+    sprites.add_argument("--source", type=int, nargs=4, metavar=("X", "Y", "W", "H"), help="only use this area of each sheet")
+    sprites.add_argument("--format", choices=SPRITE_FORMATS, default="argb1555", help="sprite pixel format (default: argb1555)")
+
+    frames = commands.add_parser("frame", help="compile PNGs into raw frame images")
+    frames.add_argument("images", nargs="+", help="PNG images")
+    frames.add_argument("--format", choices=FRAME_FORMATS, default="rgb555", help="frame pixel format (default: rgb555)")
+    frames.add_argument("--depth", action="store_true", help="set the depth bit of opaque pixels")
+
+    for command in (sprites, frames):
+        command.add_argument("--palette", metavar="PNG", help="colours to map P5 images to, from an indexed PNG or the pixels of any other")
+        command.add_argument("--out", metavar="DIR", default=".", help="directory to write to, and keep manifest.json in (default: .)")
+
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+
+    try:
+        palette = load_palette(args.palette) if args.palette else None
+        if args.command == "sprites":
+            entries, key = compile_sprites(args, palette), "sprites"
+        else:
+            entries, key = compile_frames(args, palette), "frames"
+    except (AssetError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    manifest = read_manifest(args.out)
+    add_entries(manifest[key], entries)
+    index = 0
+    for entry in manifest["sprites"]:
+        entry["index"] = index
+        index += entry["slots"]
+    if index > MAX_NUM_SPRITES:
+        print("warning: the sprites need {} indexes, there are only {}".format(index, MAX_NUM_SPRITES), file=sys.stderr)
+    write_manifest(args.out, manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Pack sprites and animations into one bundle, for load_sprite_bundle().
+
+    python tools/assets/pack_sprites.py birb=examples/floppy_birb/birb-sprite.png:32x32 \\
+        logo=examples/bouncing_logo/pim-logo.png:32x32 --out build/sprites
+
+Writes build/sprites.pvb, holding every sprite as a .pvs, and build/sprites.py,
+which names the image index of each sprite, or a tuple of indexes for each
+frame of an animation. Sprites are given indexes in turn, with sprites over
+0x900 bytes taking as many indexes as they run into, and identical frames
+share an index.
+
+Bundle format, all little endian:
+
+    4 bytes: "PVSB"
+    uint16: First image index
+    uint16: Number of image indexes the bundle takes up
+    uint16: Number of sprites
+    uint16: Reserved, 0
+
+    For each sprite:
+      uint16: Image index, counted from the first
+      uint16: Length in bytes
+
+    For each sprite:
+      .pvs sprite data, padded to a multiple of 4 bytes
+"""
+
+import argparse
+import os
+import re
+import struct
+import sys
+
+from PIL import Image
+
+from compile_assets import (MAX_NUM_SPRITES, SPRITE_FORMATS, AssetError, encode_sprites, load_palette,
+                            split_cells, sprite_slots, to_argb1555, to_p5)
+
+BUNDLE_MAGIC = b"PVSB"
+BUNDLE_HEADER = struct.Struct("<4sHHHH")
+BUNDLE_ENTRY = struct.Struct("<HH")
+
+
+def parse_source(source):
+    """Splits NAME=FILE[:WxH] into its parts."""
+    match = re.fullmatch(r"([A-Za-z_][A-Za-z0-9_]*)=(.+?)(?::(\d+)x(\d+))?", source)
+    if not match:
+        raise AssetError("{}: expected NAME=FILE or NAME=FILE:WxH".format(source))
+    name, path, width, height = match.groups()
+    size = (int(width), int(height)) if width else None
+    return name.upper(), path, size
+
+
+def load_frames(path, size, sprite_format, palette):
+    """The .pvs data of each frame in a sheet, or of a .pvs file as it is."""
+    if path.endswith(".pvs"):
+        with open(path, "rb") as f:
+            return [f.read()]
+    image = Image.open(path)
+    pixels = to_p5(image, palette, path) if sprite_format == "p5" else to_argb1555(image)
+    width, height = size or (pixels.shape[1], pixels.shape[0])
+    try:
+        return encode_sprites(split_cells(pixels, width, height))
+    except AssetError as e:
+        raise AssetError("{}: {}".format(path, e))
+
+
+def pack(animations, first_index):
+    """Gives each distinct frame an index, so that no two overlap.
+
+    Returns the index of every frame of each animation, and the (index, data)
+    of each distinct sprite in index order.
+    """
+    indexes = {}
+    sprites = []
+    next_index = first_index
+    packed = {}
+    for name, frames in animations.items():
+        packed[name] = []
+        for frame in frames:
+            if frame not in indexes:
+                indexes[frame] = next_index
+                sprites.append((next_index, frame))
+                next_index += sprite_slots(frame)
+            packed[name].append(indexes[frame])
+    if next_index > MAX_NUM_SPRITES:
+        raise AssetError("the sprites need image indexes {} to {}, but there are only {}".format(
+            first_index, next_index - 1, MAX_NUM_SPRITES))
+    return packed, sprites, next_index - first_index
+
+
+def encode_bundle(sprites, first_index, num_indexes):
+    header = BUNDLE_HEADER.pack(BUNDLE_MAGIC, first_index, num_indexes, len(sprites), 0)
+    table = b"".join(BUNDLE_ENTRY.pack(index - first_index, len(data)) for index, data in sprites)
+    data = b"".join(data + bytes(-len(data) % 4) for _, data in sprites)
+    return header + table + data
+
+
+def write_index_module(path, bundle_name, packed, first_index, num_indexes):
+    with open(path, "w") as f:
+        f.write("# Image indexes of the sprites in {}, written by tools/assets/pack_sprites.py\n".format(bundle_name))
+        f.write("# Load them with display.load_sprite_bundle(\"{}\")\n\n".format(bundle_name))
+        f.write("BUNDLE = \"{}\"\n".format(bundle_name))
+        f.write("FIRST_INDEX = {}\n".format(first_index))
+        f.write("NUM_INDEXES = {}\n\n".format(num_indexes))
+        for name, indexes in packed.items():
+            if len(indexes) == 1:
+                f.write("{} = {}\n".format(name, indexes[0]))
+            else:
+                f.write("{} = ({})\n".format(name, ", ".join(str(index) for index in indexes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sources", nargs="+", metavar="NAME=FILE[:WxH]",
+                        help="a PNG sheet cut into sprites of WxH (default: the whole image) or a .pvs file, named NAME")
+    parser.add_argument("--out", required=True, metavar="PATH", help="where to write PATH.pvb and PATH.py")
+    parser.add_argument("--format", choices=SPRITE_FORMATS, default="argb1555", help="sprite pixel format (default: argb1555)")
+    parser.add_argument("--palette", metavar="PNG", help="colours to map P5 sprites to, from an indexed PNG or the pixels of any other")
+    parser.add_argument("--first-index", type=int, default=0, help="the image index to start from (default: 0)")
+    args = parser.parse_args()
+
+    try:
+        palette = load_palette(args.palette) if args.palette else None
+        animations = {}
+        for source in args.sources:
+            name, path, size = parse_source(source)
+            if name in animations:
+                raise AssetError("{}: there is already a sprite called {}".format(source, name))
+            animations[name] = load_frames(path, size, args.format, palette)
+        packed, sprites, num_indexes = pack(animations, args.first_index)
+    except (AssetError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    bundle_name = os.path.basename(args.out) + ".pvb"
+    bundle = encode_bundle(sprites, args.first_index, num_indexes)
+    with open(args.out + ".pvb", "wb") as f:
+        f.write(bundle)
+    write_index_module(args.out + ".py", bundle_name, packed, args.first_index, num_indexes)
+
+    frames = sum(len(indexes) for indexes in packed.values())
+    largest = max(len(data) for _, data in sprites)
+    print("{} frames, {} sprites after removing duplicates, using image indexes {} to {}".format(
+        frames, len(sprites), args.first_index, args.first_index + num_indexes - 1))
+    print("{}: {} bytes, the largest sprite is {} bytes".format(args.out + ".pvb", len(bundle), largest))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
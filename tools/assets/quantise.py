@@ -0,0 +1,200 @@
+"""Build 32 colour palettes for PEN_P5 and convert images to them.
+
+    python tools/assets/quantise.py sky.png ground.png pipe.png --out build/
+
+Finds the 32 colours that best fit a set of images, by median cut refined
+with k-means over their RGB555 colours, and maps each image to them with an
+ordered dither, so nothing has to be matched to the palette on the device.
+With --palettes 2 the images are split into two groups that look alike and
+each group gets its own palette, for set_local_palette/set_remote_palette.
+
+Writes palette.pal, 96 bytes of R, G, B for each palette to pass to
+set_palette(), and an indexed PNG of each image that keeps its palette
+indexes when decoded with pngdec's PNG_COPY, or by load_sprite and the other
+asset tools. Transparent pixels use palette entries 32-63, which are the
+same colours as 0-31 but transparent, so no colour is lost to transparency.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from compile_assets import PALETTE_SIZE, add_entries, encode_frame, read_manifest, write_manifest
+
+NUM_PALETTES = 2
+PALETTE_FILE = "palette.pal"
+BAYER_4X4 = np.array([[0, 8, 2, 10], [12, 4, 14, 6], [3, 11, 1, 9], [15, 7, 13, 5]])
+
+
+def rgb555_histogram(rgba):
+    """How many opaque pixels there are of each RGB555 colour."""
+    opaque = rgba[rgba[..., 3] > 0].astype(np.int32)
+    keys = ((opaque[:, 0] >> 3) << 10) | ((opaque[:, 1] >> 3) << 5) | (opaque[:, 2] >> 3)
+    return np.bincount(keys, minlength=1 << 15)
+
+
+def rgb555_colours(keys):
+    """RGB888 for RGB555 keys, expanding each channel to 8 bits."""
+    channels = (np.asarray(keys)[..., None] >> np.array([10, 5, 0])) & 0x1F
+    return (channels << 3) | (channels >> 2)
+
+
+def median_cut(colours, weights, count):
+    """Splits the colours into up to count boxes, always halving the box with the widest weighted spread."""
+    boxes = [np.arange(len(colours))]
+    while len(boxes) < count:
+        spreads = [np.ptp(colours[box], axis=0).max() * np.sqrt(weights[box].sum()) if len(box) > 1 else -1 for box in boxes]
+        widest = int(np.argmax(spreads))
+        if spreads[widest] <= 0:
+            break
+        box = boxes.pop(widest)
+        channel = np.ptp(colours[box], axis=0).argmax()
+        box = box[np.argsort(colours[box, channel], kind="stable")]
+        split = np.searchsorted(np.cumsum(weights[box]), weights[box].sum() / 2)
+        split = min(max(split, 1), len(box) - 1)
+        boxes += [box[:split], box[split:]]
+    return [np.average(colours[box], axis=0, weights=weights[box]) for box in boxes]
+
+
+def nearest(colours, palette):
+    distance = ((colours[:, None, :].astype(np.float64) - palette[None, :, :]) ** 2).sum(axis=2)
+    return distance.argmin(axis=1)
+
+
+def build_palette(histogram, iterations=8):
+    """The PALETTE_SIZE colours that best fit a histogram of RGB555 colours."""
+    keys = np.flatnonzero(histogram)
+    if len(keys) == 0:
+        return np.zeros((PALETTE_SIZE, 3), dtype=np.uint8)
+    colours = rgb555_colours(keys).astype(np.float64)
+    weights = histogram[keys].astype(np.float64)
+
+    palette = np.array(median_cut(colours, weights, PALETTE_SIZE))
+    for _ in range(iterations):
+        # Move each colour to the weighted mean of the image colours nearest it
+        cluster = nearest(colours, palette)
+        totals = np.zeros_like(palette)
+        np.add.at(totals, cluster, colours * weights[:, None])
+        counts = np.bincount(cluster, weights=weights, minlength=len(palette))
+        used = counts > 0
+        palette[used] = totals[used] / counts[used, None]
+
+    palette = np.clip(np.rint(palette), 0, 255).astype(np.uint8)
+    # Unused entries are black
+    return np.concatenate((palette, np.zeros((PALETTE_SIZE - len(palette), 3), dtype=np.uint8)))
+
+
+def group_images(histograms, groups):
+    """Splits images into groups with similar colours, by k-means over their coarse colour histograms."""
+    if groups == 1 or len(histograms) < groups:
+        return np.zeros(len(histograms), dtype=int)
+    # 4 bits per channel is plenty to tell images apart
+    coarse = np.array([h.reshape(16, 2, 16, 2, 16, 2).sum(axis=(1, 3, 5)).ravel() for h in histograms], dtype=np.float64)
+    coarse /= np.maximum(coarse.sum(axis=1, keepdims=True), 1)
+    # Start from the two images least alike
+    distance = ((coarse[:, None, :] - coarse[None, :, :]) ** 2).sum(axis=2)
+    first, second = np.unravel_index(distance.argmax(), distance.shape)
+    centres = coarse[[first, second]]
+    for _ in range(16):
+        group = ((coarse[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        new_centres = np.array([coarse[group == g].mean(axis=0) if (group == g).any() else centres[g] for g in range(groups)])
+        if np.allclose(new_centres, centres):
+            break
+        centres = new_centres
+    return group
+
+
+def palette_lut(palette):
+    """The nearest palette entry to every RGB555 colour."""
+    return nearest(rgb555_colours(np.arange(1 << 15)), palette.astype(np.float64)).astype(np.uint8)
+
+
+def quantise(rgba, lut, dither):
+    """Palette indexes for an image, offsetting each pixel by a 4x4 ordered dither of +/- dither / 2."""
+    rgb = rgba[..., :3].astype(np.int32)
+    if dither:
+        height, width = rgb.shape[:2]
+        threshold = (BAYER_4X4 + 0.5) / 16 - 0.5
+        offset = np.tile(threshold, ((height + 3) // 4, (width + 3) // 4))[:height, :width]
+        rgb = np.clip(rgb + np.rint(offset * dither).astype(np.int32)[..., None], 0, 255)
+    keys = ((rgb[..., 0] >> 3) << 10) | ((rgb[..., 1] >> 3) << 5) | (rgb[..., 2] >> 3)
+    return lut[keys]
+
+
+def save_indexed_png(path, index, opaque, palette):
+    """Entries 0-31 are the palette, and 32-63 the same colours fully transparent."""
+    image = Image.fromarray(np.where(opaque, index, index + PALETTE_SIZE).astype(np.uint8), mode="P")
+    image.putpalette(np.concatenate((palette, palette)).ravel().tolist())
+    image.save(path, transparency=bytes([255] * PALETTE_SIZE + [0] * PALETTE_SIZE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="+", help="images to build the palettes from and convert")
+    parser.add_argument("--palettes", type=int, choices=range(1, NUM_PALETTES + 1), default=1, help="number of palettes to build (default: 1)")
+    parser.add_argument("--dither", type=float, default=32, help="ordered dither strength, 0 for none (default: 32)")
+    parser.add_argument("--raw", action="store_true", help="also write each image as a raw P5 frame image")
+    parser.add_argument("--out", metavar="DIR", default=".", help="directory to write to, and keep manifest.json in (default: .)")
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+
+    try:
+        images = [np.array(Image.open(path).convert("RGBA"), dtype=np.uint8) for path in args.images]
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    histograms = [rgb555_histogram(rgba) for rgba in images]
+    groups = group_images(histograms, args.palettes)
+    palettes = np.zeros((args.palettes, PALETTE_SIZE, 3), dtype=np.uint8)
+    for g in range(args.palettes):
+        members = [h for h, group in zip(histograms, groups) if group == g]
+        if members:
+            palettes[g] = build_palette(np.sum(members, axis=0))
+    luts = [palette_lut(palette) for palette in palettes]
+
+    with open(os.path.join(args.out, PALETTE_FILE), "wb") as f:
+        f.write(palettes.tobytes())
+
+    frames = []
+    for path, rgba, group in zip(args.images, images, groups):
+        index = quantise(rgba, luts[group], args.dither)
+        opaque = rgba[..., 3] > 0
+        name = os.path.splitext(os.path.basename(path))[0]
+        save_indexed_png(os.path.join(args.out, name + ".png"), index, opaque, palettes[group])
+
+        error = np.sqrt(((palettes[group][quantise(rgba, luts[group], 0)].astype(np.float64) - rgba[..., :3]) ** 2)[opaque].mean()) if opaque.any() else 0.0
+        print("{}: palette {}, RMS error {:.1f} before dithering".format(path, group, error))
+
+        if args.raw:
+            data, stride = encode_frame((index << 2).astype(np.uint8))
+            filename = name + ".p5"
+            with open(os.path.join(args.out, filename), "wb") as f:
+                f.write(data)
+            frames.append({
+                "file": filename,
+                "format": "p5",
+                "width": rgba.shape[1],
+                "height": rgba.shape[0],
+                "stride": stride,
+                "bytes": len(data),
+                "source": [path, 0, 0, rgba.shape[1], rgba.shape[0]],
+                "palette": int(group),
+            })
+
+    manifest = read_manifest(args.out)
+    add_entries(manifest["frames"], frames)
+    manifest["palette"] = {
+        "file": PALETTE_FILE,
+        "palettes": args.palettes,
+        "images": {os.path.splitext(os.path.basename(path))[0] + ".png": int(group) for path, group in zip(args.images, groups)},
+    }
+    write_manifest(args.out, manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
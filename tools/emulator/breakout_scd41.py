@@ -0,0 +1,35 @@
+"""A stand-in for the ``breakout_scd41`` module: a CO2 sensor in a room that's slowly getting stuffier.
+
+It has a new measurement whenever it's asked, rather than every 5 seconds.
+"""
+
+import math
+
+_state = {"started": False, "readings": 0}
+
+
+def init(i2c):
+    pass
+
+
+def start():
+    _state["started"] = True
+
+
+def stop():
+    _state["started"] = False
+
+
+def ready():
+    return _state["started"]
+
+
+def measure():
+    if not _state["started"]:
+        raise RuntimeError("SCD41: not started")
+    i = _state["readings"]
+    _state["readings"] += 1
+    co2 = 600.0 + i * 2.0 + 50.0 * math.sin(i / 10)
+    temperature = 21.0 + math.sin(i / 25)
+    humidity = 45.0 + 5.0 * math.sin(i / 40)
+    return co2, temperature, humidity
@@ -0,0 +1,248 @@
+"""Reference model of the GPU's scanline compositor.
+
+Builds the frame the GPU would show from a PSRAM bank image and the state
+the RP2040 has sent it over I2C: the line table, scroll groups, palette and
+sprites, with each sprite row blended as a patch. Only ten patches fit in a
+scanline, so a scanline with more loses the patches of the highest numbered
+sprites, and the scanlines where that happens are reported.
+
+    python tools/emulator/compositor.py frame0001.npz --png frame0001.png
+
+composites a bank saved by ``run.py --dump``.
+"""
+
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+MAX_PATCHES_PER_LINE = 10
+
+BLEND_NONE = 0
+BLEND_DEPTH = 1
+BLEND_DEPTH2 = 2
+BLEND_BLEND = 3
+BLEND_BLEND2 = 4
+
+MODE_RGB555 = 1
+MODE_PALETTE = 2
+MODE_RGB888 = 3
+
+PALETTE_SIZE = 32
+NUM_PALETTES = 2
+MAX_NUM_SPRITES = 1024
+MAX_DISPLAYED_SPRITES = 80
+MAX_SPRITE_HEIGHT = 32
+SPRITE_ENTRY_LEN = 7
+CLEARED_SPRITE = bytes((1, 0xFF, 0xFF, 0, 0, 0, 0))
+
+I2C_REG_SCROLL_BASE = 0xE0
+I2C_REG_PALETTE_INDEX = 0xF8
+
+Frame = namedtuple("Frame", ("rgb", "overflow_lines"))
+
+
+def _sign_extend(value, bits):
+    value = np.asarray(value, dtype=np.int64) & ((1 << bits) - 1)
+    return np.where(value & (1 << (bits - 1)), value - (1 << bits), value)
+
+
+def _bytes_per_pixel(mode):
+    return 1 if mode == MODE_PALETTE else 2 if mode == MODE_RGB555 else 3
+
+
+def decode_pixels(mode, data, palette):
+    """Turn raw bytes, one row per line, into RGB and the alpha (depth) bit of each pixel."""
+    if mode == MODE_RGB555:
+        pixels = data[..., 0::2].astype(np.uint16) | (data[..., 1::2].astype(np.uint16) << 8)
+        channels = (pixels[..., None] >> np.array((10, 5, 0), dtype=np.uint16)) & 0x1F
+        return ((channels << 3) | (channels >> 2)).astype(np.uint8), (pixels & 0x8000) != 0
+    if mode == MODE_PALETTE:
+        return palette[(data >> 2) & 0x1F], (data & 1) != 0
+    usable = data.shape[-1] - data.shape[-1] % 3
+    rgb = data[..., :usable].reshape(data.shape[:-1] + (-1, 3))[..., ::-1]
+    return rgb, np.zeros(rgb.shape[:-1], dtype=bool)
+
+
+def blend(blend_mode, frame_rgb, frame_alpha, sprite_rgb, sprite_alpha):
+    """Blend sprite pixels into frame pixels in place."""
+    if blend_mode == BLEND_NONE:
+        frame_rgb[:] = sprite_rgb
+    elif blend_mode == BLEND_DEPTH:
+        # Back to front: Sprite A0, Frame A0, Sprite A1, Frame A1
+        show = sprite_alpha & ~frame_alpha
+        frame_rgb[show] = sprite_rgb[show]
+    elif blend_mode == BLEND_DEPTH2:
+        # Back to front: Sprite A0, Frame A0, Frame A1, Sprite A1
+        frame_rgb[sprite_alpha] = sprite_rgb[sprite_alpha]
+    elif blend_mode in (BLEND_BLEND, BLEND_BLEND2):
+        # Additive blend where the sprite is A1, and for BLEND, the frame is A0
+        add = sprite_alpha & ~frame_alpha if blend_mode == BLEND_BLEND else sprite_alpha
+        frame_rgb[add] = np.minimum(frame_rgb[add].astype(np.uint16) + sprite_rgb[add], 255).astype(np.uint8)
+
+
+class GPU:
+    """The state the GPU is sent over I2C, and its scan out of a PSRAM bank."""
+
+    def __init__(self):
+        self.i2c_bytes_written = 0
+        self.i2c_transfers = 0
+        self.scroll_groups = [bytes(13)] * 8
+        self.palette_index = 0
+        self.sprites = [CLEARED_SPRITE] * MAX_DISPLAYED_SPRITES
+
+    def write(self, reg, data):
+        data = bytes(data)
+        self.i2c_bytes_written += len(data)
+        self.i2c_transfers += 1
+        if reg < MAX_DISPLAYED_SPRITES:
+            self.sprites[reg] = data + CLEARED_SPRITE[len(data):]
+        elif I2C_REG_SCROLL_BASE < reg < I2C_REG_SCROLL_BASE + 8:
+            self.scroll_groups[reg - I2C_REG_SCROLL_BASE] = data
+        elif reg == I2C_REG_PALETTE_INDEX:
+            self.palette_index = data[0]
+
+    def get_state(self):
+        """The I2C state as arrays, eg: to save alongside a bank image."""
+        return {
+            "sprites": np.frombuffer(b"".join(self.sprites), dtype=np.uint8).reshape(-1, SPRITE_ENTRY_LEN),
+            "scroll_groups": np.frombuffer(b"".join(self.scroll_groups), dtype=np.uint8).reshape(8, 13),
+            "palette_index": np.uint8(self.palette_index),
+        }
+
+    def set_state(self, sprites, scroll_groups, palette_index):
+        self.sprites = [bytes(entry) for entry in np.asarray(sprites, dtype=np.uint8)]
+        self.scroll_groups = [bytes(cfg) for cfg in np.asarray(scroll_groups, dtype=np.uint8)]
+        self.palette_index = int(palette_index)
+
+    def _scroll_tables(self):
+        cfg = np.frombuffer(b"".join(self.scroll_groups), dtype=np.uint8).reshape(8, 13).astype(np.int64)
+        offset = _sign_extend(cfg[:, 0] | (cfg[:, 1] << 8) | (cfg[:, 2] << 16), 24)
+        max_addr = cfg[:, 3] | (cfg[:, 4] << 8) | (cfg[:, 5] << 16)
+        offset2 = _sign_extend(cfg[:, 6] | (cfg[:, 7] << 8) | (cfg[:, 8] << 16), 24)
+        wrap_position = _sign_extend(cfg[:, 9] | (cfg[:, 10] << 8), 16)
+        wrap_offset = _sign_extend(cfg[:, 11] | (cfg[:, 12] << 8), 16)
+        # Group 0 doesn't scroll
+        for table in (offset, max_addr, offset2, wrap_position, wrap_offset):
+            table[0] = 0
+        return offset, max_addr, offset2, wrap_position, wrap_offset
+
+    def composite(self, mem):
+        """Returns the Frame the GPU would send to the display from a bank image."""
+        mem = np.asarray(mem, dtype=np.uint8)
+        header = mem[:28].view("<u4")
+        full_width = int(header[2] >> 16)
+        height = int(header[3] >> 16)
+        lines = mem[28:28 + 4 * height].view("<u4").astype(np.int64)
+
+        palette_base = 28 + 4 * height
+        palette_addr = palette_base + (self.palette_index % NUM_PALETTES) * PALETTE_SIZE * 3
+        palette = mem[palette_addr:palette_addr + PALETTE_SIZE * 3].reshape(PALETTE_SIZE, 3)
+        sprite_table = mem[palette_base + NUM_PALETTES * PALETTE_SIZE * 3:][:MAX_NUM_SPRITES * 4].view("<u4")
+
+        h_repeat = np.maximum((lines >> 24) & 7, 1)
+        modes = (lines >> 27) & 3
+        groups = lines >> 29
+        address = lines & 0xFFFFFF
+
+        # Every line's start address, after its scroll group's offset and vertical wrap
+        offset, max_addr, offset2, wrap_position, wrap_offset = self._scroll_tables()
+        scrolled = address + offset[groups]
+        wrapped = (max_addr[groups] != 0) & (scrolled >= max_addr[groups])
+        address = np.where(wrapped, address + offset2[groups], scrolled)
+
+        width = full_width // int(h_repeat[0]) if height else 0
+        rgb = np.zeros((height, width, 3), dtype=np.uint8)
+        alpha = np.zeros((height, width), dtype=bool)
+
+        # Fetch and decode all the lines sharing a format at once
+        for mode, repeat in set(zip(modes.tolist(), h_repeat.tolist())):
+            rows = np.flatnonzero((modes == mode) & (h_repeat == repeat))
+            pixels = full_width // repeat
+            length = pixels * _bytes_per_pixel(mode)
+            column = np.arange(length)
+            index = address[rows, None] + column[None, :]
+            wrap_at = wrap_position[groups[rows], None]
+            index += np.where((wrap_at > 0) & (wrap_at < length) & (column[None, :] >= wrap_at), wrap_offset[groups[rows], None], 0)
+            line_rgb, line_alpha = decode_pixels(mode, mem.take(index, mode="wrap"), palette)
+            if pixels != width:
+                # Resample lines with a different pixel width to the display width
+                x = np.minimum(np.arange(width) * pixels // max(width, 1), pixels - 1)
+                line_rgb, line_alpha = line_rgb[:, x], line_alpha[:, x]
+            rgb[rows] = line_rgb[:, :width]
+            alpha[rows] = line_alpha[:, :width]
+
+        patches = self._patches(mem, sprite_table, height)
+        overflow_lines = []
+        for y, line_patches in enumerate(patches):
+            if len(line_patches) > MAX_PATCHES_PER_LINE:
+                overflow_lines.append(y)
+            for blend_mode, x, sprite_rgb, sprite_alpha in line_patches[:MAX_PATCHES_PER_LINE]:
+                x0, x1 = max(0, x), min(width, x + len(sprite_alpha))
+                if x1 > x0:
+                    blend(blend_mode, rgb[y, x0:x1], alpha[y, x0:x1], sprite_rgb[x0 - x:x1 - x], sprite_alpha[x0 - x:x1 - x])
+        return Frame(rgb, tuple(overflow_lines))
+
+    def _patches(self, mem, sprite_table, height):
+        """Each scanline's sprite patches, in the order they're blended."""
+        patches = [[] for _ in range(height)]
+        for entry in self.sprites:
+            sprite_idx = entry[1] | (entry[2] << 8)
+            if sprite_idx >= MAX_NUM_SPRITES:
+                continue
+            blend_mode = entry[0] & 7
+            v_scale = (entry[0] >> 3) + 1
+            x = int(_sign_extend(entry[3] | (entry[4] << 8), 16))
+            y = int(_sign_extend(entry[5] | (entry[6] << 8), 16))
+
+            table_entry = int(sprite_table[sprite_idx])
+            mode = (table_entry >> 28) & 3
+            if mode not in (MODE_PALETTE, MODE_RGB555):
+                continue
+            bpp = _bytes_per_pixel(mode)
+            addr = table_entry & 0xFFFFFF
+
+            sprite_height = min(int(mem[addr + 1]), MAX_SPRITE_HEIGHT)
+            limits = mem[addr + 2:addr + 2 + sprite_height * 2].view("<u2").astype(np.int64)
+            offsets, lengths = limits & 0xFF, limits >> 8
+            data_addr = addr + 2 + sprite_height * 2
+            if (sprite_height * 2 + 2) & 2:
+                data_addr += 2
+            starts = data_addr + np.concatenate(([0], np.cumsum(lengths * bpp)[:-1]))
+
+            palette_addr = 28 + 4 * height + (self.palette_index % NUM_PALETTES) * PALETTE_SIZE * 3
+            palette = mem[palette_addr:palette_addr + PALETTE_SIZE * 3].reshape(PALETTE_SIZE, 3)
+            for row in range(sprite_height):
+                if lengths[row] == 0:
+                    continue
+                data = mem[starts[row]:starts[row] + lengths[row] * bpp]
+                sprite_rgb, sprite_alpha = decode_pixels(mode, data, palette)
+                for line_y in range(y + row * v_scale, y + (row + 1) * v_scale):
+                    if 0 <= line_y < height:
+                        patches[line_y].append((blend_mode, x + int(offsets[row]), sprite_rgb, sprite_alpha))
+        return patches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Composite a PSRAM bank saved by run.py --dump")
+    parser.add_argument("dump", help="a .npz holding a bank image and the GPU's I2C state")
+    parser.add_argument("--png", metavar="FILE", help="save the frame as a PNG")
+    args = parser.parse_args()
+
+    dump = np.load(args.dump)
+    gpu = GPU()
+    gpu.set_state(dump["sprites"], dump["scroll_groups"], dump["palette_index"])
+    frame = gpu.composite(dump["bank"])
+
+    height, width = frame.rgb.shape[:2]
+    print("{}x{} frame, {} scanlines over the limit of {} sprite patches{}".format(
+        width, height, len(frame.overflow_lines), MAX_PATCHES_PER_LINE,
+        ": " + ", ".join(str(y) for y in frame.overflow_lines) if frame.overflow_lines else ""))
+
+    if args.png:
+        from PIL import Image
+        Image.fromarray(frame.rgb).save(args.png)
+
+
+if __name__ == "__main__":
+    main()
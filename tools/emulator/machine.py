@@ -0,0 +1,105 @@
+"""Just enough of MicroPython's ``machine`` module for the examples to start."""
+
+import time
+
+
+def freq(hz=None):
+    return 250_000_000
+
+
+def reset():
+    raise SystemExit
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, pin, mode=IN, pull=None, value=None):
+        self._pin = pin
+        # Inputs read as if nothing is pressed, ie: pulled to their idle level
+        self._value = 0 if pull == Pin.PULL_DOWN else 1
+        if value is not None:
+            self._value = value
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+
+class PWM:
+    def __init__(self, pin, freq=0, duty_u16=0):
+        self._freq = freq
+        self._duty = duty_u16
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+
+    def deinit(self):
+        pass
+
+
+class ADC:
+    def __init__(self, pin):
+        self._pin = pin
+
+    def read_u16(self):
+        return 0
+
+
+
+class SPI:
+    # Nothing is connected, so reads see the bus idling high
+    def __init__(self, id, baudrate=1_000_000, **kwargs):
+        self._baudrate = baudrate
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            self._baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def read(self, nbytes, write=0x00):
+        return bytes([0xFF] * nbytes)
+
+    def readinto(self, buf, write=0x00):
+        for i in range(len(buf)):
+            buf[i] = 0xFF
+
+    def write(self, buf):
+        pass
+
+    def write_readinto(self, write_buf, read_buf):
+        self.readinto(read_buf)
+
+
+class RTC:
+    # Runs from the computer's clock until it's set
+    _offset = 0
+
+    def datetime(self, datetimetuple=None):
+        if datetimetuple is None:
+            year, month, day, hour, minute, second, weekday = time.localtime(time.time() + RTC._offset)[:7]
+            return (year, month, day, weekday, hour, minute, second, 0)
+        year, month, day, _, hour, minute, second = datetimetuple[:7]
+        RTC._offset = time.mktime((year, month, day, hour, minute, second, 0, 0, -1)) - time.time()
@@ -0,0 +1,45 @@
+"""MicroPython's ``network`` module with no network, so examples take their offline path."""
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self._interface = interface
+        self._active = False
+        self._status = STAT_IDLE
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+
+    def config(self, *args, **kwargs):
+        return None
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        # There's never an access point to find
+        self._status = STAT_NO_AP_FOUND
+
+    def disconnect(self):
+        self._status = STAT_IDLE
+
+    def isconnected(self):
+        return False
+
+    def status(self, param=None):
+        return self._status
+
+    def ifconfig(self, config=None):
+        return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+
+    def scan(self):
+        return []
@@ -0,0 +1,155 @@
+"""A silent stand-in for the ``picosynth`` module.
+
+There's no audio, so channels and voices only keep their settings, and samples,
+WAV files and songs finish as soon as they're started.
+"""
+
+_BUFFER_SIZE = 1024
+_CHANNEL_COUNT = 8
+
+
+class Channel:
+    NOISE = 128
+    SQUARE = 64
+    SAW = 32
+    TRIANGLE = 16
+    SINE = 8
+    WAVE = 1
+
+    def __init__(self):
+        self._settings = {"waveforms": 0, "frequency": 660, "volume": 1.0, "attack": 0.002,
+                          "decay": 0.006, "sustain": 0.5, "release": 0.1, "pulse_width": 0.5}
+        self._saved = dict(self._settings)
+
+    def _setting(self, name, value):
+        if value is None:
+            return self._settings[name]
+        self._settings[name] = value
+
+    def configure(self, waveforms=None, frequency=None, volume=None, attack=None, decay=None,
+                  sustain=None, release=None, pulse_width=None):
+        for name, value in (("waveforms", waveforms), ("frequency", frequency), ("volume", volume),
+                            ("attack", attack), ("decay", decay), ("sustain", sustain),
+                            ("release", release), ("pulse_width", pulse_width)):
+            if value is not None:
+                self._settings[name] = value
+        self._saved = dict(self._settings)
+
+    def restore(self):
+        self._settings = dict(self._saved)
+
+    def waveforms(self, waveforms=None):
+        return self._setting("waveforms", waveforms)
+
+    def frequency(self, frequency=None):
+        return self._setting("frequency", frequency)
+
+    def volume(self, volume=None):
+        return self._setting("volume", volume)
+
+    def attack_duration(self, duration=None):
+        return self._setting("attack", duration)
+
+    def decay_duration(self, duration=None):
+        return self._setting("decay", duration)
+
+    def sustain_level(self, level=None):
+        return self._setting("sustain", level)
+
+    def release_duration(self, duration=None):
+        return self._setting("release", duration)
+
+    def pulse_width(self, width=None):
+        return self._setting("pulse_width", width)
+
+    def trigger_attack(self):
+        pass
+
+    def trigger_release(self):
+        pass
+
+    def play_tone(self, frequency, volume=None, attack=None, release=None):
+        self.frequency(frequency)
+        if volume is not None:
+            self.volume(volume)
+        if attack is not None:
+            self.attack_duration(attack)
+        if release is not None:
+            self.release_duration(release)
+
+
+class PicoSynth:
+    def __init__(self, pio=0, sm=0, buffer_size=None):
+        self._channels = [Channel() for _ in range(_CHANNEL_COUNT)]
+        self._volume = 0.5
+        self._buffer_size = _BUFFER_SIZE if buffer_size is None else buffer_size
+        self._song_playing = False
+
+    def channel(self, channel):
+        if not 0 <= channel < len(self._channels):
+            raise ValueError("channel out of range. Expected 0 to {}".format(_CHANNEL_COUNT - 1))
+        return self._channels[channel]
+
+    def set_volume(self, volume):
+        self._volume = min(max(volume, 0.0), 1.0)
+
+    def get_volume(self):
+        return self._volume
+
+    def adjust_volume(self, delta):
+        self.set_volume(self._volume + delta)
+
+    def play_sample(self, data, voice=0, loop=False, loop_start=0, loop_end=None, volume=None, speed=None):
+        pass
+
+    def play_wav(self, file, voice=0, volume=None, speed=None):
+        pass
+
+    def stop_sample(self, voice):
+        pass
+
+    def is_sample_playing(self, voice):
+        return False
+
+    def set_sample_volume(self, voice, volume):
+        pass
+
+    def set_sample_speed(self, voice, speed):
+        pass
+
+    def play_song(self, song):
+        self._song_playing = True
+
+    def stop_song(self):
+        self._song_playing = False
+
+    def is_song_playing(self):
+        return self._song_playing
+
+    def get_song_position(self):
+        return (0, 0)
+
+    def play(self):
+        pass
+
+    def stop(self):
+        self._song_playing = False
+
+    def set_buffer_size(self, size):
+        self._buffer_size = size
+
+    def get_buffer_size(self):
+        return self._buffer_size
+
+    def update(self):
+        pass
+
+    def get_audio_stats(self):
+        return (0, 0)
+
+    def reset_audio_stats(self):
+        pass
+
+    def render_block(self, buffer):
+        for i in range(len(buffer)):
+            buffer[i] = 0
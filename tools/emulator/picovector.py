@@ -0,0 +1,93 @@
+"""A stand-in for the ``picovector`` module.
+
+Shapes are filled with the display's pen using the even-odd rule, a scanline at
+a time with ``pixel_span``, so they cost what a span fill would. Antialiasing
+isn't emulated, and ``.af`` fonts aren't read, so ``text`` draws nothing.
+"""
+
+import math
+
+ANTIALIAS_NONE = 0
+ANTIALIAS_X4 = 1
+ANTIALIAS_X16 = 2
+
+
+class Polygon:
+    def __init__(self, *points):
+        for point in points:
+            if not isinstance(point, tuple) or len(point) != 2:
+                raise ValueError("Polygon: points must be (x, y) tuples")
+        self._points = [(float(x), float(y)) for x, y in points]
+
+    def __len__(self):
+        return len(self._points)
+
+    def __iter__(self):
+        return iter([(int(x), int(y)) for x, y in self._points])
+
+    def bounds(self):
+        if not self._points:
+            return (0, 0, 0, 0)
+        xs = [int(x) for x, _ in self._points]
+        ys = [int(y) for _, y in self._points]
+        return (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+
+def RegularPolygon(x, y, sides, radius, rotation=0.0):
+    rotation = math.radians(rotation)
+    return Polygon(*[(x + math.sin(rotation + i * 2 * math.pi / sides) * radius,
+                      y + math.cos(rotation + i * 2 * math.pi / sides) * radius) for i in range(sides)])
+
+
+def Rectangle(x, y, w, h):
+    return Polygon((x, y), (x + w, y), (x + w, y + h), (x, y + h))
+
+
+class PicoVector:
+    def __init__(self, display):
+        self._display = display
+        self._antialiasing = ANTIALIAS_NONE
+        self._font = None
+        self._font_size = 48
+
+    def set_antialiasing(self, aa):
+        self._antialiasing = aa
+
+    def set_font(self, font, size):
+        self._font = font
+        self._font_size = size
+        return True
+
+    def set_font_size(self, size):
+        self._font_size = size
+
+    def text(self, text, x, y, angle=None):
+        pass
+
+    def rotate(self, polygon, angle, origin_x, origin_y):
+        a = math.radians(angle)
+        s, c = math.sin(a), math.cos(a)
+        polygon._points = [(origin_x + (px - origin_x) * c - (py - origin_y) * s,
+                            origin_y + (px - origin_x) * s + (py - origin_y) * c) for px, py in polygon._points]
+
+    def translate(self, polygon, x, y):
+        polygon._points = [(px + x, py + y) for px, py in polygon._points]
+
+    def draw(self, *polygons):
+        # Even-odd, so a polygon inside another cuts a hole in it
+        edges = []
+        for polygon in polygons:
+            points = polygon._points
+            edges += [(p, q) for p, q in zip(points, points[1:] + points[:1]) if p[1] != q[1]]
+        if not edges:
+            return
+        min_y = int(math.floor(min(min(p[1], q[1]) for p, q in edges)))
+        max_y = int(math.ceil(max(max(p[1], q[1]) for p, q in edges)))
+        for y in range(min_y, max_y):
+            sy = y + 0.5
+            nodes = sorted(p[0] + (sy - p[1]) * (q[0] - p[0]) / (q[1] - p[1])
+                           for p, q in edges if (p[1] <= sy < q[1]) or (q[1] <= sy < p[1]))
+            for x0, x1 in zip(nodes[0::2], nodes[1::2]):
+                x0, x1 = int(round(x0)), int(round(x1))
+                if x1 > x0:
+                    self._display.pixel_span(x0, y, x1 - x0)
@@ -0,0 +1,1304 @@
+"""Host emulation of the PicoVision ``picovision`` module.
+
+Drawing goes into two NumPy arrays standing in for the two PSRAM banks, laid
+out the way DVDisplay lays out the real ones: the header and line table at 0,
+followed by the palettes and sprite table, the frame at 0x10000 and sprite data
+at the top of the bank. ``update()`` flips the banks and has the compositor
+build the frame the GPU would show from the one going on screen.
+
+Every byte the RP2040 would move over the PSRAM bus, or send to the GPU over
+I2C, is counted so the cost of a frame can be checked without hardware. Set
+``frame_callback`` to be handed each frame as it goes on screen.
+"""
+
+import math
+import os
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from compositor import GPU
+
+PEN_RGB888 = 9
+PEN_RGB555 = 10
+PEN_P5 = 11
+
+BLEND_TARGET = 0
+BLEND_FIXED = 1
+
+SPRITE_OVERWRITE = 0
+SPRITE_UNDER = 1
+SPRITE_OVER = 2
+SPRITE_BLEND_UNDER = 3
+SPRITE_BLEND_OVER = 4
+
+SPRITE_COMMIT_IMMEDIATE = 0
+SPRITE_COMMIT_MANUAL = 1
+SPRITE_COMMIT_AUTO = 2
+
+TILE_FLIP_X = 0x4000
+TILE_FLIP_Y = 0x8000
+
+# The emulator behaves like the widescreen build
+WIDESCREEN = True
+
+# Called with (display, image, stats) as each frame goes on screen, where image
+# is a (height, width, 3) array of RGB and stats is a FrameStats
+frame_callback = None
+
+# Where absolute paths, eg: "/floppy_birb/pipe.png", are looked up
+filesystem_root = None
+
+# sprite_overflow_lines are the scanlines with more sprite patches than the GPU can blend
+FrameStats = namedtuple("FrameStats", (
+    "frame", "psram_bytes_written", "psram_bytes_read", "i2c_bytes_written", "sprite_overflow_lines"))
+
+_MODE_RGB555 = 1
+_MODE_PALETTE = 2
+_MODE_RGB888 = 3
+
+_BANK_SIZE = 0x800000
+_BASE_ADDRESS = 0x10000
+_MAX_NUM_SPRITES = 1024
+_SPRITE_SIZE = 0x900
+_SPRITE_BASE_ADDRESS = _BANK_SIZE - _MAX_NUM_SPRITES * _SPRITE_SIZE
+_MAX_SPRITE_HEIGHT = 32
+
+_PALETTE_SIZE = 32
+_NUM_PALETTES = 2
+_MAX_DISPLAYED_SPRITES = 80
+_SPRITE_ENTRY_LEN = 7
+_CLEARED_SPRITE = bytes((1, 0xFF, 0xFF, 0, 0, 0, 0))
+
+_GLYPH_CACHE_SIZE = 4096
+_PIXEL_BUFFER_SIZE = 1024
+_MAX_SURFACES = 32
+_MAX_GLYPHS = 128
+_GLYPH_RUN_LEN = 8
+
+_I2C_REG_SCROLL_BASE = 0xE0
+_I2C_REG_PALETTE_INDEX = 0xF8
+_I2C_REG_SET_RES = 0xFC
+_I2C_REG_START = 0xFD
+
+_RESOLUTIONS = {
+    (640, 480): 0x00,
+    (720, 480): 0x01,
+    (720, 400): 0x02,
+    (720, 576): 0x03,
+    (800, 600): 0x10,
+    (800, 480): 0x11,
+    (800, 450): 0x12,
+    (960, 540): 0x14,
+    (1280, 720): 0x15,
+}
+
+_PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+_BUNDLE_MAGIC = b"PVSB"
+_BUNDLE_HEADER_LEN = 12
+
+
+def _open_path(path):
+    if isinstance(path, bytes):
+        path = path.decode()
+    if path.startswith("/") and filesystem_root is not None:
+        path = os.path.join(filesystem_root, path.lstrip("/"))
+    return open(path, "rb")
+
+
+def _rgb_to_rgb555(r, g, b):
+    return ((r & 0xF8) << 7) | ((g & 0xF8) << 2) | (b >> 3)
+
+
+def _rgb_from_hsv(h, s, v):
+    i = math.floor(h * 6.0)
+    f = h * 6.0 - i
+    v *= 255.0
+    p = int(v * (1.0 - s))
+    q = int(v * (1.0 - f * s))
+    t = int(v * (1.0 - (1.0 - f) * s))
+    v = int(v)
+    return [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)][int(i) % 6]
+
+
+def _count_runs(mask):
+    """The number of horizontal runs of set pixels, each a PSRAM write on the device."""
+    return int((np.diff(mask.astype(np.int8), axis=1, prepend=0) == 1).sum())
+
+
+def _run_lengths(mask):
+    """The length of each horizontal run of set pixels."""
+    edges = np.diff(np.pad(mask, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+class PSRAM:
+    """One APS6404 bank, counting the bytes moved over its bus."""
+
+    def __init__(self):
+        self.data = np.zeros(_BANK_SIZE, dtype=np.uint8)
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.transfers = 0
+
+    def write(self, address, data):
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).view(np.uint8).ravel()
+        else:
+            data = np.frombuffer(bytes(data), dtype=np.uint8)
+        self.data[address:address + len(data)] = data
+        self.bytes_written += len(data)
+        self.transfers += 1
+
+    def write_words(self, address, words):
+        self.write(address, np.asarray(words, dtype="<u4"))
+
+    def read_words(self, address, count):
+        self.bytes_read += count * 4
+        self.transfers += 1
+        return self.data[address:address + count * 4].view("<u4").copy()
+
+
+def _after_flip(method):
+    """Finishes a flip started by flip_async before touching the frame, as the device does."""
+    def wrapper(self, *args, **kwargs):
+        self.wait_for_flip()
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _recorded(method):
+    """Adds a drawing command to the display list while recording."""
+    def wrapper(self, *args, **kwargs):
+        self.wait_for_flip()
+        result = method(self, *args, **kwargs)
+        if self._recording and not self._replaying:
+            self._display_list.append((method, args, kwargs, self._get_state()))
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class PicoVision:
+    def __init__(self, pen_type=PEN_RGB888, width=320, height=240, frame_width=-1, frame_height=-1):
+        frame_width = width if frame_width == -1 else frame_width
+        frame_height = height if frame_height == -1 else frame_height
+        if frame_width < width or frame_height < height:
+            raise RuntimeError("PicoVision: Frame smaller than display!")
+
+        modes = {PEN_RGB888: _MODE_RGB888, PEN_RGB555: _MODE_RGB555, PEN_P5: _MODE_PALETTE}
+        if pen_type not in modes:
+            raise RuntimeError("PicoVision: Unsupported Mode!")
+        self._pen_type = pen_type
+        self._mode = modes[pen_type]
+
+        self._display_width = width
+        self._display_height = height
+        self._bounds = (frame_width, frame_height)
+        # Internal frame width should be a multiple of 4
+        self._frame_width = (frame_width + 3) & ~3
+        self._frame_height = frame_height
+
+        self._h_repeat = 1
+        self._v_repeat = 1
+        full_width = width
+        full_height = height
+        if width < 640 or (width == 640 and height in (360, 720)):
+            self._h_repeat = 2
+            full_width *= 2
+        if height < 400:
+            self._v_repeat = 2
+            full_height *= 2
+        if self._mode == _MODE_RGB888 and self._h_repeat == 1:
+            raise RuntimeError("PicoVision: Unsupported Mode!")
+        if (full_width, full_height) not in _RESOLUTIONS:
+            raise RuntimeError("PicoVision: Unsupported Mode!")
+
+        self._banks = [PSRAM(), PSRAM()]
+        self._frames = [self._make_frame(bank) for bank in self._banks]
+        self._gpu = GPU()
+        self._bank = 0
+
+        self._pen = 0
+        self._bg = 0
+        self._depth = 0
+        self._thickness = 1
+        self._blend_mode = BLEND_TARGET
+        self._clip = (0, 0, frame_width, frame_height)
+        self._font = "bitmap8"
+        self._glyph_cache = OrderedDict()
+        self._glyph_cache_size = _GLYPH_CACHE_SIZE
+        self._glyph_cache_stats = [0, 0, 0]
+        self._pixel_buffer_size = _PIXEL_BUFFER_SIZE
+        self._pixels_buffered = 0
+        self._pixel_buffer_writes = 0
+        self._pixel_buffer_base = (0, 0)
+        self._psram_stats_base = 0
+        # (address, width, height, mode) of each surface, or None when it's free
+        self._surfaces = [None] * _MAX_SURFACES
+
+        self._palette = np.zeros((_NUM_PALETTES, _PALETTE_SIZE, 3), dtype=np.uint8)
+        self._used = [[False] * _PALETTE_SIZE for _ in range(_NUM_PALETTES)]
+        self._local_palette = 0
+        self._rewrite_palette = 0
+        if self._mode == _MODE_PALETTE:
+            for i in range(_PALETTE_SIZE):
+                self._set_palette_colour(i, ((i << 16) | (i << 8) | i) << 3, 0)
+                n = _PALETTE_SIZE - i
+                self._set_palette_colour(i, ((n << 16) | (n << 8) | n) << 3, 1)
+
+        self._sprite_commit_mode = SPRITE_COMMIT_IMMEDIATE
+        self._sprite_pending = [_CLEARED_SPRITE] * _MAX_DISPLAYED_SPRITES
+        self._sprite_committed = [_CLEARED_SPRITE] * _MAX_DISPLAYED_SPRITES
+        self._sprites_dirty = False
+        self._sprite_bytes_requested = 0
+        self._sprite_bytes_written = 0
+        self._sprite_bytes_saved = 0
+
+        self._recording = False
+        self._replaying = False
+        self._display_list = []
+        self._flip_pending = False
+        self._vsync_callback = None
+
+        for bank in (0, 1):
+            self._bank = bank
+            self._write_header()
+        self._bank = 0
+        self._gpu.write(_I2C_REG_SET_RES, (_RESOLUTIONS[(full_width, full_height)],))
+        self._gpu.write(_I2C_REG_START, (1,))
+        for i in range(_MAX_DISPLAYED_SPRITES):
+            self._sprite_pending[i] = _CLEARED_SPRITE
+            self._commit_sprite(i, True)
+        if self._mode == _MODE_PALETTE:
+            self._rewrite_palette = 2
+
+        # Clear each buffer
+        for _ in range(2):
+            self._pen = 0
+            self.clear()
+            self._flip()
+
+        self._frame_count = 0
+        self._counted = self._totals()
+        self.reset_stats()
+
+    # PSRAM layout
+
+    def _make_frame(self, psram):
+        stride = self._frame_width * 3
+        rows = psram.data[_BASE_ADDRESS:_BASE_ADDRESS + stride * self._frame_height].reshape(self._frame_height, stride)
+        if self._mode == _MODE_PALETTE:
+            return rows[:, :self._frame_width]
+        if self._mode == _MODE_RGB555:
+            return rows[:, :self._frame_width * 2].view("<u2")
+        return rows.reshape(self._frame_height, self._frame_width, 3)
+
+    def _pixel_size(self):
+        return {_MODE_PALETTE: 1, _MODE_RGB555: 2, _MODE_RGB888: 3}[self._mode]
+
+    def _ram(self):
+        return self._banks[self._bank]
+
+    def _write_header(self):
+        full_width = self._display_width * self._h_repeat
+        self._ram().write_words(0, (
+            0x4F434950,
+            0x01000101 + (self._v_repeat << 16),
+            full_width << 16,
+            self._display_height << 16,
+            0x00000001,
+            self._display_height + (self._bank << 24),
+            0x04000000 + _NUM_PALETTES))
+        self._set_scroll_idx_for_lines(0, 0, self._display_height)
+        self._write_sprite_table()
+
+    def _write_sprite_table(self):
+        addr = (self._display_height + 7) * 4 + _NUM_PALETTES * _PALETTE_SIZE * 3
+        sprite_type = self._mode << 28
+        self._ram().write_words(addr, [sprite_type + i * _SPRITE_SIZE + _SPRITE_BASE_ADDRESS for i in range(_MAX_NUM_SPRITES)])
+
+    def _write_palette(self):
+        self._ram().write((self._display_height + 7) * 4, self._palette)
+
+    def _line_address(self, y):
+        return _BASE_ADDRESS + y * self._frame_width * 3
+
+    def _set_scroll_idx_for_lines(self, idx, min_y, max_y):
+        if max_y <= min_y:
+            return
+        addr = 4 * (7 + min_y)
+        line_type = (self._mode << 27) + (self._h_repeat << 24)
+        lines = np.array([line_type + self._line_address(y) for y in range(min_y, max_y)], dtype=np.uint32)
+        if idx >= 0:
+            lines |= np.uint32((idx & 7) << 29)
+        else:
+            lines |= self._ram().read_words(addr, max_y - min_y) & np.uint32(0xE0000000)
+        self._ram().write_words(addr, lines)
+
+    def _totals(self):
+        return (sum(bank.bytes_written for bank in self._banks),
+                sum(bank.bytes_read for bank in self._banks),
+                self._gpu.i2c_bytes_written)
+
+    # Drawing state
+
+    def _get_state(self):
+        return (self._pen, self._bg, self._depth, self._thickness, self._blend_mode, self._clip, self._font)
+
+    def _set_state(self, state):
+        self._pen, self._bg, self._depth, self._thickness, self._blend_mode, self._clip, self._font = state
+
+    def _pen_value(self):
+        if self._mode == _MODE_PALETTE:
+            return (self._pen << 2) | self._depth
+        if self._mode == _MODE_RGB555:
+            return (self._pen | self._depth) & 0xFFFF
+        return np.array((self._pen & 0xFF, (self._pen >> 8) & 0xFF, (self._pen >> 16) & 0xFF), dtype=np.uint8)
+
+    def _fill(self, x, y, w, h):
+        """Fills a rectangle with the pen, clipped, counting the bytes written."""
+        cx, cy, cw, ch = self._clip
+        x0, y0 = max(x, cx), max(y, cy)
+        x1, y1 = min(x + w, cx + cw), min(y + h, cy + ch)
+        if x1 <= x0 or y1 <= y0:
+            return
+        self._frames[self._bank][y0:y1, x0:x1] = self._pen_value()
+        self._ram().bytes_written += (x1 - x0) * (y1 - y0) * self._pixel_size()
+        self._ram().transfers += y1 - y0
+
+    def _fill_mask(self, x, y, mask):
+        """Sets the pixels of a boolean mask, placed at x, y, to the pen."""
+        cx, cy, cw, ch = self._clip
+        h, w = mask.shape
+        x0, y0 = max(x, cx), max(y, cy)
+        x1, y1 = min(x + w, cx + cw), min(y + h, cy + ch)
+        if x1 <= x0 or y1 <= y0:
+            return
+        mask = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+        self._frames[self._bank][y0:y1, x0:x1][mask] = self._pen_value()
+        self._buffer_pixels(mask)
+
+    def _buffer_pixels(self, mask):
+        """Counts the writes the pixel buffer combines the set pixels of a mask into."""
+        # Runs of adjacent pixels on a line are combined, up to the pixel buffer size in whole pixels
+        pixels_per_write = max(1, self._pixel_buffer_size // self._pixel_size())
+        runs = _run_lengths(mask)
+        writes = int(((runs + pixels_per_write - 1) // pixels_per_write).sum())
+        self._pixels_buffered += int(runs.sum())
+        self._pixel_buffer_writes += writes
+        self._ram().bytes_written += int(runs.sum()) * self._pixel_size()
+        self._ram().transfers += writes
+
+    def _draw_image(self, x, y, rgb, mask):
+        """Draws the pixels of an RGB image where mask is set, a pixel at a time like pngdec."""
+        cx, cy, cw, ch = self._clip
+        h, w = mask.shape
+        x0, y0 = max(x, cx), max(y, cy)
+        x1, y1 = min(x + w, cx + cw), min(y + h, cy + ch)
+        if x1 <= x0 or y1 <= y0:
+            return
+        rgb = rgb[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.uint32)
+        mask = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        if self._mode == _MODE_PALETTE:
+            # The nearest colour in the palette being drawn with
+            distance = ((rgb[:, :, None, :].astype(np.int32) - self._palette[self._local_palette].astype(np.int32)) ** 2).sum(axis=-1)
+            pixels = ((distance.argmin(axis=-1) << 2) | self._depth).astype(np.uint8)
+        elif self._mode == _MODE_RGB555:
+            pixels = (((r & 0xF8) << 7) | ((g & 0xF8) << 2) | (b >> 3) | self._depth).astype(np.uint16)
+        else:
+            pixels = np.stack((b, g, r), axis=-1).astype(np.uint8)
+        self._frames[self._bank][y0:y1, x0:x1][mask] = pixels[mask]
+        self._buffer_pixels(mask)
+
+    def set_pen(self, pen):
+        self._pen = pen & 0x1F if self._mode == _MODE_PALETTE else pen
+
+    def set_bg(self, pen):
+        self._bg = pen
+
+    def set_blend_mode(self, mode):
+        self._blend_mode = mode
+
+    def set_depth(self, depth):
+        if self._mode == _MODE_PALETTE:
+            self._depth = 1 if depth > 0 else 0
+        elif self._mode == _MODE_RGB555:
+            self._depth = 0x8000 if depth > 0 else 0
+
+    def set_thickness(self, thickness):
+        self._thickness = thickness
+
+    def set_clip(self, x, y, w, h):
+        bw, bh = self._bounds
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, bw), min(y + h, bh)
+        self._clip = (x0, y0, max(0, x1 - x0), max(0, y1 - y0))
+
+    def remove_clip(self):
+        self._clip = (0, 0) + self._bounds
+
+    def set_font(self, font):
+        self._font = font
+
+    def get_bounds(self):
+        return self._bounds
+
+    # Pens and palettes
+
+    def create_pen(self, r, g, b):
+        r, g, b = r & 0xFF, g & 0xFF, b & 0xFF
+        if self._mode == _MODE_RGB555:
+            return _rgb_to_rgb555(r, g, b)
+        if self._mode == _MODE_RGB888:
+            return (r << 16) | (g << 8) | b
+        # Create a colour and place it in the palette if there's space
+        used = self._used[self._local_palette]
+        for i in range(_PALETTE_SIZE):
+            if not used[i]:
+                used[i] = True
+                self._set_palette_colour(i, (r << 16) | (g << 8) | b, self._local_palette)
+                return i
+        return -1
+
+    def create_pen_hsv(self, h, s, v):
+        return self.create_pen(*_rgb_from_hsv(h, s, v))
+
+    def update_pen(self, i, r, g, b):
+        if self._mode != _MODE_PALETTE:
+            return 0
+        i &= 0x1F
+        self._used[self._local_palette][i] = True
+        self._set_palette_colour(i, ((r & 0xFF) << 16) | ((g & 0xFF) << 8) | (b & 0xFF), self._local_palette)
+        return i
+
+    def reset_pen(self, i):
+        if self._mode != _MODE_PALETTE:
+            return 0
+        self._set_palette_colour(i, 0, self._local_palette)
+        self._used[self._local_palette][i] = False
+        return i
+
+    def set_palette(self, *colours):
+        if len(colours) == 1 and not isinstance(colours[0], (list, tuple)):
+            try:
+                data = np.frombuffer(memoryview(colours[0]).tobytes(), dtype=np.uint8)
+            except TypeError:
+                raise TypeError("set_palette(): can't convert object to list")
+            if self._mode != _MODE_PALETTE:
+                raise ValueError("set_palette(): palette buffers need PEN_P5")
+            if len(data) == _PALETTE_SIZE * 3:
+                palettes = [self._local_palette]
+            elif len(data) == _PALETTE_SIZE * 3 * _NUM_PALETTES:
+                palettes = list(range(_NUM_PALETTES))
+            else:
+                raise ValueError("set_palette(): buffer must hold 32 or 64 colours as R, G, B bytes")
+            self._palette[palettes] = data.reshape(len(palettes), _PALETTE_SIZE, 3)
+            for palette_idx in palettes:
+                self._used[palette_idx] = [True] * _PALETTE_SIZE
+            self._rewrite_palette = 2
+            return
+        if len(colours) == 1:
+            if not isinstance(colours[0], list):
+                raise TypeError("set_palette(): can't convert object to list")
+            if len(colours[0]) == 0:
+                raise ValueError("set_palette(): cannot provide an empty list")
+            colours = colours[0]
+        for i, colour in enumerate(colours):
+            if not isinstance(colour, tuple):
+                raise ValueError("set_palette(): can't convert object to tuple")
+            if len(colour) != 3:
+                raise ValueError("set_palette(): tuple must contain R, G, B values")
+            self.update_pen(i, *colour)
+
+    def set_local_palette(self, index):
+        self._local_palette = index % _NUM_PALETTES
+
+    def build_palette_lut(self, index=None):
+        # Nothing here matches colours to the palette, so there's no lookup table to build
+        if self._mode != _MODE_PALETTE:
+            raise ValueError("build_palette_lut(): needs PEN_P5")
+        if index is not None and not 0 <= index < _NUM_PALETTES:
+            raise ValueError("build_palette_lut(): palette index out of range")
+
+    def set_remote_palette(self, index):
+        self._gpu.write(_I2C_REG_PALETTE_INDEX, (index & 0xFF,))
+
+    def _set_palette_colour(self, entry, colour, palette_idx):
+        self._palette[palette_idx, entry] = ((colour >> 16) & 0xFF, (colour >> 8) & 0xFF, colour & 0xFF)
+        self._rewrite_palette = 2
+
+    # Primitives
+
+    @_recorded
+    def clear(self):
+        self._fill(*self._clip)
+
+    @_recorded
+    def pixel(self, x, y):
+        self._fill_mask(x, y, np.ones((1, 1), dtype=bool))
+
+    @_recorded
+    def pixel_span(self, x, y, length):
+        self._fill(x, y, length, 1)
+
+    @_recorded
+    def rectangle(self, x, y, w, h):
+        self._fill(x, y, w, h)
+
+    @_recorded
+    def circle(self, x, y, r):
+        if r <= 0:
+            return
+        ox, oy, err = r, 0, -r
+        while ox >= oy:
+            last_oy = oy
+            err += oy
+            oy += 1
+            err += oy
+            self._fill(x - ox, y + last_oy, ox * 2 + 1, 1)
+            if last_oy != 0:
+                self._fill(x - ox, y - last_oy, ox * 2 + 1, 1)
+            if err >= 0 and ox != last_oy:
+                self._fill(x - last_oy, y + ox, last_oy * 2 + 1, 1)
+                if ox != 0:
+                    self._fill(x - last_oy, y - ox, last_oy * 2 + 1, 1)
+                err -= ox
+                ox -= 1
+                err -= ox
+
+    def _polygon(self, points):
+        cx, cy, cw, ch = self._clip
+        ys = [p[1] for p in points]
+        for y in range(max(min(ys), cy), min(max(ys), cy + ch)):
+            nodes = []
+            for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+                if (y1 <= y < y2) or (y2 <= y < y1):
+                    nodes.append(x1 + (y - y1) * (x2 - x1) // (y2 - y1))
+            nodes.sort()
+            for x0, x1 in zip(nodes[0::2], nodes[1::2]):
+                self._fill(x0, y, x1 - x0, 1)
+
+    @_recorded
+    def polygon(self, *points):
+        if len(points) == 1:
+            if not isinstance(points[0], list):
+                raise TypeError("poly(): can't convert object to list")
+            if len(points[0]) == 0:
+                raise ValueError("poly(): cannot provide an empty list")
+            points = points[0]
+        for point in points:
+            if not isinstance(point, tuple):
+                raise ValueError("poly(): can't convert object to tuple")
+            if len(point) != 2:
+                raise ValueError("poly(): tuple must only contain two numbers")
+        self._polygon([(int(x), int(y)) for x, y in points])
+
+    @_recorded
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        self._polygon([(x1, y1), (x2, y2), (x3, y3)])
+
+    @_recorded
+    def line(self, x1, y1, x2, y2, thickness=None):
+        if thickness is not None and thickness > 1:
+            # A thick line is a quad either side of the line
+            length = math.hypot(x2 - x1, y2 - y1) or 1
+            nx = -(y2 - y1) * thickness / (2 * length)
+            ny = (x2 - x1) * thickness / (2 * length)
+            self._polygon([(int(x1 + nx), int(y1 + ny)), (int(x2 + nx), int(y2 + ny)),
+                           (int(x2 - nx), int(y2 - ny)), (int(x1 - nx), int(y1 - ny))])
+            return
+        if y1 == y2:
+            self._fill(min(x1, x2), y1, abs(x2 - x1), 1)
+            return
+        if x1 == x2:
+            self._fill(x1, min(y1, y2), 1, abs(y2 - y1))
+            return
+        dx, dy = x2 - x1, y2 - y1
+        steps = max(abs(dx), abs(dy))
+        # Drawn a pixel at a time, so adjacent pixels on a line share a write
+        xs = np.array([x1 + (dx * i) // steps for i in range(steps)])
+        ys = np.array([y1 + (dy * i) // steps for i in range(steps)])
+        mask = np.zeros((ys.max() - ys.min() + 1, xs.max() - xs.min() + 1), dtype=bool)
+        mask[ys - ys.min(), xs - xs.min()] = True
+        self._fill_mask(int(xs.min()), int(ys.min()), mask)
+
+    # Text, drawn with Pillow's built in font when it's installed
+
+    def _text_mask(self, text, scale):
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError:
+            return None
+        font = ImageFont.load_default()
+        _, _, w, h = font.getbbox(text)
+        if w <= 0 or h <= 0:
+            return None
+        image = Image.new("1", (w, h))
+        ImageDraw.Draw(image).text((0, 0), text, font=font, fill=1)
+        mask = np.array(image, dtype=bool)
+        scale = max(1, int(round(scale)))
+        return mask.repeat(scale, axis=0).repeat(scale, axis=1)
+
+    def _glyph_runs(self, char, scale):
+        # Rectangles in the glyph as the cache keeps it: runs on each row, stacked where they repeat
+        mask = self._text_mask(char, scale)
+        if mask is None:
+            return 0
+        edges = np.diff(np.pad(mask, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        count = 0
+        above = set()
+        for row in edges:
+            runs = set(zip(np.flatnonzero(row == 1), np.flatnonzero(row == -1)))
+            count += len(runs - above)
+            above = runs
+        return count
+
+    def _cache_glyphs(self, text, wordwrap, scale, angle, spacing, fixed_width):
+        # Counts glyph cache hits and misses as the device would, the text itself is drawn as usual
+        if not self._glyph_cache_size or angle or any(not " " <= c <= "~" for c in text):
+            return
+        hershey = not self._font.startswith("bitmap")
+        if hershey:
+            key = (self._font, scale, self._thickness, 0, False)
+        else:
+            if self.measure_text(text, scale, spacing, fixed_width) > wordwrap:
+                return
+            key = (self._font, max(1, int(scale)), 0, spacing, bool(fixed_width))
+
+        for c in text:
+            if key + (c,) in self._glyph_cache:
+                self._glyph_cache.move_to_end(key + (c,))
+                self._glyph_cache_stats[0] += 1
+                continue
+            self._glyph_cache_stats[1] += 1
+            size = self._glyph_runs(c, scale) * _GLYPH_RUN_LEN
+            if size > self._glyph_cache_size:
+                continue
+            while len(self._glyph_cache) == _MAX_GLYPHS or sum(self._glyph_cache.values()) + size > self._glyph_cache_size:
+                self._glyph_cache.popitem(last=False)
+                self._glyph_cache_stats[2] += 1
+            self._glyph_cache[key + (c,)] = size
+
+    def set_glyph_cache_size(self, size):
+        if size < 0:
+            raise ValueError("set_glyph_cache_size: size must be positive")
+        self._glyph_cache_size = min(size, 0xFFFF * _GLYPH_RUN_LEN)
+        self._glyph_cache.clear()
+
+    def get_glyph_cache_stats(self):
+        return tuple(self._glyph_cache_stats) + (sum(self._glyph_cache.values()),)
+
+    def reset_glyph_cache_stats(self):
+        self._glyph_cache_stats = [0, 0, 0]
+
+    @_recorded
+    def text(self, text, x1, y1, wordwrap=0x7FFFFFFF, scale=2, angle=0, spacing=1, fixed_width=False):
+        scale = 2 if scale is None else scale
+        self._cache_glyphs(str(text), wordwrap, scale, angle, spacing, fixed_width)
+        for i, line in enumerate(str(text).split("\n")):
+            mask = self._text_mask(line, scale)
+            if mask is not None:
+                self._fill_mask(x1, y1 + i * 8 * int(scale), mask)
+
+    @_recorded
+    def character(self, char, x, y, scale=2):
+        mask = self._text_mask(chr(char), scale)
+        if mask is not None:
+            self._fill_mask(x, y, mask)
+
+    def measure_text(self, text, scale=2, spacing=1, fixed_width=False):
+        scale = 2 if scale is None else scale
+        mask = self._text_mask(str(text), scale)
+        if mask is None:
+            return int(len(str(text)) * 6 * scale)
+        return mask.shape[1]
+
+    # Tilemaps
+
+    @_recorded
+    def tilemap(self, tilemap, bounds, tile_data, tile_width=16, tile_height=16):
+        if len(bounds) != 4:
+            raise ValueError("tilemap: bounds tuple must contain (x, y, w, h)")
+        ox, oy, width, height = bounds
+        if width < 0 or height < 0:
+            raise ValueError("tilemap: bounds must not be negative")
+        if tile_width <= 0 or tile_height <= 0:
+            raise ValueError("tilemap: tile size must be positive")
+        if len(tile_data) != 3:
+            raise ValueError("tilemap: tile_data tuple must contain (w, h, data)")
+
+        sheet_width, sheet_height, sheet_data = tile_data
+        sheet_type = np.dtype(np.uint8 if self._mode == _MODE_PALETTE else "<u2")
+        sheet = memoryview(sheet_data).tobytes()
+        if sheet_width < 0 or sheet_height < 0 or len(sheet) < sheet_width * sheet_height * sheet_type.itemsize:
+            raise ValueError("tilemap: tile_data is too small for its size")
+        sheet = np.frombuffer(sheet[:sheet_width * sheet_height * sheet_type.itemsize], dtype=sheet_type).reshape(sheet_height, sheet_width)
+
+        # 16-bit maps, eg: array("H"), can also flip tiles
+        view = memoryview(tilemap)
+        wide = view.format in ("H", "h")
+        entries = np.frombuffer(view.tobytes(), dtype="<u2" if wide else np.uint8)
+        if len(entries) < width * height:
+            raise ValueError("tilemap: tilemap is too small for bounds")
+        entries = entries[:width * height].reshape(height, width)
+
+        sheet_cols = sheet_width // tile_width
+        num_tiles = sheet_cols * (sheet_height // tile_height)
+        for map_y in range(height):
+            for map_x in range(width):
+                entry = int(entries[map_y, map_x])
+                index = entry & 0x3FFF
+                if index == 0 or index > num_tiles:
+                    continue
+                index -= 1
+                sx = (index % sheet_cols) * tile_width
+                sy = (index // sheet_cols) * tile_height
+                tile = sheet[sy:sy + tile_height, sx:sx + tile_width]
+                if wide and entry & TILE_FLIP_X:
+                    tile = tile[:, ::-1]
+                if wide and entry & TILE_FLIP_Y:
+                    tile = tile[::-1, :]
+                self._draw_tile(ox + map_x * tile_width, oy + map_y * tile_height, tile)
+
+    def _draw_tile(self, x, y, tile):
+        cx, cy, cw, ch = self._clip
+        h, w = tile.shape
+        x0, y0 = max(x, cx), max(y, cy)
+        x1, y1 = min(x + w, cx + cw), min(y + h, cy + ch)
+        if x1 <= x0 or y1 <= y0:
+            return
+        tile = tile[y0 - y:y1 - y, x0 - x:x1 - x]
+        target = self._frames[self._bank][y0:y1, x0:x1]
+        if self._mode == _MODE_PALETTE:
+            opaque = (tile & 0x01) != 0
+            target[opaque] = (tile[opaque] & 0x7C) | self._depth
+        elif self._mode == _MODE_RGB555:
+            opaque = (tile & 0x8000) != 0
+            target[opaque] = tile[opaque] | self._depth
+        else:
+            opaque = (tile & 0x8000) != 0
+            pixels = tile[opaque]
+            target[opaque] = np.stack(((pixels & 0x1F) << 3, ((pixels >> 5) & 0x1F) << 3, ((pixels >> 10) & 0x1F) << 3), axis=-1).astype(np.uint8)
+        self._ram().bytes_written += int(opaque.sum()) * self._pixel_size()
+        self._ram().transfers += _count_runs(opaque)
+
+    # Surfaces, kept between the end of the frame and the sprite data like DVDisplay keeps them
+
+    def _surface_size(self, idx):
+        _, width, height, mode = self._surfaces[idx]
+        bytes_per_pixel = {_MODE_PALETTE: 1, _MODE_RGB555: 2, _MODE_RGB888: 3}[mode]
+        return (width * height * bytes_per_pixel + 3) & ~3
+
+    def _surface_start_address(self):
+        return (self._line_address(self._frame_height) + 3) & ~3
+
+    def _is_surface(self, idx):
+        return 0 <= idx < _MAX_SURFACES and self._surfaces[idx] is not None and self._surfaces[idx][3] == self._mode
+
+    def _surface_pixels(self, idx):
+        """The pixels of a surface, or the frame for None, in the bank being drawn to."""
+        if idx is None:
+            return self._frames[self._bank]
+        address, width, height, _ = self._surfaces[idx]
+        data = self._ram().data[address:address + width * height * self._pixel_size()]
+        if self._mode == _MODE_PALETTE:
+            return data.reshape(height, width)
+        if self._mode == _MODE_RGB555:
+            return data.view("<u2").reshape(height, width)
+        return data.reshape(height, width, 3)
+
+    @_after_flip
+    def create_surface(self, width, height):
+        if width <= 0 or height <= 0 or width > 0xFFFF or height > 0xFFFF:
+            raise ValueError("create_surface: invalid size")
+        if None not in self._surfaces:
+            raise RuntimeError("create_surface: not enough free PSRAM")
+        idx = self._surfaces.index(None)
+        self._surfaces[idx] = (0, width, height, self._mode)
+        size = self._surface_size(idx)
+
+        # First fit: move past each surface in the way until there's a gap
+        address = self._surface_start_address()
+        moved = True
+        while moved:
+            moved = False
+            for i, surface in enumerate(self._surfaces):
+                if i != idx and surface is not None and address < surface[0] + self._surface_size(i) and surface[0] < address + size:
+                    address = surface[0] + self._surface_size(i)
+                    moved = True
+
+        if address + size > _SPRITE_BASE_ADDRESS:
+            self._surfaces[idx] = None
+            raise RuntimeError("create_surface: not enough free PSRAM")
+        self._surfaces[idx] = (address, width, height, self._mode)
+        return idx
+
+    @_after_flip
+    def free_surface(self, surface):
+        if 0 <= surface < _MAX_SURFACES:
+            self._surfaces[surface] = None
+
+    def get_free_surface_memory(self):
+        start = self._surface_start_address()
+        used = sum(self._surface_size(i) for i, surface in enumerate(self._surfaces) if surface is not None)
+        return max(0, _SPRITE_BASE_ADDRESS - start - used)
+
+    @_recorded
+    def blit(self, src_surface, src_rect, dst_point, transparent=-1, dst_surface=None):
+        for surface in (src_surface, dst_surface):
+            if surface is not None and not self._is_surface(surface):
+                raise ValueError("blit: invalid surface, or surface created in a different mode")
+        if len(src_rect) != 4:
+            raise ValueError("blit: src_rect tuple must contain (x, y, w, h)")
+        if len(dst_point) != 2:
+            raise ValueError("blit: dst_point tuple must contain (x, y)")
+
+        src = self._surface_pixels(src_surface)
+        dst = self._surface_pixels(dst_surface)
+        sx, sy, w, h = src_rect
+        dx, dy = dst_point[0] - sx, dst_point[1] - sy
+
+        # Clip to the source, then to the destination, which for the frame is the clip
+        x0, y0 = max(sx, 0), max(sy, 0)
+        x1, y1 = min(sx + w, src.shape[1]), min(sy + h, src.shape[0])
+        bx, by, bw, bh = self._clip if dst_surface is None else (0, 0, dst.shape[1], dst.shape[0])
+        x0, y0 = max(x0 + dx, bx) - dx, max(y0 + dy, by) - dy
+        x1, y1 = min(x1 + dx, bx + bw) - dx, min(y1 + dy, by + bh) - dy
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        # Copied first, so a blit within a surface reads each pixel before it's overwritten
+        pixels = src[y0:y1, x0:x1].copy()
+        if transparent < 0:
+            opaque = np.ones(pixels.shape[:2], dtype=bool)
+        elif self._mode == _MODE_PALETTE:
+            opaque = ((pixels >> 2) & 0x1F) != transparent
+        elif self._mode == _MODE_RGB555:
+            opaque = (pixels & 0x7FFF) != transparent
+        else:
+            opaque = (pixels[..., 0] | (pixels[..., 1].astype(np.uint32) << 8) | (pixels[..., 2].astype(np.uint32) << 16)) != transparent
+        dst[y0 + dy:y1 + dy, x0 + dx:x1 + dx][opaque] = pixels[opaque]
+
+        # Each row is read in 1KB chunks and its opaque runs written back
+        row_bytes = (x1 - x0) * self._pixel_size()
+        self._ram().bytes_read += row_bytes * (y1 - y0)
+        self._ram().transfers += (y1 - y0) * ((row_bytes + _PIXEL_BUFFER_SIZE - 1) // _PIXEL_BUFFER_SIZE)
+        self._ram().bytes_written += int(opaque.sum()) * self._pixel_size()
+        self._ram().transfers += _count_runs(opaque)
+
+    # Scroll groups and line offsets
+
+    @_after_flip
+    def set_scroll_group_offset(self, scroll_group=1, x=0, y=0, wrap_x=0, wrap_y=0, wrap_x_to=0, wrap_y_to=0):
+        if scroll_group < 1 or scroll_group > 7:
+            return
+        pixel_size = self._pixel_size()
+        wrap_position = 0
+        wrap_offset = 0
+        if x < wrap_x < x + self._display_width:
+            wrap_position = (wrap_x - x) * pixel_size
+            wrap_offset = (wrap_x_to - wrap_x) * pixel_size
+
+        def address(px, py):
+            return _BASE_ADDRESS + py * self._frame_width * 3 + px * pixel_size
+
+        addr_offset = address(x, y) - address(0, 0)
+        addr_offset2 = address(x, y + wrap_y_to) - address(0, wrap_y)
+        max_addr = 0
+        if y < wrap_y < y + self._display_height:
+            max_addr = address(0, wrap_y)
+
+        config = bytearray()
+        config += (addr_offset & 0xFFFFFF).to_bytes(3, "little")
+        config += (max_addr & 0xFFFFFF).to_bytes(3, "little")
+        config += (addr_offset2 & 0xFFFFFF).to_bytes(3, "little")
+        config += (wrap_position & 0xFFFF).to_bytes(2, "little")
+        config += (wrap_offset & 0xFFFF).to_bytes(2, "little")
+        self._gpu.write(_I2C_REG_SCROLL_BASE + scroll_group, config)
+
+    @_recorded
+    def set_scroll_group_for_lines(self, scroll_index, min_y, max_y):
+        self._set_scroll_idx_for_lines(scroll_index, min_y, max_y)
+
+    @_recorded
+    def set_line_offsets(self, offsets, start=0, scroll_group=0):
+        data = memoryview(offsets).tobytes()
+        if len(data) % 4 != 0:
+            raise ValueError("set_line_offsets: offsets must be a 32-bit array, eg: array('I')")
+        lines = np.frombuffer(data, dtype="<u4")
+        if scroll_group < 0 or scroll_group > 7:
+            raise ValueError("set_line_offsets: scroll_group must be in the range 0 to 7")
+        if start < 0 or start + len(lines) > self._display_height:
+            raise ValueError("set_line_offsets: lines out of range")
+        if np.any(lines >= _SPRITE_BASE_ADDRESS - _BASE_ADDRESS):
+            raise ValueError("set_line_offsets: offset out of range")
+        line_type = (self._mode << 27) | ((scroll_group & 7) << 29) | (self._h_repeat << 24)
+        self._ram().write_words(4 * (7 + start), line_type + ((lines + _BASE_ADDRESS) & 0xFFFFFF))
+
+    @_after_flip
+    def get_line_offset(self, x, y):
+        return y * self._frame_width * 3 + x * self._pixel_size()
+
+    # Sprites
+
+    @_recorded
+    def _define_sprite(self, sprite_data_idx, width, height, data):
+        """Writes sprite data the way DVDisplay::define_sprite_internal lays it out."""
+        opaque = (data & (1 if data.dtype == np.uint8 else 0x8000)) != 0
+        offsets, lengths = [], []
+        for row in opaque[:_MAX_SPRITE_HEIGHT]:
+            columns = np.flatnonzero(row)
+            if len(columns) == 0:
+                offsets.append(min(width, 0xFF))
+                lengths.append(0)
+            else:
+                offsets.append(int(columns[0]))
+                lengths.append(int(columns[-1]) + 1 - int(columns[0]))
+
+        # Clip off the bottom of the image if it is empty
+        height = min(height, _MAX_SPRITE_HEIGHT)
+        while height > 1 and lengths[height - 1] == 0:
+            height -= 1
+
+        header = np.array([(height << 8) + width] + [(lengths[i] << 8) | offsets[i] for i in range(height)], dtype="<u2")
+        addr = _SPRITE_BASE_ADDRESS + sprite_data_idx * _SPRITE_SIZE
+        self._ram().write(addr, header)
+        addr += len(header) * 2
+        if (len(header) * 2) & 2:
+            addr += 2
+        for i in range(height):
+            row = data[i, offsets[i]:offsets[i] + lengths[i]]
+            self._ram().write(addr, row)
+            addr += row.nbytes
+
+    @_recorded
+    def _load_pvs_sprite(self, sprite_data_idx, data):
+        self._ram().write(_SPRITE_BASE_ADDRESS + sprite_data_idx * _SPRITE_SIZE, data)
+
+    def _decode_png(self, data, source):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise RuntimeError("load_sprite: decoding PNGs needs Pillow installed")
+        import io
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception:
+            raise RuntimeError("load_sprite: could not read file/buffer.")
+
+        if source is not None:
+            if len(source) != 4:
+                raise ValueError("load_sprite: source tuple must contain (x, y, w, h)")
+            x, y, w, h = source
+            image = image.crop((x, y, x + w, y + h))
+
+        if self._mode == _MODE_PALETTE:
+            # 5-bit palette entries with the alpha in bit 0, straight from an indexed PNG
+            if image.mode != "P":
+                return image.width, image.height, np.zeros((image.height, image.width), dtype=np.uint8)
+            index = np.array(image, dtype=np.uint8)
+            alpha = np.ones(256, dtype=bool)
+            transparency = image.info.get("transparency")
+            if isinstance(transparency, bytes):
+                alpha[:len(transparency)] = np.frombuffer(transparency, dtype=np.uint8) > 0
+                alpha[len(transparency):] = False
+            elif isinstance(transparency, int):
+                alpha[transparency] = False
+            else:
+                alpha[:] = False
+            return image.width, image.height, (((index & 0x1F) << 2) | alpha[index]).astype(np.uint8)
+
+        # 16-bit RGB555 with a 1-bit alpha
+        rgba = np.array(image.convert("RGBA"), dtype=np.uint16)
+        pixels = ((rgba[..., 0] & 0xF8) << 7) | ((rgba[..., 1] & 0xF8) << 2) | (rgba[..., 2] >> 3)
+        pixels |= np.where(rgba[..., 3] > 0, 0x8000, 0).astype(np.uint16)
+        return image.width, image.height, pixels.astype("<u2")
+
+    @_after_flip
+    def load_sprite(self, filename, index=-1, source=None):
+        if isinstance(filename, (str, bytes)):
+            with _open_path(filename) as f:
+                data = f.read()
+        else:
+            data = memoryview(filename).tobytes()
+
+        if not data.startswith(_PNG_HEADER):
+            # Not a PNG, so assume it's a raw PicoVision sprite
+            if index != -1:
+                self._load_pvs_sprite(index, data)
+            return None
+
+        width, height, pixels = self._decode_png(data, source)
+        if index == -1:
+            return (width, height, bytearray(pixels.tobytes()))
+        self._define_sprite(index, width, height, pixels)
+        return True
+
+    @_after_flip
+    def load_sprite_bundle(self, bundle, both_buffers=True):
+        # A bytes object is the bundle itself, only a str is a filename
+        if isinstance(bundle, str):
+            with _open_path(bundle) as f:
+                data = f.read()
+        else:
+            data = memoryview(bundle).tobytes()
+
+        if len(data) < _BUNDLE_HEADER_LEN or data[:4] != _BUNDLE_MAGIC:
+            raise ValueError("load_sprite_bundle: not a sprite bundle")
+        first_index, num_indexes, num_sprites = (int.from_bytes(data[i:i + 2], "little") for i in (4, 6, 8))
+        if first_index + num_indexes > _MAX_NUM_SPRITES:
+            raise ValueError("load_sprite_bundle: bundle doesn't fit in the sprite indexes")
+
+        table = np.frombuffer(data, dtype="<u2", count=num_sprites * 2, offset=_BUNDLE_HEADER_LEN).reshape(-1, 2)
+        offset = _BUNDLE_HEADER_LEN + num_sprites * 4
+        banks = self._banks if both_buffers else [self._ram()]
+        for index, length in table.tolist():
+            if index + -(-length // _SPRITE_SIZE) > num_indexes or offset + length > len(data):
+                raise ValueError("load_sprite_bundle: bundle is corrupt")
+            for bank in banks:
+                bank.write(_SPRITE_BASE_ADDRESS + (first_index + index) * _SPRITE_SIZE, data[offset:offset + length])
+            offset += (length + 3) & ~3
+
+    @_after_flip
+    def load_animation(self, slot, data, frame_size, source=None):
+        if len(frame_size) != 2:
+            raise ValueError("load_animation: frame_size tuple must contain (w, h)")
+        frame_w, frame_h = frame_size
+
+        cropped = False
+        if isinstance(data, str):
+            data = self.load_sprite(data, -1, source)
+            cropped = True
+        if len(data) != 3:
+            raise ValueError("load_animation: data tuple must contain (w, h, data)")
+
+        sheet_w, sheet_h, sheet_data = data
+        source_x, source_y, source_w, source_h = 0, 0, sheet_w, sheet_h
+        if isinstance(source, tuple) and not cropped:
+            if len(source) != 4:
+                raise ValueError("load_animation: source tuple must contain (x, y, w, h)")
+            source_x, source_y, source_w, source_h = source
+
+        sheet_type = np.uint8 if self._mode == _MODE_PALETTE else np.dtype("<u2")
+        sheet = np.frombuffer(memoryview(sheet_data).tobytes(), dtype=sheet_type)[:sheet_w * sheet_h].reshape(sheet_h, sheet_w)
+
+        slots = []
+        for y in range(source_h // frame_h):
+            for x in range(source_w // frame_w):
+                fx = source_x + x * frame_w
+                fy = source_y + y * frame_h
+                self._define_sprite(slot, frame_w, frame_h, sheet[fy:fy + frame_h, fx:fx + frame_w])
+                slots.append(slot)
+                slot += 1
+        return slots
+
+    @_after_flip
+    def display_sprite(self, slot, sprite_index, x, y, blend_mode=SPRITE_UNDER, v_scale=1):
+        if not 0 <= slot < _MAX_DISPLAYED_SPRITES:
+            return
+        self._sprite_pending[slot] = bytes((
+            (blend_mode | ((v_scale - 1) << 3)) & 0xFF,
+            sprite_index & 0xFF, (sprite_index >> 8) & 0xFF,
+            x & 0xFF, (x >> 8) & 0xFF,
+            y & 0xFF, (y >> 8) & 0xFF))
+        self._sprite_bytes_requested += _SPRITE_ENTRY_LEN
+        if self._sprite_commit_mode == SPRITE_COMMIT_IMMEDIATE:
+            self._commit_sprite(slot)
+        else:
+            self._sprites_dirty = True
+
+    @_after_flip
+    def clear_sprite(self, slot):
+        if not 0 <= slot < _MAX_DISPLAYED_SPRITES:
+            return
+        self._sprite_pending[slot] = _CLEARED_SPRITE
+        self._sprite_bytes_requested += 3
+        if self._sprite_commit_mode == SPRITE_COMMIT_IMMEDIATE:
+            self._commit_sprite(slot)
+        else:
+            self._sprites_dirty = True
+
+    @_after_flip
+    def commit_sprites(self):
+        if not self._sprites_dirty:
+            return
+        for i in range(_MAX_DISPLAYED_SPRITES):
+            self._commit_sprite(i)
+        self._sprites_dirty = False
+
+    def set_sprite_commit_mode(self, mode):
+        if mode < SPRITE_COMMIT_IMMEDIATE or mode > SPRITE_COMMIT_AUTO:
+            raise ValueError("set_sprite_commit_mode: mode must be SPRITE_COMMIT_IMMEDIATE, SPRITE_COMMIT_MANUAL or SPRITE_COMMIT_AUTO")
+        # Don't leave anything queued when switching back to immediate mode
+        if mode == SPRITE_COMMIT_IMMEDIATE:
+            self.commit_sprites()
+        self._sprite_commit_mode = mode
+
+    def get_sprite_bytes_saved(self):
+        return self._sprite_bytes_saved
+
+    def _commit_sprite(self, slot, force=False):
+        entry = self._sprite_pending[slot]
+        if not force and entry == self._sprite_committed[slot]:
+            return
+        # The GPU only reads the first 3 bytes of a cleared sprite
+        length = 3 if entry[1] == 0xFF and entry[2] == 0xFF else _SPRITE_ENTRY_LEN
+        self._gpu.write(slot, entry[:length])
+        self._sprite_committed[slot] = entry
+        self._sprite_bytes_written += length
+
+    # Recording
+
+    def start_recording(self):
+        self._recording = True
+
+    def stop_recording(self):
+        self._recording = False
+
+    def _replay(self):
+        live_state = self._get_state()
+        self._replaying = True
+        try:
+            for method, args, kwargs, state in self._display_list:
+                self._set_state(state)
+                method(self, *args, **kwargs)
+        finally:
+            self._replaying = False
+            self._set_state(live_state)
+            self._display_list = []
+
+    # Flipping
+
+    def flush(self):
+        pass
+
+    def set_pixel_buffer_size(self, size):
+        if size < 0:
+            raise ValueError("set_pixel_buffer_size: size must be positive")
+        self._pixel_buffer_size = max(1, min(size, _PIXEL_BUFFER_SIZE))
+
+    def get_pixel_buffer_stats(self):
+        return (self._pixels_buffered - self._pixel_buffer_base[0], self._pixel_buffer_writes - self._pixel_buffer_base[1])
+
+    def reset_pixel_buffer_stats(self):
+        self._pixel_buffer_base = (self._pixels_buffered, self._pixel_buffer_writes)
+
+    def get_psram_stats(self):
+        """Transfers since the last reset. Nothing waits, so the queue is never deeper than 0."""
+        return (sum(bank.transfers for bank in self._banks) - self._psram_stats_base, 0, 0)
+
+    def reset_psram_stats(self):
+        self._psram_stats_base = sum(bank.transfers for bank in self._banks)
+
+    def _flip(self):
+        if self._mode == _MODE_PALETTE and self._rewrite_palette > 0:
+            self._write_palette()
+            self._rewrite_palette -= 1
+
+        if self._sprite_commit_mode == SPRITE_COMMIT_AUTO:
+            self.commit_sprites()
+        requested, written = self._sprite_bytes_requested, self._sprite_bytes_written
+        self._sprite_bytes_saved = requested - written if requested > written else 0
+        self._sprite_bytes_requested = 0
+        self._sprite_bytes_written = 0
+
+        self._bank ^= 1
+
+    def update(self):
+        self.flip_async()
+        self.wait_for_flip()
+
+    @_after_flip
+    def flip_async(self):
+        self._flip()
+        self._flip_pending = True
+
+    def is_flipping(self):
+        # The vsync comes as soon as it's waited for
+        return False
+
+    def set_vsync_callback(self, callback):
+        if callback is not None and not callable(callback):
+            raise TypeError("set_vsync_callback: callback must be callable or None")
+        self._vsync_callback = callback
+
+    def wait_for_flip(self):
+        if not self._flip_pending:
+            return
+        self._flip_pending = False
+        # The bank just drawn is now on screen
+        frame = self._gpu.composite(self._banks[self._bank ^ 1].data)
+        self._replay()
+
+        self._frame_count += 1
+        totals = self._totals()
+        stats = FrameStats(self._frame_count, *(now - then for now, then in zip(totals, self._counted)),
+                           frame.overflow_lines)
+        self._counted = totals
+        if frame_callback is not None:
+            frame_callback(self, frame.rgb, stats)
+        if self._vsync_callback is not None:
+            self._vsync_callback(self)
+
+    def _stats_totals(self):
+        return {
+            "psram_transfers": sum(bank.transfers for bank in self._banks),
+            "psram_bytes_written": sum(bank.bytes_written for bank in self._banks),
+            "psram_bytes_read": sum(bank.bytes_read for bank in self._banks),
+            "i2c_transfers": self._gpu.i2c_transfers,
+            # The device counts the register byte sent with each transfer
+            "i2c_bytes": self._gpu.i2c_bytes_written + self._gpu.i2c_transfers,
+            "pixels_buffered": self._pixels_buffered,
+            "pixel_buffer_writes": self._pixel_buffer_writes,
+            "flips": self._frame_count,
+        }
+
+    def stats(self):
+        """The device's performance counters. Every frame is shown for one vsync, and times are 0."""
+        stats = {name: value - self._stats_base[name] for name, value in self._stats_totals().items()}
+        stats.update({
+            "psram_page_splits": 0,
+            "psram_max_queue_depth": 0,
+            "psram_wait_us": 0,
+            "flips_shown": stats["flips"],
+            "flip_us": 0,
+            "flip_wait_us": 0,
+            "flip_latency_us": 0,
+            "flip_latency_max_us": 0,
+            "missed_vsyncs": 0,
+            # The first flip after a reset has no frame before it to time
+            "frame_vsyncs": (max(stats["flips"] - 1, 0), 0, 0, 0, 0),
+        })
+        return stats
+
+    def reset_stats(self):
+        self._stats_base = self._stats_totals()
+
+    def get_frame(self):
+        """Returns the image on screen, as a (height, width, 3) array of RGB."""
+        return self._gpu.composite(self._banks[self._bank ^ 1].data).rgb
+
+    def get_bank(self):
+        """Returns the bank on screen, as the GPU sees it, for saving or compositing again."""
+        return self._banks[self._bank ^ 1].data
+
+    def get_gpu_state(self):
+        """Returns the sprites, scroll groups and palette index the GPU has been sent."""
+        return self._gpu.get_state()
+
+    # Board I/O
+
+    def is_button_x_pressed(self):
+        return False
+
+    def is_button_a_pressed(self):
+        return False
+
+    def get_gpu_temp(self):
+        return 25.0
@@ -0,0 +1,11 @@
+"""A stand-in for ``pimoroni_i2c``, for breakouts the emulator pretends are attached."""
+
+
+class PimoroniI2C:
+    def __init__(self, sda=None, scl=None, baudrate=400_000):
+        self._sda = sda
+        self._scl = scl
+        self._baudrate = baudrate
+
+    def scan(self):
+        return []
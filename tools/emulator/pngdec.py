@@ -0,0 +1,56 @@
+"""A stand-in for the ``pngdec`` module, decoding with Pillow.
+
+Pixels are drawn into the display the way the device draws them, one at a time
+through the pen, so they cost what they would there. In PEN_P5 each colour is
+drawn with the nearest colour in the current palette.
+"""
+
+import numpy as np
+
+import picovision
+
+PNG_POSTERISE = 0
+PNG_DITHER = 1
+PNG_COPY = 2
+
+
+class PNG:
+    def __init__(self, display):
+        self._display = display
+        self._image = None
+
+    def _open(self, f):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise RuntimeError("pngdec needs Pillow")
+        image = Image.open(f)
+        image.load()
+        self._image = np.array(image.convert("RGBA"))
+
+    def open_file(self, filename):
+        with picovision._open_path(filename) as f:
+            self._open(f)
+
+    def open_RAM(self, data):
+        import io
+        self._open(io.BytesIO(memoryview(data).tobytes()))
+
+    def get_width(self):
+        return 0 if self._image is None else self._image.shape[1]
+
+    def get_height(self):
+        return 0 if self._image is None else self._image.shape[0]
+
+    def decode(self, x=0, y=0, scale=1, mode=PNG_POSTERISE, palette_offset=0, rotate=0, source=None):
+        if self._image is None:
+            raise RuntimeError("PNG: no file open")
+        image = self._image
+        if source is not None:
+            sx, sy, sw, sh = source
+            image = image[sy:sy + sh, sx:sx + sw]
+        image = np.rot90(image, -(rotate // 90) % 4)
+        scale = max(1, int(scale))
+        image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+        # Transparent pixels are skipped
+        self._display._draw_image(x, y, image[:, :, :3], image[:, :, 3] > 0)
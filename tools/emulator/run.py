@@ -0,0 +1,169 @@
+"""Run a PicoVision example headless on the emulator.
+
+    python tools/emulator/run.py examples/starfield.py --frames 60 --png frames/
+
+Prints the PSRAM and I2C bytes each frame cost the RP2040, and any scanlines
+with too many sprites for the GPU, then a summary. Optionally saves each frame
+as a PNG, or the bank behind it for compositor.py.
+"""
+
+import argparse
+import builtins
+import gc
+import os
+import runpy
+import sys
+import time
+
+EMULATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(EMULATOR_DIR))
+
+
+class FramesDone(BaseException):
+    """Stops the example once enough frames have been shown.
+
+    A BaseException so examples catching Exception don't swallow it.
+    """
+
+
+class TimeUp(BaseException):
+    """Stops the example once its clock has run for long enough.
+
+    Examples that animate with sprites and scroll groups, without calling
+    update() again, would otherwise never stop.
+    """
+
+
+def install_micropython_time(seconds):
+    # Sleeps advance a virtual clock rather than waiting, so headless runs go as fast as they can
+    start = time.monotonic_ns()
+    slept_ns = [0]
+
+    def now_ns():
+        ns = time.monotonic_ns() - start + slept_ns[0]
+        if ns > seconds * 1_000_000_000:
+            raise TimeUp
+        return ns
+
+    def sleep_ns(ns):
+        slept_ns[0] += max(0, int(ns))
+        now_ns()
+
+    time.ticks_ms = lambda: (now_ns() // 1_000_000) & 0x3FFFFFFF
+    time.ticks_us = lambda: (now_ns() // 1_000) & 0x3FFFFFFF
+    time.ticks_cpu = time.ticks_us
+    time.ticks_add = lambda ticks, delta: (ticks + delta) & 0x3FFFFFFF
+    time.ticks_diff = lambda end, start: ((end - start + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+    time.sleep = lambda s: sleep_ns(s * 1e9)
+    time.sleep_ms = lambda ms: sleep_ns(ms * 1e6)
+    time.sleep_us = lambda us: sleep_ns(us * 1e3)
+
+    gc.mem_free = lambda: 0
+    gc.mem_alloc = lambda: 0
+
+    # MicroPython's times are 8-tuples, without CPython's is_dst
+    localtime, gmtime, mktime = time.localtime, time.gmtime, time.mktime
+    time.localtime = lambda secs=None: tuple(localtime(secs))[:8]
+    time.gmtime = lambda secs=None: tuple(gmtime(secs))[:8]
+    time.mktime = lambda t: int(mktime(tuple(t)[:8] + (-1,)))
+
+
+def install_filesystem(root):
+    # Absolute paths into a directory under root, that isn't also on the computer, are opened from root
+    # so examples can read and write their files, eg: "/sneks_and_ladders/tiles-0-0-64-64.bin"
+    host_open = builtins.open
+
+    def device_open(file, *args, **kwargs):
+        if isinstance(file, str) and file.startswith("/"):
+            top = file.lstrip("/").split("/")[0]
+            if top and not os.path.exists("/" + top) and os.path.isdir(os.path.join(root, top)):
+                file = os.path.join(root, file.lstrip("/"))
+        return host_open(file, *args, **kwargs)
+
+    builtins.open = device_open
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("script", help="the example to run")
+    parser.add_argument("--frames", type=int, default=60, help="frames to run for (default: 60)")
+    parser.add_argument("--seconds", type=float, default=60, help="seconds of the example's clock to run for at most (default: 60)")
+    parser.add_argument("--png", metavar="DIR", help="save each frame to DIR as a PNG")
+    parser.add_argument("--root", metavar="DIR", help="the directory / maps to on the device (default: the examples directory)")
+    parser.add_argument("--dump", metavar="DIR", help="save the bank and GPU state behind each frame to DIR as a .npz")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    script = os.path.abspath(args.script)
+    script_dir = os.path.dirname(script)
+    root = os.path.abspath(args.root) if args.root else script_dir
+    if not args.root and os.path.basename(os.path.dirname(script_dir)) == "examples":
+        # Examples in their own directory refer to their files as "/<directory>/<file>"
+        root = os.path.dirname(script_dir)
+
+    sys.path[:0] = [EMULATOR_DIR, script_dir, os.path.join(REPO_DIR, "lib")]
+    install_micropython_time(args.seconds)
+
+    # MicroPython's urllib.urequest can't be a module here without hiding CPython's urllib
+    import urllib
+    import urequests
+    urllib.urequest = urequests
+    sys.modules["urllib.urequest"] = urequests
+
+    import compositor
+    import picovision
+    picovision.filesystem_root = root
+
+    if args.png:
+        from PIL import Image
+        os.makedirs(args.png, exist_ok=True)
+    if args.dump:
+        import numpy as np
+        os.makedirs(args.dump, exist_ok=True)
+
+    frames = []
+    frame_start = [time.perf_counter()]
+
+    def on_frame(display, image, stats):
+        host_ms = (time.perf_counter() - frame_start[0]) * 1000
+        frames.append(stats)
+        if not args.quiet:
+            print("frame {:4d}: PSRAM {:8d} bytes written {:7d} read, I2C {:5d} bytes, {:7.1f}ms on host".format(
+                stats.frame, stats.psram_bytes_written, stats.psram_bytes_read, stats.i2c_bytes_written, host_ms))
+            if stats.sprite_overflow_lines:
+                print("            {} scanlines over the sprite patch limit: {}".format(
+                    len(stats.sprite_overflow_lines), ", ".join(str(y) for y in stats.sprite_overflow_lines)))
+        if args.png:
+            Image.fromarray(image).save(os.path.join(args.png, "frame{:04d}.png".format(stats.frame)))
+        if args.dump:
+            np.savez_compressed(os.path.join(args.dump, "frame{:04d}.npz".format(stats.frame)),
+                                bank=display.get_bank(), **display.get_gpu_state())
+        if len(frames) >= args.frames:
+            raise FramesDone
+        frame_start[0] = time.perf_counter()
+
+    picovision.frame_callback = on_frame
+
+    os.chdir(root)
+    install_filesystem(root)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except (FramesDone, TimeUp):
+        pass
+
+    if not frames:
+        print("No frames were shown")
+        return 1
+
+    for name in ("psram_bytes_written", "psram_bytes_read", "i2c_bytes_written"):
+        values = [getattr(stats, name) for stats in frames]
+        print("{:20s} mean {:10.1f} max {:8d} total {:10d}".format(name, sum(values) / len(values), max(values), sum(values)))
+    overflowing = sum(1 for stats in frames if stats.sprite_overflow_lines)
+    if overflowing:
+        print("{} of {} frames had scanlines over the limit of {} sprite patches".format(
+            overflowing, len(frames), compositor.MAX_PATCHES_PER_LINE))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""MicroPython's ``urequests`` with no network: every request fails as it would offline."""
+
+
+def request(method, url, *args, **kwargs):
+    raise OSError(-2, "Host not found: {}".format(url))
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+def urlopen(url, data=None, method="GET"):
+    # urllib.urequest's only function, run.py installs this module as it too
+    return request(method, url)
@@ -0,0 +1,510 @@
+"""Convert MOD and MIDI files into songs for PicoSynth.play_song.
+
+    python tools/song_converter/convert_song.py tune.mod tune.pvsq
+    python tools/song_converter/convert_song.py tune.mid tune.pvsq --rows-per-beat 4 --loop
+
+Writes a .pvsq song, the compact pattern format PicoSynth's sequencer plays
+from the audio fill, so a song costs no Python time once it's started. The
+synth has no samples, so each MOD sample or MIDI program becomes a synth
+instrument: a waveform and envelope, as Channel.configure takes them. These
+default to something close to the original, and can be chosen with
+--instruments, a JSON file of Channel.configure arguments for each MOD sample
+number or MIDI program (or "drums"):
+
+    {"1": {"waveforms": ["SQUARE"], "attack": 0.005, "sustain": 0.5},
+     "drums": {"waveforms": ["NOISE"], "decay": 0.08, "sustain": 0}}
+
+The format is described in libraries/pico_synth_i2s/sequencer.hpp.
+"""
+
+import argparse
+import json
+import math
+import struct
+import sys
+
+MAGIC = b"PVSQ"
+VERSION = 1
+MAX_CHANNELS = 8
+NOTE_OFF = 0xFF
+NO_RESTART = 0xFF
+HAS_NOTE = 0x08
+HAS_INSTRUMENT = 0x10
+HAS_EFFECT = 0x20
+
+# As Sequencer::Effect
+ARPEGGIO = 1
+SLIDE_UP = 2
+SLIDE_DOWN = 3
+VOLUME_SLIDE = 4
+SET_VOLUME = 5
+SET_SPEED = 6
+SET_TEMPO = 7
+PATTERN_BREAK = 8
+POSITION_JUMP = 9
+NOTE_CUT = 10
+
+WAVEFORMS = {"NOISE": 128, "SQUARE": 64, "SAW": 32, "TRIANGLE": 16, "SINE": 8, "WAVE": 1}
+
+DEFAULT_SPEED = 6
+DEFAULT_TEMPO = 125
+PATTERN_ROWS = 64
+
+# A MOD's C-2, which plays its samples at the rate they're usually recorded, as middle C
+MOD_C_PERIOD = 428
+MOD_C_NOTE = 60
+MOD_CHANNEL_TAGS = {b"M.K.": 4, b"M!K!": 4, b"FLT4": 4, b"4CHN": 4, b"6CHN": 6, b"8CHN": 8, b"FLT8": 8, b"OCTA": 8, b"CD81": 8}
+MOD_SAMPLE_RATE = 8363
+
+MIDI_DRUM_CHANNEL = 9
+
+# What each family of eight General MIDI programs sounds most like on the synth
+GM_FAMILIES = [
+    {"waveforms": ["TRIANGLE", "SQUARE"], "attack": 0.005, "decay": 0.8, "sustain": 0.2, "release": 0.2},   # Piano
+    {"waveforms": ["SINE"], "attack": 0.002, "decay": 0.4, "sustain": 0.0, "release": 0.2},                 # Chromatic percussion
+    {"waveforms": ["SINE", "SQUARE"], "attack": 0.01, "decay": 0.05, "sustain": 0.9, "release": 0.05},      # Organ
+    {"waveforms": ["SAW", "TRIANGLE"], "attack": 0.005, "decay": 0.5, "sustain": 0.3, "release": 0.2},      # Guitar
+    {"waveforms": ["TRIANGLE"], "attack": 0.005, "decay": 0.3, "sustain": 0.6, "release": 0.1},             # Bass
+    {"waveforms": ["SAW"], "attack": 0.08, "decay": 0.2, "sustain": 0.8, "release": 0.3},                   # Strings
+    {"waveforms": ["SAW"], "attack": 0.1, "decay": 0.2, "sustain": 0.8, "release": 0.4},                    # Ensemble
+    {"waveforms": ["SAW", "SQUARE"], "attack": 0.03, "decay": 0.1, "sustain": 0.8, "release": 0.1},         # Brass
+    {"waveforms": ["SQUARE"], "attack": 0.02, "decay": 0.1, "sustain": 0.8, "release": 0.1, "pulse_width": 0.3},  # Reed
+    {"waveforms": ["SINE", "TRIANGLE"], "attack": 0.03, "decay": 0.1, "sustain": 0.8, "release": 0.15},     # Pipe
+    {"waveforms": ["SQUARE"], "attack": 0.005, "decay": 0.1, "sustain": 0.8, "release": 0.1},               # Synth lead
+    {"waveforms": ["TRIANGLE", "SAW"], "attack": 0.2, "decay": 0.3, "sustain": 0.7, "release": 0.5},        # Synth pad
+    {"waveforms": ["SAW"], "attack": 0.1, "decay": 0.3, "sustain": 0.5, "release": 0.5},                    # Synth effects
+    {"waveforms": ["TRIANGLE"], "attack": 0.005, "decay": 0.3, "sustain": 0.4, "release": 0.2},             # Ethnic
+    {"waveforms": ["TRIANGLE"], "attack": 0.002, "decay": 0.2, "sustain": 0.0, "release": 0.1},             # Percussive
+    {"waveforms": ["NOISE"], "attack": 0.01, "decay": 0.2, "sustain": 0.5, "release": 0.2},                 # Sound effects
+]
+GM_DRUMS = {"waveforms": ["NOISE"], "attack": 0.002, "decay": 0.1, "sustain": 0.0, "release": 0.05}
+DEFAULT_VOLUME = 0.6
+
+
+class SongError(Exception):
+    pass
+
+
+class Song:
+    """Rows of events, each (channel, note, instrument, effect), with None for what's left out."""
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.instruments = []
+        self.patterns = []
+        self.order = []
+        self.restart = NO_RESTART
+        self.speed = DEFAULT_SPEED
+        self.samples_per_tick = 0
+
+
+def instrument_bytes(settings):
+    """The 14 bytes of an instrument, from Channel.configure style settings."""
+    settings = dict(settings)
+    unknown = set(settings) - {"waveforms", "volume", "attack", "decay", "sustain", "release", "pulse_width"}
+    if unknown:
+        raise SongError("unknown instrument settings: {}".format(", ".join(sorted(unknown))))
+    waveforms = 0
+    for name in settings.get("waveforms", ["SQUARE"]):
+        if name.upper() not in WAVEFORMS:
+            raise SongError("unknown waveform {}, expected one of {}".format(name, ", ".join(WAVEFORMS)))
+        waveforms |= WAVEFORMS[name.upper()]
+
+    def fraction(name, default):
+        value = settings.get(name, default)
+        if not 0.0 <= value <= 1.0:
+            raise SongError("{} out of range. Expected 0.0 to 1.0".format(name))
+        return round(value * 65535)
+
+    def milliseconds(name, default):
+        value = round(settings.get(name, default) * 1000)
+        if not 0 <= value <= 65535:
+            raise SongError("{} out of range. Expected 0.0s to 65.5s".format(name))
+        return max(value, 1)
+
+    return struct.pack("<BBHHHHHH", waveforms, 0, fraction("volume", DEFAULT_VOLUME), milliseconds("attack", 0.005),
+                       milliseconds("decay", 0.1), fraction("sustain", 0.7), milliseconds("release", 0.1), fraction("pulse_width", 0.5))
+
+
+def pattern_bytes(rows):
+    data = bytearray()
+    for row in rows:
+        data.append(len(row))
+        for channel, note, instrument, effect in sorted(row, key=lambda event: event[0]):
+            flags = channel | (HAS_NOTE if note is not None else 0) | (HAS_INSTRUMENT if instrument is not None else 0) | (HAS_EFFECT if effect is not None else 0)
+            data.append(flags)
+            if note is not None:
+                data.append(note)
+            if instrument is not None:
+                data.append(instrument)
+            if effect is not None:
+                data += bytes(effect)
+    if len(data) > 0xFFFF:
+        raise SongError("a pattern is over 65535 bytes, try fewer rows per beat")
+    return struct.pack("<BH", len(rows) & 0xFF, len(data)) + data
+
+
+def song_bytes(song):
+    if not song.order:
+        raise SongError("there's nothing to play")
+    if len(song.instruments) > 255 or len(song.patterns) > 255 or len(song.order) > 255:
+        raise SongError("a song can have at most 255 instruments, patterns and positions")
+    header = MAGIC + struct.pack("<BBBBBBBBHH", VERSION, song.channels, len(song.instruments), len(song.patterns),
+                                 len(song.order), song.restart, song.speed, 0, song.samples_per_tick, 0)
+    return header + b"".join(song.instruments) + bytes(song.order) + b"".join(pattern_bytes(rows) for rows in song.patterns)
+
+
+def samples_per_tick(sample_rate, tempo):
+    """A tracker's tick is 2.5 / tempo seconds."""
+    return max(1, min(0xFFFF, round(sample_rate * 2.5 / tempo)))
+
+
+def load_instrument_map(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return {str(key).lower(): value for key, value in json.load(f).items()}
+
+
+# MOD
+
+def period_to_note(period):
+    return max(0, min(127, MOD_C_NOTE + round(12 * math.log2(MOD_C_PERIOD / period))))
+
+
+def note_frequency(note):
+    return 440.0 * 2 ** ((note - 69) / 12)
+
+
+def mod_channels(tag):
+    if tag in MOD_CHANNEL_TAGS:
+        return MOD_CHANNEL_TAGS[tag]
+    if tag[2:] == b"CH" and tag[:2].isdigit():
+        return int(tag[:2])
+    if tag[1:] == b"CHN" and tag[:1].isdigit():
+        return int(tag[:1])
+    raise SongError("not a 31 sample MOD file")
+
+
+def mod_effect(command, param, channel_note, period):
+    """The sequencer effect for a MOD effect, or None for ones it doesn't do."""
+    if command == 0x0 and param:
+        return (ARPEGGIO, param)
+    if command in (0x1, 0x2) and param and period:
+        # MOD slides are in period steps, which are roughly this many Hz at the note's pitch
+        hz = max(1, min(255, round(note_frequency(channel_note) * param / period)))
+        return (SLIDE_UP if command == 0x1 else SLIDE_DOWN, hz)
+    if command == 0xA:
+        return (VOLUME_SLIDE, param)
+    if command == 0xB:
+        return (POSITION_JUMP, param)
+    if command == 0xC:
+        return (SET_VOLUME, min(param, 64) * 255 // 64)
+    if command == 0xD:
+        return (PATTERN_BREAK, (param >> 4) * 10 + (param & 0xF))
+    if command == 0xE and param >> 4 == 0xC:
+        return (NOTE_CUT, param & 0xF)
+    if command == 0xF and param:
+        return (SET_SPEED, param) if param < 32 else (SET_TEMPO, param)
+    return None
+
+
+def convert_mod(data, args, instrument_map):
+    if len(data) < 1084:
+        raise SongError("not a 31 sample MOD file")
+    channels = mod_channels(data[1080:1084])
+    if channels > MAX_CHANNELS:
+        raise SongError("the MOD has {} channels, the synth has {}".format(channels, MAX_CHANNELS))
+
+    samples = []
+    for i in range(31):
+        name, length, finetune, volume, repeat_start, repeat_length = struct.unpack(">22sHBBHH", data[20 + i * 30:50 + i * 30])
+        samples.append({"length": length * 2, "volume": min(volume, 64), "looped": repeat_length > 1})
+
+    song_length = data[950]
+    restart = data[951]
+    order = list(data[952:952 + song_length])
+    pattern_total = max(data[952:1080]) + 1
+    pattern_size = 64 * channels * 4
+    if len(data) < 1084 + pattern_total * pattern_size:
+        raise SongError("the MOD is missing some of its patterns")
+
+    song = Song(channels)
+    song.speed = DEFAULT_SPEED
+    song.samples_per_tick = samples_per_tick(args.sample_rate, DEFAULT_TEMPO)
+    if restart < song_length and restart != 127:
+        song.restart = restart
+    elif args.loop:
+        song.restart = 0
+
+    # Only the samples that are played become instruments
+    instruments = {}
+
+    def instrument(number):
+        if number not in instruments:
+            sample = samples[number - 1]
+            settings = {"waveforms": ["SQUARE"], "volume": DEFAULT_VOLUME * sample["volume"] / 64}
+            if sample["looped"]:
+                settings.update(attack=0.005, decay=0.05, sustain=1.0, release=0.05)
+            else:
+                # Fades out over as long as the sample would have played for
+                length = max(0.02, min(2.0, sample["length"] / MOD_SAMPLE_RATE))
+                settings.update(attack=0.002, decay=length, sustain=0.0, release=0.02)
+            settings.update(instrument_map.get(str(number), {}))
+            song.instruments.append(instrument_bytes(settings))
+            instruments[number] = len(song.instruments)
+        return instruments[number]
+
+    # Patterns are numbered in the order they're first played, leaving out any that aren't
+    pattern_numbers = {}
+    channel_notes = [MOD_C_NOTE] * channels
+    channel_periods = [MOD_C_PERIOD] * channels
+    for pattern in order:
+        if pattern in pattern_numbers:
+            continue
+        pattern_numbers[pattern] = len(song.patterns)
+        rows = []
+        cells = data[1084 + pattern * pattern_size:1084 + (pattern + 1) * pattern_size]
+        for r in range(64):
+            row = []
+            for c in range(channels):
+                b = cells[(r * channels + c) * 4:(r * channels + c + 1) * 4]
+                number = (b[0] & 0xF0) | (b[2] >> 4)
+                period = ((b[0] & 0x0F) << 8) | b[1]
+                command = b[2] & 0x0F
+                param = b[3]
+
+                note = None
+                if period and command != 0x3:
+                    note = max(0, min(127, period_to_note(period) + args.transpose))
+                    channel_notes[c] = note
+                    channel_periods[c] = period
+                effect = mod_effect(command, param, channel_notes[c], channel_periods[c])
+                number = instrument(number) if 0 < number <= 31 else None
+                if note is not None or number is not None or effect is not None:
+                    row.append((c, note, number, effect))
+            rows.append(row)
+        song.patterns.append(rows)
+
+    song.order = [pattern_numbers[pattern] for pattern in order]
+    return song
+
+
+# MIDI
+
+def read_variable(data, i):
+    value = 0
+    while True:
+        byte = data[i]
+        i += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, i
+
+
+def midi_events(data):
+    """Each (tick, order, kind, values) in the file, merged across tracks, and the ticks per beat."""
+    if data[:4] != b"MThd":
+        raise SongError("not a MIDI file")
+    header_length, file_format, track_total, division = struct.unpack(">IHHH", data[4:14])
+    if file_format > 1:
+        raise SongError("only MIDI files of type 0 and 1 can be converted")
+    if division & 0x8000:
+        raise SongError("MIDI files timed in SMPTE frames can't be converted")
+
+    events = []
+    i = 8 + header_length
+    for track in range(track_total):
+        if data[i:i + 4] != b"MTrk":
+            raise SongError("MIDI track {} is missing".format(track))
+        end = i + 8 + struct.unpack(">I", data[i + 4:i + 8])[0]
+        i += 8
+        tick = 0
+        status = 0
+        while i < end:
+            delta, i = read_variable(data, i)
+            tick += delta
+            if data[i] & 0x80:
+                status = data[i]
+                i += 1
+            kind = status & 0xF0
+            if status == 0xFF:
+                meta = data[i]
+                length, i = read_variable(data, i + 1)
+                if meta == 0x51 and length == 3:
+                    events.append((tick, 1, "tempo", (int.from_bytes(data[i:i + 3], "big"),)))
+                elif meta == 0x2F:
+                    i += length
+                    break
+                i += length
+            elif status in (0xF0, 0xF7):
+                length, i = read_variable(data, i)
+                i += length
+            elif kind in (0x80, 0x90, 0xA0, 0xB0, 0xE0):
+                channel, note, velocity = status & 0x0F, data[i], data[i + 1]
+                i += 2
+                if kind == 0x90 and velocity > 0:
+                    events.append((tick, 3, "on", (channel, note, velocity)))
+                elif kind in (0x80, 0x90):
+                    events.append((tick, 0, "off", (channel, note)))
+            elif kind in (0xC0, 0xD0):
+                if kind == 0xC0:
+                    events.append((tick, 2, "program", (status & 0x0F, data[i])))
+                i += 1
+            else:
+                raise SongError("bad MIDI event in track {}".format(track))
+        i = end
+
+    # Notes ending as others start let the voice go first
+    events.sort(key=lambda event: (event[0], event[1]))
+    return events, division
+
+
+def convert_midi(data, args, instrument_map):
+    events, division = midi_events(data)
+    channels = args.channels
+    rows_per_beat = args.rows_per_beat
+    song = Song(channels)
+    song.speed = DEFAULT_SPEED
+    # The tempo that plays rows_per_beat rows of song.speed ticks each beat
+    tempo_scale = rows_per_beat * song.speed / 24
+    song.samples_per_tick = samples_per_tick(args.sample_rate, 120 * tempo_scale)
+
+    instruments = {}
+
+    def instrument(key):
+        if key not in instruments:
+            if key == "drums":
+                settings = dict(GM_DRUMS)
+            else:
+                settings = dict(GM_FAMILIES[key // 8])
+            settings.setdefault("volume", DEFAULT_VOLUME)
+            settings.update(instrument_map.get(str(key), {}))
+            song.instruments.append(instrument_bytes(settings))
+            instruments[key] = (len(song.instruments), settings["volume"])
+        return instruments[key]
+
+    rows = {}
+
+    def add(row, channel, note=None, number=None, effect=None):
+        events = rows.setdefault(row, {})
+        old = events.get(channel)
+        if old is not None:
+            # A note replaces a note off
+            note = note if note is not None else old[1]
+            number = number if number is not None else old[2]
+            effect = effect if effect is not None else old[3]
+        events[channel] = (channel, note, number, effect)
+
+    programs = [0] * 16
+    tempos = {}
+    # What each voice is playing, as (MIDI channel, note), and the row it started or stopped on
+    voices = [None] * channels
+    voice_rows = [-1] * channels
+    voice_instruments = [None] * channels
+    stolen = 0
+    last_row = 0
+    for tick, _, kind, values in events:
+        row = round(tick * rows_per_beat / division)
+        last_row = max(last_row, row)
+        if kind == "tempo":
+            bpm = 60000000 / values[0]
+            if row == 0:
+                song.samples_per_tick = samples_per_tick(args.sample_rate, bpm * tempo_scale)
+            else:
+                tempos[row] = max(1, min(255, round(bpm * tempo_scale)))
+        elif kind == "program":
+            programs[values[0]] = values[1]
+        elif kind == "off":
+            for c in range(channels):
+                if voices[c] == values:
+                    voices[c] = None
+                    # A note is at least a row long
+                    off_row = max(row, voice_rows[c] + 1)
+                    voice_rows[c] = off_row
+                    add(off_row, c, note=NOTE_OFF)
+                    last_row = max(last_row, off_row)
+                    break
+        else:
+            midi_channel, note, velocity = values
+            free = [c for c in range(channels) if voices[c] is None and voice_rows[c] <= row]
+            if free:
+                # The voice that's been quiet longest, so releases can ring on
+                c = min(free, key=lambda c: voice_rows[c])
+            else:
+                c = min(range(channels), key=lambda c: voice_rows[c])
+                stolen += 1
+            key = "drums" if midi_channel == MIDI_DRUM_CHANNEL else programs[midi_channel]
+            number, volume = instrument(key)
+            note = max(0, min(127, note + (0 if key == "drums" else args.transpose)))
+            add(row, c, note=note, number=number if voice_instruments[c] != number else None,
+                effect=(SET_VOLUME, round(255 * volume * velocity / 127)))
+            voices[c] = (midi_channel, values[1])
+            voice_rows[c] = row
+            voice_instruments[c] = number
+
+    # The tempo is only set by the header when the song starts, not when it loops
+    if tempos and args.loop:
+        tempos.setdefault(0, max(1, min(255, round(args.sample_rate * 2.5 / song.samples_per_tick))))
+
+    # Tempo changes go on a voice without an effect that row, or take over a velocity
+    for row, tempo in tempos.items():
+        events = rows.get(row, {})
+        free = [c for c in range(channels) if c not in events or events[c][3] is None]
+        add(row, free[0] if free else channels - 1, effect=(SET_TEMPO, tempo))
+
+    if stolen:
+        print("warning: {} notes cut short, there were more playing at once than --channels {}".format(stolen, channels), file=sys.stderr)
+
+    # Split into patterns, playing repeated ones again rather than keeping copies
+    total_rows = last_row + 1
+    pattern_numbers = {}
+    for start in range(0, total_rows, PATTERN_ROWS):
+        pattern = tuple(tuple(sorted(rows.get(r, {}).values())) for r in range(start, min(start + PATTERN_ROWS, total_rows)))
+        if pattern not in pattern_numbers:
+            pattern_numbers[pattern] = len(song.patterns)
+            song.patterns.append(pattern)
+        song.order.append(pattern_numbers[pattern])
+    if args.loop:
+        song.restart = 0
+    return song
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help=".mod or .mid file")
+    parser.add_argument("output", help=".pvsq file to write")
+    parser.add_argument("--instruments", metavar="JSON", help="Channel.configure settings for MOD samples or MIDI programs")
+    parser.add_argument("--sample-rate", type=int, default=22050, help="rate the synth plays at (default: 22050)")
+    parser.add_argument("--transpose", type=int, default=0, help="semitones to move every note by (default: 0)")
+    parser.add_argument("--loop", action="store_true", help="play from the start again at the end")
+    parser.add_argument("--channels", type=int, default=MAX_CHANNELS, choices=range(1, MAX_CHANNELS + 1), metavar="1-8",
+                        help="MIDI: synth channels to play the notes on (default: 8)")
+    parser.add_argument("--rows-per-beat", type=int, default=4, help="MIDI: rows each beat is quantised to (default: 4)")
+    args = parser.parse_args()
+
+    try:
+        with open(args.input, "rb") as f:
+            data = f.read()
+        instrument_map = load_instrument_map(args.instruments)
+        if data[:4] == b"MThd":
+            song = convert_midi(data, args, instrument_map)
+        else:
+            song = convert_mod(data, args, instrument_map)
+        output = song_bytes(song)
+    except (SongError, OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    except (IndexError, struct.error):
+        print("{} is cut short or damaged".format(args.input), file=sys.stderr)
+        return 1
+
+    with open(args.output, "wb") as f:
+        f.write(output)
+    print("{}: {} channels, {} instruments, {} patterns, {} positions, {} bytes".format(
+        args.output, song.channels, len(song.instruments), len(song.patterns), len(song.order), len(output)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+#pragma once
+
+// The little of the Pico SDK that pimoroni_common.hpp and the audio library use, so they build on a computer
+
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+
+typedef unsigned int uint;
+typedef uint64_t absolute_time_t;
+
+static inline absolute_time_t get_absolute_time() {
+  return std::chrono::duration_cast<std::chrono::microseconds>(std::chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+static inline uint32_t to_ms_since_boot(absolute_time_t t) {
+  return (uint32_t)(t / 1000);
+}
+
+static inline uint64_t to_us_since_boot(absolute_time_t t) {
+  return t;
+}
@@ -0,0 +1,141 @@
+// Measures how fast PicoSynth::get_audio_frame and render_block run on the computer
+// building it, for comparing changes to the synth and the cost of filling the audio
+// ring in blocks, and what each sample voice mixed over the synth adds to that.
+//
+//   synth_benchmark [seconds of audio per test, default 60]
+
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <initializer_list>
+
+#include "pico_synth.hpp"
+#include "synth_block.hpp"
+#include "sample_voice.hpp"
+
+using namespace pimoroni;
+
+namespace {
+  const uint32_t SAMPLE_RATE = 22050;
+
+  struct Voices {
+    const char* name;
+    uint8_t waveforms;
+    uint channels;
+  };
+
+  const Voices VOICES[] = {
+    {"silent", 0, 0},
+    {"1 sine", SINE, 1},
+    {"8 sine", SINE, PicoSynth::CHANNEL_COUNT},
+    {"8 square", SQUARE, PicoSynth::CHANNEL_COUNT},
+    {"8 noise", NOISE, PicoSynth::CHANNEL_COUNT},
+    {"8 mixed", SQUARE | SAW | TRIANGLE | SINE, PicoSynth::CHANNEL_COUNT},
+  };
+
+  // 4 is the block PicoSynth_I2S used to fill in the interrupt, the rest are ring blocks
+  const uint BLOCK_SIZES[] = {4, 64, 256, 512};
+  const uint MAX_BLOCK_SIZE = 512;
+
+  const uint MAX_SAMPLE_VOICES = 4;
+
+  void start_voices(PicoSynth &synth, const Voices &voices) {
+    for(auto i = 0u; i < voices.channels; i++) {
+      AudioChannel &channel = synth.channels[i];
+      channel.waveforms = voices.waveforms;
+      channel.frequency = 220 + i * 110;
+      channel.volume = 0xffff / PicoSynth::CHANNEL_COUNT;
+      channel.attack_ms = 10;
+      channel.decay_ms = 10;
+      channel.sustain = 0xc000;
+      channel.release_ms = 100;
+      // Held in sustain for the rest of the test
+      channel.trigger_attack();
+    }
+  }
+
+  double seconds_to_fill(const Voices &voices, uint block_size, bool per_sample, uint32_t samples, int32_t &checksum) {
+    PicoSynth synth(SAMPLE_RATE);
+    start_voices(synth, voices);
+
+    static int16_t block[MAX_BLOCK_SIZE];
+    auto start = std::chrono::steady_clock::now();
+    for(uint32_t done = 0; done < samples; done += block_size) {
+      if(per_sample) {
+        for(auto i = 0u; i < block_size; i++) {
+          block[i] = synth.get_audio_frame();
+        }
+      }
+      else {
+        render_block(synth, block, block_size, SAMPLE_RATE);
+      }
+      // Keep the compiler from throwing the samples away
+      checksum += block[block_size - 1];
+    }
+    std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+    return elapsed.count();
+  }
+
+  // Mixes looping sample voices into blocks the size of PicoSynth_I2S's default ring blocks
+  double seconds_to_mix(uint voice_count, uint32_t step, uint32_t samples, int32_t &checksum) {
+    const uint BLOCK_SIZE = 256;
+    const uint SAMPLE_LENGTH = SAMPLE_RATE / 2;
+    static int16_t sample[SAMPLE_LENGTH];
+    for(auto i = 0u; i < SAMPLE_LENGTH; i++) {
+      sample[i] = (int16_t)((i * 2654435761u) >> 16);
+    }
+
+    SampleVoice voices[MAX_SAMPLE_VOICES];
+    for(auto i = 0u; i < voice_count; i++) {
+      voices[i].start(sample, SAMPLE_LENGTH, true, 0, SAMPLE_LENGTH);
+      voices[i].step = step;
+      voices[i].volume = 0xffff / MAX_SAMPLE_VOICES;
+    }
+
+    static int16_t block[BLOCK_SIZE];
+    auto start = std::chrono::steady_clock::now();
+    for(uint32_t done = 0; done < samples; done += BLOCK_SIZE) {
+      for(auto i = 0u; i < voice_count; i++) {
+        voices[i].mix(block, BLOCK_SIZE, 0xffff);
+      }
+      checksum += block[BLOCK_SIZE - 1];
+    }
+    std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+    return elapsed.count();
+  }
+}
+
+int main(int argc, char *argv[]) {
+  double audio_seconds = argc > 1 ? atof(argv[1]) : 60.0;
+  if(audio_seconds <= 0) {
+    fprintf(stderr, "usage: %s [seconds of audio per test]\n", argv[0]);
+    return 1;
+  }
+  const uint32_t samples = (uint32_t)(audio_seconds * SAMPLE_RATE);
+
+  printf("%u samples per test, %.0fs of audio at %luHz\n\n", samples, audio_seconds, (unsigned long)SAMPLE_RATE);
+  printf("%-10s %6s %-8s %14s %12s %12s\n", "voices", "block", "render", "samples/s", "ns/sample", "x realtime");
+
+  int32_t checksum = 0;
+  for(auto &voices : VOICES) {
+    for(auto block_size : BLOCK_SIZES) {
+      for(auto per_sample : {true, false}) {
+        double elapsed = seconds_to_fill(voices, block_size, per_sample, samples, checksum);
+        double rate = samples / elapsed;
+        printf("%-10s %6u %-8s %14.0f %12.1f %12.1f\n", voices.name, block_size, per_sample ? "sample" : "block",
+               rate, elapsed * 1e9 / samples, rate / SAMPLE_RATE);
+      }
+    }
+  }
+
+  printf("\n%-10s %6s %14s %12s\n", "voices", "speed", "samples/s", "ns/voice");
+  for(auto step : {0x10000u, 0x18000u}) {
+    for(auto voice_count = 1u; voice_count <= MAX_SAMPLE_VOICES; voice_count++) {
+      double elapsed = seconds_to_mix(voice_count, step, samples, checksum);
+      printf("%-10u %6.2f %14.0f %12.1f\n", voice_count, step / 65536.0, samples / elapsed, elapsed * 1e9 / samples / voice_count);
+    }
+  }
+
+  printf("\nchecksum %ld\n", (long)checksum);
+  return 0;
+}
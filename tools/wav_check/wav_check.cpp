@@ -0,0 +1,95 @@
+// Decodes a WAV file with WavStream, as PicoSynth streams it, and compares it with a
+// reference decode of the same file, so IMA-ADPCM decoding can be checked on a computer.
+//
+//   wav_check input.wav reference.wav [tolerance, default 0]
+//
+// The reference should be 16 bit PCM at the same rate and channels, eg. from
+//   sox input.wav -e signed-integer reference.wav
+// Both are read through WavStream, so stereo is mixed down to mono the same way.
+
+#include <cstdio>
+#include <cstdlib>
+
+#include "wav_stream.hpp"
+
+using namespace pimoroni;
+
+namespace {
+  int read_file(void* context, uint8_t *buf, uint len) {
+    return (int)fread(buf, 1, len, (FILE *)context);
+  }
+
+  bool open_wav(WavStream &stream, FILE *&file, const char *path) {
+    file = fopen(path, "rb");
+    if(!file) {
+      fprintf(stderr, "can't open %s\n", path);
+      return false;
+    }
+    if(!stream.open(read_file, file)) {
+      fprintf(stderr, "%s isn't a 16 bit PCM or IMA-ADPCM WAV file\n", path);
+      return false;
+    }
+    printf("%s: %s, %u channels, %luHz\n", path, stream.get_format() == WavStream::IMA_ADPCM ? "IMA-ADPCM" : "PCM",
+           stream.get_channels(), (unsigned long)stream.get_sample_rate());
+    return true;
+  }
+
+  // Hands out the stream's samples one at a time, through the same double buffering a voice uses
+  struct Reader {
+    WavStream &stream;
+    const int16_t *data = nullptr;
+    uint32_t length = 0;
+    uint32_t position = 0;
+
+    bool next(int16_t &sample) {
+      while(position >= length) {
+        stream.fill();
+        if(!stream.next_block(data, length)) {
+          return false;
+        }
+        position = 0;
+      }
+      sample = data[position++];
+      return true;
+    }
+  };
+}
+
+int main(int argc, char *argv[]) {
+  if(argc < 3) {
+    fprintf(stderr, "usage: %s input.wav reference.wav [tolerance]\n", argv[0]);
+    return 2;
+  }
+  int tolerance = argc > 3 ? atoi(argv[3]) : 0;
+
+  static WavStream input, reference;
+  FILE *input_file, *reference_file;
+  if(!open_wav(input, input_file, argv[1]) || !open_wav(reference, reference_file, argv[2])) {
+    return 2;
+  }
+
+  Reader input_reader{input}, reference_reader{reference};
+  uint32_t samples = 0, differing = 0;
+  int max_difference = 0;
+  int16_t a, b;
+  while(true) {
+    bool have_a = input_reader.next(a);
+    bool have_b = reference_reader.next(b);
+    if(!have_a || !have_b) {
+      if(have_a || have_b) {
+        printf("lengths differ, %s ends first\n", have_a ? argv[2] : argv[1]);
+      }
+      break;
+    }
+    int difference = abs(a - b);
+    if(difference > tolerance) {
+      differing++;
+    }
+    max_difference = difference > max_difference ? difference : max_difference;
+    samples++;
+  }
+
+  printf("%lu samples, %lu differ by more than %d, largest difference %d\n",
+         (unsigned long)samples, (unsigned long)differing, tolerance, max_difference);
+  return differing == 0 ? 0 : 1;
+}